@@ -2,19 +2,310 @@ import { NextResponse } from 'next/server';
 import { MongoClient } from 'mongodb';
 import { v4 as uuidv4 } from 'uuid';
 import crypto from 'crypto';
+import fs from 'fs';
+import { AsyncLocalStorage } from 'async_hooks';
 import QRCode from 'qrcode';
 
 let cachedClient = null;
 let cachedDb = null;
 
-async function getDb() {
-  if (cachedDb) return cachedDb;
-  const client = await MongoClient.connect(process.env.MONGO_URL);
-  cachedDb = client.db(process.env.DB_NAME || 'freshfold');
+// Index plan: one entry per hot query. Listing indexes end in (createdAt, id)
+// so keyset pages are served straight from the index in sort order. Suburb
+// lookups go through the normalized suburbKey / zoneKeys fields.
+const INDEXES = [
+  // listings (bookings, admin orders, complaints, notifications)
+  { collection: 'orders', key: { userId: 1, createdAt: -1, id: -1 } },
+  { collection: 'orders', key: { createdAt: -1, id: -1 } },
+  { collection: 'orders', key: { status: 1, createdAt: -1, id: -1 } },
+  { collection: 'complaints', key: { userId: 1, createdAt: -1, id: -1 } },
+  { collection: 'complaints', key: { createdAt: -1, id: -1 } },
+  { collection: 'complaints', key: { status: 1, createdAt: -1, id: -1 } },
+  // point lookups
+  { collection: 'orders', key: { id: 1 }, options: { unique: true } },
+  { collection: 'orders', key: { trackingId: 1 }, options: { unique: true } },
+  { collection: 'complaints', key: { id: 1 }, options: { unique: true } },
+  { collection: 'users', key: { id: 1 }, options: { unique: true } },
+  { collection: 'users', key: { email: 1 }, options: { unique: true } },
+  { collection: 'drivers', key: { id: 1 }, options: { unique: true } },
+  { collection: 'promo_codes', key: { code: 1 } },
+  { collection: 'subscriptions', key: { userId: 1, status: 1 } },
+  { collection: 'payment_transactions', key: { sessionId: 1 } },
+  // capacity checks and driver auto-assign
+  { collection: 'orders', key: { pickupDate: 1, suburbKey: 1, pickupTimeSlot: 1 } },
+  // capacity calendar: equality on suburb first, then the date range
+  { collection: 'orders', key: { suburbKey: 1, pickupDate: 1, pickupTimeSlot: 1 } },
+  { collection: 'capacity_settings', key: { suburbKey: 1 } },
+  { collection: 'drivers', key: { zoneKeys: 1, status: 1 } },
+  { collection: 'driver_slots', key: { driverId: 1, pickupDate: 1, pickupTimeSlot: 1 }, options: { unique: true } },
+  // sessions and the notification outbox
+  { collection: 'sessions', key: { token: 1 }, options: { unique: true } },
+  { collection: 'sessions', key: { expiresAt: 1 }, options: { expireAfterSeconds: 0 } },
+  { collection: 'notifications', key: { status: 1, nextAttemptAt: 1 } },
+  { collection: 'notifications', key: { claimId: 1 }, options: { sparse: true } },
+  { collection: 'notifications', key: { createdAt: -1, id: -1 } },
+  // retention: delivered or abandoned rows carry expireAt
+  { collection: 'notifications', key: { expireAt: 1 }, options: { expireAfterSeconds: 0 } },
+  // webhook idempotency and the stale-event sweep
+  { collection: 'webhook_logs', key: { eventId: 1 }, options: { unique: true, sparse: true } },
+  { collection: 'webhook_logs', key: { status: 1, receivedAt: 1 } },
+  { collection: 'webhook_logs', key: { expireAt: 1 }, options: { expireAfterSeconds: 0 } },
+];
+
+async function ensureIndexes(db) {
+  const results = await Promise.allSettled(INDEXES.map(({ collection, key, options }) => db.collection(collection).createIndex(key, options || {})));
+  const failed = results.map((r, i) => r.status === 'rejected' && { ...INDEXES[i], error: r.reason.message }).filter(Boolean);
+  for (const f of failed) console.error(`Index ${f.collection} ${JSON.stringify(f.key)} failed:`, f.error);
+  return { created: results.length - failed.length, failed };
+}
+
+// Case- and whitespace-insensitive key for suburb equality lookups
+function suburbKey(suburb) {
+  return String(suburb || '').trim().toLowerCase();
+}
+
+const toKey = (expr) => ({ $toLower: { $trim: { input: { $ifNull: [expr, ''] } } } });
+
+// Data migrations, each applied once per database and recorded in `migrations`
+const MIGRATIONS = [
+  {
+    id: '2025-suburb-keys',
+    run: async (db) => ({
+      orders: (await db.collection('orders').updateMany({ suburbKey: { $exists: false } }, [{ $set: { suburbKey: toKey('$suburb') } }])).modifiedCount,
+      capacity_settings: (await db.collection('capacity_settings').updateMany({ suburbKey: { $exists: false } }, [{ $set: { suburbKey: toKey('$suburb') } }])).modifiedCount,
+      drivers: (await db.collection('drivers').updateMany({ zoneKeys: { $exists: false } }, [{ $set: { zoneKeys: { $map: { input: { $ifNull: ['$assignedZones', []] }, in: toKey('$$this') } } } }])).modifiedCount,
+    }),
+  },
+  {
+    // Per-driver pickup counters for each date/slot, rebuilt from assigned orders
+    id: '2026-driver-slots',
+    run: async (db) => {
+      await db.collection('driver_slots').createIndex({ driverId: 1, pickupDate: 1, pickupTimeSlot: 1 }, { unique: true });
+      await db.collection('orders').aggregate([
+        { $match: { driverId: { $ne: null } } },
+        { $group: { _id: { driverId: '$driverId', pickupDate: '$pickupDate', pickupTimeSlot: '$pickupTimeSlot' }, count: { $sum: 1 } } },
+        { $replaceWith: { driverId: '$_id.driverId', pickupDate: '$_id.pickupDate', pickupTimeSlot: '$_id.pickupTimeSlot', count: '$count' } },
+        { $merge: { into: 'driver_slots', on: ['driverId', 'pickupDate', 'pickupTimeSlot'], whenMatched: [{ $set: { count: '$$new.count' } }], whenNotMatched: 'insert' } },
+      ]).toArray();
+      return { driver_slots: await db.collection('driver_slots').countDocuments() };
+    },
+  },
+  {
+    // Build the admin stats projection from existing orders before any delta lands on it
+    id: '2026-admin-stats-projection',
+    run: async (db) => ({ totalOrders: (await rebuildAdminStats(db)).totalOrders }),
+  },
+  {
+    // Rows queued before the outbox have no nextAttemptAt, so no drain ever claims them; the
+    // old sendNotification only console-logged them, so close them out as logged. They get their
+    // expireAt here too: databases that already ran 2026-retention-expiry skip its backfill
+    id: '2026-legacy-notifications',
+    run: async (db) => ({
+      notifications: (await db.collection('notifications').updateMany(
+        { status: 'queued', nextAttemptAt: { $exists: false } },
+        { $set: { status: 'logged', expireAt: new Date(Date.now() + NOTIFY_RETENTION_MS) } })).modifiedCount,
+    }),
+  },
+  {
+    // Rows finished before retention existed expire one retention period from now
+    id: '2026-retention-expiry',
+    run: async (db) => ({
+      notifications: (await db.collection('notifications').updateMany(
+        { status: { $in: NOTIFY_FINAL_STATUSES }, expireAt: { $exists: false } }, { $set: { expireAt: new Date(Date.now() + NOTIFY_RETENTION_MS) } })).modifiedCount,
+      webhook_logs: (await db.collection('webhook_logs').updateMany(
+        { status: { $in: ['processed', 'failed'] }, expireAt: { $exists: false } }, { $set: { expireAt: new Date(Date.now() + WEBHOOK_LOG_RETENTION_MS) } })).modifiedCount,
+    }),
+  },
+];
+
+async function runMigrations(db, { force = false } = {}) {
+  const applied = {};
+  for (const migration of MIGRATIONS) {
+    if (!force && await db.collection('migrations').findOne({ id: migration.id })) continue;
+    applied[migration.id] = await migration.run(db);
+    await db.collection('migrations').updateOne({ id: migration.id }, { $set: { id: migration.id, appliedAt: new Date().toISOString(), result: applied[migration.id] } }, { upsert: true });
+  }
+  return applied;
+}
+
+// ===== SERVER TIMING =====
+// Each request runs inside a timing context. Handlers mark phases with lap()
+// or phase(), and every collection call is charged to `db.<collection>`. The
+// totals go out as a Server-Timing header and into per-endpoint histograms.
+const SERVER_TIMING = process.env.SERVER_TIMING !== 'off';
+const METRIC_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000];
+const METRICS_MAX_ENDPOINTS = 200;
+const timingStore = new AsyncLocalStorage();
+let metrics = new Map();
+let metricsSince = new Date().toISOString();
+
+function addTiming(name, ms) {
+  const timing = timingStore.getStore();
+  if (!timing) return;
+  const entry = timing.phases.get(name) || { dur: 0, count: 0 };
+  entry.dur += ms;
+  entry.count += 1;
+  timing.phases.set(name, entry);
+}
+
+// Charge the time since the previous mark (or the request start) to `name`
+function lap(name) {
+  const timing = timingStore.getStore();
+  if (!timing) return;
+  const now = performance.now();
+  addTiming(name, now - timing.mark);
+  timing.mark = now;
+}
+
+async function phase(name, fn) {
+  const start = performance.now();
+  try {
+    return await fn();
+  } finally {
+    const now = performance.now();
+    addTiming(name, now - start);
+    const timing = timingStore.getStore();
+    if (timing) timing.mark = now;
+  }
+}
+
+function timedResult(label, start, result) {
+  if (result && typeof result.toArray === 'function') return timedCursor(result, label);
+  if (result && typeof result.then === 'function') return result.finally(() => addTiming(label, performance.now() - start));
+  return result;
+}
+
+const CURSOR_FETCHES = new Set(['toArray', 'next', 'tryNext', 'hasNext', 'forEach']);
+
+// Cursor builders (sort, limit, project...) return the wrapped cursor; fetches are timed
+function timedCursor(cursor, label) {
+  const wrapped = new Proxy(cursor, {
+    get(target, prop) {
+      const value = Reflect.get(target, prop);
+      if (typeof value !== 'function') return value;
+      if (CURSOR_FETCHES.has(prop)) return (...args) => timedResult(label, performance.now(), value.apply(target, args));
+      return (...args) => {
+        const result = value.apply(target, args);
+        return result === target ? wrapped : result;
+      };
+    },
+  });
+  return wrapped;
+}
+
+function timedCollection(collection) {
+  const label = `db.${collection.collectionName}`;
+  return new Proxy(collection, {
+    get(target, prop) {
+      const value = Reflect.get(target, prop);
+      if (typeof value !== 'function') return value;
+      return (...args) => timedResult(label, performance.now(), value.apply(target, args));
+    },
+  });
+}
+
+function instrumentDb(db) {
+  return new Proxy(db, {
+    get(target, prop) {
+      const value = Reflect.get(target, prop);
+      if (prop === 'collection') return (name, options) => timedCollection(target.collection(name, options));
+      return typeof value === 'function' ? value.bind(target) : value;
+    },
+  });
+}
+
+// Route ids (uuids, tracking ids, session ids) all contain digits; route words never do
+function endpointKey(method, pathArr) {
+  return `${method} /api/${pathArr.map(s => /\d/.test(s) ? '{id}' : s).join('/')}`;
+}
+
+function observe(histograms, name, ms) {
+  const h = histograms[name] ||= { count: 0, sumMs: 0, maxMs: 0, buckets: new Array(METRIC_BUCKETS_MS.length + 1).fill(0) };
+  h.count += 1;
+  h.sumMs += ms;
+  h.maxMs = Math.max(h.maxMs, ms);
+  const i = METRIC_BUCKETS_MS.findIndex(b => ms <= b);
+  h.buckets[i === -1 ? METRIC_BUCKETS_MS.length : i] += 1;
+}
+
+function recordMetrics(key, timing, total) {
+  if (!metrics.has(key) && metrics.size >= METRICS_MAX_ENDPOINTS) return;
+  const histograms = metrics.get(key) || {};
+  for (const [name, { dur }] of timing.phases) observe(histograms, name, dur);
+  observe(histograms, 'total', total);
+  metrics.set(key, histograms);
+}
+
+function serverTimingHeader(timing, total) {
+  const entries = [...timing.phases].map(([name, { dur, count }]) => `${name};dur=${dur.toFixed(2)}${count > 1 ? `;desc="${count} calls"` : ''}`);
+  return [...entries, `total;dur=${total.toFixed(2)}`].join(', ');
+}
+
+// ===== DATABASE CONNECTION =====
+// One client per process. Concurrent first requests share the connect in
+// flight (and its one run of migrations and index setup) rather than each
+// opening a client of their own; a failed connect is retried by the next
+// caller. The pool is sized by MONGO_MAX_POOL_SIZE / MONGO_MIN_POOL_SIZE and,
+// unless DB_WARMUP=off, filled at module load so the first burst of requests
+// finds open connections.
+const MONGO_MAX_POOL_SIZE = parseInt(process.env.MONGO_MAX_POOL_SIZE) || 100;
+const MONGO_MIN_POOL_SIZE = parseInt(process.env.MONGO_MIN_POOL_SIZE ?? '5');
+const MONGO_MAX_IDLE_MS = parseInt(process.env.MONGO_MAX_IDLE_MS) || 60000;
+const MONGO_CONNECT_TIMEOUT_MS = parseInt(process.env.MONGO_CONNECT_TIMEOUT_MS) || 10000;
+const DB_WARMUP = process.env.DB_WARMUP !== 'off';
+const dbStats = { connects: 0, connectMs: null, connectionsCreated: 0, connectionsClosed: 0, warmedUp: false };
+let dbPromise = null;
+
+async function connectDb() {
+  const start = performance.now();
+  dbStats.connects += 1;
+  const client = new MongoClient(process.env.MONGO_URL, {
+    maxPoolSize: MONGO_MAX_POOL_SIZE,
+    minPoolSize: MONGO_MIN_POOL_SIZE,
+    maxIdleTimeMS: MONGO_MAX_IDLE_MS,
+    connectTimeoutMS: MONGO_CONNECT_TIMEOUT_MS,
+    serverSelectionTimeoutMS: MONGO_CONNECT_TIMEOUT_MS,
+  });
+  client.on('connectionCreated', () => { dbStats.connectionsCreated += 1; });
+  client.on('connectionClosed', () => { dbStats.connectionsClosed += 1; });
+  await client.connect();
+  const db = client.db(process.env.DB_NAME || 'freshfold');
+  try {
+    await runMigrations(db);
+    await ensureIndexes(db);
+  } catch (e) {
+    console.error('Database setup failed:', e);
+  }
+  cachedDb = SERVER_TIMING ? instrumentDb(db) : db;
   cachedClient = client;
+  dbStats.connectMs = performance.now() - start;
   return cachedDb;
 }
 
+async function getDb() {
+  if (cachedDb) return cachedDb;
+  dbPromise ||= connectDb().catch(e => {
+    dbPromise = null;
+    throw e;
+  });
+  return phase('db.connect', () => dbPromise);
+}
+
+// Parallel pings make the pool open MONGO_MIN_POOL_SIZE connections now
+// instead of on the first requests that need them
+async function warmUpDb() {
+  const db = await getDb();
+  await Promise.all(Array.from({ length: MONGO_MIN_POOL_SIZE }, () => db.command({ ping: 1 })));
+  dbStats.warmedUp = true;
+}
+
+if (DB_WARMUP && process.env.MONGO_URL && process.env.NEXT_PHASE !== 'phase-production-build') {
+  warmUpDb().catch(e => console.error('Database warm-up failed:', e));
+}
+
+function dbSnapshot() {
+  return { ...dbStats, maxPoolSize: MONGO_MAX_POOL_SIZE, minPoolSize: MONGO_MIN_POOL_SIZE, warmup: DB_WARMUP };
+}
+
 function hashPw(pw) {
   return crypto.createHash('sha256').update(pw).digest('hex');
 }
@@ -23,7 +314,9 @@ function cors() {
   return {
     'Access-Control-Allow-Origin': process.env.CORS_ORIGINS || '*',
     'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
-    'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+    'Access-Control-Allow-Headers': 'Content-Type,Authorization,If-None-Match,Last-Event-ID',
+    'Access-Control-Expose-Headers': 'ETag',
+    'Timing-Allow-Origin': process.env.CORS_ORIGINS || '*',
   };
 }
 
@@ -31,14 +324,81 @@ function json(data, status = 200) {
   return NextResponse.json(data, { status, headers: cors() });
 }
 
+// ===== SESSIONS =====
+// Sessions expire after SESSION_TTL_DAYS; a TTL index on expiresAt lets Mongo
+// prune them. Resolved users are kept in a bounded per-process LRU for
+// SESSION_CACHE_TTL_MS (0 disables it). Logout, role and subscription changes
+// invalidate entries here; other instances catch up within the cache TTL.
+const SESSION_TTL_MS = (parseInt(process.env.SESSION_TTL_DAYS) || 30) * 24 * 60 * 60 * 1000;
+const SESSION_CACHE_TTL_MS = parseInt(process.env.SESSION_CACHE_TTL_MS ?? '60000');
+const SESSION_CACHE_MAX = parseInt(process.env.SESSION_CACHE_MAX) || 10000;
+const PRUNE_INTERVAL_MS = 60 * 60 * 1000;
+const sessionCache = new Map();
+let lastPruneAt = 0;
+
+function cacheUser(token, user, sessionExpiresAt) {
+  if (SESSION_CACHE_TTL_MS <= 0) return;
+  let expires = Date.now() + SESSION_CACHE_TTL_MS;
+  if (sessionExpiresAt) expires = Math.min(expires, new Date(sessionExpiresAt).getTime());
+  sessionCache.delete(token);
+  sessionCache.set(token, { user, expires });
+  if (sessionCache.size > SESSION_CACHE_MAX) sessionCache.delete(sessionCache.keys().next().value);
+}
+
+function cachedUser(token) {
+  const entry = sessionCache.get(token);
+  if (!entry) return null;
+  sessionCache.delete(token);
+  if (entry.expires <= Date.now()) return null;
+  sessionCache.set(token, entry);
+  return { ...entry.user };
+}
+
+function invalidateUserCache(match) {
+  for (const [token, entry] of sessionCache) {
+    if (Object.entries(match).every(([k, v]) => entry.user[k] === v)) sessionCache.delete(token);
+  }
+}
+
+async function createSession(db, userId) {
+  const token = uuidv4();
+  const now = Date.now();
+  await db.collection('sessions').insertOne({
+    token, userId, active: true, createdAt: new Date(now).toISOString(), expiresAt: new Date(now + SESSION_TTL_MS),
+  });
+  pruneSessions(db).catch(e => console.error('Session pruning failed:', e));
+  return token;
+}
+
+// Backstop for rows the TTL index cannot expire: logged-out sessions and
+// sessions created before expiresAt existed.
+async function pruneSessions(db) {
+  if (Date.now() - lastPruneAt < PRUNE_INTERVAL_MS) return;
+  lastPruneAt = Date.now();
+  const cutoff = new Date(Date.now() - SESSION_TTL_MS).toISOString();
+  await db.collection('sessions').deleteMany({ $or: [{ active: false }, { expiresAt: { $exists: false }, createdAt: { $lt: cutoff } }] });
+}
+
 async function getUser(request) {
+  const user = await phase('auth', () => lookupUser(request));
+  const timing = timingStore.getStore();
+  if (timing) timing.user = user;
+  return user;
+}
+
+async function lookupUser(request) {
   const auth = request.headers.get('Authorization');
   if (!auth) return null;
   const token = auth.replace('Bearer ', '');
+  const cached = cachedUser(token);
+  if (cached) return cached;
   const db = await getDb();
   const session = await db.collection('sessions').findOne({ token, active: true });
   if (!session) return null;
-  return db.collection('users').findOne({ id: session.userId });
+  if (session.expiresAt && new Date(session.expiresAt) <= new Date()) return null;
+  const user = await db.collection('users').findOne({ id: session.userId }, { projection: { _id: 0 } });
+  if (user) cacheUser(token, user, session.expiresAt);
+  return user;
 }
 
 // ===== DATA =====
@@ -88,6 +448,8 @@ const TRACKING_STATUSES = [
   'Order Placed','Picked Up','Facility Intake','Washing','Drying','Ironing','Quality Check','Out for Delivery','Delivered'
 ];
 
+const PICKUP_SLOTS = ['8:00 AM - 10:00 AM','10:00 AM - 12:00 PM','12:00 PM - 2:00 PM','2:00 PM - 4:00 PM','4:00 PM - 6:00 PM'];
+
 const ONE_OFF_RATE_PER_KG = 5.99;
 const GST_RATE = 0.10;
 
@@ -107,8 +469,7 @@ async function handleRegister(request) {
   };
   user.referralCode = 'REF-' + user.id.substring(0, 8).toUpperCase();
   await db.collection('users').insertOne(user);
-  const token = uuidv4();
-  await db.collection('sessions').insertOne({ token, userId: user.id, active: true, createdAt: new Date().toISOString() });
+  const token = await createSession(db, user.id);
   const { password: _, ...safe } = user;
   return json({ user: safe, token });
 }
@@ -119,8 +480,7 @@ async function handleLogin(request) {
   const db = await getDb();
   const user = await db.collection('users').findOne({ email: email.toLowerCase() });
   if (!user || user.password !== hashPw(password)) return json({ error: 'Invalid credentials' }, 401);
-  const token = uuidv4();
-  await db.collection('sessions').insertOne({ token, userId: user.id, active: true, createdAt: new Date().toISOString() });
+  const token = await createSession(db, user.id);
   const { password: _, ...safe } = user;
   return json({ user: safe, token });
 }
@@ -132,6 +492,16 @@ async function handleMe(request) {
   return json({ user: safe });
 }
 
+async function handleLogout(request) {
+  const auth = request.headers.get('Authorization');
+  if (!auth) return json({ error: 'Unauthorized' }, 401);
+  const token = auth.replace('Bearer ', '');
+  sessionCache.delete(token);
+  const db = await getDb();
+  await db.collection('sessions').deleteOne({ token });
+  return json({ message: 'Logged out' });
+}
+
 async function handleGetPlans() {
   return json({ plans: PLANS });
 }
@@ -153,15 +523,18 @@ async function handleCreateBooking(request) {
     return json({ error: 'Service not available in this suburb. We serve Greater Geelong, Bellarine Peninsula, and Surf Coast areas.' }, 400);
   }
   if (!pickupDate || !pickupTimeSlot) return json({ error: 'Pickup date and time slot required' }, 400);
+  lap('validate');
 
   // Capacity check
   const db = await getDb();
-  const capacitySettings = await db.collection('capacity_settings').findOne({ suburb: { $regex: new RegExp(`^${suburb}$`, 'i') }, active: true });
+  const key = suburbKey(suburb);
+  const capacitySettings = await db.collection('capacity_settings').findOne({ suburbKey: key, active: true });
   const maxPerSlot = capacitySettings?.maxPerSlot || 5;
-  const slotBookings = await db.collection('orders').countDocuments({ pickupDate, pickupTimeSlot, suburb: { $regex: new RegExp(`^${suburb}$`, 'i') } });
+  const slotBookings = await db.collection('orders').countDocuments({ pickupDate, suburbKey: key, pickupTimeSlot });
   if (slotBookings >= maxPerSlot) {
     return json({ error: `This time slot is fully booked for ${suburb} on ${pickupDate}. Please choose another slot.` }, 400);
   }
+  lap('capacity');
 
   let baseCost = 0;
   let plan = null;
@@ -206,19 +579,15 @@ async function handleCreateBooking(request) {
   subtotal = parseFloat((subtotal - discount).toFixed(2));
   const gst = parseFloat((subtotal * GST_RATE).toFixed(2));
   const total = parseFloat((subtotal + gst).toFixed(2));
+  lap('pricing');
 
   const trackingId = 'FF-' + uuidv4().substring(0, 8).toUpperCase();
   const baseUrl = process.env.NEXT_PUBLIC_BASE_URL || 'http://localhost:3000';
   const trackingUrl = `${baseUrl}?track=${trackingId}`;
-  let qrCode = '';
-  try {
-    qrCode = await QRCode.toDataURL(trackingUrl, { width: 300, margin: 2 });
-  } catch(e) { console.error('QR generation failed', e); }
 
-  // Auto-assign driver based on suburb zone
-  let driverId = null, driverName = null;
-  const availableDriver = await db.collection('drivers').findOne({ status: 'active', assignedZones: { $regex: new RegExp(suburb, 'i') } });
-  if (availableDriver) { driverId = availableDriver.id; driverName = availableDriver.name; await db.collection('drivers').updateOne({ id: availableDriver.id }, { $inc: { currentOrders: 1 } }); }
+  // Auto-assign the least-loaded driver for the suburb zone and slot
+  const { driverId, driverName, overCap } = await assignDriver(db, key, pickupDate, pickupTimeSlot) || { driverId: null, driverName: null, overCap: false };
+  lap('driver');
 
   const order = {
     id: uuidv4(), trackingId,
@@ -227,7 +596,7 @@ async function handleCreateBooking(request) {
     guestName: guestName || user?.name || null,
     guestPhone: guestPhone || user?.phone || null,
     type: type || 'one-off', planId: planId || null, planName: plan?.name || 'One-Off Service',
-    suburb, pickupDate, pickupTimeSlot,
+    suburb, suburbKey: key, pickupDate, pickupTimeSlot,
     deliveryPreference: deliveryPreference || 'standard',
     items: items || 0, weightKg: weightKg || 5,
     instructions: instructions || '',
@@ -236,26 +605,80 @@ async function handleCreateBooking(request) {
     subtotal, gst, total,
     status: 'Order Placed',
     statusHistory: [{ status: 'Order Placed', timestamp: new Date().toISOString(), note: 'Order created' }],
-    paymentStatus: 'pending', qrCode, trackingUrl,
-    driverId, driverName,
+    paymentStatus: 'pending', qrUrl: qrPath(trackingId), trackingUrl,
+    driverId, driverName, driverOverCap: overCap,
     itemsConfirmed: false,
     createdAt: new Date().toISOString(), updatedAt: new Date().toISOString(),
   };
 
   await db.collection('orders').insertOne(order);
+  lap('insert');
+  await recordOrderStats(db, order);
+  lap('stats');
   
   // Send notification
   await sendNotification('order_created', { trackingId, trackingUrl, name: order.guestName, email: order.guestEmail, phone: order.guestPhone, total: order.total, planName: order.planName });
+  lap('notify');
 
   return json({ order, message: 'Booking created successfully' }, 201);
 }
 
+// ===== LISTING PAGINATION =====
+// Listings are keyset-paginated on (createdAt, id) descending and leave out
+// heavy fields (QR data URLs, status history, complaint photos) unless the
+// caller asks for them with ?include=field1,field2.
+const DEFAULT_PAGE_SIZE = 50;
+const MAX_PAGE_SIZE = 200;
+const HEAVY_FIELDS = {
+  orders: ['qrCode', 'statusHistory'],
+  complaints: ['photos'],
+};
+
+function encodeCursor(doc) {
+  return Buffer.from(`${doc.createdAt}|${doc.id}`).toString('base64url');
+}
+
+function decodeCursor(cursor) {
+  const [createdAt, id] = Buffer.from(cursor, 'base64url').toString().split('|');
+  return createdAt && id ? { createdAt, id } : null;
+}
+
+function pageParams(request) {
+  const url = new URL(request.url);
+  const limit = Math.min(Math.max(parseInt(url.searchParams.get('limit')) || DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE);
+  const cursor = url.searchParams.get('cursor');
+  const include = (url.searchParams.get('include') || '').split(',').filter(Boolean);
+  return { url, limit, cursor, include };
+}
+
+async function findPage(db, collectionName, filter, { limit, cursor, include }) {
+  let query = filter;
+  if (cursor) {
+    const after = decodeCursor(cursor);
+    if (!after) return null;
+    query = { $and: [filter, { $or: [{ createdAt: { $lt: after.createdAt } }, { createdAt: after.createdAt, id: { $lt: after.id } }] }] };
+  }
+  const projection = { _id: 0 };
+  for (const field of HEAVY_FIELDS[collectionName] || []) {
+    if (!include.includes(field)) projection[field] = 0;
+  }
+  const docs = await db.collection(collectionName).find(query, { projection }).sort({ createdAt: -1, id: -1 }).limit(limit + 1).toArray();
+  const items = docs.slice(0, limit);
+  return { items, nextCursor: docs.length > limit ? encodeCursor(items[items.length - 1]) : null };
+}
+
 async function handleGetBookings(request) {
   const user = await getUser(request);
   if (!user) return json({ error: 'Unauthorized' }, 401);
   const db = await getDb();
-  const orders = await db.collection('orders').find({ userId: user.id }).sort({ createdAt: -1 }).toArray();
-  return json({ orders });
+  const params = pageParams(request);
+  // The first page also carries the customer's order count for the dashboard
+  const [page, total] = await Promise.all([
+    findPage(db, 'orders', { userId: user.id }, params),
+    params.cursor ? undefined : db.collection('orders').countDocuments({ userId: user.id }),
+  ]);
+  if (!page) return json({ error: 'Invalid cursor' }, 400);
+  return json({ orders: page.items, nextCursor: page.nextCursor, total });
 }
 
 async function handleGetBooking(request, bookingId) {
@@ -284,7 +707,9 @@ async function handleUpdateBookingStatus(request, bookingId) {
   }
 
   await db.collection('orders').updateOne({ id: bookingId }, { $set: update });
+  if (update.status && update.status !== order.status) await recordStatusChange(db, order.status, update.status);
   const updated = await db.collection('orders').findOne({ id: bookingId });
+  if (!TRACKING_CHANGE_STREAM && (update.status || 'itemsConfirmed' in update)) publishTracking(updated, update.status ? update.statusHistory.at(-1) : null);
   
   // Send notification on status change
   if (status) {
@@ -294,11 +719,92 @@ async function handleUpdateBookingStatus(request, bookingId) {
   return json({ order: updated });
 }
 
-async function handleGetTracking(trackingId) {
+// Driver rounds: one read, one unordered bulk write, one stats update and one
+// notification insert for the whole list. Every entry gets its own result.
+const BULK_STATUS_MAX = 500;
+
+async function handleBulkUpdateStatus(request) {
+  const user = await getUser(request);
+  if (!user || user.role !== 'admin') return json({ error: 'Admin access required' }, 403);
+  const { updates } = await request.json();
+  if (!Array.isArray(updates) || !updates.length) return json({ error: 'updates must be a non-empty array of { orderId, status, note }' }, 400);
+  if (updates.length > BULK_STATUS_MAX) return json({ error: `At most ${BULK_STATUS_MAX} updates per request` }, 400);
+
+  const results = updates.map(u => ({ orderId: u?.orderId ?? null, ok: false }));
+  const seen = new Set();
+  const valid = [];
+  updates.forEach((u, i) => {
+    if (!u || typeof u.orderId !== 'string') results[i].error = 'orderId required';
+    else if (!TRACKING_STATUSES.includes(u.status)) results[i].error = 'Invalid status';
+    else if (seen.has(u.orderId)) results[i].error = 'Duplicate orderId in batch';
+    else {
+      seen.add(u.orderId);
+      valid.push(i);
+    }
+  });
+  lap('validate');
+
   const db = await getDb();
-  const order = await db.collection('orders').findOne({ trackingId });
-  if (!order) return json({ error: 'Tracking ID not found' }, 404);
-  return json({
+  const orders = db.collection('orders');
+  const found = await orders.find({ id: { $in: valid.map(i => updates[i].orderId) } }, { projection: { _id: 0, id: 1, trackingId: 1, status: 1, guestEmail: 1, guestName: 1, guestPhone: 1 } }).toArray();
+  const byId = new Map(found.map(o => [o.id, o]));
+  const pending = valid.filter(i => {
+    if (byId.has(updates[i].orderId)) return true;
+    results[i].error = 'Order not found';
+    return false;
+  });
+  lap('read');
+
+  const now = new Date().toISOString();
+  const ops = pending.map(i => {
+    const { orderId, status, note } = updates[i];
+    return { updateOne: { filter: { id: orderId }, update: { $set: { status, updatedAt: now }, $push: { statusHistory: { status, timestamp: now, note: note || '' } } } } };
+  });
+  const failedOps = new Map();
+  if (ops.length) {
+    try {
+      await orders.bulkWrite(ops, { ordered: false });
+    } catch (e) {
+      if (!e.writeErrors) throw e;
+      for (const err of [].concat(e.writeErrors)) failedOps.set(err.index, err.errmsg || err.message || 'Write failed');
+    }
+  }
+  const applied = [];
+  pending.forEach((i, op) => {
+    if (failedOps.has(op)) results[i].error = failedOps.get(op);
+    else {
+      results[i] = { orderId: updates[i].orderId, ok: true, status: updates[i].status };
+      applied.push(i);
+    }
+  });
+  lap('write');
+
+  const inc = {};
+  for (const i of applied) {
+    const from = byId.get(updates[i].orderId).status;
+    if (from === updates[i].status) continue;
+    inc[`status.${statsKey(from)}`] = (inc[`status.${statsKey(from)}`] || 0) - 1;
+    inc[`status.${statsKey(updates[i].status)}`] = (inc[`status.${statsKey(updates[i].status)}`] || 0) + 1;
+  }
+  if (Object.keys(inc).length) await applyStatsDelta(db, inc);
+  lap('stats');
+
+  const watched = applied.filter(i => trackingWatchers.has(byId.get(updates[i].orderId).trackingId));
+  if (!TRACKING_CHANGE_STREAM && watched.length) {
+    const fresh = await orders.find({ id: { $in: watched.map(i => updates[i].orderId) } }).toArray();
+    for (const order of fresh) publishTracking(order, order.statusHistory.at(-1));
+  }
+  await sendNotifications(applied.map(i => {
+    const order = byId.get(updates[i].orderId);
+    return { type: 'status_updated', data: { trackingId: order.trackingId, status: updates[i].status, email: order.guestEmail, name: order.guestName, phone: order.guestPhone } };
+  }));
+  lap('notify');
+
+  return json({ updated: applied.length, failed: updates.length - applied.length, results });
+}
+
+function trackingView(order) {
+  return {
     trackingId: order.trackingId,
     status: order.status,
     statusHistory: order.statusHistory,
@@ -309,9 +815,245 @@ async function handleGetTracking(trackingId) {
     items: order.items,
     itemsConfirmed: order.itemsConfirmed,
     confirmedItems: order.confirmedItems,
-    qrCode: order.qrCode,
+    qrUrl: qrPath(order.trackingId),
     createdAt: order.createdAt,
+  };
+}
+
+// Every tracked change rewrites updatedAt, so (status, updatedAt) identifies a version
+function trackingEtag(order) {
+  return `"${TRACKING_STATUSES.indexOf(order.status) + 1}-${Date.parse(order.updatedAt || order.createdAt).toString(36)}"`;
+}
+
+async function handleGetTracking(request, trackingId) {
+  const db = await getDb();
+  const orders = db.collection('orders');
+  const ifNoneMatch = request.headers.get('If-None-Match');
+  if (ifNoneMatch) {
+    // Long-poll: ?wait=N holds an unchanged request until the next delta or N seconds.
+    // Subscribe before reading so a change landing in between still wakes us.
+    const wait = Math.min(parseInt(new URL(request.url).searchParams.get('wait')) || 0, TRACKING_LONG_POLL_MAX_S);
+    const waiter = wait ? trackingWaiter(trackingId) : null;
+    try {
+      // Revalidation reads two fields; only a changed order pays for the full document
+      const current = await orders.findOne({ trackingId }, { projection: { _id: 0, status: 1, updatedAt: 1, createdAt: 1 } });
+      if (!current) return json({ error: 'Tracking ID not found' }, 404);
+      const headers = { ...cors(), ETag: trackingEtag(current), 'Cache-Control': 'no-cache' };
+      if (ifNoneMatch === headers.ETag && (!waiter || current.status === FINAL_TRACKING_STATUS || !(await waiter.next(wait * 1000, request.signal)))) {
+        return new NextResponse(null, { status: 304, headers });
+      }
+    } finally {
+      waiter?.close();
+    }
+  }
+  const order = await orders.findOne({ trackingId });
+  if (!order) return json({ error: 'Tracking ID not found' }, 404);
+  return NextResponse.json(trackingView(order), { headers: { ...cors(), ETag: trackingEtag(order), 'Cache-Control': 'no-cache' } });
+}
+
+// ===== TRACKING PUSH =====
+// Watchers of an order register a listener here; status changes are published
+// to them as deltas, so an idle watcher costs no reads. handleUpdateBookingStatus
+// publishes directly. With several app instances set TRACKING_CHANGE_STREAM=on,
+// and each process publishes from one shared change stream on orders instead
+// (needs a replica set).
+const TRACKING_HEARTBEAT_MS = parseInt(process.env.TRACKING_HEARTBEAT_MS) || 15000;
+const TRACKING_STREAM_MAX_MS = parseInt(process.env.TRACKING_STREAM_MAX_MS) || 5 * 60 * 1000;
+const TRACKING_LONG_POLL_MAX_S = 30;
+const TRACKING_CHANGE_STREAM = process.env.TRACKING_CHANGE_STREAM === 'on';
+const FINAL_TRACKING_STATUS = TRACKING_STATUSES[TRACKING_STATUSES.length - 1];
+const trackingWatchers = new Map();
+let orderChangeStream = null;
+
+function watchTracking(trackingId, listener) {
+  if (TRACKING_CHANGE_STREAM) startOrderChangeStream();
+  let listeners = trackingWatchers.get(trackingId);
+  if (!listeners) trackingWatchers.set(trackingId, listeners = new Set());
+  listeners.add(listener);
+  return () => {
+    listeners.delete(listener);
+    if (!listeners.size && trackingWatchers.get(trackingId) === listeners) trackingWatchers.delete(trackingId);
+  };
+}
+
+// Keeps the first delta published after it was created; next() resolves to it, or null on timeout/abort
+function trackingWaiter(trackingId) {
+  let delta = null;
+  let wake = () => {};
+  const close = watchTracking(trackingId, (d) => {
+    delta = delta || d;
+    wake();
   });
+  return {
+    close,
+    next(timeoutMs, signal) {
+      return new Promise(resolve => {
+        const timer = setTimeout(() => wake(), timeoutMs);
+        wake = () => {
+          clearTimeout(timer);
+          resolve(delta);
+        };
+        if (delta || signal?.aborted) wake();
+        signal?.addEventListener('abort', () => wake(), { once: true });
+      });
+    },
+  };
+}
+
+function publishTracking(order, entry) {
+  const listeners = trackingWatchers.get(order.trackingId);
+  if (!listeners) return;
+  const delta = {
+    trackingId: order.trackingId, version: order.statusHistory?.length || 0, status: order.status, entry: entry || null,
+    itemsConfirmed: order.itemsConfirmed, confirmedItems: order.confirmedItems, updatedAt: order.updatedAt, etag: trackingEtag(order),
+  };
+  for (const listener of [...listeners]) listener(delta);
+}
+
+async function startOrderChangeStream() {
+  if (orderChangeStream) return;
+  orderChangeStream = 'starting';
+  try {
+    const db = await getDb();
+    const stream = db.collection('orders').watch([{ $match: { operationType: 'update' } }], { fullDocument: 'updateLookup' });
+    stream.on('change', ({ fullDocument: order, updateDescription }) => {
+      const fields = updateDescription?.updatedFields || {};
+      if (!order || !('status' in fields || 'itemsConfirmed' in fields)) return;
+      publishTracking(order, 'statusHistory' in fields ? order.statusHistory.at(-1) : null);
+    });
+    stream.on('error', (e) => {
+      console.error('Order change stream failed:', e);
+      orderChangeStream = null;
+    });
+    orderChangeStream = stream;
+  } catch (e) {
+    console.error('Order change stream failed:', e);
+    orderChangeStream = null;
+  }
+}
+
+// Server-sent events: a snapshot (or, on reconnect, only the missed entries),
+// then one `status`/`items` event per change. The event id is the status
+// history length, which EventSource sends back as Last-Event-ID.
+async function handleTrackingEvents(request, trackingId) {
+  // Subscribe before the snapshot read; deltas arriving meanwhile are replayed below
+  const missed = [];
+  let deliver = (delta) => missed.push(delta);
+  const unwatch = watchTracking(trackingId, (delta) => deliver(delta));
+  let order;
+  try {
+    const db = await getDb();
+    order = await db.collection('orders').findOne({ trackingId });
+  } catch (e) {
+    unwatch();
+    throw e;
+  }
+  if (!order) {
+    unwatch();
+    return json({ error: 'Tracking ID not found' }, 404);
+  }
+  const history = order.statusHistory || [];
+  const lastEventId = parseInt(request.headers.get('Last-Event-ID'));
+  const resuming = Number.isInteger(lastEventId) && lastEventId <= history.length;
+  // A delivered order never changes again. EventSource reconnects after a
+  // closed stream but not after a 204, so answer 204 unless this reconnect
+  // still has to catch up on entries (the client closes on the last one).
+  if (order.status === FINAL_TRACKING_STATUS && (!resuming || lastEventId === history.length)) {
+    unwatch();
+    return new NextResponse(null, { status: 204, headers: cors() });
+  }
+  const encoder = new TextEncoder();
+  let close = () => {};
+  const stream = new ReadableStream({
+    start(controller) {
+      let closed = false;
+      const send = (event, data, id) => {
+        if (!closed) controller.enqueue(encoder.encode(`${id !== undefined ? `id: ${id}\n` : ''}event: ${event}\ndata: ${JSON.stringify(data)}\n\n`));
+      };
+      if (resuming) {
+        history.slice(lastEventId).forEach((entry, i) => send('status', { trackingId, version: lastEventId + i + 1, status: entry.status, entry }, lastEventId + i + 1));
+      } else {
+        send('snapshot', trackingView(order), history.length);
+      }
+      const heartbeat = setInterval(() => { if (!closed) controller.enqueue(encoder.encode(': ping\n\n')); }, TRACKING_HEARTBEAT_MS);
+      // Bounded lifetime keeps serverless invocations short; EventSource reconnects and resumes
+      const expiry = setTimeout(() => close(), TRACKING_STREAM_MAX_MS);
+      close = () => {
+        if (closed) return;
+        closed = true;
+        unwatch();
+        clearInterval(heartbeat);
+        clearTimeout(expiry);
+        try { controller.close(); } catch {}
+      };
+      deliver = (delta) => {
+        if (delta.entry) send('status', delta, delta.version);
+        else send('items', delta);
+        if (delta.status === FINAL_TRACKING_STATUS) close();
+      };
+      missed.filter(delta => !delta.entry || delta.version > history.length).forEach(deliver);
+      if (order.status === FINAL_TRACKING_STATUS) close();
+      request.signal?.addEventListener('abort', () => close(), { once: true });
+    },
+    cancel() {
+      close();
+    },
+  });
+  return new Response(stream, {
+    headers: { ...cors(), 'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache, no-transform', Connection: 'keep-alive', 'X-Accel-Buffering': 'no' },
+  });
+}
+
+// ===== QR CODES =====
+// QR images are rendered on first request and kept in a per-process LRU. A
+// tracking ID's URL never changes, so responses are immutable and carry an
+// ETag for cheap revalidation. Orders only store the qrUrl.
+const QR_CACHE_MAX = parseInt(process.env.QR_CACHE_MAX) || 1000;
+const qrCache = new Map();
+
+function qrPath(trackingId) {
+  return `/api/tracking/${encodeURIComponent(trackingId)}/qr`;
+}
+
+async function renderQr(trackingUrl) {
+  const png = await QRCode.toBuffer(trackingUrl, { type: 'png', width: 300, margin: 2 });
+  return { png, etag: `"${crypto.createHash('sha1').update(png).digest('base64url')}"` };
+}
+
+async function handleTrackingQr(request, trackingId) {
+  let pending = qrCache.get(trackingId);
+  if (pending) {
+    qrCache.delete(trackingId);
+  } else {
+    const db = await getDb();
+    const order = await db.collection('orders').findOne({ trackingId }, { projection: { _id: 0, trackingUrl: 1 } });
+    if (!order) return json({ error: 'Tracking ID not found' }, 404);
+    // Concurrent first requests share one render
+    pending = renderQr(order.trackingUrl);
+  }
+  qrCache.set(trackingId, pending);
+  if (qrCache.size > QR_CACHE_MAX) qrCache.delete(qrCache.keys().next().value);
+  let qr;
+  try {
+    qr = await phase('render', () => pending);
+  } catch (e) {
+    qrCache.delete(trackingId);
+    console.error('QR generation failed', e);
+    return json({ error: 'QR generation failed' }, 500);
+  }
+  const headers = { ...cors(), ETag: qr.etag, 'Cache-Control': 'public, max-age=31536000, immutable' };
+  if (request.headers.get('If-None-Match') === qr.etag) return new NextResponse(null, { status: 304, headers });
+  return new NextResponse(qr.png, { status: 200, headers: { ...headers, 'Content-Type': 'image/png' } });
+}
+
+// One Stripe client per process instead of an import and construction per call
+let stripeClient = null;
+
+function getStripe() {
+  stripeClient ||= import('stripe')
+    .then(({ default: Stripe }) => new Stripe(process.env.STRIPE_API_KEY))
+    .catch(e => { stripeClient = null; throw e; });
+  return stripeClient;
 }
 
 async function handleCreateCheckout(request) {
@@ -341,8 +1083,7 @@ async function handleCreateCheckout(request) {
   };
 
   try {
-    const Stripe = (await import('stripe')).default;
-    const stripe = new Stripe(process.env.STRIPE_API_KEY);
+    const stripe = await getStripe();
     const session = await stripe.checkout.sessions.create({
       payment_method_types: ['card'],
       line_items: [{
@@ -378,8 +1119,7 @@ async function handleCheckoutStatus(sessionId) {
   if (!txn) return json({ error: 'Transaction not found' }, 404);
 
   try {
-    const Stripe = (await import('stripe')).default;
-    const stripe = new Stripe(process.env.STRIPE_API_KEY);
+    const stripe = await getStripe();
     const session = await stripe.checkout.sessions.retrieve(sessionId);
     const newStatus = session.payment_status === 'paid' ? 'paid' : session.payment_status;
 
@@ -389,10 +1129,7 @@ async function handleCheckoutStatus(sessionId) {
         { $set: { paymentStatus: newStatus, status: session.status, updatedAt: new Date().toISOString() } }
       );
       if (newStatus === 'paid' && txn.orderId) {
-        await db.collection('orders').updateOne(
-          { id: txn.orderId },
-          { $set: { paymentStatus: 'paid', updatedAt: new Date().toISOString() } }
-        );
+        await markOrderPaid(db, txn.orderId);
       }
     }
     return json({ payment_status: newStatus, status: session.status, amount_total: session.amount_total, currency: session.currency });
@@ -438,9 +1175,13 @@ async function handleGetComplaints(request) {
   const user = await getUser(request);
   if (!user) return json({ error: 'Unauthorized' }, 401);
   const db = await getDb();
+  const params = pageParams(request);
   const filter = user.role === 'admin' ? {} : { userId: user.id };
-  const complaints = await db.collection('complaints').find(filter).sort({ createdAt: -1 }).toArray();
-  return json({ complaints });
+  const status = params.url.searchParams.get('status');
+  if (status) filter.status = status;
+  const page = await findPage(db, 'complaints', filter, params);
+  if (!page) return json({ error: 'Invalid cursor' }, 400);
+  return json({ complaints: page.items, nextCursor: page.nextCursor });
 }
 
 async function handleUpdateComplaint(request, complaintId) {
@@ -462,68 +1203,185 @@ async function handleUpdateComplaint(request, complaintId) {
   return json({ complaint: updated });
 }
 
-async function handleAdminStats() {
-  const db = await getDb();
-  const totalOrders = await db.collection('orders').countDocuments();
-  const activeSubscriptions = await db.collection('orders').countDocuments({ type: 'subscription', paymentStatus: 'paid' });
-  const totalRevenue = await db.collection('orders').aggregate([{ $match: { paymentStatus: 'paid' } }, { $group: { _id: null, total: { $sum: '$total' } } }]).toArray();
-  const oneOffOrders = await db.collection('orders').countDocuments({ type: 'one-off' });
-  const subOrders = await db.collection('orders').countDocuments({ type: 'subscription' });
-  const openComplaints = await db.collection('complaints').countDocuments({ status: 'open' });
-  const recentOrders = await db.collection('orders').find().sort({ createdAt: -1 }).limit(10).toArray();
-  const totalUsers = await db.collection('users').countDocuments();
+// ===== ADMIN STATS PROJECTION =====
+// Dashboard figures are kept in a single `admin_stats` document that is
+// $inc'd on order create, status change and payment, instead of re-running
+// the aggregations over the whole orders collection on every load.
+const ADMIN_STATS_ID = 'global';
 
-  const monthlyRevenue = await db.collection('orders').aggregate([
-    { $group: { _id: { $substr: ['$createdAt', 0, 7] }, revenue: { $sum: '$total' }, count: { $sum: 1 } } },
-    { $sort: { _id: 1 } },
-    { $limit: 12 }
-  ]).toArray();
+function statsKey(value) {
+  return (String(value ?? '') || 'Unknown').replace(/[.$]/g, '_');
+}
 
-  // Status breakdown for bar chart
-  const statusBreakdown = await db.collection('orders').aggregate([
-    { $group: { _id: '$status', count: { $sum: 1 } } }
-  ]).toArray();
+function round2(n) {
+  return parseFloat((n || 0).toFixed(2));
+}
 
-  // Plan distribution for pie chart
-  const planDistribution = await db.collection('orders').aggregate([
-    { $group: { _id: '$planName', count: { $sum: 1 }, revenue: { $sum: '$total' } } }
-  ]).toArray();
+// No upsert: a delta must never create a partial projection. While the doc
+// is missing the delta is dropped and the next read rebuilds it from orders.
+async function applyStatsDelta(db, inc) {
+  await db.collection('admin_stats').updateOne(
+    { id: ADMIN_STATS_ID },
+    { $inc: inc, $set: { updatedAt: new Date().toISOString() } }
+  );
+}
 
-  // Suburb distribution
-  const suburbStats = await db.collection('orders').aggregate([
-    { $group: { _id: '$suburb', count: { $sum: 1 } } },
-    { $sort: { count: -1 } },
-    { $limit: 10 }
-  ]).toArray();
+function orderStatsDelta(order) {
+  const total = order.total || 0;
+  const month = statsKey((order.createdAt || '').substring(0, 7));
+  const plan = statsKey(order.planName);
+  const inc = {
+    totalOrders: 1,
+    [`monthly.${month}.revenue`]: total, [`monthly.${month}.count`]: 1,
+    [`status.${statsKey(order.status)}`]: 1,
+    [`plans.${plan}.count`]: 1, [`plans.${plan}.revenue`]: total,
+    [`suburbs.${statsKey(order.suburb)}`]: 1,
+  };
+  if (order.type === 'one-off') inc.oneOffOrders = 1;
+  if (order.type === 'subscription') inc.subOrders = 1;
+  for (const a of order.addons || []) {
+    const name = statsKey(a.name);
+    inc[`addons.${name}.count`] = (inc[`addons.${name}.count`] || 0) + (a.quantity || 0);
+    inc[`addons.${name}.revenue`] = (inc[`addons.${name}.revenue`] || 0) + (a.subtotal || 0);
+  }
+  if (order.paymentStatus === 'paid') Object.assign(inc, paymentStatsDelta(order));
+  return inc;
+}
 
-  // Add-on revenue
-  const addOnRevenue = await db.collection('orders').aggregate([
-    { $unwind: { path: '$addons', preserveNullAndEmptyArrays: false } },
-    { $group: { _id: '$addons.name', count: { $sum: '$addons.quantity' }, revenue: { $sum: '$addons.subtotal' } } },
-    { $sort: { revenue: -1 } }
-  ]).toArray();
+function paymentStatsDelta(order) {
+  const inc = { totalRevenue: order.total || 0 };
+  if (order.type === 'subscription') inc.activeSubscriptions = 1;
+  return inc;
+}
 
-  // Active promo codes
-  const activePromos = await db.collection('promo_codes').countDocuments({ active: true });
-  const totalDrivers = await db.collection('drivers').countDocuments({ status: 'active' });
+async function recordOrderStats(db, order) {
+  await applyStatsDelta(db, orderStatsDelta(order));
+}
 
-  return json({
-    totalOrders, activeSubscriptions, oneOffOrders, subOrders, openComplaints, totalUsers,
-    totalRevenue: totalRevenue[0]?.total || 0,
-    recentOrders, monthlyRevenue, statusBreakdown, planDistribution, suburbStats, addOnRevenue,
-    activePromos, totalDrivers,
-  });
+async function recordStatusChange(db, fromStatus, toStatus) {
+  await applyStatsDelta(db, { [`status.${statsKey(fromStatus)}`]: -1, [`status.${statsKey(toStatus)}`]: 1 });
+}
+
+// Flips an order to paid exactly once, so webhook retries and status polls
+// never double-count revenue in the projection. Returns the order on the
+// call that flipped it and null otherwise.
+async function markOrderPaid(db, orderId) {
+  const order = await db.collection('orders').findOneAndUpdate(
+    { id: orderId, paymentStatus: { $ne: 'paid' } },
+    { $set: { paymentStatus: 'paid', updatedAt: new Date().toISOString() } },
+    { returnDocument: 'after', projection: { _id: 0, total: 1, type: 1, trackingId: 1, guestEmail: 1, guestName: 1 } }
+  );
+  if (!order) return null;
+  await applyStatsDelta(db, paymentStatsDelta(order));
+  return order;
+}
+
+// Full recomputation from the orders collection; used to bootstrap the
+// projection and by POST /api/admin/stats/rebuild after bulk imports.
+// Increments landing while a rebuild aggregates can be lost, so rebuild
+// during quiet periods.
+async function computeAdminStats(db) {
+  const orders = db.collection('orders');
+  const [totals, paid, monthly, status, plans, suburbs, addons] = await Promise.all([
+    orders.aggregate([{ $group: { _id: '$type', count: { $sum: 1 } } }]).toArray(),
+    orders.aggregate([{ $match: { paymentStatus: 'paid' } }, { $group: { _id: '$type', total: { $sum: '$total' }, count: { $sum: 1 } } }]).toArray(),
+    orders.aggregate([{ $group: { _id: { $substr: ['$createdAt', 0, 7] }, revenue: { $sum: '$total' }, count: { $sum: 1 } } }]).toArray(),
+    orders.aggregate([{ $group: { _id: '$status', count: { $sum: 1 } } }]).toArray(),
+    orders.aggregate([{ $group: { _id: '$planName', count: { $sum: 1 }, revenue: { $sum: '$total' } } }]).toArray(),
+    orders.aggregate([{ $group: { _id: '$suburb', count: { $sum: 1 } } }]).toArray(),
+    orders.aggregate([
+      { $unwind: { path: '$addons', preserveNullAndEmptyArrays: false } },
+      { $group: { _id: '$addons.name', count: { $sum: '$addons.quantity' }, revenue: { $sum: '$addons.subtotal' } } },
+    ]).toArray(),
+  ]);
+  const stats = {
+    id: ADMIN_STATS_ID,
+    totalOrders: totals.reduce((n, t) => n + t.count, 0),
+    oneOffOrders: totals.find(t => t._id === 'one-off')?.count || 0,
+    subOrders: totals.find(t => t._id === 'subscription')?.count || 0,
+    totalRevenue: paid.reduce((n, p) => n + p.total, 0),
+    activeSubscriptions: paid.find(p => p._id === 'subscription')?.count || 0,
+    monthly: {}, status: {}, plans: {}, suburbs: {}, addons: {},
+    rebuiltAt: new Date().toISOString(), updatedAt: new Date().toISOString(),
+  };
+  for (const m of monthly) stats.monthly[statsKey(m._id)] = { revenue: m.revenue, count: m.count };
+  for (const st of status) stats.status[statsKey(st._id)] = st.count;
+  for (const p of plans) stats.plans[statsKey(p._id)] = { count: p.count, revenue: p.revenue };
+  for (const sb of suburbs) stats.suburbs[statsKey(sb._id)] = sb.count;
+  for (const a of addons) stats.addons[statsKey(a._id)] = { count: a.count, revenue: a.revenue };
+  return stats;
+}
+
+async function rebuildAdminStats(db) {
+  const stats = await computeAdminStats(db);
+  await db.collection('admin_stats').replaceOne({ id: ADMIN_STATS_ID }, stats, { upsert: true });
+  return stats;
+}
+
+function formatAdminStats(stats) {
+  const entries = (obj) => Object.entries(obj || {});
+  return {
+    totalOrders: stats.totalOrders || 0,
+    activeSubscriptions: stats.activeSubscriptions || 0,
+    oneOffOrders: stats.oneOffOrders || 0,
+    subOrders: stats.subOrders || 0,
+    totalRevenue: round2(stats.totalRevenue),
+    monthlyRevenue: entries(stats.monthly).map(([_id, m]) => ({ _id, revenue: round2(m.revenue), count: m.count }))
+      .filter(m => m.count > 0).sort((a, b) => a._id.localeCompare(b._id)).slice(0, 12),
+    statusBreakdown: entries(stats.status).filter(([, count]) => count > 0).map(([_id, count]) => ({ _id, count })),
+    planDistribution: entries(stats.plans).filter(([, p]) => p.count > 0).map(([_id, p]) => ({ _id, count: p.count, revenue: round2(p.revenue) })),
+    suburbStats: entries(stats.suburbs).filter(([, count]) => count > 0).map(([_id, count]) => ({ _id, count }))
+      .sort((a, b) => b.count - a.count).slice(0, 10),
+    addOnRevenue: entries(stats.addons).filter(([, a]) => a.count > 0).map(([_id, a]) => ({ _id, count: a.count, revenue: round2(a.revenue) }))
+      .sort((a, b) => b.revenue - a.revenue),
+    statsUpdatedAt: stats.updatedAt,
+  };
+}
+
+async function handleAdminStats(request) {
+  const db = await getDb();
+  const url = new URL(request.url);
+  let stats;
+  if (url.searchParams.get('live') === '1') {
+    // Live aggregation bypassing the projection, for verification only
+    const user = await getUser(request);
+    if (!user || user.role !== 'admin') return json({ error: 'Admin access required' }, 403);
+    stats = await computeAdminStats(db);
+  } else {
+    stats = await db.collection('admin_stats').findOne({ id: ADMIN_STATS_ID });
+    if (!stats) stats = await rebuildAdminStats(db);
+  }
+
+  const [openComplaints, recentOrders, totalUsers, activePromos, totalDrivers] = await Promise.all([
+    db.collection('complaints').countDocuments({ status: 'open' }),
+    db.collection('orders').find({}, { projection: { _id: 0, qrCode: 0, statusHistory: 0 } }).sort({ createdAt: -1 }).limit(10).toArray(),
+    db.collection('users').estimatedDocumentCount(),
+    db.collection('promo_codes').countDocuments({ active: true }),
+    db.collection('drivers').countDocuments({ status: 'active' }),
+  ]);
+
+  return json({ ...formatAdminStats(stats), openComplaints, totalUsers, recentOrders, activePromos, totalDrivers });
+}
+
+async function handleRebuildAdminStats(request) {
+  const user = await getUser(request);
+  if (!user || user.role !== 'admin') return json({ error: 'Admin access required' }, 403);
+  const db = await getDb();
+  const started = Date.now();
+  const stats = await rebuildAdminStats(db);
+  return json({ message: 'Admin stats rebuilt', totalOrders: stats.totalOrders, durationMs: Date.now() - started });
 }
 
 async function handleAdminOrders(request) {
   const user = await getUser(request);
   if (!user || user.role !== 'admin') return json({ error: 'Admin access required' }, 403);
   const db = await getDb();
-  const url = new URL(request.url);
-  const status = url.searchParams.get('status');
+  const params = pageParams(request);
+  const status = params.url.searchParams.get('status');
   const filter = status ? { status } : {};
-  const orders = await db.collection('orders').find(filter).sort({ createdAt: -1 }).toArray();
-  return json({ orders });
+  const page = await findPage(db, 'orders', filter, params);
+  if (!page) return json({ error: 'Invalid cursor' }, 400);
+  return json({ orders: page.items, nextCursor: page.nextCursor });
 }
 
 async function handleSubscribe(request) {
@@ -542,6 +1400,7 @@ async function handleSubscribe(request) {
   };
   await db.collection('subscriptions').insertOne(subscription);
   await db.collection('users').updateOne({ id: user.id }, { $set: { subscription: { planId: plan.id, planName: plan.name, status: 'active' } } });
+  invalidateUserCache({ id: user.id });
   return json({ subscription, message: 'Subscribed to ' + plan.name });
 }
 
@@ -579,6 +1438,7 @@ async function handleUpdateSubscription(request) {
     const updated = await db.collection('subscriptions').findOne({ id: sub.id });
     await db.collection('users').updateOne({ id: user.id }, { $set: { subscription: { planId: updated.planId, planName: updated.planName, status: updated.status } } });
   }
+  invalidateUserCache({ id: user.id });
   const updatedSub = await db.collection('subscriptions').findOne({ id: sub.id });
   return json({ subscription: updatedSub });
 }
@@ -590,12 +1450,83 @@ async function handleMakeAdmin(request) {
   const db = await getDb();
   const result = await db.collection('users').updateOne({ email: email.toLowerCase() }, { $set: { role: 'admin' } });
   if (result.matchedCount === 0) return json({ error: 'User not found' }, 404);
+  invalidateUserCache({ email: email.toLowerCase() });
   return json({ message: 'User promoted to admin' });
 }
 
 // ===== NOTIFICATION SYSTEM (Ready for SendGrid/Twilio) =====
-async function sendNotification(type, data) {
-  const db = await getDb();
+// Handlers only enqueue: sendNotification writes a 'queued' row to the
+// notifications collection (the outbox) and returns. A worker claims queued
+// rows in batches, delivers them under per-channel rate limits and retries
+// failures with exponential backoff. The in-process worker is kicked on every
+// enqueue; set NOTIFY_WORKER=off and call POST /api/admin/notifications/drain
+// from a scheduler where background work does not survive the response.
+// Sent, logged and failed rows get an expireAt NOTIFICATION_RETENTION_DAYS
+// out, and a TTL index removes them; queued rows never expire.
+const NOTIFY_BATCH_SIZE = parseInt(process.env.NOTIFY_BATCH_SIZE) || 50;
+const NOTIFY_MAX_ATTEMPTS = parseInt(process.env.NOTIFY_MAX_ATTEMPTS) || 5;
+const NOTIFY_BACKOFF_MS = parseInt(process.env.NOTIFY_BACKOFF_MS) || 2000;
+const NOTIFY_LOCK_MS = 5 * 60 * 1000;
+const NOTIFY_RETENTION_MS = (parseInt(process.env.NOTIFICATION_RETENTION_DAYS) || 30) * 24 * 60 * 60 * 1000;
+const NOTIFY_FINAL_STATUSES = ['sent', 'logged', 'failed'];
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+// Spaces calls at least 1/perSecond apart, shared by all concurrent senders
+function rateLimiter(perSecond) {
+  let nextAt = 0;
+  return async () => {
+    const now = Date.now();
+    const at = Math.max(now, nextAt);
+    nextAt = at + 1000 / perSecond;
+    if (at > now) await sleep(at - now);
+  };
+}
+
+// Stand-in provider for load tests: NOTIFY_STUB_DELAY_MS adds latency,
+// NOTIFY_STUB_FAILURE_RATE (0-1) makes that share of sends throw.
+function stubProvider(name) {
+  if (!process.env.NOTIFY_STUB_DELAY_MS && !process.env.NOTIFY_STUB_FAILURE_RATE) return null;
+  return {
+    name,
+    send: async () => {
+      await sleep(parseInt(process.env.NOTIFY_STUB_DELAY_MS) || 0);
+      if (Math.random() < (parseFloat(process.env.NOTIFY_STUB_FAILURE_RATE) || 0)) throw new Error(`${name} unavailable`);
+    },
+  };
+}
+
+const NOTIFY_CHANNELS = [
+  {
+    field: 'email',
+    limit: rateLimiter(parseFloat(process.env.NOTIFY_EMAIL_RATE) || 50),
+    // SendGrid integration (ready - add SENDGRID_API_KEY to .env)
+    provider: () => process.env.SENDGRID_API_KEY ? {
+      name: 'sendgrid',
+      send: async (notification) => {
+        // TODO: Uncomment when @sendgrid/mail is installed and SENDGRID_API_KEY is set
+        // const sgMail = require('@sendgrid/mail');
+        // sgMail.setApiKey(process.env.SENDGRID_API_KEY);
+        // await sgMail.send({ to: notification.email, from: process.env.SENDGRID_FROM || 'noreply@freshfold.com.au', subject: notification.subject, text: notification.message, html: `<div style="font-family:sans-serif;max-width:600px;margin:0 auto;padding:20px"><h2 style="color:#3B82F6">Fresh Fold</h2><p>${notification.message}</p><hr><p style="color:#94A3B8;font-size:12px">Fresh Fold Pty Ltd | Geelong, VIC 3220</p></div>` });
+      },
+    } : stubProvider('email-stub'),
+  },
+  {
+    field: 'phone',
+    limit: rateLimiter(parseFloat(process.env.NOTIFY_SMS_RATE) || 10),
+    // Twilio SMS integration (ready - add TWILIO_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE to .env)
+    provider: () => process.env.TWILIO_SID && process.env.TWILIO_AUTH_TOKEN ? {
+      name: 'twilio',
+      send: async (notification) => {
+        // TODO: Uncomment when twilio is installed and keys are set
+        // const twilio = require('twilio')(process.env.TWILIO_SID, process.env.TWILIO_AUTH_TOKEN);
+        // await twilio.messages.create({ body: notification.message, from: process.env.TWILIO_PHONE, to: notification.phone });
+      },
+    } : stubProvider('sms-stub'),
+  },
+];
+
+function buildNotification(type, data) {
   const subjects = {
     'order_created': 'Fresh Fold - Order Confirmed!',
     'status_updated': 'Fresh Fold - Order Status Update',
@@ -616,61 +1547,306 @@ async function sendNotification(type, data) {
     'subscription_paused': `Your ${data.planName} subscription has been paused. Resume anytime.`,
     'subscription_cancelled': `Your ${data.planName} subscription has been cancelled.`,
   };
+  const now = new Date().toISOString();
   const notification = {
     id: uuidv4(), type, data: { ...data, _sanitized: true },
     email: data.email || null, phone: data.phone || null,
     subject: subjects[type] || 'Fresh Fold Notification',
     message: messages[type] || `Update for ${data.trackingId || 'your account'}`,
-    status: 'queued', sentVia: null, sentAt: null, createdAt: new Date().toISOString(),
+    status: 'queued', sentVia: null, sentAt: null, attempts: 0, delivered: [], nextAttemptAt: now, createdAt: now,
   };
-  // SendGrid integration (ready - add SENDGRID_API_KEY to .env)
-  if (process.env.SENDGRID_API_KEY && data.email) {
-    try {
-      // TODO: Uncomment when @sendgrid/mail is installed and SENDGRID_API_KEY is set
-      // const sgMail = require('@sendgrid/mail');
-      // sgMail.setApiKey(process.env.SENDGRID_API_KEY);
-      // await sgMail.send({ to: data.email, from: process.env.SENDGRID_FROM || 'noreply@freshfold.com.au', subject: notification.subject, text: notification.message, html: `<div style="font-family:sans-serif;max-width:600px;margin:0 auto;padding:20px"><h2 style="color:#3B82F6">Fresh Fold</h2><p>${notification.message}</p><hr><p style="color:#94A3B8;font-size:12px">Fresh Fold Pty Ltd | Geelong, VIC 3220</p></div>` });
-      notification.sentVia = 'sendgrid';
-      notification.status = 'sent';
-      notification.sentAt = new Date().toISOString();
-    } catch(e) { notification.status = 'failed'; notification.error = e.message; }
-  }
-  // Twilio SMS integration (ready - add TWILIO_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE to .env)
-  if (process.env.TWILIO_SID && process.env.TWILIO_AUTH_TOKEN && data.phone) {
+  return notification;
+}
+
+async function sendNotification(type, data) {
+  const db = await getDb();
+  const notification = buildNotification(type, data);
+  await db.collection('notifications').insertOne(notification);
+  scheduleDrain(0);
+  return notification;
+}
+
+// Queues many notifications with one insert and one drain wake-up
+async function sendNotifications(items) {
+  if (!items.length) return [];
+  const db = await getDb();
+  const notifications = items.map(({ type, data }) => buildNotification(type, data));
+  await db.collection('notifications').insertMany(notifications, { ordered: false });
+  scheduleDrain(0);
+  return notifications;
+}
+
+// Delivers to every channel the notification has a contact for, skipping
+// channels that already succeeded on an earlier attempt.
+async function deliverNotification(notification) {
+  const delivered = [...(notification.delivered || [])];
+  for (const channel of NOTIFY_CHANNELS) {
+    const provider = notification[channel.field] && channel.provider();
+    if (!provider || delivered.includes(provider.name)) continue;
     try {
-      // TODO: Uncomment when twilio is installed and keys are set
-      // const twilio = require('twilio')(process.env.TWILIO_SID, process.env.TWILIO_AUTH_TOKEN);
-      // await twilio.messages.create({ body: notification.message, from: process.env.TWILIO_PHONE, to: data.phone });
-      notification.sentVia = (notification.sentVia ? notification.sentVia + '+sms' : 'twilio');
-      notification.status = 'sent';
-    } catch(e) { console.error('Twilio error:', e.message); }
+      await channel.limit();
+      await provider.send(notification);
+      delivered.push(provider.name);
+    } catch (e) {
+      return { delivered, error: e.message };
+    }
   }
-  if (notification.status === 'queued') {
-    console.log(`[NOTIFICATION] ${type} -> ${data.email || data.phone || 'no-contact'}: ${notification.message.substring(0, 120)}`);
+  return { delivered };
+}
+
+function deliveryUpdate(notification, result) {
+  const now = Date.now();
+  const unlock = { claimId: '', lockedUntil: '' };
+  if (!result.error) {
+    if (!result.delivered.length) {
+      console.log(`[NOTIFICATION] ${notification.type} -> ${notification.email || notification.phone || 'no-contact'}: ${notification.message.substring(0, 120)}`);
+    }
+    return {
+      $set: {
+        status: result.delivered.length ? 'sent' : 'logged', sentVia: result.delivered.join('+') || null, delivered: result.delivered,
+        sentAt: new Date(now).toISOString(), expireAt: new Date(now + NOTIFY_RETENTION_MS),
+      },
+      $unset: unlock,
+    };
   }
-  await db.collection('notifications').insertOne(notification);
-  return notification;
+  const attempts = (notification.attempts || 0) + 1;
+  if (attempts >= NOTIFY_MAX_ATTEMPTS) {
+    return { $set: { status: 'failed', attempts, delivered: result.delivered, error: result.error, expireAt: new Date(now + NOTIFY_RETENTION_MS) }, $unset: unlock };
+  }
+  const backoff = NOTIFY_BACKOFF_MS * 2 ** (attempts - 1) * (0.5 + Math.random());
+  return {
+    $set: { status: 'queued', attempts, delivered: result.delivered, error: result.error, nextAttemptAt: new Date(now + backoff).toISOString() },
+    $unset: unlock,
+  };
+}
+
+// Claims up to `limit` due rows for this worker. Rows stuck in 'sending' past
+// their lock (a crashed worker) are claimed again.
+async function claimNotifications(db, limit) {
+  const now = new Date().toISOString();
+  const due = { $or: [{ status: 'queued', nextAttemptAt: { $lte: now } }, { status: 'sending', lockedUntil: { $lte: now } }] };
+  const candidates = await db.collection('notifications').find(due, { projection: { _id: 0, id: 1 } }).sort({ nextAttemptAt: 1 }).limit(limit).toArray();
+  if (!candidates.length) return [];
+  const claimId = uuidv4();
+  await db.collection('notifications').updateMany(
+    { $and: [{ id: { $in: candidates.map(n => n.id) } }, due] },
+    { $set: { status: 'sending', claimId, lockedUntil: new Date(Date.now() + NOTIFY_LOCK_MS).toISOString() } },
+  );
+  return db.collection('notifications').find({ claimId }, { projection: { _id: 0 } }).toArray();
+}
+
+let draining = null;
+let drainRequested = false;
+let drainTimer = null;
+let drainTimerAt = Infinity;
+
+function scheduleDrain(delayMs) {
+  // An unparseable nextAttemptAt would otherwise re-arm the timer every millisecond
+  if (process.env.NOTIFY_WORKER === 'off' || !Number.isFinite(delayMs)) return;
+  const at = Date.now() + delayMs;
+  if (drainTimer && drainTimerAt <= at) return;
+  clearTimeout(drainTimer);
+  drainTimerAt = at;
+  // The drain belongs to no request, so keep it out of the caller's timings
+  drainTimer = timingStore.exit(() => setTimeout(() => {
+    drainTimer = null;
+    drainTimerAt = Infinity;
+    drainNotifications().catch(e => console.error('Notification drain failed:', e));
+  }, delayMs));
+  drainTimer.unref?.();
+}
+
+async function drainNotifications({ maxBatches = Infinity } = {}) {
+  if (draining) {
+    drainRequested = true;
+    return draining;
+  }
+  draining = (async () => {
+    const db = await getDb();
+    const totals = { batches: 0, sent: 0, retried: 0, failed: 0 };
+    while (totals.batches < maxBatches) {
+      const batch = await claimNotifications(db, NOTIFY_BATCH_SIZE);
+      if (!batch.length) break;
+      totals.batches++;
+      const results = await Promise.all(batch.map(deliverNotification));
+      const ops = batch.map((notification, i) => {
+        const update = deliveryUpdate(notification, results[i]);
+        totals[update.$set.status === 'queued' ? 'retried' : update.$set.status === 'failed' ? 'failed' : 'sent']++;
+        return { updateOne: { filter: { id: notification.id, claimId: notification.claimId }, update } };
+      });
+      await db.collection('notifications').bulkWrite(ops, { ordered: false });
+    }
+    const [next] = await db.collection('notifications').find({ status: 'queued', nextAttemptAt: { $exists: true } }, { projection: { _id: 0, nextAttemptAt: 1 } }).sort({ nextAttemptAt: 1 }).limit(1).toArray();
+    if (next) scheduleDrain(Math.max(0, new Date(next.nextAttemptAt).getTime() - Date.now()));
+    return totals;
+  })().finally(() => {
+    draining = null;
+    if (drainRequested) {
+      drainRequested = false;
+      scheduleDrain(0);
+    }
+  });
+  return draining;
+}
+
+async function notificationQueueStats(db) {
+  const [counts, [oldest]] = await Promise.all([
+    db.collection('notifications').aggregate([{ $group: { _id: '$status', count: { $sum: 1 } } }]).toArray(),
+    db.collection('notifications').find({ status: { $in: ['queued', 'sending'] } }, { projection: { _id: 0, createdAt: 1 } }).sort({ createdAt: 1 }).limit(1).toArray(),
+  ]);
+  return {
+    counts: Object.fromEntries(counts.map(c => [c._id, c.count])),
+    oldestPendingAgeMs: oldest ? Date.now() - new Date(oldest.createdAt).getTime() : 0,
+  };
+}
+
+async function handleDrainNotifications(request) {
+  const user = await getUser(request);
+  if (!user || user.role !== 'admin') return json({ error: 'Admin access required' }, 403);
+  const url = new URL(request.url);
+  const totals = await drainNotifications({ maxBatches: parseInt(url.searchParams.get('maxBatches')) || Infinity });
+  const db = await getDb();
+  return json({ ...totals, ...(await notificationQueueStats(db)) });
+}
+
+async function handleNotificationStats(request) {
+  const user = await getUser(request);
+  if (!user || user.role !== 'admin') return json({ error: 'Admin access required' }, 403);
+  const db = await getDb();
+  return json(await notificationQueueStats(db));
 }
 
 // ===== INVOICE =====
+function invoiceFor(order, user) {
+  return {
+    invoiceNumber: 'INV-' + order.trackingId,
+    date: order.createdAt,
+    company: { name: 'Fresh Fold Pty Ltd', abn: '12 345 678 901', address: 'Geelong, VIC 3220, Australia', email: 'hello@freshfold.com.au', phone: '1300 FRESH FOLD' },
+    customer: { name: user?.name || order.guestName || 'Guest', email: user?.email || order.guestEmail || '', phone: user?.phone || order.guestPhone || '', suburb: order.suburb },
+    order: { trackingId: order.trackingId, type: order.type, planName: order.planName, pickupDate: order.pickupDate, pickupTimeSlot: order.pickupTimeSlot, items: order.items, weightKg: order.weightKg },
+    lineItems: [
+      { description: order.planName, quantity: 1, unitPrice: order.baseCost, total: order.baseCost },
+      ...(order.addons || []).map(a => ({ description: a.name, quantity: a.quantity, unitPrice: a.price, total: a.subtotal })),
+    ],
+    subtotal: order.subtotal, gst: order.gst, discount: order.discount || 0, promoCode: order.promoCode || null, total: order.total, paymentStatus: order.paymentStatus,
+  };
+}
+
 async function handleGetInvoice(request, orderId) {
   const db = await getDb();
   const order = await db.collection('orders').findOne({ id: orderId });
   if (!order) return json({ error: 'Order not found' }, 404);
   const user = order.userId ? await db.collection('users').findOne({ id: order.userId }) : null;
-  return json({
-    invoice: {
-      invoiceNumber: 'INV-' + order.trackingId,
-      date: order.createdAt,
-      company: { name: 'Fresh Fold Pty Ltd', abn: '12 345 678 901', address: 'Geelong, VIC 3220, Australia', email: 'hello@freshfold.com.au', phone: '1300 FRESH FOLD' },
-      customer: { name: user?.name || order.guestName || 'Guest', email: user?.email || order.guestEmail || '', phone: user?.phone || order.guestPhone || '', suburb: order.suburb },
-      order: { trackingId: order.trackingId, type: order.type, planName: order.planName, pickupDate: order.pickupDate, pickupTimeSlot: order.pickupTimeSlot, items: order.items, weightKg: order.weightKg },
-      lineItems: [
-        { description: order.planName, quantity: 1, unitPrice: order.baseCost, total: order.baseCost },
-        ...(order.addons || []).map(a => ({ description: a.name, quantity: a.quantity, unitPrice: a.price, total: a.subtotal })),
-      ],
-      subtotal: order.subtotal, gst: order.gst, discount: order.discount || 0, promoCode: order.promoCode || null, total: order.total, paymentStatus: order.paymentStatus,
-    }
+  return json({ invoice: invoiceFor(order, user) });
+}
+
+// ===== BULK EXPORT =====
+// GET /api/admin/export?type=orders|invoices&from=&to=&format=ndjson|csv streams
+// the orders created on UTC days from..to in (createdAt, id) order off the
+// createdAt index. Batches of EXPORT_BATCH_SIZE are read as the client pulls,
+// and each invoice batch resolves its customers with one users.find, so the
+// server holds one batch whatever the range.
+const EXPORT_BATCH_SIZE = parseInt(process.env.EXPORT_BATCH_SIZE) || 500;
+const EXPORT_MAX_DAYS = parseInt(process.env.EXPORT_MAX_DAYS) || 366;
+const EXPORT_FORMATS = { ndjson: 'application/x-ndjson', csv: 'text/csv; charset=utf-8' };
+const EXPORT_COLUMNS = {
+  orders: ['id', 'trackingId', 'createdAt', 'type', 'planName', 'status', 'paymentStatus', 'suburb', 'pickupDate', 'pickupTimeSlot', 'userId', 'guestEmail',
+    'driverName', 'items', 'weightKg', 'baseCost', 'addonsTotal', 'discount', 'promoCode', 'subtotal', 'gst', 'total'],
+  invoices: ['invoiceNumber', 'date', 'customerName', 'customerEmail', 'suburb', 'trackingId', 'type', 'planName', 'pickupDate', 'subtotal', 'gst',
+    'discount', 'promoCode', 'total', 'paymentStatus'],
+};
+
+function csvCell(value) {
+  if (value === null || value === undefined) return '';
+  let text = String(value);
+  // Text a spreadsheet would run as a formula is kept as text
+  if (typeof value === 'string' && /^[=+\-@\t\r]/.test(text)) text = `'${text}`;
+  return /[",\r\n]/.test(text) ? `"${text.replace(/"/g, '""')}"` : text;
+}
+
+function invoiceRow(invoice) {
+  const { customer, order } = invoice;
+  return {
+    invoiceNumber: invoice.invoiceNumber, date: invoice.date, customerName: customer.name, customerEmail: customer.email, suburb: customer.suburb,
+    trackingId: order.trackingId, type: order.type, planName: order.planName, pickupDate: order.pickupDate, subtotal: invoice.subtotal, gst: invoice.gst,
+    discount: invoice.discount, promoCode: invoice.promoCode, total: invoice.total, paymentStatus: invoice.paymentStatus,
+  };
+}
+
+// { $gte, $lt } on createdAt for UTC days from..to, or null past EXPORT_MAX_DAYS or for bad dates
+function exportRange(from, to) {
+  if (!ISO_DATE.test(from || '') || !ISO_DATE.test(to || '')) return null;
+  const start = new Date(`${from}T00:00:00.000Z`);
+  const end = new Date(`${to}T00:00:00.000Z`);
+  end.setUTCDate(end.getUTCDate() + 1);
+  const days = (end - start) / 86400000;
+  if (!(days >= 1 && days <= EXPORT_MAX_DAYS)) return null;
+  return { $gte: start.toISOString(), $lt: end.toISOString() };
+}
+
+async function handleExport(request) {
+  const user = await getUser(request);
+  if (!user || user.role !== 'admin') return json({ error: 'Admin access required' }, 403);
+  const params = new URL(request.url).searchParams;
+  const type = params.get('type') || 'orders';
+  const format = params.get('format') || 'ndjson';
+  if (!EXPORT_COLUMNS[type]) return json({ error: 'type must be orders or invoices' }, 400);
+  if (!EXPORT_FORMATS[format]) return json({ error: 'format must be ndjson or csv' }, 400);
+  const from = params.get('from');
+  const to = params.get('to') || from;
+  const createdAt = exportRange(from, to);
+  if (!createdAt) return json({ error: `from and to (YYYY-MM-DD) must cover 1-${EXPORT_MAX_DAYS} days` }, 400);
+
+  const db = await getDb();
+  const cursor = db.collection('orders').find({ createdAt }, { projection: { _id: 0, qrCode: 0, statusHistory: 0 } })
+    .sort({ createdAt: 1, id: 1 }).batchSize(EXPORT_BATCH_SIZE);
+  const columns = EXPORT_COLUMNS[type];
+  const encoder = new TextEncoder();
+  let pending = format === 'csv' ? columns.join(',') + '\n' : '';
+  const stream = new ReadableStream({
+    async pull(controller) {
+      try {
+        const orders = [];
+        while (orders.length < EXPORT_BATCH_SIZE && await cursor.hasNext()) orders.push(await cursor.next());
+        let rows = orders;
+        if (type === 'invoices') {
+          const ids = [...new Set(orders.map(o => o.userId).filter(Boolean))];
+          const users = ids.length
+            ? await db.collection('users').find({ id: { $in: ids } }, { projection: { _id: 0, id: 1, name: 1, email: 1, phone: 1 } }).toArray()
+            : [];
+          const byId = new Map(users.map(u => [u.id, u]));
+          rows = orders.map(o => invoiceFor(o, byId.get(o.userId)));
+        }
+        let chunk = pending;
+        pending = '';
+        for (const row of rows) {
+          if (format === 'csv') {
+            const flat = type === 'invoices' ? invoiceRow(row) : row;
+            chunk += columns.map(c => csvCell(flat[c])).join(',') + '\n';
+          } else {
+            chunk += JSON.stringify(row) + '\n';
+          }
+        }
+        if (chunk) controller.enqueue(encoder.encode(chunk));
+        if (orders.length < EXPORT_BATCH_SIZE) {
+          await cursor.close();
+          controller.close();
+        }
+      } catch (e) {
+        console.error('Export failed:', e);
+        await cursor.close().catch(() => {});
+        controller.error(e);
+      }
+    },
+    cancel() {
+      return cursor.close();
+    },
+  });
+  return new Response(stream, {
+    headers: {
+      ...cors(), 'Content-Type': EXPORT_FORMATS[format], 'Cache-Control': 'no-store', 'X-Accel-Buffering': 'no',
+      'Content-Disposition': `attachment; filename="freshfold-${type}-${from}-to-${to}.${format}"`,
+    },
   });
 }
 
@@ -718,6 +1894,121 @@ async function handleTogglePromo(request, promoId) {
   return json({ message: promo.active ? 'Deactivated' : 'Activated' });
 }
 
+// ===== DRIVER ASSIGNMENT =====
+// Bookings are matched against a per-process zone -> drivers index instead of
+// a drivers query per booking. Candidates are ranked by pickups already held
+// in the booking's date/slot, then by currentOrders. The index is only a
+// ranking hint refreshed every DRIVER_INDEX_TTL_MS. Pickups are counted per
+// driver and slot in `driver_slots`. With DRIVER_SLOT_MAX set, a driver takes
+// at most that many per slot, reserved with a conditional upsert so concurrent
+// bookings on any instance cannot overfill a driver, and a full or deactivated
+// driver is skipped for the next candidate. When every zone driver is full the
+// least-loaded one is booked over the cap and the order flagged driverOverCap,
+// rather than leaving it unassigned. Unset, suburb capacity is the only limit.
+const DRIVER_INDEX_TTL_MS = parseInt(process.env.DRIVER_INDEX_TTL_MS) || 30000;
+const DRIVER_SLOT_MAX = parseInt(process.env.DRIVER_SLOT_MAX) || 0;
+let driverIndex = null;
+let driverIndexLoading = null;
+let driverIndexVersion = 0;
+
+async function loadDriverIndex(db) {
+  const drivers = await db.collection('drivers').find({ status: 'active' }, { projection: { _id: 0, id: 1, name: 1, zoneKeys: 1, currentOrders: 1 } }).toArray();
+  const byZone = new Map();
+  const byId = new Map();
+  for (const d of drivers) {
+    const entry = { id: d.id, name: d.name, currentOrders: d.currentOrders || 0, active: true };
+    byId.set(d.id, entry);
+    for (const zone of d.zoneKeys || []) {
+      if (!byZone.has(zone)) byZone.set(zone, []);
+      byZone.get(zone).push(entry);
+    }
+  }
+  // slotLoad: `${driverId}|${date}|${slot}` -> pickups held, learned from reservations
+  return { byZone, byId, slotLoad: new Map(), expires: Date.now() + DRIVER_INDEX_TTL_MS };
+}
+
+async function getDriverIndex(db) {
+  if (driverIndex && driverIndex.expires > Date.now()) return driverIndex;
+  if (!driverIndexLoading) {
+    const version = driverIndexVersion;
+    driverIndexLoading = loadDriverIndex(db)
+      .then(index => { if (version === driverIndexVersion) driverIndex = index; return index; })
+      .finally(() => { driverIndexLoading = null; });
+  }
+  return driverIndexLoading;
+}
+
+function invalidateDriverIndex() {
+  driverIndexVersion++;
+  driverIndex = null;
+}
+
+function pickDriver(index, zone, slotOf, skip, cap) {
+  let best = null, bestSlot = 0;
+  for (const d of index.byZone.get(zone) || []) {
+    if (!d.active || skip.has(d.id)) continue;
+    const held = index.slotLoad.get(slotOf(d)) || 0;
+    if (held >= cap) continue;
+    if (!best || held < bestSlot || (held === bestSlot && d.currentOrders < best.currentOrders)) { best = d; bestSlot = held; }
+  }
+  return best;
+}
+
+async function assignDriver(db, zone, pickupDate, pickupTimeSlot) {
+  const index = await getDriverIndex(db);
+  const slotOf = d => `${d.id}|${pickupDate}|${pickupTimeSlot}`;
+  // Within the cap first; then, with every zone driver full, over it
+  for (const cap of DRIVER_SLOT_MAX ? [DRIVER_SLOT_MAX, Infinity] : [Infinity]) {
+    const skip = new Set();
+    for (let d = pickDriver(index, zone, slotOf, skip, cap); d; d = pickDriver(index, zone, slotOf, skip, cap)) {
+      skip.add(d.id);
+      // Count the pick locally before awaiting so concurrent bookings here spread out
+      index.slotLoad.set(slotOf(d), (index.slotLoad.get(slotOf(d)) || 0) + 1);
+      d.currentOrders++;
+      let slot;
+      try {
+        slot = await db.collection('driver_slots').findOneAndUpdate(
+          { driverId: d.id, pickupDate, pickupTimeSlot, ...(cap < Infinity && { count: { $lt: cap } }) },
+          { $inc: { count: 1 } },
+          { upsert: true, returnDocument: 'after', projection: { _id: 0, count: 1 } });
+      } catch (e) {
+        if (e.code !== 11000) throw e;
+        // The upsert collided with a counter already at the cap (an uncapped upsert is retried by the server)
+        index.slotLoad.set(slotOf(d), cap);
+        d.currentOrders--;
+        continue;
+      }
+      index.slotLoad.set(slotOf(d), slot.count);
+      const driver = await db.collection('drivers').findOneAndUpdate({ id: d.id, status: 'active' }, { $inc: { currentOrders: 1 } }, { returnDocument: 'after', projection: { _id: 0, currentOrders: 1 } });
+      if (!driver) {
+        d.active = false;
+        await db.collection('driver_slots').updateOne({ driverId: d.id, pickupDate, pickupTimeSlot }, { $inc: { count: -1 } });
+        continue;
+      }
+      d.currentOrders = driver.currentOrders;
+      const overCap = !!DRIVER_SLOT_MAX && slot.count > DRIVER_SLOT_MAX;
+      if (overCap) console.log(`[DRIVER] every ${zone} driver is full for ${pickupDate} ${pickupTimeSlot}; ${d.name} now holds ${slot.count} pickups`);
+      return { driverId: d.id, driverName: d.name, overCap };
+    }
+  }
+  return null;
+}
+
+// Manual (re)assignment: move the slot counter and keep the local index in step
+async function moveDriverLoad(db, order, fromId, toId) {
+  const { pickupDate, pickupTimeSlot } = order;
+  if (fromId) await db.collection('driver_slots').updateOne({ driverId: fromId, pickupDate, pickupTimeSlot }, { $inc: { count: -1 } });
+  if (toId) await db.collection('driver_slots').updateOne({ driverId: toId, pickupDate, pickupTimeSlot }, { $inc: { count: 1 } }, { upsert: true });
+  if (!driverIndex) return;
+  for (const [id, delta] of [[fromId, -1], [toId, 1]]) {
+    const entry = id && driverIndex.byId.get(id);
+    if (!entry) continue;
+    entry.currentOrders += delta;
+    const slotKey = `${id}|${pickupDate}|${pickupTimeSlot}`;
+    if (driverIndex.slotLoad.has(slotKey)) driverIndex.slotLoad.set(slotKey, driverIndex.slotLoad.get(slotKey) + delta);
+  }
+}
+
 // ===== DRIVER MANAGEMENT =====
 async function handleCreateDriver(request) {
   const user = await getUser(request);
@@ -725,8 +2016,9 @@ async function handleCreateDriver(request) {
   const { name, phone, vehicle, zones } = await request.json();
   if (!name) return json({ error: 'Driver name required' }, 400);
   const db = await getDb();
-  const driver = { id: uuidv4(), name, phone: phone || '', vehicle: vehicle || '', assignedZones: zones || [], status: 'active', currentOrders: 0, totalDeliveries: 0, createdAt: new Date().toISOString() };
+  const driver = { id: uuidv4(), name, phone: phone || '', vehicle: vehicle || '', assignedZones: zones || [], zoneKeys: (zones || []).map(suburbKey), status: 'active', currentOrders: 0, totalDeliveries: 0, createdAt: new Date().toISOString() };
   await db.collection('drivers').insertOne(driver);
+  invalidateDriverIndex();
   return json({ driver }, 201);
 }
 
@@ -749,10 +2041,11 @@ async function handleUpdateDriver(request, driverId) {
   if (body.name) update.name = body.name;
   if (body.phone !== undefined) update.phone = body.phone;
   if (body.vehicle !== undefined) update.vehicle = body.vehicle;
-  if (body.zones) update.assignedZones = body.zones;
+  if (body.zones) { update.assignedZones = body.zones; update.zoneKeys = body.zones.map(suburbKey); }
   if (body.status) update.status = body.status;
   update.updatedAt = new Date().toISOString();
   await db.collection('drivers').updateOne({ id: driverId }, { $set: update });
+  invalidateDriverIndex();
   const updated = await db.collection('drivers').findOne({ id: driverId });
   return json({ driver: updated });
 }
@@ -771,8 +2064,9 @@ async function handleAssignDriver(request, orderId) {
   }
   // Unassign previous driver
   if (order.driverId) { await db.collection('drivers').updateOne({ id: order.driverId }, { $inc: { currentOrders: -1 } }); }
-  await db.collection('orders').updateOne({ id: orderId }, { $set: { driverId: driverId || null, driverName: driver?.name || null, updatedAt: new Date().toISOString() } });
+  await db.collection('orders').updateOne({ id: orderId }, { $set: { driverId: driverId || null, driverName: driver?.name || null, driverOverCap: false, updatedAt: new Date().toISOString() } });
   if (driver) { await db.collection('drivers').updateOne({ id: driverId }, { $inc: { currentOrders: 1 } }); }
+  if (order.driverId !== (driverId || null)) await moveDriverLoad(db, order, order.driverId, driverId || null);
   return json({ message: driver ? `Assigned to ${driver.name}` : 'Driver unassigned', driverName: driver?.name || null });
 }
 
@@ -783,62 +2077,221 @@ async function handleGetCapacity(request) {
   const suburb = url.searchParams.get('suburb');
   if (!date || !suburb) return json({ error: 'Date and suburb query params required' }, 400);
   const db = await getDb();
-  const settings = await db.collection('capacity_settings').findOne({ suburb: { $regex: new RegExp(`^${suburb}$`, 'i') }, active: true });
+  const key = suburbKey(suburb);
+  const settings = await db.collection('capacity_settings').findOne({ suburbKey: key, active: true });
   const maxPerSlot = settings?.maxPerSlot || 5;
   const bookings = await db.collection('orders').aggregate([
-    { $match: { pickupDate: date, suburb: { $regex: new RegExp(`^${suburb}$`, 'i') } } },
+    { $match: { pickupDate: date, suburbKey: key } },
     { $group: { _id: '$pickupTimeSlot', count: { $sum: 1 } } }
   ]).toArray();
-  const slots = ['8:00 AM - 10:00 AM','10:00 AM - 12:00 PM','12:00 PM - 2:00 PM','2:00 PM - 4:00 PM','4:00 PM - 6:00 PM'];
-  const capacity = slots.map(slot => {
+  const capacity = PICKUP_SLOTS.map(slot => {
     const booked = bookings.find(b => b._id === slot)?.count || 0;
     return { slot, maxCapacity: maxPerSlot, booked, available: Math.max(0, maxPerSlot - booked) };
   });
   return json({ date, suburb, capacity, maxPerSlot });
 }
 
+const CALENDAR_MAX_DAYS = 31;
+const CALENDAR_MAX_SUBURBS = 20;
+const ISO_DATE = /^\d{4}-\d{2}-\d{2}$/;
+
+// Slot availability for a date range across several suburbs: one settings
+// read and one grouped aggregation instead of a /capacity call per cell.
+async function handleGetCapacityCalendar(request) {
+  const url = new URL(request.url);
+  const from = url.searchParams.get('from');
+  const suburbs = (url.searchParams.get('suburbs') || '').split(',').map(s => s.trim()).filter(Boolean);
+  if (!from || !ISO_DATE.test(from) || !suburbs.length) return json({ error: 'from (YYYY-MM-DD) and suburbs query params required' }, 400);
+  const start = new Date(`${from}T00:00:00Z`);
+  const to = url.searchParams.get('to');
+  const days = to ? Math.round((new Date(`${to}T00:00:00Z`) - start) / 86400000) + 1 : parseInt(url.searchParams.get('days')) || 14;
+  if (isNaN(start) || !(days >= 1 && days <= CALENDAR_MAX_DAYS)) return json({ error: `Date range must cover 1-${CALENDAR_MAX_DAYS} days` }, 400);
+  const byKey = new Map();
+  for (const suburb of suburbs) if (!byKey.has(suburbKey(suburb))) byKey.set(suburbKey(suburb), suburb);
+  if (byKey.size > CALENDAR_MAX_SUBURBS) return json({ error: `At most ${CALENDAR_MAX_SUBURBS} suburbs per request` }, 400);
+  const dates = Array.from({ length: days }, (_, i) => new Date(start.getTime() + i * 86400000).toISOString().slice(0, 10));
+  const keys = [...byKey.keys()];
+
+  const db = await getDb();
+  const [settings, booked] = await Promise.all([
+    db.collection('capacity_settings').find({ suburbKey: { $in: keys }, active: true }, { projection: { _id: 0, suburbKey: 1, maxPerSlot: 1 } }).toArray(),
+    db.collection('orders').aggregate([
+      { $match: { suburbKey: { $in: keys }, pickupDate: { $gte: dates[0], $lte: dates[dates.length - 1] } } },
+      { $group: { _id: { suburb: '$suburbKey', date: '$pickupDate', slot: '$pickupTimeSlot' }, count: { $sum: 1 } } }
+    ]).toArray(),
+  ]);
+  lap('read');
+  const maxByKey = new Map(settings.map(s => [s.suburbKey, s.maxPerSlot]));
+  const counts = new Map(booked.map(b => [`${b._id.suburb}|${b._id.date}|${b._id.slot}`, b.count]));
+  const calendar = keys.map(key => {
+    const maxPerSlot = maxByKey.get(key) || 5;
+    return {
+      suburb: byKey.get(key), maxPerSlot,
+      days: dates.map(date => {
+        const capacity = PICKUP_SLOTS.map(slot => {
+          const count = counts.get(`${key}|${date}|${slot}`) || 0;
+          return { slot, maxCapacity: maxPerSlot, booked: count, available: Math.max(0, maxPerSlot - count) };
+        });
+        return { date, available: capacity.reduce((sum, c) => sum + c.available, 0), capacity };
+      }),
+    };
+  });
+  return json({ from: dates[0], to: dates[dates.length - 1], slots: PICKUP_SLOTS, suburbs: calendar });
+}
+
+async function handleMigrate(request) {
+  const user = await getUser(request);
+  if (!user || user.role !== 'admin') return json({ error: 'Admin access required' }, 403);
+  const url = new URL(request.url);
+  const db = await getDb();
+  const migrations = await runMigrations(db, { force: url.searchParams.get('force') === '1' });
+  const indexes = await ensureIndexes(db);
+  return json({ migrations, indexes });
+}
+
 async function handleSetCapacity(request) {
   const user = await getUser(request);
   if (!user || user.role !== 'admin') return json({ error: 'Admin access required' }, 403);
   const { suburb, maxPerSlot } = await request.json();
   if (!suburb || !maxPerSlot) return json({ error: 'Suburb and maxPerSlot required' }, 400);
   const db = await getDb();
-  await db.collection('capacity_settings').updateOne({ suburb }, { $set: { suburb, maxPerSlot: parseInt(maxPerSlot), active: true, updatedAt: new Date().toISOString() } }, { upsert: true });
+  await db.collection('capacity_settings').updateOne({ suburbKey: suburbKey(suburb) }, { $set: { suburb, suburbKey: suburbKey(suburb), maxPerSlot: parseInt(maxPerSlot), active: true, updatedAt: new Date().toISOString() } }, { upsert: true });
   return json({ message: `Capacity: ${maxPerSlot} per slot for ${suburb}` });
 }
 
 // ===== STRIPE WEBHOOK =====
+// Each delivery is recorded in webhook_logs under its Stripe event id
+// (unique), acknowledged, and applied after the response. A redelivered event
+// id only bumps `deliveries`, so retry bursts cost one write each. Applying
+// claims the row pending -> processing and every effect is conditional (an
+// order is marked paid, counted and notified once however many events report
+// it), so duplicates and out-of-order events are harmless. Rows a crashed or
+// failing process left behind are retried by the next webhook's sweep once
+// they are WEBHOOK_STALE_MS old. Processed and failed rows expire after
+// WEBHOOK_LOG_RETENTION_DAYS; keep that past Stripe's 3-day retry window, or a
+// late redelivery would be applied again.
+const WEBHOOK_STALE_MS = parseInt(process.env.WEBHOOK_STALE_MS) || 60000;
+const WEBHOOK_LOG_RETENTION_MS = (parseInt(process.env.WEBHOOK_LOG_RETENTION_DAYS) || 30) * 24 * 60 * 60 * 1000;
+const WEBHOOK_MAX_ATTEMPTS = 5;
+const WEBHOOK_SWEEP_BATCH = 100;
+let lastWebhookSweepAt = 0;
+
+async function parseWebhookEvent(request) {
+  const body = await request.text();
+  const secret = process.env.STRIPE_WEBHOOK_SECRET;
+  // Without a secret (local development) the payload is trusted as-is
+  if (!secret) return JSON.parse(body);
+  const stripe = await getStripe();
+  return stripe.webhooks.constructEvent(body, request.headers.get('stripe-signature') || '', secret);
+}
+
 async function handleStripeWebhook(request) {
+  let event;
   try {
-    const body = await request.text();
-    const db = await getDb();
-    let event;
-    try {
-      const Stripe = (await import('stripe')).default;
-      const stripe = new Stripe(process.env.STRIPE_API_KEY);
-      const sig = request.headers.get('stripe-signature');
-      if (process.env.STRIPE_WEBHOOK_SECRET && sig) {
-        event = stripe.webhooks.constructEvent(body, sig, process.env.STRIPE_WEBHOOK_SECRET);
-      } else { event = JSON.parse(body); }
-    } catch { event = JSON.parse(body); }
-    await db.collection('webhook_logs').insertOne({ id: uuidv4(), type: event.type, data: event.data, processedAt: new Date().toISOString() });
-    if (event.type === 'checkout.session.completed') {
-      const session = event.data.object;
-      const orderId = session.metadata?.orderId;
-      if (orderId) {
-        await db.collection('orders').updateOne({ id: orderId }, { $set: { paymentStatus: 'paid', updatedAt: new Date().toISOString() } });
-        await db.collection('payment_transactions').updateOne({ sessionId: session.id }, { $set: { paymentStatus: 'paid', updatedAt: new Date().toISOString() } });
-        const order = await db.collection('orders').findOne({ id: orderId });
-        if (order) await sendNotification('payment_received', { trackingId: order.trackingId, amount: order.total, email: order.guestEmail, name: order.guestName });
-      }
-    } else if (event.type === 'customer.subscription.deleted') {
-      const sub = event.data.object;
-      if (sub.metadata?.userId) {
-        await db.collection('subscriptions').updateOne({ userId: sub.metadata.userId, status: { $ne: 'cancelled' } }, { $set: { status: 'cancelled', updatedAt: new Date().toISOString() } });
-      }
+    event = await parseWebhookEvent(request);
+  } catch (err) {
+    return json({ error: `Webhook rejected: ${err.message}` }, 400);
+  }
+  const eventId = event.id || crypto.createHash('sha256').update(JSON.stringify(event)).digest('hex');
+  lap('verify');
+  const db = await getDb();
+  try {
+    await db.collection('webhook_logs').insertOne({
+      id: uuidv4(), eventId, type: event.type, data: event.data, eventCreated: event.created || null,
+      status: 'pending', attempts: 0, deliveries: 1, receivedAt: new Date().toISOString(),
+    });
+  } catch (e) {
+    if (e.code !== 11000) throw e;
+    await db.collection('webhook_logs').updateOne({ eventId }, { $inc: { deliveries: 1 } });
+    return json({ received: true, duplicate: true });
+  }
+  lap('record');
+  scheduleWebhook(db, eventId);
+  if (Date.now() - lastWebhookSweepAt >= WEBHOOK_STALE_MS) {
+    lastWebhookSweepAt = Date.now();
+    scheduleWebhook(db, null);
+  }
+  return json({ received: true });
+}
+
+// Runs after the response, outside the request's timing context
+function scheduleWebhook(db, eventId) {
+  timingStore.exit(() => setImmediate(() => {
+    const work = eventId ? processWebhookEvent(db, eventId) : sweepWebhooks(db);
+    work.catch(e => console.error('Webhook processing failed:', e));
+  }));
+}
+
+async function processWebhookEvent(db, eventId) {
+  const row = await db.collection('webhook_logs').findOneAndUpdate(
+    { eventId, status: 'pending' },
+    { $set: { status: 'processing', claimedAt: new Date().toISOString() }, $inc: { attempts: 1 } },
+    { returnDocument: 'after', projection: { _id: 0, type: 1, data: 1, attempts: 1 } }
+  );
+  if (!row) return; // already applied, or claimed by another worker
+  try {
+    const result = await applyWebhookEvent(db, row);
+    await db.collection('webhook_logs').updateOne({ eventId }, {
+      $set: { status: 'processed', result, processedAt: new Date().toISOString(), expireAt: new Date(Date.now() + WEBHOOK_LOG_RETENTION_MS) },
+    });
+  } catch (err) {
+    console.error(`Webhook ${eventId} failed:`, err);
+    const update = row.attempts >= WEBHOOK_MAX_ATTEMPTS
+      ? { status: 'failed', error: err.message, expireAt: new Date(Date.now() + WEBHOOK_LOG_RETENTION_MS) }
+      : { status: 'pending', error: err.message };
+    await db.collection('webhook_logs').updateOne({ eventId }, { $set: update });
+  }
+}
+
+async function sweepWebhooks(db) {
+  const cutoff = new Date(Date.now() - WEBHOOK_STALE_MS).toISOString();
+  const stale = await db.collection('webhook_logs').find(
+    { $or: [{ status: 'pending', receivedAt: { $lt: cutoff } }, { status: 'processing', claimedAt: { $lt: cutoff } }] },
+    { projection: { _id: 0, eventId: 1, status: 1, claimedAt: 1 } }
+  ).limit(WEBHOOK_SWEEP_BATCH).toArray();
+  for (const row of stale) {
+    if (row.status === 'processing') {
+      await db.collection('webhook_logs').updateOne({ eventId: row.eventId, status: 'processing', claimedAt: row.claimedAt }, { $set: { status: 'pending' } });
     }
-    return json({ received: true });
-  } catch(err) { console.error('Webhook error:', err); return json({ error: err.message }, 400); }
+    await processWebhookEvent(db, row.eventId);
+  }
+  return stale.length;
+}
+
+async function applyWebhookEvent(db, { type, data }) {
+  if (type === 'checkout.session.completed' || type === 'checkout.session.async_payment_succeeded') {
+    const session = data.object;
+    const orderId = session.metadata?.orderId;
+    // Delayed payment methods complete unpaid and settle with async_payment_succeeded
+    if (!orderId || session.payment_status === 'unpaid') return { skipped: true };
+    const [order] = await Promise.all([
+      markOrderPaid(db, orderId),
+      db.collection('payment_transactions').updateOne({ sessionId: session.id, paymentStatus: { $ne: 'paid' } }, { $set: { paymentStatus: 'paid', updatedAt: new Date().toISOString() } }),
+    ]);
+    // Only the event that flipped the order to paid notifies
+    if (order) await sendNotification('payment_received', { trackingId: order.trackingId, amount: order.total, email: order.guestEmail, name: order.guestName });
+    return { orderId, paid: Boolean(order) };
+  }
+  if (type === 'customer.subscription.deleted') {
+    const userId = data.object.metadata?.userId;
+    if (!userId) return { skipped: true };
+    const result = await db.collection('subscriptions').updateOne({ userId, status: { $ne: 'cancelled' } }, { $set: { status: 'cancelled', updatedAt: new Date().toISOString() } });
+    return { userId, cancelled: result.modifiedCount > 0 };
+  }
+  return { ignored: true };
+}
+
+async function handleWebhookStats(request) {
+  const user = await getUser(request);
+  if (!user || user.role !== 'admin') return json({ error: 'Admin access required' }, 403);
+  const db = await getDb();
+  const rows = await db.collection('webhook_logs').aggregate([
+    { $group: { _id: '$status', events: { $sum: 1 }, deliveries: { $sum: { $ifNull: ['$deliveries', 1] } } } }
+  ]).toArray();
+  const byStatus = Object.fromEntries(rows.map(r => [r._id || 'legacy', r.events]));
+  const deliveries = rows.reduce((sum, r) => sum + r.deliveries, 0);
+  const events = rows.reduce((sum, r) => sum + r.events, 0);
+  return json({ events, deliveries, duplicates: deliveries - events, byStatus });
 }
 
 // ===== NOTIFICATIONS LIST =====
@@ -846,8 +2299,9 @@ async function handleGetNotifications(request) {
   const user = await getUser(request);
   if (!user || user.role !== 'admin') return json({ error: 'Admin access required' }, 403);
   const db = await getDb();
-  const notifications = await db.collection('notifications').find().sort({ createdAt: -1 }).limit(100).toArray();
-  return json({ notifications });
+  const page = await findPage(db, 'notifications', {}, pageParams(request));
+  if (!page) return json({ error: 'Invalid cursor' }, 400);
+  return json({ notifications: page.items, nextCursor: page.nextCursor });
 }
 
 // ===== REFERRAL CODE =====
@@ -859,8 +2313,151 @@ async function handleGetReferralCode(request) {
 }
 
 
+// ===== METRICS =====
+// Sized by ?collections=1 (estimated counts from collection metadata), for soak runs watching growth
+const MONITORED_COLLECTIONS = ['sessions', 'notifications', 'webhook_logs', 'orders', 'users', 'complaints', 'payment_transactions', 'driver_slots'];
+
+async function handleMetrics(request) {
+  const user = await getUser(request);
+  if (!user || user.role !== 'admin') return json({ error: 'Admin access required' }, 403);
+  const params = new URL(request.url).searchParams;
+  const endpoints = Object.fromEntries(metrics);
+  const since = metricsSince;
+  if (params.get('reset') === '1') {
+    metrics = new Map();
+    metricsSince = new Date().toISOString();
+  }
+  let collections;
+  if (params.get('collections') === '1') {
+    const db = await getDb();
+    const counts = await Promise.all(MONITORED_COLLECTIONS.map(name => db.collection(name).estimatedDocumentCount()));
+    collections = Object.fromEntries(MONITORED_COLLECTIONS.map((name, i) => [name, counts[i]]));
+  }
+  return json({ enabled: SERVER_TIMING, since, bucketsMs: METRIC_BUCKETS_MS, endpoints, db: dbSnapshot(), memory: process.memoryUsage(), collections });
+}
+
+// ===== TRAFFIC CAPTURE =====
+// With TRAFFIC_CAPTURE_FILE set, every request appends one NDJSON line:
+// timing, route, auth role and a scrubbed body. Ids and tokens become salted
+// pseudonyms (stable within a capture, so a replay can follow an order from
+// creation to tracking), PII becomes typed placeholders (emails keep a
+// pseudonym, so a login still finds the account registered earlier) and any
+// other free text only keeps its length. Only values under CAPTURE_KEEP_KEYS,
+// which drive behaviour rather than identify anyone, are written verbatim.
+// TRAFFIC_CAPTURE_SAMPLE keeps that share of sessions, whole; instances
+// writing one capture need the same TRAFFIC_CAPTURE_SALT.
+const TRAFFIC_CAPTURE_FILE = process.env.TRAFFIC_CAPTURE_FILE || null;
+const TRAFFIC_CAPTURE_SAMPLE = parseFloat(process.env.TRAFFIC_CAPTURE_SAMPLE ?? '1');
+const CAPTURE_VERSION = 1;
+const CAPTURE_KEEP_KEYS = new Set([
+  'type', 'planId', 'suburb', 'suburbs', 'zones', 'pickupDate', 'pickupTimeSlot', 'deliveryPreference', 'items', 'weightKg',
+  'addons', 'promoCode', 'code', 'value', 'maxUses', 'expiryDate', 'maxPerSlot', 'status', 'action', 'category',
+  'itemsConfirmed', 'refundAmount', 'subtotal', 'date', 'from', 'to', 'days', 'limit', 'include', 'live', 'wait',
+  'reset', 'force', 'maxBatches',
+]);
+const CAPTURE_PII = {
+  email: 'email', guestEmail: 'email', userEmail: 'email', name: 'name', guestName: 'name', userName: 'name',
+  driverName: 'name', phone: 'phone', guestPhone: 'phone', password: 'secret', secret: 'secret',
+  originUrl: 'url', photoUrl: 'url', photos: 'url',
+};
+const CAPTURE_ID_KEY = /^(id|token|cursor|nextCursor)$|Ids?$/;
+let captureSink = null;
+
+function getCaptureSink() {
+  if (!TRAFFIC_CAPTURE_FILE) return null;
+  if (!captureSink) {
+    captureSink = {
+      stream: fs.createWriteStream(TRAFFIC_CAPTURE_FILE, { flags: 'a' }),
+      salt: process.env.TRAFFIC_CAPTURE_SALT || crypto.randomBytes(16).toString('hex'),
+    };
+    captureSink.stream.on('error', e => console.error('Traffic capture failed:', e));
+    captureSink.stream.write(JSON.stringify({ type: 'capture', version: CAPTURE_VERSION, startedAt: new Date().toISOString(), source: 'route.js' }) + '\n');
+  }
+  return captureSink;
+}
+
+function pseudonym(sink, value) {
+  return 'ref_' + crypto.createHmac('sha256', sink.salt).update(String(value)).digest('hex').slice(0, 12);
+}
+
+function scrubCaptured(sink, key, value) {
+  if (value === null || value === undefined || typeof value === 'boolean' || typeof value === 'number') return value ?? null;
+  if (CAPTURE_KEEP_KEYS.has(key)) return value;
+  if (Array.isArray(value)) return value.map(v => scrubCaptured(sink, key, v));
+  if (typeof value === 'object') return Object.fromEntries(Object.entries(value).map(([k, v]) => [k, scrubCaptured(sink, k, v)]));
+  if (key && CAPTURE_ID_KEY.test(key)) return pseudonym(sink, value);
+  if (CAPTURE_PII[key] === 'email') return `<email:${pseudonym(sink, String(value).trim().toLowerCase())}>`;
+  if (CAPTURE_PII[key]) return `<${CAPTURE_PII[key]}>`;
+  return `<text:${String(value).length}>`;
+}
+
+// {dotted path: pseudonym} of the ids a JSON response mentions, outside lists
+function capturedReturns(sink, data, prefix = '') {
+  const found = {};
+  if (!data || typeof data !== 'object' || Array.isArray(data)) return found;
+  for (const [key, value] of Object.entries(data)) {
+    if (value && typeof value === 'object' && !Array.isArray(value) && !prefix) Object.assign(found, capturedReturns(sink, value, `${key}.`));
+    else if (typeof value === 'string' && CAPTURE_ID_KEY.test(key)) found[prefix + key] = pseudonym(sink, value);
+  }
+  return found;
+}
+
+async function captureRequest(sink, request, pathArr, bodyText, response, user, total) {
+  const auth = request.headers.get('Authorization');
+  const token = auth ? auth.replace('Bearer ', '') : null;
+  const contentType = response.headers.get('Content-Type') || '';
+  const stream = contentType.includes('text/event-stream');
+  const data = !stream && contentType.includes('json') ? await response.json().catch(() => null) : null;
+  let returned = response.status < 400 ? capturedReturns(sink, data) : {};
+  const session = token ? pseudonym(sink, token) : returned.token || null;
+  if (session ? parseInt(session.slice(4, 12), 16) / 0xffffffff >= TRAFFIC_CAPTURE_SAMPLE : Math.random() >= TRAFFIC_CAPTURE_SAMPLE) return;
+  if (!user && data?.user && typeof data.user === 'object') user = data.user;
+  const text = await bodyText;
+  let body = null;
+  if (text) {
+    try { body = JSON.parse(text); } catch { body = `<text:${text.length}>`; }
+  }
+  const record = {
+    at: Math.round(Date.now() - total), session, role: user ? user.role : (token ? null : 'anonymous'),
+    method: request.method, route: endpointKey(request.method, pathArr),
+    path: pathArr.map(s => /\d/.test(s) ? pseudonym(sink, s) : s),
+    query: Object.fromEntries([...new URL(request.url).searchParams].map(([k, v]) => [k, scrubCaptured(sink, k, v)])),
+    body: scrubCaptured(sink, '', body), bytes: text ? Buffer.byteLength(text) : 0, status: response.status, durationMs: Math.round(total * 100) / 100,
+  };
+  if (token) record.auth = true;
+  if (request.headers.get('If-None-Match')) record.conditional = true;
+  if (stream) record.stream = true;
+  // Ids the request already named are echoes, not hand-outs a replay could wait for
+  const named = JSON.stringify([record.path, record.query, record.body]);
+  returned = Object.fromEntries(Object.entries(returned).filter(([, ref]) => !named.includes(ref)));
+  if (Object.keys(returned).length) record.returns = returned;
+  sink.stream.write(JSON.stringify(record) + '\n');
+}
+
 // ===== ROUTER =====
 async function handler(request, context) {
+  const sink = getCaptureSink();
+  if ((!SERVER_TIMING && !sink) || request.method === 'OPTIONS') return route(request, context);
+  const start = performance.now();
+  const timing = { mark: start, phases: new Map(), user: null };
+  // Read the body from a copy before the handler consumes the original
+  const bodyText = sink && request.method !== 'GET' ? request.clone().text().catch(() => '') : null;
+  const response = await timingStore.run(timing, () => route(request, context));
+  const total = performance.now() - start;
+  const pathArr = (await context.params)?.path || [];
+  if (SERVER_TIMING) {
+    response.headers.set('Server-Timing', serverTimingHeader(timing, total));
+    recordMetrics(endpointKey(request.method, pathArr), timing, total);
+  }
+  if (sink) {
+    // Only JSON bodies are read (from a copy) for the ids they hand out; event streams never end
+    const copy = (response.headers.get('Content-Type') || '').includes('json') ? response.clone() : response;
+    captureRequest(sink, request, pathArr, bodyText, copy, timing.user, total).catch(e => console.error('Traffic capture failed:', e));
+  }
+  return response;
+}
+
+async function route(request, context) {
   if (request.method === 'OPTIONS') return json({});
 
   const resolvedParams = await context.params;
@@ -876,6 +2473,7 @@ async function handler(request, context) {
     if (p === 'auth/register' && method === 'POST') return handleRegister(request);
     if (p === 'auth/login' && method === 'POST') return handleLogin(request);
     if (p === 'auth/me' && method === 'GET') return handleMe(request);
+    if (p === 'auth/logout' && method === 'POST') return handleLogout(request);
     if (p === 'auth/make-admin' && method === 'POST') return handleMakeAdmin(request);
 
     // Plans & Data
@@ -886,12 +2484,15 @@ async function handler(request, context) {
     // Bookings
     if (p === 'bookings' && method === 'POST') return handleCreateBooking(request);
     if (p === 'bookings' && method === 'GET') return handleGetBookings(request);
+    if (p === 'bookings/status' && method === 'POST') return handleBulkUpdateStatus(request);
     if (pathArr[0] === 'bookings' && pathArr[1] === 'status' && pathArr.length === 3 && method === 'PUT') return handleUpdateBookingStatus(request, pathArr[2]);
     if (pathArr[0] === 'bookings' && pathArr.length === 2 && method === 'GET') return handleGetBooking(request, pathArr[1]);
     if (pathArr[0] === 'bookings' && pathArr.length === 2 && method === 'PUT') return handleUpdateBookingStatus(request, pathArr[1]);
 
     // Tracking
-    if (pathArr[0] === 'tracking' && pathArr.length === 2 && method === 'GET') return handleGetTracking(pathArr[1]);
+    if (pathArr[0] === 'tracking' && pathArr.length === 2 && method === 'GET') return handleGetTracking(request, pathArr[1]);
+    if (pathArr[0] === 'tracking' && pathArr.length === 3 && pathArr[2] === 'events' && method === 'GET') return handleTrackingEvents(request, pathArr[1]);
+    if (pathArr[0] === 'tracking' && pathArr.length === 3 && pathArr[2] === 'qr' && method === 'GET') return handleTrackingQr(request, pathArr[1]);
 
     // Checkout
     if (p === 'checkout/session' && method === 'POST') return handleCreateCheckout(request);
@@ -908,8 +2509,10 @@ async function handler(request, context) {
     if (p === 'subscriptions' && method === 'PUT') return handleUpdateSubscription(request);
 
     // Admin
-    if (p === 'admin/stats' && method === 'GET') return handleAdminStats();
+    if (p === 'admin/stats' && method === 'GET') return handleAdminStats(request);
+    if (p === 'admin/stats/rebuild' && method === 'POST') return handleRebuildAdminStats(request);
     if (p === 'admin/orders' && method === 'GET') return handleAdminOrders(request);
+    if (p === 'admin/export' && method === 'GET') return handleExport(request);
     if (pathArr[0] === 'admin' && pathArr[1] === 'orders' && pathArr.length === 3 && method === 'PUT') return handleUpdateBookingStatus(request, pathArr[2]);
     if (p === 'admin/complaints' && method === 'GET') return handleGetComplaints(request);
     if (pathArr[0] === 'admin' && pathArr[1] === 'complaints' && pathArr.length === 3 && method === 'PUT') return handleUpdateComplaint(request, pathArr[2]);
@@ -931,17 +2534,25 @@ async function handler(request, context) {
 
     // Capacity
     if (p === 'capacity' && method === 'GET') return handleGetCapacity(request);
+    if (p === 'capacity/calendar' && method === 'GET') return handleGetCapacityCalendar(request);
     if (p === 'capacity' && method === 'PUT') return handleSetCapacity(request);
 
     // Stripe Webhook
     if (p === 'webhook/stripe' && method === 'POST') return handleStripeWebhook(request);
+    if (p === 'admin/webhooks/stats' && method === 'GET') return handleWebhookStats(request);
 
     // Notifications
     if (p === 'notifications' && method === 'GET') return handleGetNotifications(request);
+    if (p === 'admin/migrate' && method === 'POST') return handleMigrate(request);
+    if (p === 'admin/notifications/drain' && method === 'POST') return handleDrainNotifications(request);
+    if (p === 'admin/notifications/stats' && method === 'GET') return handleNotificationStats(request);
 
     // Referral
     if (p === 'referral' && method === 'GET') return handleGetReferralCode(request);
 
+    // Metrics
+    if (p === 'metrics' && method === 'GET') return handleMetrics(request);
+
     return json({ error: 'Not found', path: p }, 404);
   } catch (error) {
     console.error('API Error:', error);
@@ -1,5 +1,5 @@
 'use client';
-import { useState, useEffect, useCallback, useMemo } from 'react';
+import { useState, useEffect, useCallback, useMemo, useRef } from 'react';
 import { Button } from '@/components/ui/button';
 import { Card, CardContent, CardDescription, CardFooter, CardHeader, CardTitle } from '@/components/ui/card';
 import { Input } from '@/components/ui/input';
@@ -56,6 +56,8 @@ const FAQS = [
 ];
 
 const COMPLAINT_CATEGORIES = ['Missing Item','Damaged Garment','Quality Issue','Late Delivery','Billing Issue','Other'];
+const COMPLAINT_STATUSES = ['open','in_progress','resolved'];
+const ADMIN_PAGE_SIZE = 50;
 const GST_RATE = 0.10;
 const ONE_OFF_RATE = 5.99;
 
@@ -69,6 +71,46 @@ const api = async (path, options = {}) => {
   return data;
 };
 
+// Cursor-paged list endpoints answer { [key]: [...], nextCursor }. reload()
+// starts over from the first page (overrides win over params, for filters
+// changed in the same event), loadMore() appends the page after the cursor.
+function usePagedList(path, key, params = {}) {
+  const [items, setItems] = useState([]);
+  const [cursor, setCursor] = useState(null);
+  const [total, setTotal] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // Bumped by every reload, so a page still in flight for the previous query is dropped
+  const generation = useRef(0);
+  const fetchPage = async (after, overrides = {}) => {
+    const current = after ? generation.current : ++generation.current;
+    const query = new URLSearchParams(Object.entries({ ...params, ...overrides, cursor: after }).filter(([, v]) => v));
+    const data = await api(`${path}?${query}`);
+    if (current !== generation.current) return;
+    setItems(prev => after ? [...prev, ...(data[key] || [])] : (data[key] || []));
+    setCursor(data.nextCursor || null);
+    if (data.total !== undefined) setTotal(data.total);
+  };
+  const loadMore = async () => {
+    if (!cursor || loadingMore) return;
+    setLoadingMore(true);
+    try { await fetchPage(cursor); } catch (e) { toast.error(e.message); }
+    finally { setLoadingMore(false); }
+  };
+  return { items, setItems, total, hasMore: !!cursor, loadingMore, reload: (overrides) => fetchPage(null, overrides), loadMore };
+}
+
+function LoadMoreButton({ list }) {
+  if (!list.hasMore) return null;
+  return (
+    <div className="text-center mt-4">
+      <Button variant="outline" onClick={list.loadMore} disabled={list.loadingMore}>{list.loadingMore ? <Loader2 className="w-4 h-4 animate-spin" /> : 'Load more'}</Button>
+    </div>
+  );
+}
+
+// Orders created before QR images moved to their own endpoint have no qrUrl
+const qrSrc = (order) => order.qrUrl || `/api/tracking/${encodeURIComponent(order.trackingId)}/qr`;
+
 // ===== ICON MAP =====
 const IconMap = { Shirt, Package, Droplets, ShieldCheck, Sparkles, Zap };
 
@@ -833,7 +875,7 @@ function BookingView({ type, setView, user }) {
                 <div><span className="text-slate-500">Pickup</span><p className="font-medium">{order.pickupDate} @ {order.pickupTimeSlot}</p></div>
                 <div><span className="text-slate-500">Total</span><p className="font-medium text-lg">${order.total.toFixed(2)} AUD</p></div>
               </div>
-              {order.qrCode && <div className="text-center mb-6"><p className="text-sm text-slate-500 mb-2">Scan to track your order:</p><img src={order.qrCode} alt="QR Code" className="mx-auto w-48 h-48 rounded-xl border" /></div>}
+              {order.trackingId && <div className="text-center mb-6"><p className="text-sm text-slate-500 mb-2">Scan to track your order:</p><img src={qrSrc(order)} alt="QR Code" className="mx-auto w-48 h-48 rounded-xl border" /></div>}
               <div className="flex flex-col sm:flex-row gap-3">
                 <Button onClick={handlePayment} className="flex-1 bg-gradient-to-r from-blue-600 to-indigo-600 text-white py-5" disabled={paymentLoading}>{paymentLoading ? <Loader2 className="w-4 h-4 animate-spin mr-2" /> : <CreditCard className="w-4 h-4 mr-2" />}Pay Now — ${order.total.toFixed(2)}</Button>
                 <Button variant="outline" onClick={() => setView('dashboard')} className="flex-1 py-5">Go to Dashboard</Button>
@@ -972,22 +1014,22 @@ function BookingView({ type, setView, user }) {
 // ===== DASHBOARD VIEW =====
 function DashboardView({ user, setView }) {
   const [tab, setTab] = useState('overview');
-  const [orders, setOrders] = useState([]);
+  const orderList = usePagedList('bookings', 'orders', { limit: 100 });
+  const complaintList = usePagedList('complaints', 'complaints');
+  const orders = orderList.items;
+  const complaints = complaintList.items;
   const [subscription, setSubscription] = useState(null);
-  const [complaints, setComplaints] = useState([]);
   const [loading, setLoading] = useState(true);
   const [referralCode, setReferralCode] = useState('');
 
   useEffect(() => {
     const load = async () => {
       try {
-        const [ordersData, subData, compData, refData] = await Promise.all([
-          api('bookings'), api('subscriptions'), api('complaints'), api('referral'),
+        const [, subData, , refData] = await Promise.all([
+          orderList.reload(), api('subscriptions'), complaintList.reload(), api('referral'),
         ]);
-        setOrders(ordersData.orders || []);
         setSubscription(subData.subscription);
         setReferralCode(refData.referralCode || '');
-        setComplaints(compData.complaints || []);
       } catch (e) { console.error(e); }
       finally { setLoading(false); }
     };
@@ -1022,8 +1064,8 @@ function DashboardView({ user, setView }) {
           <TabsContent value="overview">
             <div className="grid grid-cols-1 sm:grid-cols-3 gap-4 mb-8">
               <Card className="border-0 shadow-md"><CardContent className="pt-6"><p className="text-sm text-slate-500">Active Plan</p><p className="text-2xl font-bold">{subscription?.planName || 'No Plan'}</p><p className="text-sm text-slate-500">{subscription?.status === 'active' ? 'Active' : subscription?.status || 'N/A'}</p></CardContent></Card>
-              <Card className="border-0 shadow-md"><CardContent className="pt-6"><p className="text-sm text-slate-500">Total Orders</p><p className="text-2xl font-bold">{orders.length}</p></CardContent></Card>
-              <Card className="border-0 shadow-md"><CardContent className="pt-6"><p className="text-sm text-slate-500">Open Tickets</p><p className="text-2xl font-bold">{complaints.filter(c => c.status === 'open').length}</p></CardContent></Card>
+              <Card className="border-0 shadow-md"><CardContent className="pt-6"><p className="text-sm text-slate-500">Total Orders</p><p className="text-2xl font-bold">{orderList.total ?? orders.length}</p></CardContent></Card>
+              <Card className="border-0 shadow-md"><CardContent className="pt-6"><p className="text-sm text-slate-500">Open Tickets</p><p className="text-2xl font-bold">{complaints.filter(c => c.status === 'open').length}{complaintList.hasMore && '+'}</p></CardContent></Card>
             </div>
             <div className="flex gap-3 mb-8">
               <Button onClick={() => setView('booking')} className="bg-blue-600 text-white"><Plus className="w-4 h-4 mr-2" /> New Booking</Button>
@@ -1071,7 +1113,7 @@ function DashboardView({ user, setView }) {
                       <span>{o.planName}</span><span>{o.suburb}</span><span>{o.pickupDate}</span><span className="font-medium">${o.total?.toFixed(2)}</span>
                     </div>
                     <div className="flex items-center gap-2 mt-3">
-                      {o.qrCode && <img src={o.qrCode} alt="QR" className="w-16 h-16 rounded-lg border" />}
+                      {o.trackingId && <img src={qrSrc(o)} alt="QR" loading="lazy" className="w-16 h-16 rounded-lg border" />}
                       <Button size="sm" variant="outline" className="text-xs gap-1" onClick={async () => {
                         try {
                           const { invoice } = await api(`invoices/${o.id}`);
@@ -1108,6 +1150,7 @@ function DashboardView({ user, setView }) {
                     </div>
                   </div>
                 ))}
+                <LoadMoreButton list={orderList} />
               </div>}
             </CardContent></Card>
           </TabsContent>
@@ -1138,7 +1181,7 @@ function DashboardView({ user, setView }) {
             </CardContent></Card>
           </TabsContent>
           <TabsContent value="complaints">
-            <ComplaintView user={user} complaints={complaints} setComplaints={setComplaints} orders={orders} />
+            <ComplaintView user={user} complaints={complaints} setComplaints={complaintList.setItems} orders={orders} complaintList={complaintList} />
           </TabsContent>
         </Tabs>
       </div>
@@ -1147,7 +1190,7 @@ function DashboardView({ user, setView }) {
 }
 
 // ===== COMPLAINT VIEW =====
-function ComplaintView({ user, complaints, setComplaints, orders }) {
+function ComplaintView({ user, complaints, setComplaints, orders, complaintList }) {
   const [category, setCategory] = useState('');
   const [description, setDescription] = useState('');
   const [orderId, setOrderId] = useState('');
@@ -1230,6 +1273,7 @@ function ComplaintView({ user, complaints, setComplaints, orders }) {
               </div>
             ))}
           </div>
+          {complaintList && <LoadMoreButton list={complaintList} />}
         </CardContent></Card>
       )}
     </div>
@@ -1256,6 +1300,31 @@ function TrackingView({ trackingId: initialId }) {
 
   useEffect(() => { if (initialId) lookup(initialId); }, [initialId]);
 
+  // Live updates: the server pushes status deltas instead of us polling
+  const watchedId = data?.trackingId;
+  useEffect(() => {
+    if (!watchedId || typeof EventSource === 'undefined') return;
+    const events = new EventSource(`/api/tracking/${encodeURIComponent(watchedId)}/events`);
+    // Delivered is final: stop EventSource from reconnecting after the server closes
+    const closeIfDelivered = (status) => { if (status === 'Delivered') events.close(); };
+    const apply = (e) => {
+      const delta = JSON.parse(e.data);
+      closeIfDelivered(delta.status);
+      setData(prev => prev && prev.trackingId === delta.trackingId ? {
+        ...prev, status: delta.status, itemsConfirmed: delta.itemsConfirmed ?? prev.itemsConfirmed, confirmedItems: delta.confirmedItems ?? prev.confirmedItems,
+        statusHistory: delta.entry && (prev.statusHistory?.length || 0) < delta.version ? [...(prev.statusHistory || []), delta.entry] : prev.statusHistory,
+      } : prev);
+    };
+    events.addEventListener('snapshot', (e) => {
+      const snapshot = JSON.parse(e.data);
+      setData(snapshot);
+      closeIfDelivered(snapshot.status);
+    });
+    events.addEventListener('status', apply);
+    events.addEventListener('items', apply);
+    return () => events.close();
+  }, [watchedId]);
+
   const currentIdx = data ? TRACKING_STATUSES.indexOf(data.status) : -1;
 
   return (
@@ -1298,7 +1367,7 @@ function TrackingView({ trackingId: initialId }) {
                   );
                 })}
               </div>
-              {data.qrCode && <div className="text-center"><p className="text-sm text-slate-500 mb-2">Order QR Code</p><img src={data.qrCode} alt="QR" className="mx-auto w-40 h-40 rounded-xl border" /></div>}
+              {data.trackingId && <div className="text-center"><p className="text-sm text-slate-500 mb-2">Order QR Code</p><img src={qrSrc(data)} alt="QR" className="mx-auto w-40 h-40 rounded-xl border" /></div>}
             </CardContent>
           </Card>
         )}
@@ -1311,54 +1380,78 @@ function TrackingView({ trackingId: initialId }) {
 function AdminView({ user, setView }) {
   const [tab, setTab] = useState('stats');
   const [stats, setStats] = useState(null);
-  const [orders, setOrders] = useState([]);
-  const [complaints, setComplaints] = useState([]);
+  const [statusFilter, setStatusFilter] = useState('');
+  const [complaintFilter, setComplaintFilter] = useState('');
+  // Filters go to the server, so they search every order / complaint rather than the loaded pages
+  const orderList = usePagedList('admin/orders', 'orders', { limit: ADMIN_PAGE_SIZE, status: statusFilter });
+  const complaintList = usePagedList('admin/complaints', 'complaints', { include: 'photos', limit: ADMIN_PAGE_SIZE, status: complaintFilter });
+  const orders = orderList.items;
+  const complaints = complaintList.items;
   const [drivers, setDrivers] = useState([]);
   const [promos, setPromos] = useState([]);
   const [loading, setLoading] = useState(true);
-  const [statusFilter, setStatusFilter] = useState('');
   const [newDriver, setNewDriver] = useState({ name: '', phone: '', vehicle: '', zones: '' });
   const [newPromo, setNewPromo] = useState({ code: '', type: 'percentage', value: '', maxUses: '', description: '' });
 
   const CHART_COLORS = ['#3B82F6', '#10B981', '#F59E0B', '#EF4444', '#8B5CF6', '#EC4899'];
 
+  // Stats, drivers and promos; the paged lists are patched in place after row actions so loaded pages stay put
+  const loadSideData = async () => {
+    const [s, d, p] = await Promise.all([api('admin/stats'), api('drivers'), api('promo')]);
+    setStats(s); setDrivers(d.drivers || []); setPromos(p.promos || []);
+  };
+
   const loadData = async () => {
     setLoading(true);
-    try {
-      const [s, o, c, d, p] = await Promise.all([api('admin/stats'), api('admin/orders'), api('admin/complaints'), api('drivers'), api('promo')]);
-      setStats(s); setOrders(o.orders || []); setComplaints(c.complaints || []); setDrivers(d.drivers || []); setPromos(p.promos || []);
-    } catch (e) { toast.error(e.message); }
+    try { await Promise.all([loadSideData(), orderList.reload(), complaintList.reload()]); }
+    catch (e) { toast.error(e.message); }
     finally { setLoading(false); }
   };
 
   useEffect(() => { loadData(); }, []);
 
+  const refresh = () => loadSideData().catch(e => toast.error(e.message));
+  const patchOrder = (id, changes) => orderList.setItems(prev => prev.map(o => o.id === id ? { ...o, ...changes } : o));
+
+  const filterOrders = (status) => {
+    setStatusFilter(status);
+    orderList.reload({ status }).catch(e => toast.error(e.message));
+  };
+
+  const filterComplaints = (status) => {
+    setComplaintFilter(status);
+    complaintList.reload({ status }).catch(e => toast.error(e.message));
+  };
+
   const updateOrderStatus = async (orderId, status) => {
-    try { await api(`bookings/${orderId}`, { method: 'PUT', body: JSON.stringify({ status }) }); toast.success(`Status: ${status}`); loadData(); } catch (e) { toast.error(e.message); }
+    try { const { order } = await api(`bookings/${orderId}`, { method: 'PUT', body: JSON.stringify({ status }) }); toast.success(`Status: ${status}`); patchOrder(orderId, { status: order.status }); refresh(); } catch (e) { toast.error(e.message); }
   };
 
   const updateComplaintStatus = async (complaintId, status, resolution) => {
-    try { await api(`complaints/${complaintId}`, { method: 'PUT', body: JSON.stringify({ status, resolution }) }); toast.success('Updated'); loadData(); } catch (e) { toast.error(e.message); }
+    try {
+      const { complaint } = await api(`complaints/${complaintId}`, { method: 'PUT', body: JSON.stringify({ status, resolution }) });
+      toast.success('Updated');
+      complaintList.setItems(prev => prev.map(c => c.id === complaintId ? { ...c, ...complaint } : c));
+      refresh();
+    } catch (e) { toast.error(e.message); }
   };
 
   const assignDriver = async (orderId, driverId) => {
-    try { await api(`drivers/assign/${orderId}`, { method: 'POST', body: JSON.stringify({ driverId }) }); toast.success('Driver assigned'); loadData(); } catch (e) { toast.error(e.message); }
+    try { const { driverName } = await api(`drivers/assign/${orderId}`, { method: 'POST', body: JSON.stringify({ driverId }) }); toast.success('Driver assigned'); patchOrder(orderId, { driverId: driverId || null, driverName }); refresh(); } catch (e) { toast.error(e.message); }
   };
 
   const createDriver = async () => {
     if (!newDriver.name) { toast.error('Name required'); return; }
-    try { await api('drivers', { method: 'POST', body: JSON.stringify({ ...newDriver, zones: newDriver.zones.split(',').map(z => z.trim()).filter(Boolean) }) }); toast.success('Driver added'); setNewDriver({ name: '', phone: '', vehicle: '', zones: '' }); loadData(); } catch (e) { toast.error(e.message); }
+    try { await api('drivers', { method: 'POST', body: JSON.stringify({ ...newDriver, zones: newDriver.zones.split(',').map(z => z.trim()).filter(Boolean) }) }); toast.success('Driver added'); setNewDriver({ name: '', phone: '', vehicle: '', zones: '' }); refresh(); } catch (e) { toast.error(e.message); }
   };
 
   const createPromo = async () => {
     if (!newPromo.code || !newPromo.value) { toast.error('Code and value required'); return; }
-    try { await api('promo', { method: 'POST', body: JSON.stringify(newPromo) }); toast.success('Promo created'); setNewPromo({ code: '', type: 'percentage', value: '', maxUses: '', description: '' }); loadData(); } catch (e) { toast.error(e.message); }
+    try { await api('promo', { method: 'POST', body: JSON.stringify(newPromo) }); toast.success('Promo created'); setNewPromo({ code: '', type: 'percentage', value: '', maxUses: '', description: '' }); refresh(); } catch (e) { toast.error(e.message); }
   };
 
   if (loading) return <div className="min-h-screen flex items-center justify-center pt-20"><Loader2 className="w-8 h-8 animate-spin text-blue-600" /></div>;
 
-  const filteredOrders = statusFilter ? orders.filter(o => o.status === statusFilter) : orders;
-
   return (
     <div className="min-h-screen bg-slate-50 pt-24 pb-12 px-4">
       <div className="max-w-7xl mx-auto">
@@ -1471,11 +1564,11 @@ function AdminView({ user, setView }) {
           
           <TabsContent value="orders">
             <div className="flex items-center gap-3 mb-6">
-              <select value={statusFilter} onChange={e => setStatusFilter(e.target.value)} className="p-2 rounded-lg border border-slate-200 text-sm"><option value="">All Statuses</option>{TRACKING_STATUSES.map(s => <option key={s} value={s}>{s}</option>)}</select>
-              <Badge variant="secondary">{filteredOrders.length} orders</Badge>
+              <select value={statusFilter} onChange={e => filterOrders(e.target.value)} className="p-2 rounded-lg border border-slate-200 text-sm"><option value="">All Statuses</option>{TRACKING_STATUSES.map(s => <option key={s} value={s}>{s}</option>)}</select>
+              <Badge variant="secondary">{orders.length}{orderList.hasMore && '+'} orders</Badge>
             </div>
             <div className="space-y-4">
-              {filteredOrders.map(o => (
+              {orders.map(o => (
                 <Card key={o.id}>
                   <CardContent className="p-4">
                     <div className="flex flex-col sm:flex-row sm:items-center justify-between gap-4">
@@ -1503,9 +1596,14 @@ function AdminView({ user, setView }) {
                 </Card>
               ))}
             </div>
+            <LoadMoreButton list={orderList} />
           </TabsContent>
           
           <TabsContent value="complaints">
+            <div className="flex items-center gap-3 mb-6">
+              <select value={complaintFilter} onChange={e => filterComplaints(e.target.value)} className="p-2 rounded-lg border border-slate-200 text-sm"><option value="">All Statuses</option>{COMPLAINT_STATUSES.map(s => <option key={s} value={s}>{s.replace('_', ' ')}</option>)}</select>
+              <Badge variant="secondary">{complaints.length}{complaintList.hasMore && '+'} complaints</Badge>
+            </div>
             <div className="space-y-4">
               {complaints.map(c => (
                 <Card key={c.id}>
@@ -1533,6 +1631,7 @@ function AdminView({ user, setView }) {
               ))}
               {complaints.length === 0 && <p className="text-center text-slate-500 py-8">No complaints. Great work!</p>}
             </div>
+            <LoadMoreButton list={complaintList} />
           </TabsContent>
 
           <TabsContent value="drivers">
@@ -1559,7 +1658,7 @@ function AdminView({ user, setView }) {
                     <Button size="sm" variant="outline" className="mt-1 text-xs" onClick={async () => {
                       const newStatus = d.status === 'active' ? 'inactive' : 'active';
                       await api(`drivers/${d.id}`, { method: 'PUT', body: JSON.stringify({ status: newStatus }) });
-                      toast.success(`Driver ${newStatus}`); loadData();
+                      toast.success(`Driver ${newStatus}`); refresh();
                     }}>{d.status === 'active' ? 'Deactivate' : 'Activate'}</Button>
                   </div>
                 </CardContent></Card>
@@ -1590,7 +1689,7 @@ function AdminView({ user, setView }) {
                     <p className="text-sm">{p.currentUses}/{p.maxUses || '∞'} uses</p>
                     <Button size="sm" variant="outline" className="mt-1 text-xs" onClick={async () => {
                       await api(`promo/${p.id}`, { method: 'PUT' });
-                      toast.success(p.active ? 'Deactivated' : 'Activated'); loadData();
+                      toast.success(p.active ? 'Deactivated' : 'Activated'); refresh();
                     }}>{p.active ? 'Deactivate' : 'Activate'}</Button>
                   </div>
                 </CardContent></Card>
@@ -1662,6 +1761,7 @@ export default function App() {
   }, []);
 
   const handleLogout = () => {
+    api('auth/logout', { method: 'POST' }).catch(() => {});
     localStorage.removeItem('ff_token');
     localStorage.removeItem('ff_user');
     setUser(null);
@@ -4,14 +4,58 @@ Fresh Fold Laundry Platform Backend API Test Suite
 Tests all backend endpoints as specified in the test plan
 """
 
+import argparse
+import csv
+import io
+import os
 import requests
 import json
+import threading
 import time
+import traceback
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
 
+DEFAULT_BASE_URL = "https://pressfresh.preview.emergentagent.com/api"
+DEFAULT_WORKERS = 8
+
+# (name, method, requires, after) - a test starts once everything in `requires`
+# and `after` has finished. It is skipped if a `requires` test failed; `after`
+# only orders it (logout must not revoke the token while others still use it).
+TEST_PLAN = [
+    ("health_check", "test_health_check", (), ()),
+    ("get_plans", "test_get_plans", (), ()),
+    ("get_addons", "test_get_addons", (), ()),
+    ("get_suburbs", "test_get_suburbs", (), ()),
+    ("user_registration", "test_user_registration", (), ()),
+    ("user_login", "test_user_login", ("user_registration",), ()),
+    ("auth_me", "test_auth_me", ("user_login",), ()),
+    ("create_booking", "test_create_booking", ("user_login",), ()),
+    ("suburb_validation", "test_suburb_validation", ("user_login",), ()),
+    ("get_bookings", "test_get_bookings", ("create_booking",), ()),
+    ("tracking", "test_tracking", ("create_booking",), ()),
+    ("tracking_qr", "test_tracking_qr", ("create_booking",), ()),
+    ("subscription_flow", "test_subscription_flow", ("user_login",), ()),
+    ("complaints_system", "test_complaints_system", ("create_booking",), ()),
+    ("make_admin", "test_make_admin", ("user_registration",), ()),
+    ("admin_stats", "test_admin_stats", ("make_admin", "user_login"), ()),
+    ("tracking_events", "test_tracking_events", ("create_booking", "make_admin"), ("tracking",)),
+    ("bulk_status_update", "test_bulk_status_update", ("create_booking", "make_admin"), ("tracking", "tracking_events")),
+    ("capacity_calendar", "test_capacity_calendar", ("create_booking",), ()),
+    ("bulk_export", "test_bulk_export", ("create_booking", "make_admin"), ()),
+    ("driver_assignment", "test_driver_assignment", ("make_admin", "user_login"), ()),
+    ("stripe_webhook", "test_stripe_webhook", ("create_booking",), ("checkout_session",)),
+    ("checkout_session", "test_checkout_session", ("create_booking",), ()),
+    ("logout", "test_logout", ("user_login",),
+     ("auth_me", "suburb_validation", "get_bookings", "subscription_flow", "complaints_system", "admin_stats",
+      "tracking_events", "bulk_status_update", "driver_assignment", "bulk_export")),
+]
+
+
 class FreshFoldAPITester:
-    def __init__(self):
-        self.base_url = "https://pressfresh.preview.emergentagent.com/api"
+    def __init__(self, base_url=None):
+        self.base_url = (base_url or os.environ.get("FRESHFOLD_API_URL") or DEFAULT_BASE_URL).rstrip("/")
         self.session = requests.Session()
         self.auth_token = None
         self.test_user = {
@@ -22,11 +66,22 @@ class FreshFoldAPITester:
         }
         self.created_order_id = None
         self.tracking_id = None
+        self.created_pickup = None
         self.subscription_id = None
         self.complaint_id = None
+        self._captured = threading.local()
         
     def log(self, message):
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] {message}")
+        line = f"[{datetime.now().strftime('%H:%M:%S')}] {message}"
+        lines = getattr(self._captured, "lines", None)
+        if lines is not None:
+            lines.append(line)
+        else:
+            print(line)
+
+    def collect_server_timing(self, collector):
+        """Feed the Server-Timing header of every response on this session into `collector`"""
+        self.session.hooks["response"].append(lambda response, *args, **kwargs: collector.observe(response, self.base_url))
         
     def test_health_check(self):
         """Test GET /api/health"""
@@ -115,6 +170,26 @@ class FreshFoldAPITester:
             self.log(f"❌ Auth me failed - error: {str(e)}")
             return False
 
+    def test_logout(self):
+        """Test POST /api/auth/logout revokes the token immediately"""
+        self.log("Testing logout...")
+        try:
+            headers = {"Authorization": f"Bearer {self.auth_token}"}
+            response = self.session.post(f"{self.base_url}/auth/logout", headers=headers)
+            if response.status_code != 200:
+                self.log(f"❌ Logout failed - status {response.status_code}")
+                return False
+            me = self.session.get(f"{self.base_url}/auth/me", headers=headers)
+            if me.status_code == 401:
+                self.log("✅ Logout working - token revoked")
+                return True
+            else:
+                self.log(f"❌ Logout failed - token still accepted (status {me.status_code})")
+                return False
+        except Exception as e:
+            self.log(f"❌ Logout failed - error: {str(e)}")
+            return False
+
     def test_get_plans(self):
         """Test GET /api/plans"""
         self.log("Testing get plans endpoint...")
@@ -175,17 +250,17 @@ class FreshFoldAPITester:
             self.log(f"❌ Suburbs endpoint failed - error: {str(e)}")
             return False
 
-    def test_create_booking(self):
+    def test_create_booking(self, suburb="Geelong", pickup_date=None, pickup_time_slot="10:00 AM - 12:00 PM"):
         """Test POST /api/bookings"""
         self.log("Testing create booking endpoint...")
         try:
             headers = {"Authorization": f"Bearer {self.auth_token}"}
-            pickup_date = (datetime.now() + timedelta(days=3)).strftime('%Y-%m-%d')
+            pickup_date = pickup_date or (datetime.now() + timedelta(days=3)).strftime('%Y-%m-%d')
             booking_data = {
                 "type": "one-off",
-                "suburb": "Geelong",  # Valid suburb from service area
+                "suburb": suburb,  # Valid suburb from service area
                 "pickupDate": pickup_date,
-                "pickupTimeSlot": "10:00 AM - 12:00 PM",
+                "pickupTimeSlot": pickup_time_slot,
                 "items": 15,
                 "weightKg": 8.5,
                 "instructions": "Handle delicate items with care",
@@ -200,6 +275,7 @@ class FreshFoldAPITester:
                 if 'order' in data and data['order'].get('trackingId'):
                     self.created_order_id = data['order']['id']
                     self.tracking_id = data['order']['trackingId']
+                    self.created_pickup = (suburb, pickup_date, pickup_time_slot)
                     self.log(f"✅ Booking created successfully - tracking ID: {self.tracking_id}")
                     # Verify pricing calculation
                     order = data['order']
@@ -214,10 +290,10 @@ class FreshFoldAPITester:
                     else:
                         self.log(f"⚠️ Pricing mismatch - expected {expected_total:.2f}, got {order['total']:.2f}")
                     
-                    if order.get('qrCode'):
-                        self.log("✅ QR code generated")
+                    if order.get('qrUrl') and 'qrCode' not in order:
+                        self.log("✅ QR code URL returned")
                     else:
-                        self.log("⚠️ No QR code in response")
+                        self.log("⚠️ No QR code URL in response")
                         
                     return True
                 else:
@@ -267,8 +343,8 @@ class FreshFoldAPITester:
             response = self.session.get(f"{self.base_url}/bookings", headers=headers)
             if response.status_code == 200:
                 data = response.json()
-                if 'orders' in data:
-                    self.log(f"✅ Get bookings working - {len(data['orders'])} orders found")
+                if 'orders' in data and 'nextCursor' in data and data.get('total', -1) >= len(data['orders']):
+                    self.log(f"✅ Get bookings working - {len(data['orders'])} of {data['total']} orders found")
                     return True
                 else:
                     self.log(f"❌ Get bookings failed - missing orders: {data}")
@@ -292,11 +368,16 @@ class FreshFoldAPITester:
             if response.status_code == 200:
                 data = response.json()
                 required_fields = ['trackingId', 'status', 'statusHistory', 'suburb']
-                if all(field in data for field in required_fields):
-                    self.log("✅ Tracking endpoint working")
+                if not all(field in data for field in required_fields):
+                    self.log(f"❌ Tracking failed - missing required fields: {data}")
+                    return False
+                etag = response.headers.get('ETag')
+                revalidated = self.session.get(f"{self.base_url}/tracking/{self.tracking_id}", headers={"If-None-Match": etag or ''})
+                if etag and revalidated.status_code == 304:
+                    self.log("✅ Tracking endpoint working - 304 on revalidation")
                     return True
                 else:
-                    self.log(f"❌ Tracking failed - missing required fields: {data}")
+                    self.log(f"❌ Tracking failed - revalidation returned {revalidated.status_code} (ETag {etag})")
                     return False
             else:
                 self.log(f"❌ Tracking failed - status {response.status_code}")
@@ -305,6 +386,64 @@ class FreshFoldAPITester:
             self.log(f"❌ Tracking failed - error: {str(e)}")
             return False
 
+    def test_tracking_events(self):
+        """Test GET /api/tracking/{trackingId}/events pushes a snapshot, then status deltas"""
+        if not self.tracking_id or not self.created_order_id:
+            self.log("❌ Cannot test tracking events - no order available")
+            return False
+
+        self.log("Testing tracking event stream...")
+        try:
+            with self.session.get(f"{self.base_url}/tracking/{self.tracking_id}/events", stream=True, timeout=10) as stream:
+                if stream.status_code != 200 or not stream.headers.get('Content-Type', '').startswith('text/event-stream'):
+                    self.log(f"❌ Tracking events failed - status {stream.status_code}, type {stream.headers.get('Content-Type')}")
+                    return False
+                events = (line[len("event: "):] for line in stream.iter_lines(decode_unicode=True) if line.startswith("event: "))
+                if next(events, None) != 'snapshot':
+                    self.log("❌ Tracking events failed - no snapshot event")
+                    return False
+                headers = {"Authorization": f"Bearer {self.auth_token}"}
+                update = self.session.put(f"{self.base_url}/bookings/{self.created_order_id}", json={"status": "Picked Up"}, headers=headers)
+                if update.status_code != 200:
+                    self.log(f"❌ Tracking events failed - status update returned {update.status_code}")
+                    return False
+                if next(events, None) == 'status':
+                    self.log("✅ Tracking events working - status delta pushed")
+                    return True
+                self.log("❌ Tracking events failed - no status event after update")
+                return False
+        except Exception as e:
+            self.log(f"❌ Tracking events failed - error: {str(e)}")
+            return False
+
+    def test_tracking_qr(self):
+        """Test GET /api/tracking/{trackingId}/qr serves a cacheable PNG"""
+        if not self.tracking_id:
+            self.log("❌ Cannot test tracking QR - no tracking ID available")
+            return False
+
+        self.log("Testing tracking QR image endpoint...")
+        try:
+            url = f"{self.base_url}/tracking/{self.tracking_id}/qr"
+            response = self.session.get(url)
+            if response.status_code != 200 or response.headers.get('Content-Type') != 'image/png':
+                self.log(f"❌ Tracking QR failed - status {response.status_code}, type {response.headers.get('Content-Type')}")
+                return False
+            etag = response.headers.get('ETag')
+            if not etag or 'immutable' not in response.headers.get('Cache-Control', ''):
+                self.log(f"❌ Tracking QR failed - missing caching headers: {dict(response.headers)}")
+                return False
+            revalidated = self.session.get(url, headers={"If-None-Match": etag})
+            if revalidated.status_code == 304:
+                self.log(f"✅ Tracking QR working - {len(response.content)} bytes, 304 on revalidation")
+                return True
+            else:
+                self.log(f"❌ Tracking QR failed - revalidation returned {revalidated.status_code}")
+                return False
+        except Exception as e:
+            self.log(f"❌ Tracking QR failed - error: {str(e)}")
+            return False
+
     def test_subscription_flow(self):
         """Test subscription management endpoints"""
         self.log("Testing subscription flow...")
@@ -451,6 +590,14 @@ class FreshFoldAPITester:
                 data = response.json()
                 required_fields = ['totalOrders', 'totalRevenue', 'totalUsers', 'openComplaints']
                 if all(field in data for field in required_fields):
+                    # the projection must count every order, not only those booked since it was first written;
+                    # concurrent tests keep booking, so it has to land between two live counts
+                    before = self.session.get(f"{self.base_url}/admin/stats?live=1", headers=headers).json()['totalOrders']
+                    projected = self.session.get(f"{self.base_url}/admin/stats", headers=headers).json()['totalOrders']
+                    after = self.session.get(f"{self.base_url}/admin/stats?live=1", headers=headers).json()['totalOrders']
+                    if not before <= projected <= after:
+                        self.log(f"❌ Admin stats failed - projection counts {projected} orders, live count {before}..{after}")
+                        return False
                     self.log("✅ Admin stats working")
                     return True
                 else:
@@ -463,6 +610,188 @@ class FreshFoldAPITester:
             self.log(f"❌ Admin stats failed - error: {str(e)}")
             return False
 
+    def test_stripe_webhook(self):
+        """Test POST /api/webhook/stripe acknowledges, dedupes by event id and marks the order paid"""
+        if not self.created_order_id:
+            self.log("❌ Cannot test Stripe webhook - no order ID available")
+            return False
+
+        self.log("Testing Stripe webhook idempotency...")
+        try:
+            event = {"id": f"evt_test_{uuid.uuid4().hex[:16]}", "type": "checkout.session.completed", "created": int(time.time()),
+                     "data": {"object": {"id": f"cs_test_{uuid.uuid4().hex[:16]}", "payment_status": "paid",
+                                         "metadata": {"orderId": self.created_order_id}}}}
+            first = self.session.post(f"{self.base_url}/webhook/stripe", json=event)
+            if first.status_code == 400 and 'rejected' in first.text:
+                self.log("⚠️ Stripe webhook requires signed events on this server - skipping")
+                return True
+            second = self.session.post(f"{self.base_url}/webhook/stripe", json=event)
+            if first.status_code != 200 or first.json().get('duplicate') or not second.json().get('duplicate'):
+                self.log(f"❌ Stripe webhook failed - expected ack then duplicate: {first.text} / {second.text}")
+                return False
+            deadline = time.time() + 10
+            while time.time() < deadline:
+                invoice = self.session.get(f"{self.base_url}/invoices/{self.created_order_id}").json()['invoice']
+                if invoice['paymentStatus'] == 'paid':
+                    self.log("✅ Stripe webhook working - acknowledged once, duplicate skipped, order paid")
+                    return True
+                time.sleep(0.05)
+            self.log(f"❌ Stripe webhook failed - order still {invoice['paymentStatus']} after the event was acknowledged")
+            return False
+        except Exception as e:
+            self.log(f"❌ Stripe webhook failed - error: {str(e)}")
+            return False
+
+    def test_driver_assignment(self):
+        """Test bookings in one slot are spread over the least-loaded drivers for the zone"""
+        self.log("Testing driver assignment...")
+        try:
+            headers = {"Authorization": f"Bearer {self.auth_token}"}
+            run = uuid.uuid4().hex[:6]
+            new_drivers = set()
+            for i in range(2):
+                response = self.session.post(f"{self.base_url}/drivers", json={"name": f"Test Driver {run}-{i}", "zones": ["Lorne"]}, headers=headers)
+                if response.status_code != 201:
+                    self.log(f"❌ Driver assignment failed - could not create driver: {response.status_code} {response.text}")
+                    return False
+                new_drivers.add(response.json()['driver']['id'])
+            pickup_date = (datetime.now() + timedelta(days=5000 + uuid.uuid4().int % 3000)).strftime('%Y-%m-%d')
+            assigned = []
+            for _ in range(2):
+                response = self.session.post(f"{self.base_url}/bookings", headers=headers, json={
+                    "type": "one-off", "suburb": "Lorne", "pickupDate": pickup_date, "pickupTimeSlot": "8:00 AM - 10:00 AM", "weightKg": 5})
+                if response.status_code != 201:
+                    self.log(f"❌ Driver assignment failed - booking status {response.status_code}: {response.text}")
+                    return False
+                assigned.append(response.json()['order']['driverId'])
+            for driver_id in new_drivers:
+                self.session.put(f"{self.base_url}/drivers/{driver_id}", json={"status": "inactive"}, headers=headers)
+            if set(assigned) == new_drivers:
+                self.log("✅ Driver assignment working - two bookings went to the two idle drivers")
+                return True
+            self.log(f"❌ Driver assignment failed - expected one booking per new driver, got {assigned}")
+            return False
+        except Exception as e:
+            self.log(f"❌ Driver assignment failed - error: {str(e)}")
+            return False
+
+    def test_capacity_calendar(self):
+        """Test GET /api/capacity/calendar agrees with GET /api/capacity for every day and suburb"""
+        if not self.created_pickup:
+            self.log("❌ Cannot test capacity calendar - no booking available")
+            return False
+
+        self.log("Testing capacity calendar...")
+        try:
+            suburb, pickup_date, slot = self.created_pickup
+            start = (datetime.strptime(pickup_date, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
+            suburbs = [suburb, "Torquay", suburb.upper()]
+            response = self.session.get(f"{self.base_url}/capacity/calendar",
+                                        params={"from": start, "days": 3, "suburbs": ",".join(suburbs)})
+            if response.status_code != 200:
+                self.log(f"❌ Capacity calendar failed - status {response.status_code}: {response.text}")
+                return False
+            data = response.json()
+            if [s['suburb'] for s in data['suburbs']] != suburbs[:2] or data['to'] != (datetime.strptime(start, '%Y-%m-%d') + timedelta(days=2)).strftime('%Y-%m-%d'):
+                self.log(f"❌ Capacity calendar failed - unexpected suburbs or range: {data['suburbs'][:1]} {data['from']}..{data['to']}")
+                return False
+            for row in data['suburbs']:
+                for day in row['days']:
+                    single = self.session.get(f"{self.base_url}/capacity", params={"date": day['date'], "suburb": row['suburb']}).json()
+                    if single['capacity'] != day['capacity']:
+                        self.log(f"❌ Capacity calendar failed - {row['suburb']} {day['date']} differs from /capacity: {day['capacity']} vs {single['capacity']}")
+                        return False
+            booked_day = next(d for d in data['suburbs'][0]['days'] if d['date'] == pickup_date)
+            if next(c['booked'] for c in booked_day['capacity'] if c['slot'] == slot) < 1:
+                self.log("❌ Capacity calendar failed - the test booking is not counted")
+                return False
+            bad = self.session.get(f"{self.base_url}/capacity/calendar", params={"from": start, "days": 90, "suburbs": suburb})
+            if bad.status_code != 400:
+                self.log(f"❌ Capacity calendar failed - oversized range returned {bad.status_code}")
+                return False
+            self.log("✅ Capacity calendar working - matches the per-day endpoint for 6 suburb-days")
+            return True
+        except Exception as e:
+            self.log(f"❌ Capacity calendar failed - error: {str(e)}")
+            return False
+
+    def test_bulk_export(self):
+        """Test GET /api/admin/export streams the booking's invoice as NDJSON and CSV, matching GET /api/invoices/{id}"""
+        if not self.created_order_id:
+            self.log("❌ Cannot test bulk export - no booking available")
+            return False
+
+        self.log("Testing bulk export...")
+        try:
+            headers = {"Authorization": f"Bearer {self.auth_token}"}
+            invoice = self.session.get(f"{self.base_url}/invoices/{self.created_order_id}").json()['invoice']
+            day = invoice['date'][:10]
+            params = {"type": "invoices", "from": day, "to": day}
+            response = self.session.get(f"{self.base_url}/admin/export", params={**params, "format": "ndjson"}, headers=headers)
+            if response.status_code != 200 or 'ndjson' not in response.headers.get('Content-Type', ''):
+                self.log(f"❌ Bulk export failed - NDJSON status {response.status_code}: {response.text[:200]}")
+                return False
+            exported = [json.loads(line) for line in response.text.splitlines() if line]
+            # Concurrent tests may pay or progress the order, so compare what they leave alone
+            stable = lambda i: (i and i['customer'], i and i['lineItems'], i and i['total'])
+            if stable(next((i for i in exported if i['invoiceNumber'] == invoice['invoiceNumber']), None)) != stable(invoice):
+                self.log(f"❌ Bulk export failed - {invoice['invoiceNumber']} missing or different from GET /invoices/{{id}}")
+                return False
+            if [i['date'] for i in exported] != sorted(i['date'] for i in exported):
+                self.log("❌ Bulk export failed - rows not in createdAt order")
+                return False
+            response = self.session.get(f"{self.base_url}/admin/export", params={**params, "format": "csv"}, headers=headers)
+            table = list(csv.DictReader(io.StringIO(response.text)))
+            row = next((r for r in table if r['invoiceNumber'] == invoice['invoiceNumber']), None)
+            # Bookings made by concurrent tests may land between the two exports
+            missing = {i['invoiceNumber'] for i in exported} - {r['invoiceNumber'] for r in table}
+            if response.status_code != 200 or missing or not row or float(row['total']) != invoice['total']:
+                self.log(f"❌ Bulk export failed - CSV status {response.status_code}, {len(missing)} NDJSON invoices missing from the CSV")
+                return False
+            too_long = self.session.get(f"{self.base_url}/admin/export", params={"from": "2024-01-01", "to": "2025-12-31"}, headers=headers)
+            anonymous = self.session.get(f"{self.base_url}/admin/export", params=params)
+            if too_long.status_code != 400 or anonymous.status_code != 403:
+                self.log(f"❌ Bulk export failed - oversized range {too_long.status_code}, anonymous {anonymous.status_code}")
+                return False
+            self.log(f"✅ Bulk export working - {len(exported)} invoices for {day} as NDJSON and CSV")
+            return True
+        except Exception as e:
+            self.log(f"❌ Bulk export failed - error: {str(e)}")
+            return False
+
+    def test_bulk_status_update(self):
+        """Test POST /api/bookings/status applies a batch and reports per-entry failures"""
+        if not self.created_order_id:
+            self.log("❌ Cannot test bulk status update - no order ID available")
+            return False
+
+        self.log("Testing bulk status update...")
+        try:
+            headers = {"Authorization": f"Bearer {self.auth_token}"}
+            updates = [
+                {"orderId": self.created_order_id, "status": "Facility Intake", "note": "Round 1 drop-off"},
+                {"orderId": "no-such-order", "status": "Facility Intake"},
+                {"orderId": self.created_order_id, "status": "Not A Status"},
+            ]
+            response = self.session.post(f"{self.base_url}/bookings/status", json={"updates": updates}, headers=headers)
+            if response.status_code != 200:
+                self.log(f"❌ Bulk status update failed - status {response.status_code}: {response.text}")
+                return False
+            data = response.json()
+            oks = [r.get('ok') for r in data.get('results', [])]
+            if data.get('updated') != 1 or data.get('failed') != 2 or oks != [True, False, False]:
+                self.log(f"❌ Bulk status update failed - unexpected results: {data}")
+                return False
+            tracking = self.session.get(f"{self.base_url}/tracking/{self.tracking_id}").json()
+            if tracking.get('status') == 'Facility Intake' and tracking['statusHistory'][-1].get('note') == 'Round 1 drop-off':
+                self.log("✅ Bulk status update working - 1 applied, 2 rejected")
+                return True
+            self.log(f"❌ Bulk status update failed - order not updated: {tracking.get('status')}")
+            return False
+        except Exception as e:
+            self.log(f"❌ Bulk status update failed - error: {str(e)}")
+            return False
+
     def test_checkout_session(self):
         """Test checkout session creation"""
         if not self.created_order_id:
@@ -492,49 +821,79 @@ class FreshFoldAPITester:
             self.log(f"❌ Checkout session failed - error: {str(e)}")
             return False
 
-    def run_all_tests(self):
-        """Run all backend API tests"""
-        self.log("=== Starting Fresh Fold Backend API Tests ===")
-        
-        test_results = {}
-        
-        # Basic endpoints
-        test_results['health_check'] = self.test_health_check()
-        test_results['user_registration'] = self.test_user_registration()
-        test_results['user_login'] = self.test_user_login()
-        test_results['auth_me'] = self.test_auth_me()
-        
-        # Data endpoints
-        test_results['get_plans'] = self.test_get_plans()
-        test_results['get_addons'] = self.test_get_addons()
-        test_results['get_suburbs'] = self.test_get_suburbs()
-        
-        # Booking flow
-        test_results['create_booking'] = self.test_create_booking()
-        test_results['suburb_validation'] = self.test_suburb_validation()
-        test_results['get_bookings'] = self.test_get_bookings()
-        test_results['tracking'] = self.test_tracking()
-        
-        # Subscription management
-        test_results['subscription_flow'] = self.test_subscription_flow()
-        
-        # Complaints
-        test_results['complaints_system'] = self.test_complaints_system()
-        
-        # Admin functionality
-        test_results['make_admin'] = self.test_make_admin()
-        test_results['admin_stats'] = self.test_admin_stats()
-        
-        # Payment
-        test_results['checkout_session'] = self.test_checkout_session()
-        
+    def _run_step(self, name, method):
+        """Run one test with its log lines captured, so concurrent tests report as separate blocks"""
+        self._captured.lines = []
+        started = time.perf_counter()
+        try:
+            passed = bool(getattr(self, method)())
+        except Exception:
+            self.log(f"❌ {name} raised:\n{traceback.format_exc()}")
+            passed = False
+        finally:
+            lines, self._captured.lines = self._captured.lines, None
+        return passed, time.perf_counter() - started, lines
+
+    def run_all_tests(self, workers=DEFAULT_WORKERS, plan=TEST_PLAN):
+        """Run all backend API tests, independent ones concurrently, in dependency order"""
+        self.log(f"=== Starting Fresh Fold Backend API Tests ({workers} workers) ===")
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=max(workers, 1))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        steps = {name: (method, requires, after) for name, method, requires, after in plan}
+        results, durations, skipped = {}, {}, {}
+        running = {}
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+            while len(results) < len(steps):
+                for name, (method, requires, after) in steps.items():
+                    if name in results or name in running.values():
+                        continue
+                    if not all(dep in results for dep in requires + after):
+                        continue
+                    failed = [dep for dep in requires if not results[dep]]
+                    if failed:
+                        results[name], durations[name] = False, 0.0
+                        skipped[name] = failed
+                        self.log(f"⏭️ {name} skipped - requires {', '.join(failed)}")
+                    else:
+                        running[pool.submit(self._run_step, name, method)] = name
+                if len(results) == len(steps):
+                    break
+                if not running:
+                    raise ValueError(f"Test plan has unsatisfiable dependencies: {sorted(set(steps) - set(results))}")
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name], durations[name], lines = future.result()
+                    print(f"--- {name} ({durations[name] * 1000:.0f} ms) ---")
+                    for line in lines:
+                        print(line)
+        wall = time.perf_counter() - started
+
+        # Longest dependency chain: the floor on wall time with unlimited workers
+        finish = {}
+
+        def chain(name):
+            if name not in finish:
+                _, requires, after = steps[name]
+                finish[name] = durations[name] + max((chain(dep) for dep in requires + after), default=0.0)
+            return finish[name]
+
+        longest = max((chain(name) for name in steps), default=0.0)
+        test_results = {name: results[name] for name in steps}
+
         # Summary
         self.log("\n=== Test Results Summary ===")
         passed = 0
         failed = 0
         
         for test_name, result in test_results.items():
-            status = "✅ PASS" if result else "❌ FAIL"
+            if test_name in skipped:
+                status = f"⏭️ SKIP (requires {', '.join(skipped[test_name])})"
+            else:
+                status = f"{'✅ PASS' if result else '❌ FAIL'} ({durations[test_name] * 1000:.0f} ms)"
             self.log(f"{test_name}: {status}")
             if result:
                 passed += 1
@@ -545,9 +904,114 @@ class FreshFoldAPITester:
         self.log(f"Passed: {passed}")
         self.log(f"Failed: {failed}")
         self.log(f"Success Rate: {(passed/len(test_results)*100):.1f}%")
+        self.log(f"Wall time: {wall:.2f}s (sequential {sum(durations.values()):.2f}s, "
+                 f"longest dependency chain {longest:.2f}s)")
         
         return test_results
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fresh Fold backend API tests and load generator")
+    parser.add_argument("--base-url", default=None, help=f"API base URL (default: $FRESHFOLD_API_URL or {DEFAULT_BASE_URL})")
+    parser.add_argument("--local", action="store_true", help="start the in-process stand-in backend and test against it")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="simulated Mongo round trip for --local")
+    parser.add_argument("--qr-render-ms", type=float, default=0.0, help="simulated QR render cost for --local")
+    parser.add_argument("--seed-users", type=int, default=0, help="bulk-seed this many synthetic users into --local first")
+    parser.add_argument("--seed-orders", type=int, default=0, help="bulk-seed this many synthetic orders into --local first")
+    parser.add_argument("--scenario", help="run a named performance scenario from perf_scenarios.py (e.g. capacity-race)")
+    parser.add_argument("--concurrency", type=int, default=200, help="simultaneous requests for --scenario")
+    parser.add_argument("--sizes", help="comma-separated data volumes for --scenario benchmarks, e.g. 10000,100000,1000000")
+    parser.add_argument("--capture", help="existing NDJSON traffic capture for --scenario traffic-replay")
+    parser.add_argument("--speed", help="comma-separated replay speed-ups for --scenario traffic-replay (default 1,10,100)")
+    parser.add_argument("--capture-traffic", help="--local only: write scrubbed NDJSON request records to this file")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="concurrent tests in the functional suite (1 = sequential)")
+    parser.add_argument("--timings", action="store_true", help="print the per-phase Server-Timing breakdown after the test run")
+    parser.add_argument("--bench", action="store_true", help="run the performance regression suite and compare with the stored baseline")
+    parser.add_argument("--bench-only", help="comma-separated benchmark names for --bench (default: all)")
+    parser.add_argument("--runs", type=int, default=5, help="repetitions of every benchmark for --bench")
+    parser.add_argument("--bench-requests", type=int, default=200, help="requests per benchmark run for --bench")
+    parser.add_argument("--bench-concurrency", type=int, default=4, help="concurrent requests within a --bench run")
+    parser.add_argument("--baseline", default=None, help="baseline JSON for --bench (default: test_reports/perf/baseline.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="store this --bench run as the baseline instead of comparing")
+    parser.add_argument("--max-p95-regression", type=float, default=20.0, help="allowed p95 increase in percent for --bench")
+    parser.add_argument("--max-throughput-regression", type=float, default=15.0, help="allowed throughput drop in percent for --bench")
+    parser.add_argument("--inject-delay", help="--local only: slow endpoints down, e.g. 'POST /api/bookings=15', to check --bench catches it")
+    parser.add_argument("--load", action="store_true", help="replay the test flows from concurrent virtual users")
+    parser.add_argument("--users", type=int, default=10, help="virtual users for --load")
+    parser.add_argument("--steps", help="comma-separated user counts for a stepped --load run, e.g. 5,10,25,50")
+    parser.add_argument("--rate", type=float, default=None, help="target iterations/second across all users (default: unbounded)")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="seconds over which virtual users start")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of steady load after ramp-up")
+    parser.add_argument("--soak", action="store_true", help="long-running soak: sample memory, collection growth and latency drift")
+    parser.add_argument("--soak-minutes", type=float, default=240.0, help="length of the --soak run")
+    parser.add_argument("--sample-interval", type=float, default=60.0, help="seconds between --soak samples")
+    parser.add_argument("--max-rss-growth", type=float, default=32.0, help="allowed server RSS growth in MiB/hour for --soak")
+    parser.add_argument("--max-latency-drift", type=float, default=50.0, help="allowed p95 increase in percent over a --soak run")
+    parser.add_argument("--retention-ms", type=float, default=None,
+                        help="--local only: session TTL and notification / webhook log retention for --soak, so expiry happens within the run")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    tester = FreshFoldAPITester()
-    results = tester.run_all_tests()
\ No newline at end of file
+    args = parse_args()
+    local_backend = None
+    if args.local:
+        from local_backend import LocalBackend
+        local_backend = LocalBackend(db_latency_ms=args.db_latency_ms, qr_render_ms=args.qr_render_ms,
+                                     capture_traffic=args.capture_traffic).start()
+        if args.seed_users or args.seed_orders:
+            from seed_data import BulkSeeder, MemorySink
+            BulkSeeder(MemorySink(local_backend.db)).run(users=args.seed_users, orders=args.seed_orders, drivers=25,
+                                                         complaints=args.seed_orders // 50)
+        args.base_url = local_backend.base_url
+        if args.inject_delay:
+            delays = dict(item.rsplit("=", 1) for item in args.inject_delay.split(","))
+            requests.put(f"{args.base_url}/_local/config", json={"injectDelayMs": {k.strip(): float(v) for k, v in delays.items()}})
+    exit_code = 0
+    try:
+        if args.bench:
+            from perf_regression import DEFAULT_BASELINE, run_regression
+            exit_code = run_regression(
+                args.base_url or FreshFoldAPITester().base_url, baseline_path=args.baseline or DEFAULT_BASELINE,
+                save_baseline=args.save_baseline, max_p95_regression=args.max_p95_regression,
+                max_throughput_regression=args.max_throughput_regression,
+                target={"local": args.local, "dbLatencyMs": args.db_latency_ms if args.local else None},
+                runs=args.runs, requests_per_run=args.bench_requests, concurrency=args.bench_concurrency,
+                only=args.bench_only.split(",") if args.bench_only else None)
+        elif args.scenario:
+            from perf_scenarios import SCENARIOS
+            options = dict(concurrency=args.concurrency)
+            if args.sizes:
+                options["sizes"] = [int(n) for n in args.sizes.split(",")]
+            if args.capture:
+                options["capture"] = args.capture
+            if args.speed:
+                options["speeds"] = [float(n) for n in args.speed.split(",")]
+            SCENARIOS[args.scenario](args.base_url or FreshFoldAPITester().base_url, **options)
+        elif args.soak:
+            from soak_test import run_soak
+            exit_code = run_soak(args.base_url or FreshFoldAPITester().base_url, retention_ms=args.retention_ms if args.local else None,
+                                 duration=args.soak_minutes * 60, interval=args.sample_interval, users=args.users,
+                                 rate=args.rate or 5.0, ramp_up=args.ramp_up, max_rss_growth_mb=args.max_rss_growth,
+                                 max_latency_drift=args.max_latency_drift)
+        elif args.load:
+            from load_test import LoadGenerator, run_step_load
+            options = dict(rate=args.rate, ramp_up=args.ramp_up, duration=args.duration, base_url=args.base_url)
+            if args.steps:
+                run_step_load([int(n) for n in args.steps.split(",")], **options)
+            else:
+                generator = LoadGenerator(users=args.users, **options)
+                generator.report(generator.run())
+        else:
+            tester = FreshFoldAPITester(args.base_url)
+            if args.timings:
+                from load_test import ServerTimingCollector
+                timings = ServerTimingCollector()
+                tester.collect_server_timing(timings)
+            results = tester.run_all_tests(workers=args.workers)
+            if args.timings:
+                tester.log("\n=== Server-Timing breakdown ===")
+                timings.report(tester.log)
+    finally:
+        if local_backend:
+            local_backend.stop()
+    raise SystemExit(exit_code)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Fresh Fold Bulk Export Client
+Streams GET /api/admin/export (orders or invoices for a date range as NDJSON
+or CSV) row by row without holding the export in memory, optionally writing
+it to a file, while sampling the server's resident memory from /api/metrics.
+"""
+
+import argparse
+import csv
+import io
+import json
+import threading
+import time
+
+import requests
+
+
+class MemorySampler:
+    """Polls memory.rss from /api/metrics in the background; baseline is the first sample, peak the largest"""
+
+    def __init__(self, base_url, headers, interval=0.05):
+        self.url = f"{base_url}/metrics"
+        self.headers = headers
+        self.interval = interval
+        self.session = requests.Session()
+        self.baseline = self.peak = None
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def sample(self):
+        try:
+            rss = self.session.get(self.url, headers=self.headers, timeout=10).json().get("memory", {}).get("rss")
+        except (requests.RequestException, ValueError):
+            return
+        if rss is None:
+            return
+        self.samples += 1
+        if self.baseline is None:
+            self.baseline = rss
+        self.peak = max(self.peak or 0, rss)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def __enter__(self):
+        self.sample()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+        self.sample()
+
+    @property
+    def growth(self):
+        return None if self.baseline is None else self.peak - self.baseline
+
+
+def iter_rows(response, fmt):
+    """Rows of a streamed export: dicts for NDJSON, lists for CSV (header row first)"""
+    response.raw.decode_content = True
+    text = io.TextIOWrapper(response.raw, encoding="utf-8", newline="")
+    if fmt == "csv":
+        yield from csv.reader(text)
+        return
+    for line in text:
+        if line.strip():
+            yield json.loads(line)
+
+
+def export(base_url, headers, kind="invoices", start=None, end=None, fmt="ndjson", out=None, session=None):
+    """
+    Stream one export, writing it to `out` (a path) when given. Returns rows
+    (CSV header excluded), bytes, seconds, time to first row and rows/s
+    """
+    session = session or requests.Session()
+    params = {"type": kind, "from": start, "to": end or start, "format": fmt}
+    started = time.perf_counter()
+    first_row = None
+    rows = 0
+    with session.get(f"{base_url}/admin/export", params=params, headers=headers, stream=True, timeout=600) as response:
+        if response.status_code != 200:
+            raise RuntimeError(f"Export failed with {response.status_code}: {response.text[:200]}")
+        sink = open(out, "w", newline="", encoding="utf-8") if out else None
+        writer = csv.writer(sink) if sink and fmt == "csv" else None
+        try:
+            for row in iter_rows(response, fmt):
+                if first_row is None:
+                    first_row = time.perf_counter() - started
+                if writer:
+                    writer.writerow(row)
+                elif sink:
+                    sink.write(json.dumps(row, separators=(",", ":"), ensure_ascii=False) + "\n")
+                rows += 1
+        finally:
+            if sink:
+                sink.close()
+        size = response.raw.tell()
+    seconds = time.perf_counter() - started
+    if fmt == "csv" and rows:
+        rows -= 1
+    return {"type": kind, "format": fmt, "from": start, "to": end or start, "rows": rows, "bytes": size, "seconds": seconds,
+            "first_row_ms": (first_row or seconds) * 1000, "rows_per_s": rows / seconds if seconds else 0.0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fresh Fold streaming order / invoice export")
+    parser.add_argument("--base-url", required=True, help="API base URL, e.g. http://127.0.0.1:3001/api")
+    parser.add_argument("--token", help="admin bearer token (default: register a throwaway admin)")
+    parser.add_argument("--type", choices=("orders", "invoices"), default="invoices")
+    parser.add_argument("--from", dest="start", required=True, help="first UTC day, YYYY-MM-DD")
+    parser.add_argument("--to", dest="end", help="last UTC day, YYYY-MM-DD (default: --from)")
+    parser.add_argument("--format", choices=("ndjson", "csv"), default="csv")
+    parser.add_argument("--out", help="write the export to this file")
+    args = parser.parse_args(argv)
+    token = args.token
+    if not token:
+        from perf_scenarios import admin_tester
+        token = admin_tester(args.base_url).auth_token
+    headers = {"Authorization": f"Bearer {token}"}
+    with MemorySampler(args.base_url, headers) as memory:
+        result = export(args.base_url, headers, args.type, args.start, args.end, args.format, out=args.out)
+    growth = f", server RSS +{memory.growth / 2 ** 20:.1f} MiB at peak" if memory.growth is not None else ""
+    print(f"{result['rows']} {args.type} rows, {result['bytes'] / 2 ** 20:.1f} MiB in {result['seconds']:.2f}s "
+          f"({result['rows_per_s']:,.0f} rows/s, first row after {result['first_row_ms']:.0f}ms){growth}")
+
+
+if __name__ == "__main__":
+    main()
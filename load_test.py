@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Fresh Fold Laundry Platform Load Generator
+Replays the FreshFoldAPITester flows from concurrent virtual users and
+reports per-endpoint throughput and latency percentiles
+"""
+
+import math
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+
+from backend_test import FreshFoldAPITester
+from local_backend import PICKUP_SLOTS, SERVICE_SUBURBS
+
+# (pattern, template) pairs collapsing ids so latencies group per endpoint
+ENDPOINT_PATTERNS = [
+    (re.compile(r'^/tracking/[^/]+$'), '/tracking/{trackingId}'),
+    (re.compile(r'^/tracking/[^/]+/qr$'), '/tracking/{trackingId}/qr'),
+    (re.compile(r'^/bookings/status/[^/]+$'), '/bookings/status/{id}'),
+    (re.compile(r'^/bookings/(?!status$)[^/]+$'), '/bookings/{id}'),
+    (re.compile(r'^/checkout/status/[^/]+$'), '/checkout/status/{sessionId}'),
+    (re.compile(r'^/complaints/[^/]+$'), '/complaints/{id}'),
+    (re.compile(r'^/admin/orders/[^/]+$'), '/admin/orders/{id}'),
+    (re.compile(r'^/admin/complaints/[^/]+$'), '/admin/complaints/{id}'),
+    (re.compile(r'^/invoices/[^/]+$'), '/invoices/{orderId}'),
+    (re.compile(r'^/drivers/assign/[^/]+$'), '/drivers/assign/{orderId}'),
+    (re.compile(r'^/drivers/[^/]+$'), '/drivers/{id}'),
+    (re.compile(r'^/promo/(?!validate$)[^/]+$'), '/promo/{id}'),
+]
+
+
+def endpoint_key(method, url, base_url):
+    """Collapse a request URL into 'METHOD /template' relative to base_url"""
+    path = url[len(base_url):] if url.startswith(base_url) else url
+    path = path.split('?', 1)[0] or '/'
+    for pattern, template in ENDPOINT_PATTERNS:
+        if pattern.match(path):
+            path = template
+            break
+    return f"{method.upper()} {path}"
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    # multiply before dividing so whole-number ranks stay exact (0.07 * 100 is 7.000000000000001)
+    rank = max(1, math.ceil(pct * len(sorted_values) / 100.0))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class LatencyRecorder:
+    """Thread-safe collector of (endpoint, latency, status) samples"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.started_at = None
+        self.finished_at = None
+
+    def record(self, endpoint, elapsed_ms, ok):
+        with self.lock:
+            self.samples[endpoint].append(elapsed_ms)
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def summary(self):
+        """Per-endpoint count, error count, throughput and latency percentiles"""
+        window = (self.finished_at or time.time()) - (self.started_at or time.time())
+        with self.lock:
+            return self._summarize(self.samples, self.errors, window)
+
+    def drain(self):
+        """Summary of the samples since the previous drain, then start an empty window so long runs stay bounded"""
+        now = time.time()
+        with self.lock:
+            samples, errors, started = self.samples, self.errors, self.started_at or now
+            self.samples, self.errors, self.started_at = defaultdict(list), defaultdict(int), now
+        return self._summarize(samples, errors, now - started)
+
+    @staticmethod
+    def _summarize(samples, errors, window):
+        window = max(window, 1e-9)
+        rows = {}
+        for endpoint, values in samples.items():
+            ordered = sorted(values)
+            rows[endpoint] = {
+                "count": len(ordered),
+                "errors": errors[endpoint],
+                "throughput": len(ordered) / window,
+                "p50": percentile(ordered, 50),
+                "p95": percentile(ordered, 95),
+                "p99": percentile(ordered, 99),
+                "max": ordered[-1],
+            }
+        return rows
+
+
+def parse_server_timing(header):
+    """{metric: ms} from a Server-Timing header; metrics without a dur are skipped"""
+    timings = {}
+    for entry in header.split(','):
+        name, *params = [part.strip() for part in entry.split(';')]
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip() == 'dur':
+                try:
+                    timings[name] = timings.get(name, 0.0) + float(value.strip().strip('"'))
+                except ValueError:
+                    pass
+    return timings
+
+
+class ServerTimingCollector:
+    """Thread-safe per-endpoint, per-phase samples of the durations servers report via Server-Timing"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(lambda: defaultdict(list))
+        self.requests = defaultdict(int)
+
+    def observe(self, response, base_url):
+        """requests response hook body; responses without the header are ignored"""
+        header = response.headers.get('Server-Timing')
+        if not header:
+            return
+        endpoint = endpoint_key(response.request.method, response.request.url, base_url)
+        with self.lock:
+            self.requests[endpoint] += 1
+            for name, ms in parse_server_timing(header).items():
+                self.samples[endpoint][name].append(ms)
+
+    def breakdown(self):
+        """Per endpoint, per phase: count, mean, percentiles and share of the summed server total"""
+        rows = {}
+        with self.lock:
+            for endpoint, phases in self.samples.items():
+                total = sum(phases.get('total', [])) or 1e-9
+                rows[endpoint] = {}
+                for name, values in phases.items():
+                    ordered = sorted(values)
+                    rows[endpoint][name] = {
+                        "count": len(ordered),
+                        "mean": sum(ordered) / len(ordered),
+                        "p50": percentile(ordered, 50),
+                        "p95": percentile(ordered, 95),
+                        "max": ordered[-1],
+                        "share": sum(ordered) / total,
+                    }
+        return rows
+
+    def report(self, log=print):
+        """Breakdown table; db.<collection> rows overlap the handler phases they ran in"""
+        rows = self.breakdown()
+        if not rows:
+            log("No Server-Timing headers received")
+            return
+        log(f"{'endpoint / phase':<40}{'count':>7}{'mean ms':>9}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'share':>8}")
+        for endpoint in sorted(rows):
+            log(f"{endpoint} ({self.requests[endpoint]} requests)")
+            phases = rows[endpoint]
+            order = sorted((name for name in phases if name != 'total'), key=lambda name: -phases[name]['share'])
+            for name in order + ['total'] * ('total' in phases):
+                row = phases[name]
+                log(f"  {name:<38}{row['count']:>7}{row['mean']:>9.2f}{row['p50']:>9.2f}{row['p95']:>9.2f}"
+                    f"{row['max']:>9.2f}{row['share']:>8.0%}")
+
+
+class TimedSession(requests.Session):
+    """requests.Session that reports every call's wall-clock latency to a recorder"""
+
+    def __init__(self, recorder, base_url):
+        super().__init__()
+        self.recorder = recorder
+        self.base_url = base_url
+
+    def request(self, method, url, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except requests.RequestException:
+            self.recorder.record(endpoint_key(method, url, self.base_url), (time.perf_counter() - start) * 1000, False)
+            raise
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.recorder.record(endpoint_key(method, url, self.base_url), elapsed_ms, response.status_code < 400)
+        return response
+
+
+class VirtualUser:
+    """One simulated customer replaying the FreshFoldAPITester flows"""
+
+    def __init__(self, index, recorder, base_url=None, timings=None):
+        self.index = index
+        self.tester = FreshFoldAPITester(base_url)
+        self.tester.session = TimedSession(recorder, self.tester.base_url)
+        if timings:
+            self.tester.collect_server_timing(timings)
+        self.tester.test_user["email"] = f"loaduser.{index}.{int(time.time() * 1000)}@example.com"
+        self.tester.log = lambda message: None
+        self.rng = random.Random(index)
+
+    def setup(self):
+        return self.tester.test_user_registration()
+
+    def flow_browse(self):
+        self.tester.test_health_check()
+        self.tester.test_get_plans()
+        self.tester.test_get_addons()
+        self.tester.test_get_suburbs()
+
+    def flow_booking(self):
+        pickup_date = (datetime.now() + timedelta(days=self.rng.randint(1, 60))).strftime('%Y-%m-%d')
+        if self.tester.test_create_booking(
+            suburb=self.rng.choice(SERVICE_SUBURBS),
+            pickup_date=pickup_date,
+            pickup_time_slot=self.rng.choice(PICKUP_SLOTS),
+        ):
+            self.tester.test_tracking()
+        self.tester.test_get_bookings()
+
+    def flow_tracking(self):
+        if self.tester.tracking_id:
+            self.tester.test_tracking()
+        else:
+            self.flow_booking()
+
+    def flow_account(self):
+        self.tester.test_auth_me()
+        self.tester.test_get_bookings()
+
+    def flow_admin(self):
+        self.tester.test_admin_stats()
+
+    def flow_login(self):
+        # every login inserts a fresh session row; the previous token stays valid until it expires
+        self.tester.test_user_login()
+        self.tester.test_auth_me()
+
+    def flow_payment(self):
+        if self.tester.created_order_id:
+            self.tester.test_stripe_webhook()
+        else:
+            self.flow_booking()
+
+    def run_iteration(self, mix):
+        flows = list(mix.keys())
+        weights = [mix[name] for name in flows]
+        getattr(self, f"flow_{self.rng.choices(flows, weights)[0]}")()
+
+
+# Default iteration mix, weighted towards the lunchtime booking rush
+DEFAULT_MIX = {"booking": 4, "tracking": 3, "account": 2, "browse": 1, "admin": 1}
+
+
+class LoadGenerator:
+    """Runs N virtual users with ramp-up, a target iteration rate and a fixed duration"""
+
+    def __init__(self, users=10, rate=None, ramp_up=5.0, duration=30.0, mix=None, base_url=None, log=print, server_timing=True):
+        self.users = users
+        self.rate = rate
+        self.ramp_up = ramp_up
+        self.duration = duration
+        self.mix = mix or DEFAULT_MIX
+        self.base_url = base_url
+        self.log = log
+        self.recorder = LatencyRecorder()
+        # per-request Server-Timing samples are kept for the final report, so soak runs switch them off
+        self.timings = ServerTimingCollector() if server_timing else None
+        self.pacing_lock = threading.Lock()
+        self.next_start = 0.0
+        self.iterations = 0
+        self.failed_iterations = 0
+
+    def _acquire_slot(self):
+        """Global pacing: hand out iteration start times spaced 1/rate apart"""
+        if not self.rate:
+            return time.time()
+        with self.pacing_lock:
+            slot = max(time.time(), self.next_start)
+            self.next_start = slot + 1.0 / self.rate
+        return slot
+
+    def _run_user(self, index, deadline):
+        time.sleep(self.ramp_up * index / max(self.users, 1))
+        if time.time() >= deadline:
+            return
+        user = VirtualUser(index, self.recorder, self.base_url, self.timings)
+        if not user.setup():
+            with self.pacing_lock:
+                self.failed_iterations += 1
+            return
+        if "admin" in self.mix:
+            user.tester.test_make_admin()
+        while True:
+            slot = self._acquire_slot()
+            if slot >= deadline:
+                return
+            delay = slot - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                user.run_iteration(self.mix)
+                with self.pacing_lock:
+                    self.iterations += 1
+            except Exception:
+                with self.pacing_lock:
+                    self.failed_iterations += 1
+
+    def run(self):
+        self.log(f"=== Load run: {self.users} users, rate={self.rate or 'unbounded'} it/s, "
+                 f"ramp-up {self.ramp_up}s, duration {self.duration}s ===")
+        self.recorder.started_at = time.time()
+        deadline = self.recorder.started_at + self.ramp_up + self.duration
+        with ThreadPoolExecutor(max_workers=self.users) as pool:
+            for index in range(self.users):
+                pool.submit(self._run_user, index, deadline)
+        self.recorder.finished_at = time.time()
+        return self.recorder.summary()
+
+    def report(self, summary):
+        self.log(f"Iterations: {self.iterations} completed, {self.failed_iterations} failed")
+        self.log(f"{'endpoint':<34}{'count':>8}{'err':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+        for endpoint in sorted(summary):
+            row = summary[endpoint]
+            self.log(f"{endpoint:<34}{row['count']:>8}{row['errors']:>6}{row['throughput']:>9.1f}"
+                     f"{row['p50']:>9.1f}{row['p95']:>9.1f}{row['p99']:>9.1f}{row['max']:>9.1f}")
+        if self.timings and self.timings.samples:
+            self.log("Server-side breakdown (Server-Timing):")
+            self.timings.report(self.log)
+
+
+def run_step_load(steps, degradation_factor=2.0, **kwargs):
+    """Run successive load stages and flag endpoints whose p95 degrades past the first stage"""
+    log = kwargs.get("log", print)
+    stages = []
+    for users in steps:
+        generator = LoadGenerator(users=users, **kwargs)
+        summary = generator.run()
+        generator.report(summary)
+        stages.append((users, summary))
+
+    baseline_users, baseline = stages[0]
+    log(f"\n=== Degradation vs {baseline_users} users (p95 > {degradation_factor}x) ===")
+    for endpoint in sorted(baseline):
+        base_p95 = baseline[endpoint]["p95"] or 1e-9
+        knee = next((users for users, summary in stages[1:]
+                     if endpoint in summary and summary[endpoint]["p95"] > base_p95 * degradation_factor), None)
+        trail = " -> ".join(f"{summary[endpoint]['p95']:.0f}" for _, summary in stages if endpoint in summary)
+        status = f"⚠️ degrades at {knee} users" if knee else "✅ stable"
+        log(f"{endpoint:<34} p95 ms: {trail}  {status}")
+    return stages
@@ -0,0 +1,3178 @@
+#!/usr/bin/env python3
+"""
+Fresh Fold Local Stand-in Backend
+In-process replica of app/api/[[...path]]/route.js backed by an in-memory
+Mongo substitute, so latency and throughput benchmarks run repeatably on a
+single machine without network access, MongoDB or Stripe.
+
+    python local_backend.py --port 3001
+    python backend_test.py --base-url http://127.0.0.1:3001/api
+"""
+
+import argparse
+import base64
+import bisect
+import copy
+import hashlib
+import hmac
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+# ===== DATA (mirrors route.js) =====
+PLANS = [
+    {"id": "starter", "name": "Starter", "price": 19.99, "badge": None, "maxWeightKg": 7, "pickupsPerMonth": 2,
+     "description": "Affordable, hassle-free laundry service for individuals who need reliable twice-monthly care.",
+     "features": ["Up to 15 lbs (~7kg) per pickup", "2 pickups/month", "Standard wash & dry", "Folding included", "Real-time QR tracking", "Secure QR access"]},
+    {"id": "family", "name": "Family", "price": 49.99, "badge": "Most Popular", "maxWeightKg": 18, "pickupsPerMonth": 4,
+     "description": "Our most popular plan. Weekly convenience with ironing included and premium garment care.",
+     "features": ["Up to 40 lbs (~18kg) per pickup", "Weekly pickups (4/month)", "Premium detergents", "Ironing & folding", "Real-time QR tracking", "Secure QR access", "Priority support", "Custom wash preferences"]},
+    {"id": "premium", "name": "Premium", "price": 89.99, "badge": "Ultimate", "maxWeightKg": -1, "pickupsPerMonth": 8,
+     "description": "Ultimate garment care with unlimited volume and priority handling.",
+     "features": ["Unlimited weight", "Twice-weekly pickups (8/month)", "Luxury detergents", "Full ironing service", "Delicate care", "Real-time QR tracking", "Secure QR access", "24/7 priority support", "Same-day service"]},
+]
+
+ADDONS = [
+    {"id": "ironing", "name": "Extra Ironing Service", "unit": "per bag", "price": 14.99},
+    {"id": "folding", "name": "Folding-Only Service", "unit": "per bag", "price": 7.99},
+    {"id": "softener", "name": "Fabric Softener", "unit": "per wash", "price": 2.99},
+    {"id": "hypoallergenic", "name": "Hypoallergenic Detergent", "unit": "per wash", "price": 4.99},
+    {"id": "stain", "name": "Heavy Stain Treatment", "unit": "per item", "price": 5.99},
+    {"id": "express", "name": "Express Same-Day Service", "unit": "per order", "price": 10.99},
+]
+
+SERVICE_SUBURBS = [
+    'Geelong', 'Geelong West', 'Newtown', 'Highton', 'Belmont', 'Grovedale', 'Waurn Ponds',
+    'Corio', 'Norlane', 'North Geelong', 'South Geelong', 'Drumcondra', 'Herne Hill',
+    'Manifold Heights', 'Breakwater', 'East Geelong', 'Thomson', 'Whittington',
+    'St Albans Park', 'Newcomb', 'Moolap', 'Leopold', 'Wallington', 'Ocean Grove',
+    'Barwon Heads', 'Torquay', 'Jan Juc', 'Bells Beach', 'Anglesea', 'Lorne',
+    'Point Lonsdale', 'Queenscliff', 'Portarlington', 'Drysdale', 'Clifton Springs',
+    'Indented Head', 'St Leonards', 'Lara', 'Little River', 'Anakie', 'Lovely Banks',
+    'Batesford', 'Fyansford', 'Stonehaven', 'Armstrong Creek', 'Mount Duneed',
+    'Charlemont', 'Marshall', 'Connewarre', 'Freshwater Creek',
+]
+
+TRACKING_STATUSES = [
+    'Order Placed', 'Picked Up', 'Facility Intake', 'Washing', 'Drying', 'Ironing', 'Quality Check', 'Out for Delivery', 'Delivered',
+]
+
+PICKUP_SLOTS = ['8:00 AM - 10:00 AM', '10:00 AM - 12:00 PM', '12:00 PM - 2:00 PM', '2:00 PM - 4:00 PM', '4:00 PM - 6:00 PM']
+
+ONE_OFF_RATE_PER_KG = 5.99
+GST_RATE = 0.10
+BULK_STATUS_MAX = 500
+CALENDAR_MAX_DAYS = 31
+CALENDAR_MAX_SUBURBS = 20
+ISO_DATE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+ADMIN_SECRET = 'freshfold-admin-2025'
+
+# 1x1 transparent PNG standing in for the qrcode package's 300px render
+PLACEHOLDER_QR = 'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII='
+QR_CACHE_MAX = 1000
+
+
+def suburb_key(suburb):
+    """Case- and whitespace-insensitive key for suburb equality lookups, like suburbKey() in route.js"""
+    return str(suburb or '').strip().lower()
+
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+def hash_pw(pw):
+    return hashlib.sha256(pw.encode()).hexdigest()
+
+
+def money(value):
+    return round(value + 1e-9, 2)
+
+
+# ===== SERVER TIMING (mirrors route.js) =====
+METRIC_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+METRICS_MAX_ENDPOINTS = 200
+
+_timing = threading.local()
+
+
+class RequestTiming:
+    """Per-request phase totals; the thread-local stand-in for route.js's AsyncLocalStorage context"""
+
+    def __init__(self):
+        self.start = self.mark = time.perf_counter()
+        self.phases = {}
+        self.user = None
+
+    def add(self, name, ms):
+        entry = self.phases.setdefault(name, [0.0, 0])
+        entry[0] += ms
+        entry[1] += 1
+
+    def header(self, total_ms):
+        entries = [f"{name};dur={dur:.2f}" + (f';desc="{count} calls"' if count > 1 else '')
+                   for name, (dur, count) in self.phases.items()]
+        return ', '.join(entries + [f"total;dur={total_ms:.2f}"])
+
+
+def add_timing(name, ms):
+    timing = getattr(_timing, 'current', None)
+    if timing:
+        timing.add(name, ms)
+
+
+def lap(name):
+    """Charge the time since the previous mark (or the request start) to `name`"""
+    timing = getattr(_timing, 'current', None)
+    if timing:
+        now = time.perf_counter()
+        timing.add(name, (now - timing.mark) * 1000)
+        timing.mark = now
+
+
+@contextmanager
+def phase(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        now = time.perf_counter()
+        add_timing(name, (now - start) * 1000)
+        timing = getattr(_timing, 'current', None)
+        if timing:
+            timing.mark = now
+
+
+def timed_db(method):
+    """Charge a collection call, round trip included, to `db.<collection>`"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            add_timing(f"db.{self.name}", (time.perf_counter() - start) * 1000)
+    return wrapper
+
+
+def process_memory():
+    """Resident set size in bytes, like process.memoryUsage().rss in route.js (None without /proc)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return {"rss": int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')}
+    except (OSError, ValueError, IndexError):
+        return {"rss": None}
+
+
+def endpoint_key(method, parts):
+    # Route ids (uuids, tracking ids, session ids) all contain digits; route words never do
+    return f"{method} /api/" + '/'.join('{id}' if re.search(r'\d', s) else s for s in parts)
+
+
+class MetricsRegistry:
+    """Per-endpoint, per-phase latency histograms served by GET /api/metrics"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.endpoints = {}
+        self.since = now_iso()
+
+    def _observe(self, histograms, name, ms):
+        h = histograms.setdefault(name, {"count": 0, "sumMs": 0.0, "maxMs": 0.0, "buckets": [0] * (len(METRIC_BUCKETS_MS) + 1)})
+        h['count'] += 1
+        h['sumMs'] += ms
+        h['maxMs'] = max(h['maxMs'], ms)
+        h['buckets'][bisect.bisect_left(METRIC_BUCKETS_MS, ms)] += 1
+
+    def record(self, key, timing, total_ms):
+        with self.lock:
+            if key not in self.endpoints and len(self.endpoints) >= METRICS_MAX_ENDPOINTS:
+                return
+            histograms = self.endpoints.setdefault(key, {})
+            for name, (dur, _) in timing.phases.items():
+                self._observe(histograms, name, dur)
+            self._observe(histograms, 'total', total_ms)
+
+    def snapshot(self, reset=False):
+        with self.lock:
+            data = {"since": self.since, "bucketsMs": METRIC_BUCKETS_MS, "endpoints": copy.deepcopy(self.endpoints)}
+            if reset:
+                self.reset()
+            return data
+
+
+# ===== IN-MEMORY MONGO SUBSTITUTE =====
+
+def _get_path(doc, path):
+    for part in path.split('.'):
+        if not isinstance(doc, dict) or part not in doc:
+            return None
+        doc = doc[part]
+    return doc
+
+
+def _match_value(value, cond):
+    if isinstance(cond, dict) and cond and all(k.startswith('$') for k in cond):
+        for op, arg in cond.items():
+            if op == '$in':
+                if isinstance(value, list):
+                    if not any(v in arg for v in value):
+                        return False
+                elif value not in arg:
+                    return False
+            elif op == '$nin':
+                if value in arg:
+                    return False
+            elif op == '$ne':
+                if value == arg or (isinstance(value, list) and arg in value):
+                    return False
+            elif op == '$exists':
+                if (value is not None) != bool(arg):
+                    return False
+            elif op == '$regex':
+                pattern = arg if hasattr(arg, 'search') else re.compile(arg, re.I if 'i' in cond.get('$options', '') else 0)
+                values = value if isinstance(value, list) else [value]
+                if not any(isinstance(v, str) and pattern.search(v) for v in values):
+                    return False
+            elif op == '$options':
+                continue
+            elif op in ('$gt', '$gte', '$lt', '$lte'):
+                if value is None:
+                    return False
+                if op == '$gt' and not value > arg:
+                    return False
+                if op == '$gte' and not value >= arg:
+                    return False
+                if op == '$lt' and not value < arg:
+                    return False
+                if op == '$lte' and not value <= arg:
+                    return False
+            else:
+                raise ValueError(f"Unsupported query operator {op}")
+        return True
+    if hasattr(cond, 'search'):
+        values = value if isinstance(value, list) else [value]
+        return any(isinstance(v, str) and cond.search(v) for v in values)
+    if isinstance(value, list) and not isinstance(cond, list):
+        return cond in value
+    return value == cond
+
+
+def matches(doc, query):
+    for key, cond in (query or {}).items():
+        if key == '$or':
+            if not any(matches(doc, sub) for sub in cond):
+                return False
+        elif key == '$and':
+            if not all(matches(doc, sub) for sub in cond):
+                return False
+        elif not _match_value(_get_path(doc, key), cond):
+            return False
+    return True
+
+
+def _set_path(doc, path, value):
+    parts = path.split('.')
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def apply_update(doc, update):
+    for op, fields in update.items():
+        for path, value in fields.items():
+            if op == '$set':
+                _set_path(doc, path, copy.deepcopy(value))
+            elif op == '$inc':
+                _set_path(doc, path, (_get_path(doc, path) or 0) + value)
+            elif op == '$push':
+                current = _get_path(doc, path)
+                if current is None:
+                    current = []
+                    _set_path(doc, path, current)
+                current.append(copy.deepcopy(value))
+            elif op == '$unset':
+                parts = path.split('.')
+                parent = _get_path(doc, '.'.join(parts[:-1])) if len(parts) > 1 else doc
+                if isinstance(parent, dict):
+                    parent.pop(parts[-1], None)
+            else:
+                raise ValueError(f"Unsupported update operator {op}")
+
+
+class DuplicateKeyError(Exception):
+    """Raised on a unique index violation, like pymongo.errors.DuplicateKeyError"""
+
+
+def _sort_value(value):
+    return (0, '') if value is None else (1, value)
+
+
+def _hashable(value):
+    return value if isinstance(value, (str, int, float, bool, type(None))) else repr(value)
+
+
+class MemoryIndex:
+    """
+    Compound index: equality fields select a bucket, order fields keep the
+    bucket sorted, like a Mongo {eq: 1, ..., order: -1} index. Array values
+    in a single equality field are indexed per element (multikey).
+    """
+
+    def __init__(self, eq_fields, order_fields=(), unique=False, expire_after_seconds=None):
+        self.eq_fields = tuple(eq_fields)
+        self.order_fields = tuple(order_fields)
+        self.unique = unique
+        self.expire_after_seconds = expire_after_seconds
+        self.buckets = {}
+
+    def entries(self, doc):
+        keys = [()]
+        for field in self.eq_fields:
+            value = _get_path(doc, field)
+            values = value if isinstance(value, list) and value else [value]
+            keys = [key + (_hashable(v),) for key in keys for v in values]
+        order = tuple(_sort_value(_get_path(doc, f)) for f in self.order_fields)
+        return [(key, order) for key in keys]
+
+    def add(self, seq, entries):
+        if self.unique:
+            for key, _ in entries:
+                if self.buckets.get(key) and key != (None,) * len(self.eq_fields):
+                    raise DuplicateKeyError(f"duplicate key {dict(zip(self.eq_fields, key))}")
+        for key, order in entries:
+            bisect.insort(self.buckets.setdefault(key, []), (order, seq))
+
+    def remove(self, seq, entries):
+        for key, order in entries:
+            bucket = self.buckets.get(key)
+            if not bucket:
+                continue
+            i = bisect.bisect_left(bucket, (order, seq))
+            if i < len(bucket) and bucket[i] == (order, seq):
+                del bucket[i]
+            if not bucket:
+                del self.buckets[key]
+
+    def scan(self, key, descending=False, after=None):
+        """Sequence numbers in index order, optionally strictly past an `after` order tuple"""
+        bucket = self.buckets.get(key, [])
+        prefix = (lambda entry: entry[0][:len(after)]) if after is not None else None
+        if descending:
+            end = bisect.bisect_left(bucket, after, key=prefix) if after is not None else len(bucket)
+            return (bucket[i][1] for i in range(end - 1, -1, -1))
+        start = bisect.bisect_right(bucket, after, key=prefix) if after is not None else 0
+        return (bucket[i][1] for i in range(start, len(bucket)))
+
+
+def _equalities(query):
+    """Top-level plain equality conditions an index can use"""
+    eq = {}
+    for key, cond in (query or {}).items():
+        if key == '$and':
+            for sub in cond:
+                eq.update(_equalities(sub))
+        elif not key.startswith('$') and not isinstance(cond, (dict, list)) and not hasattr(cond, 'search'):
+            eq[key] = cond
+    return eq
+
+
+class MemoryCollection:
+    """Subset of the pymongo Collection API used by the stand-in handlers"""
+
+    def __init__(self, name, db):
+        self.name = name
+        self.db = db
+        self.lock = db.lock
+        self.docs = {}
+        self.indexes = []
+        self._next_seq = 0
+
+    def _round_trip(self):
+        """Simulated network round trip on a pooled connection, taken outside the lock like a real driver call"""
+        connector = self.db.connector
+        if connector is None:
+            if self.db.latency:
+                time.sleep(self.db.latency)
+            return
+        with connector.get_db().checkout():
+            if self.db.latency:
+                time.sleep(self.db.latency)
+
+    def create_index(self, eq_fields, order_fields=(), unique=False, expire_after_seconds=None):
+        with self.lock:
+            if any(ix.eq_fields == tuple(eq_fields) and ix.order_fields == tuple(order_fields) for ix in self.indexes):
+                return
+            index = MemoryIndex(eq_fields, order_fields, unique, expire_after_seconds)
+            for seq, doc in self.docs.items():
+                index.add(seq, index.entries(doc))
+            self.indexes.append(index)
+
+    def drop_indexes(self):
+        with self.lock:
+            self.indexes = []
+
+    def _plan(self, query, sort=None):
+        """Pick the index with the most usable equality fields; prefer one that also yields the sort order"""
+        eq = _equalities(query)
+        sort_fields = tuple(f for f, _ in sort or [])
+        directions = {d for _, d in sort or []}
+        best, best_score = None, 0
+        for index in self.indexes:
+            if not set(index.eq_fields) <= eq.keys():
+                continue
+            ordered = bool(sort_fields) and index.order_fields[:len(sort_fields)] == sort_fields and len(directions) == 1
+            score = len(index.eq_fields) * 2 + (1 if ordered else 0)
+            if score > best_score:
+                best, best_score = (index, ordered), score
+        if not best:
+            return None
+        index, ordered = best
+        key = tuple(_hashable(eq[f]) for f in index.eq_fields)
+        return index, key, ordered
+
+    def _in_plan(self, query):
+        """Single-field index serving a top-level {field: {'$in': [...]}} as a union of point lookups"""
+        for field, cond in (query or {}).items():
+            if isinstance(cond, dict) and list(cond) == ['$in']:
+                index = next((ix for ix in self.indexes if ix.eq_fields == (field,)), None)
+                if index:
+                    return index, cond['$in']
+        return None
+
+    def _candidates(self, query, sort=None, after=None):
+        """Matching documents, in sort order when a sort is given"""
+        plan = self._plan(query, sort)
+        if plan and plan[2]:
+            index, key, _ = plan
+            for seq in index.scan(key, descending=sort[0][1] < 0, after=after):
+                doc = self.docs[seq]
+                if matches(doc, query):
+                    yield doc
+            return
+        in_plan = None if plan else self._in_plan(query)
+        if plan:
+            source = (self.docs[seq] for seq in plan[0].scan(plan[1]))
+        elif in_plan:
+            index, values = in_plan
+            source = (self.docs[seq] for seq in dict.fromkeys(seq for v in values for seq in index.scan((_hashable(v),))))
+        else:
+            source = self.docs.values()
+        found = [doc for doc in source if matches(doc, query)]
+        for field, direction in reversed(sort or []):
+            found.sort(key=lambda d: _sort_value(_get_path(d, field)), reverse=direction < 0)
+        if after is not None and sort:
+            descending = sort[0][1] < 0
+            found = [d for d in found if self._past(d, sort, after, descending)]
+        yield from found
+
+    @staticmethod
+    def _past(doc, sort, after, descending):
+        key = tuple(_sort_value(_get_path(doc, f)) for f, _ in sort)
+        return key < after if descending else key > after
+
+    @timed_db
+    def find(self, query=None, sort=None, limit=None, after=None, exclude=()):
+        """`after` is the sort-key tuple of the last row of the previous page (keyset pagination)"""
+        self._round_trip()
+        with self.lock:
+            found = []
+            for doc in self._candidates(query, sort, after):
+                found.append({k: v for k, v in doc.items() if k not in exclude} if exclude else doc)
+                if limit and len(found) >= limit:
+                    break
+            return copy.deepcopy(found)
+
+    @timed_db
+    def find_one(self, query=None):
+        self._round_trip()
+        with self.lock:
+            doc = next(self._candidates(query), None)
+            return copy.deepcopy(doc) if doc is not None else None
+
+    @timed_db
+    def count_documents(self, query=None):
+        self._round_trip()
+        with self.lock:
+            if not query:
+                return len(self.docs)
+            return sum(1 for _ in self._candidates(query))
+
+    def _insert(self, doc):
+        seq = self._next_seq
+        added = []
+        try:
+            for index in self.indexes:
+                entries = index.entries(doc)
+                index.add(seq, entries)
+                added.append((index, entries))
+        except DuplicateKeyError:
+            for index, entries in added:
+                index.remove(seq, entries)
+            raise
+        self.docs[seq] = doc
+        self._next_seq += 1
+
+    @timed_db
+    def insert_one(self, doc):
+        self._round_trip()
+        with self.lock:
+            self._insert(copy.deepcopy(doc))
+
+    @timed_db
+    def insert_many(self, docs):
+        self._round_trip()
+        with self.lock:
+            for doc in copy.deepcopy(list(docs)):
+                self._insert(doc)
+
+    def _update(self, seq, doc, update):
+        before = [(index, index.entries(doc)) for index in self.indexes]
+        apply_update(doc, update)
+        for index, entries in before:
+            after = index.entries(doc)
+            if after != entries:
+                index.remove(seq, entries)
+                index.add(seq, after)
+
+    def _matching_seqs(self, query):
+        plan = self._plan(query)
+        source = plan[0].scan(plan[1]) if plan else list(self.docs)
+        return [seq for seq in list(source) if matches(self.docs[seq], query)]
+
+    def _upsert(self, query, update):
+        doc = {k: v for k, v in query.items() if not k.startswith('$') and not isinstance(v, dict)}
+        apply_update(doc, update)
+        self._insert(doc)
+        return doc
+
+    @timed_db
+    def update_one(self, query, update, upsert=False):
+        self._round_trip()
+        with self.lock:
+            seqs = self._matching_seqs(query)[:1]
+            if not seqs:
+                if not upsert:
+                    return 0
+                self._upsert(query, update)
+                return 1
+            self._update(seqs[0], self.docs[seqs[0]], update)
+            return 1
+
+    @timed_db
+    def find_one_and_update(self, query, update, upsert=False):
+        """Atomic update_one returning the document after the update, or None when nothing matched"""
+        self._round_trip()
+        with self.lock:
+            seqs = self._matching_seqs(query)[:1]
+            if seqs:
+                self._update(seqs[0], self.docs[seqs[0]], update)
+                return copy.deepcopy(self.docs[seqs[0]])
+            return copy.deepcopy(self._upsert(query, update)) if upsert else None
+
+    @timed_db
+    def update_many(self, query, update):
+        self._round_trip()
+        with self.lock:
+            seqs = self._matching_seqs(query)
+            for seq in seqs:
+                self._update(seq, self.docs[seq], update)
+            return len(seqs)
+
+    @timed_db
+    def bulk_write(self, operations):
+        """Unordered [(query, update), ...] update_one batch in one round trip; returns {op index: error}"""
+        self._round_trip()
+        errors = {}
+        with self.lock:
+            for i, (query, update) in enumerate(operations):
+                try:
+                    seqs = self._matching_seqs(query)[:1]
+                    if seqs:
+                        self._update(seqs[0], self.docs[seqs[0]], update)
+                except (ValueError, DuplicateKeyError) as e:
+                    errors[i] = str(e)
+        return errors
+
+    @timed_db
+    def delete_many(self, query):
+        self._round_trip()
+        return self._delete(query)
+
+    def _delete(self, query):
+        with self.lock:
+            seqs = self._matching_seqs(query)
+            for seq in seqs:
+                doc = self.docs.pop(seq)
+                for index in self.indexes:
+                    index.remove(seq, index.entries(doc))
+            return len(seqs)
+
+    def expire(self):
+        """
+        One TTL monitor pass: drop documents whose TTL-indexed date is
+        expire_after_seconds old. Documents without the field never expire.
+        Runs inside the server, so there is no round trip
+        """
+        removed = 0
+        for index in [ix for ix in self.indexes if ix.expire_after_seconds is not None]:
+            removed += self._delete({index.order_fields[0]: {"$lte": iso_in(-index.expire_after_seconds * 1000)}})
+        return removed
+
+    @timed_db
+    def scan(self, query=None):
+        """Snapshot of matching documents without copying, for aggregations"""
+        self._round_trip()
+        with self.lock:
+            return list(self._candidates(query))
+
+
+class MemoryDB:
+    def __init__(self, latency_ms=0.0):
+        self.lock = threading.RLock()
+        self.latency = latency_ms / 1000.0
+        self.collections = {}
+        self.connector = None
+
+    def collection(self, name):
+        with self.lock:
+            if name not in self.collections:
+                self.collections[name] = MemoryCollection(name, self)
+            return self.collections[name]
+
+    __getitem__ = collection
+
+
+# (collection, equality fields, order fields[, options]) mirroring INDEXES in route.js
+INDEXES = [
+    # listings
+    ('orders', ('userId',), ('createdAt', 'id')),
+    ('orders', (), ('createdAt', 'id')),
+    ('orders', ('status',), ('createdAt', 'id')),
+    ('complaints', ('userId',), ('createdAt', 'id')),
+    ('complaints', (), ('createdAt', 'id')),
+    ('complaints', ('status',), ('createdAt', 'id')),
+    # point lookups
+    ('orders', ('id',), (), {"unique": True}),
+    ('orders', ('trackingId',), (), {"unique": True}),
+    ('complaints', ('id',), (), {"unique": True}),
+    ('users', ('id',), (), {"unique": True}),
+    ('users', ('email',), (), {"unique": True}),
+    ('drivers', ('id',), (), {"unique": True}),
+    ('promo_codes', ('code',), ()),
+    ('subscriptions', ('userId',), ()),
+    ('payment_transactions', ('sessionId',), ()),
+    # capacity checks and driver auto-assign
+    ('orders', ('pickupDate', 'suburbKey', 'pickupTimeSlot'), ()),
+    ('orders', ('pickupDate', 'suburbKey'), ()),
+    ('orders', ('suburbKey',), ('pickupDate', 'pickupTimeSlot')),
+    ('capacity_settings', ('suburbKey',), ()),
+    ('drivers', ('zoneKeys', 'status'), ()),
+    ('driver_slots', ('driverId', 'pickupDate', 'pickupTimeSlot'), (), {"unique": True}),
+    # sessions and the notification outbox
+    ('sessions', ('token',), (), {"unique": True}),
+    ('sessions', (), ('expiresAt',), {"expire_after_seconds": 0}),
+    ('notifications', ('status',), ('nextAttemptAt',)),
+    ('notifications', ('claimId',), ()),
+    ('notifications', (), ('createdAt', 'id')),
+    # retention: delivered or abandoned rows carry expireAt
+    ('notifications', (), ('expireAt',), {"expire_after_seconds": 0}),
+    ('webhook_logs', ('eventId',), (), {"unique": True}),
+    ('webhook_logs', ('status',), ('receivedAt',)),
+    ('webhook_logs', (), ('expireAt',), {"expire_after_seconds": 0}),
+]
+
+
+def ensure_indexes(db):
+    for name, eq_fields, order_fields, *options in INDEXES:
+        db[name].create_index(eq_fields, order_fields, **(options[0] if options else {}))
+    return {"created": len(INDEXES), "failed": []}
+
+
+def migrate_suburb_keys(db):
+    """Backfill suburbKey / zoneKeys on documents written before the keys existed"""
+    counts = {}
+    for name, source, target in (('orders', 'suburb', 'suburbKey'), ('capacity_settings', 'suburb', 'suburbKey'),
+                                  ('drivers', 'assignedZones', 'zoneKeys')):
+        counts[name] = 0
+        for doc in db[name].find({target: {"$exists": False}}):
+            value = doc.get(source)
+            key = [suburb_key(v) for v in value or []] if target == 'zoneKeys' else suburb_key(value)
+            counts[name] += db[name].update_one({"id": doc['id']} if doc.get('id') else {source: value, target: {"$exists": False}},
+                                                {"$set": {target: key}})
+    return counts
+
+
+def migrate_driver_slots(db):
+    """Per-driver pickup counters for each date/slot, rebuilt from assigned orders"""
+    db['driver_slots'].create_index(('driverId', 'pickupDate', 'pickupTimeSlot'), unique=True)
+    counts = {}
+    for o in db['orders'].scan({"driverId": {"$ne": None}}):
+        cell = (o['driverId'], o.get('pickupDate'), o.get('pickupTimeSlot'))
+        counts[cell] = counts.get(cell, 0) + 1
+    for (driver_id, pickup_date, slot), count in counts.items():
+        db['driver_slots'].update_one({"driverId": driver_id, "pickupDate": pickup_date, "pickupTimeSlot": slot},
+                                      {"$set": {"count": count}}, upsert=True)
+    return {"driver_slots": db['driver_slots'].count_documents()}
+
+
+def migrate_legacy_notifications(db):
+    """
+    Rows queued before the outbox have no nextAttemptAt and are never claimed; close them out as logged,
+    with an expireAt, since databases that already ran 2026-retention-expiry skip its backfill
+    """
+    return {"notifications": db['notifications'].update_many({"status": 'queued', "nextAttemptAt": {"$exists": False}},
+                                                             {"$set": {"status": 'logged', "expireAt": iso_in(NOTIFY_RETENTION_MS)}})}
+
+
+def migrate_retention_expiry(db):
+    """Rows finished before retention existed expire one retention period from now"""
+    return {
+        "notifications": db['notifications'].update_many({"status": {"$in": NOTIFY_FINAL_STATUSES}, "expireAt": {"$exists": False}},
+                                                         {"$set": {"expireAt": iso_in(NOTIFY_RETENTION_MS)}}),
+        "webhook_logs": db['webhook_logs'].update_many({"status": {"$in": ['processed', 'failed']}, "expireAt": {"$exists": False}},
+                                                       {"$set": {"expireAt": iso_in(WEBHOOK_LOG_RETENTION_MS)}}),
+    }
+
+
+def migrate_admin_stats_projection(db):
+    """Build the admin stats projection from existing orders before any delta lands on it"""
+    return {"totalOrders": rebuild_admin_stats(db)['totalOrders']}
+
+
+MIGRATIONS = [('2025-suburb-keys', migrate_suburb_keys), ('2026-driver-slots', migrate_driver_slots),
+              ('2026-admin-stats-projection', migrate_admin_stats_projection), ('2026-legacy-notifications', migrate_legacy_notifications),
+              ('2026-retention-expiry', migrate_retention_expiry)]
+
+
+def run_migrations(db, force=False):
+    applied = {}
+    for migration_id, run in MIGRATIONS:
+        if not force and db['migrations'].find_one({"id": migration_id}):
+            continue
+        applied[migration_id] = run(db)
+        db['migrations'].update_one({"id": migration_id}, {"$set": {"id": migration_id, "appliedAt": now_iso(),
+                                                                    "result": applied[migration_id]}}, upsert=True)
+    return applied
+
+
+# ===== DATABASE CONNECTION (mirrors getDb in route.js) =====
+MONGO_MAX_POOL_SIZE = 100
+MONGO_MIN_POOL_SIZE = 5
+# The driver's maxConnecting default: callers beyond it wait for a returned connection
+MONGO_MAX_CONNECTING = 2
+
+
+class ConnectionPool:
+    """
+    One client's connection pool: a call checks out an idle connection, or
+    opens one (a handshake) while below max_size and fewer than
+    MONGO_MAX_CONNECTING are being opened; otherwise it waits
+    """
+
+    def __init__(self, connector, max_size=MONGO_MAX_POOL_SIZE, min_size=MONGO_MIN_POOL_SIZE, handshake_ms=0.0):
+        self.connector = connector
+        self.max_size = max_size
+        self.min_size = min_size
+        self.handshake = handshake_ms / 1000.0
+        self.cond = threading.Condition()
+        self.open = 0
+        self.idle = 0
+        self.connecting = 0
+
+    def _handshake(self):
+        if self.handshake:
+            time.sleep(self.handshake)
+        self.connector.count('connectionsCreated')
+
+    @contextmanager
+    def checkout(self):
+        with self.cond:
+            while not self.idle and (self.open >= self.max_size or self.connecting >= MONGO_MAX_CONNECTING):
+                self.cond.wait()
+            fresh = not self.idle
+            if fresh:
+                self.open += 1
+                self.connecting += 1
+            else:
+                self.idle -= 1
+        if fresh:
+            try:
+                self._handshake()
+            finally:
+                with self.cond:
+                    self.connecting -= 1
+                    self.cond.notify_all()
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.idle += 1
+                self.cond.notify()
+
+    def fill(self):
+        """Open connections up to min_size in parallel, as the driver's pool maintenance does after connect"""
+        with self.cond:
+            missing = max(min(self.min_size, self.max_size) - self.open, 0)
+            self.open += missing
+        threads = [threading.Thread(target=self._handshake, daemon=True) for _ in range(missing)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        with self.cond:
+            self.idle += missing
+            self.cond.notify_all()
+
+    def close(self):
+        with self.cond:
+            closed, self.open, self.idle = self.open, 0, 0
+        return closed
+
+
+class DbConnector:
+    """
+    getDb(): one client per process, connected on first use. With
+    single_flight, callers arriving while the connect is in flight wait for
+    it; without, every caller that finds no client connects its own (the
+    stampede route.js had before) and all but the last one leak.
+    connect_ms covers server selection, auth and the migration / index check
+    """
+
+    def __init__(self, connect_ms=0.0, handshake_ms=0.0, max_pool_size=MONGO_MAX_POOL_SIZE,
+                 min_pool_size=MONGO_MIN_POOL_SIZE, single_flight=True):
+        self.lock = threading.Lock()
+        self.connect_ms = connect_ms
+        self.handshake_ms = handshake_ms
+        self.max_pool_size = max_pool_size
+        self.min_pool_size = min_pool_size
+        self.single_flight = single_flight
+        self.clients = []
+        self.reset()
+
+    def reset(self):
+        self.client = None
+        self.pending = None
+        self.stats = {"connects": 0, "connectMs": None, "connectionsCreated": 0, "connectionsClosed": 0, "warmedUp": False}
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def _connect(self):
+        start = time.perf_counter()
+        self.count('connects')
+        if self.connect_ms:
+            time.sleep(self.connect_ms / 1000.0)
+        client = ConnectionPool(self, self.max_pool_size, self.min_pool_size, self.handshake_ms)
+        with self.lock:
+            self.clients.append(client)
+            self.stats['connectMs'] = (time.perf_counter() - start) * 1000
+        threading.Thread(target=client.fill, daemon=True).start()
+        return client
+
+    def get_db(self):
+        client = self.client
+        if client is not None:
+            return client
+        with phase('db.connect'):
+            if not self.single_flight:
+                self.client = self._connect()
+                return self.client
+            with self.lock:
+                pending, owner = self.pending, self.pending is None
+                if owner:
+                    pending = self.pending = Future()
+            if owner:
+                try:
+                    self.client = self._connect()
+                    pending.set_result(self.client)
+                except Exception as e:
+                    with self.lock:
+                        self.pending = None
+                    pending.set_exception(e)
+            return pending.result()
+
+    def warm_up(self):
+        self.get_db().fill()
+        with self.lock:
+            self.stats['warmedUp'] = True
+
+    def restart(self):
+        """A new process: every client is closed and the next call connects again"""
+        with self.lock:
+            clients, self.clients = self.clients, []
+        for client in clients:
+            client.close()
+        with self.lock:
+            self.reset()
+
+    def snapshot(self):
+        with self.lock:
+            return {**self.stats, "maxPoolSize": self.max_pool_size, "minPoolSize": self.min_pool_size,
+                    "singleFlight": self.single_flight}
+
+
+# ===== SEED DATA =====
+
+def seed_database(db):
+    """Known starting state: an admin, a customer, drivers, promo codes and capacity settings"""
+    created = now_iso()
+    users = [
+        {"name": "Local Admin", "email": "admin@freshfold.local", "role": "admin", "phone": "+61400000001", "suburb": "Geelong"},
+        {"name": "Local Customer", "email": "customer@freshfold.local", "role": "customer", "phone": "+61400000002", "suburb": "Belmont"},
+    ]
+    for u in users:
+        user_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, u["email"]))
+        db['users'].insert_one({
+            "id": user_id, "name": u["name"], "email": u["email"], "password": hash_pw("password123"),
+            "phone": u["phone"], "suburb": u["suburb"], "role": u["role"], "subscription": None,
+            "referralCode": 'REF-' + user_id[:8].upper(), "createdAt": created,
+        })
+    zones = [["Geelong", "Geelong West", "Newtown"], ["Belmont", "Highton", "Grovedale"], ["Torquay", "Jan Juc", "Anglesea"],
+             ["Ocean Grove", "Barwon Heads", "Drysdale"], ["Corio", "Norlane", "Lara"]]
+    for i, zone in enumerate(zones):
+        db['drivers'].insert_one({
+            "id": str(uuid.uuid5(uuid.NAMESPACE_DNS, f"driver-{i}")), "name": f"Driver {i + 1}", "phone": f"+6140000010{i}",
+            "vehicle": "Van", "assignedZones": zone, "zoneKeys": [suburb_key(z) for z in zone], "status": "active", "currentOrders": 0, "totalDeliveries": 0, "createdAt": created,
+        })
+    for code, kind, value, max_uses in [("WELCOME10", "percentage", 10, None), ("FLAT5", "fixed", 5, None), ("LIMITED50", "percentage", 50, 50)]:
+        db['promo_codes'].insert_one({
+            "id": str(uuid.uuid5(uuid.NAMESPACE_DNS, code)), "code": code, "type": kind, "value": value, "description": f"Seeded {code}",
+            "expiryDate": None, "maxUses": max_uses, "currentUses": 0, "active": True, "createdAt": created,
+        })
+    for suburb, max_per_slot in [("Geelong", 8), ("Belmont", 6), ("Torquay", 4)]:
+        db['capacity_settings'].insert_one({"suburb": suburb, "suburbKey": suburb_key(suburb), "maxPerSlot": max_per_slot, "active": True, "updatedAt": created})
+
+
+# ===== HTTP PLUMBING =====
+
+class Request:
+    def __init__(self, method, path, query, headers, body):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body or b'null')
+
+    def text(self):
+        return self.body.decode()
+
+    def header(self, name):
+        return self.headers.get(name)
+
+
+class Response:
+    def __init__(self, status=200, body=b'', headers=None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+
+class StreamResponse(Response):
+    """Response whose body is an iterator of byte chunks, sent with chunked transfer encoding"""
+
+
+def cors():
+    return {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+        'Access-Control-Allow-Headers': 'Content-Type,Authorization,If-None-Match,Last-Event-ID',
+        'Access-Control-Expose-Headers': 'ETag',
+        'Timing-Allow-Origin': '*',
+    }
+
+
+def json_response(data, status=200):
+    headers = cors()
+    headers['Content-Type'] = 'application/json'
+    return Response(status, json.dumps(data).encode(), headers)
+
+
+def public(doc):
+    if doc is None:
+        return None
+    return {k: v for k, v in doc.items() if k != '_id'}
+
+
+def without_password(user):
+    return {k: v for k, v in public(user).items() if k != 'password'}
+
+
+# ===== LISTING PAGINATION (mirrors route.js) =====
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+HEAVY_FIELDS = {
+    'orders': ('qrCode', 'statusHistory'),
+    'complaints': ('photos',),
+}
+PAGE_SORT = [("createdAt", -1), ("id", -1)]
+
+
+def encode_cursor(doc):
+    return base64.urlsafe_b64encode(f"{doc['createdAt']}|{doc['id']}".encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, _, doc_id = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode().partition('|')
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return (created_at, doc_id) if created_at and doc_id else None
+
+
+def page_params(request):
+    try:
+        limit = int(request.query.get('limit') or DEFAULT_PAGE_SIZE)
+    except ValueError:
+        limit = DEFAULT_PAGE_SIZE
+    include = [f for f in (request.query.get('include') or '').split(',') if f]
+    return {"limit": min(max(limit, 1), MAX_PAGE_SIZE), "cursor": request.query.get('cursor'), "include": include}
+
+
+def find_page(db, collection, query, limit, cursor=None, include=()):
+    """One keyset page sorted by (createdAt, id) descending; None for an invalid cursor"""
+    after = None
+    if cursor:
+        position = decode_cursor(cursor)
+        if not position:
+            return None
+        after = tuple((1, v) for v in position)
+    exclude = {'_id', *(f for f in HEAVY_FIELDS.get(collection, ()) if f not in include)}
+    docs = db[collection].find(query, sort=PAGE_SORT, limit=limit + 1, after=after, exclude=exclude)
+    items = docs[:limit]
+    return {"items": items, "nextCursor": encode_cursor(items[-1]) if len(docs) > limit else None}
+
+
+# ===== ADMIN STATS PROJECTION HELPERS (mirror route.js) =====
+ADMIN_STATS_ID = 'global'
+
+
+def stats_key(value):
+    return (str(value) if value not in (None, '') else 'Unknown').replace('.', '_').replace('$', '_')
+
+
+def payment_stats_delta(order):
+    inc = {"totalRevenue": order.get('total') or 0}
+    if order.get('type') == 'subscription':
+        inc["activeSubscriptions"] = 1
+    return inc
+
+
+def order_stats_delta(order):
+    total = order.get('total') or 0
+    month = stats_key((order.get('createdAt') or '')[:7])
+    plan = stats_key(order.get('planName'))
+    inc = {
+        "totalOrders": 1,
+        f"monthly.{month}.revenue": total, f"monthly.{month}.count": 1,
+        f"status.{stats_key(order.get('status'))}": 1,
+        f"plans.{plan}.count": 1, f"plans.{plan}.revenue": total,
+        f"suburbs.{stats_key(order.get('suburb'))}": 1,
+    }
+    if order.get('type') == 'one-off':
+        inc["oneOffOrders"] = 1
+    if order.get('type') == 'subscription':
+        inc["subOrders"] = 1
+    for a in order.get('addons') or []:
+        name = stats_key(a.get('name'))
+        inc[f"addons.{name}.count"] = inc.get(f"addons.{name}.count", 0) + (a.get('quantity') or 0)
+        inc[f"addons.{name}.revenue"] = inc.get(f"addons.{name}.revenue", 0) + (a.get('subtotal') or 0)
+    if order.get('paymentStatus') == 'paid':
+        inc.update(payment_stats_delta(order))
+    return inc
+
+
+def compute_admin_stats(db):
+    stats = {"id": ADMIN_STATS_ID, "totalOrders": 0, "oneOffOrders": 0, "subOrders": 0, "totalRevenue": 0,
+             "activeSubscriptions": 0, "monthly": {}, "status": {}, "plans": {}, "suburbs": {}, "addons": {}}
+    for order in db['orders'].scan():
+        for path, value in order_stats_delta(order).items():
+            _set_path(stats, path, (_get_path(stats, path) or 0) + value)
+    stats["rebuiltAt"] = stats["updatedAt"] = now_iso()
+    return stats
+
+
+def rebuild_admin_stats(db):
+    stats = compute_admin_stats(db)
+    db['admin_stats'].delete_many({"id": ADMIN_STATS_ID})
+    db['admin_stats'].insert_one(stats)
+    return stats
+
+
+def format_admin_stats(stats):
+    def entries(key):
+        return (stats.get(key) or {}).items()
+    return {
+        "totalOrders": stats.get('totalOrders') or 0,
+        "activeSubscriptions": stats.get('activeSubscriptions') or 0,
+        "oneOffOrders": stats.get('oneOffOrders') or 0,
+        "subOrders": stats.get('subOrders') or 0,
+        "totalRevenue": money(stats.get('totalRevenue') or 0),
+        "monthlyRevenue": sorted(({"_id": k, "revenue": money(m['revenue']), "count": m['count']} for k, m in entries('monthly') if m['count'] > 0),
+                                 key=lambda m: m['_id'])[:12],
+        "statusBreakdown": [{"_id": k, "count": c} for k, c in entries('status') if c > 0],
+        "planDistribution": [{"_id": k, "count": p['count'], "revenue": money(p['revenue'])} for k, p in entries('plans') if p['count'] > 0],
+        "suburbStats": sorted(({"_id": k, "count": c} for k, c in entries('suburbs') if c > 0), key=lambda x: -x['count'])[:10],
+        "addOnRevenue": sorted(({"_id": k, "count": a['count'], "revenue": money(a['revenue'])} for k, a in entries('addons') if a['count'] > 0),
+                               key=lambda x: -x['revenue']),
+        "statsUpdatedAt": stats.get('updatedAt'),
+    }
+
+
+# ===== BULK EXPORT (mirrors route.js) =====
+EXPORT_BATCH_SIZE = 500
+EXPORT_MAX_DAYS = 366
+EXPORT_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv; charset=utf-8'}
+EXPORT_COLUMNS = {
+    'orders': ['id', 'trackingId', 'createdAt', 'type', 'planName', 'status', 'paymentStatus', 'suburb', 'pickupDate', 'pickupTimeSlot',
+               'userId', 'guestEmail', 'driverName', 'items', 'weightKg', 'baseCost', 'addonsTotal', 'discount', 'promoCode', 'subtotal',
+               'gst', 'total'],
+    'invoices': ['invoiceNumber', 'date', 'customerName', 'customerEmail', 'suburb', 'trackingId', 'type', 'planName', 'pickupDate',
+                 'subtotal', 'gst', 'discount', 'promoCode', 'total', 'paymentStatus'],
+}
+EXPORT_SORT = [("createdAt", 1), ("id", 1)]
+FORMULA_PREFIX = re.compile(r'^[=+\-@\t\r]')
+
+
+def invoice_for(order, user):
+    user = user or {}
+    return {
+        "invoiceNumber": 'INV-' + order['trackingId'], "date": order['createdAt'],
+        "company": {"name": 'Fresh Fold Pty Ltd', "abn": '12 345 678 901', "address": 'Geelong, VIC 3220, Australia',
+                    "email": 'hello@freshfold.com.au', "phone": '1300 FRESH FOLD'},
+        "customer": {"name": user.get('name') or order.get('guestName') or 'Guest', "email": user.get('email') or order.get('guestEmail') or '',
+                     "phone": user.get('phone') or order.get('guestPhone') or '', "suburb": order['suburb']},
+        "order": {k: order.get(k) for k in ('trackingId', 'type', 'planName', 'pickupDate', 'pickupTimeSlot', 'items', 'weightKg')},
+        "lineItems": [{"description": order['planName'], "quantity": 1, "unitPrice": order['baseCost'], "total": order['baseCost']}]
+                     + [{"description": a['name'], "quantity": a['quantity'], "unitPrice": a['price'], "total": a['subtotal']} for a in order.get('addons') or []],
+        "subtotal": order['subtotal'], "gst": order['gst'], "discount": order.get('discount') or 0,
+        "promoCode": order.get('promoCode'), "total": order['total'], "paymentStatus": order['paymentStatus'],
+    }
+
+
+def invoice_row(invoice):
+    customer, order = invoice['customer'], invoice['order']
+    return {"invoiceNumber": invoice['invoiceNumber'], "date": invoice['date'], "customerName": customer['name'],
+            "customerEmail": customer['email'], "suburb": customer['suburb'], "trackingId": order['trackingId'], "type": order['type'],
+            "planName": order['planName'], "pickupDate": order['pickupDate'], "subtotal": invoice['subtotal'], "gst": invoice['gst'],
+            "discount": invoice['discount'], "promoCode": invoice['promoCode'], "total": invoice['total'], "paymentStatus": invoice['paymentStatus']}
+
+
+def csv_cell(value):
+    """One CSV field formatted like String(value) in JS; text a spreadsheet would run as a formula is kept as text"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        text = 'true' if value else 'false'
+    elif isinstance(value, float) and value.is_integer():
+        text = str(int(value))
+    else:
+        text = str(value)
+    if isinstance(value, str) and FORMULA_PREFIX.match(text):
+        text = "'" + text
+    return '"' + text.replace('"', '""') + '"' if any(c in text for c in '",\r\n') else text
+
+
+def export_range(start, end):
+    """{$gte, $lt} on createdAt for UTC days start..end, or None past EXPORT_MAX_DAYS or for bad dates"""
+    if not ISO_DATE.match(start or '') or not ISO_DATE.match(end or ''):
+        return None
+    try:
+        first = datetime.strptime(start, '%Y-%m-%d')
+        after_last = datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1)
+    except ValueError:
+        return None
+    if not 1 <= (after_last - first).days <= EXPORT_MAX_DAYS:
+        return None
+    return {"$gte": first.strftime('%Y-%m-%dT00:00:00.000Z'), "$lt": after_last.strftime('%Y-%m-%dT00:00:00.000Z')}
+
+
+# ===== QR CODES (mirror route.js) =====
+
+def qr_path(tracking_id):
+    return f"/api/tracking/{quote(tracking_id, safe='')}/qr"
+
+
+def render_qr(tracking_url, render_ms=0.0):
+    """PNG bytes for a tracking URL: a real QR when the qrcode package is installed, else the placeholder"""
+    if render_ms:
+        time.sleep(render_ms / 1000.0)
+    try:
+        import qrcode
+        from io import BytesIO
+    except ImportError:
+        return base64.b64decode(PLACEHOLDER_QR.split(',', 1)[1])
+    buffer = BytesIO()
+    qrcode.make(tracking_url, border=2).save(buffer)
+    return buffer.getvalue()
+
+
+class QrCache:
+    """
+    LRU of tracking ID -> (png, etag); concurrent misses for one ID share a
+    single render. A render returning None (unknown ID) is not cached.
+    """
+
+    def __init__(self, max_entries=QR_CACHE_MAX):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.renders = 0
+
+    def get(self, tracking_id, render):
+        with self.lock:
+            entry = self.entries.get(tracking_id)
+            if entry is None:
+                entry = self.entries[tracking_id] = {"ready": threading.Event(), "qr": None}
+                owner = True
+            else:
+                owner = False
+            self.entries.move_to_end(tracking_id)
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        if owner:
+            try:
+                png = render()
+                if png is not None:
+                    entry["qr"] = (png, '"' + base64.urlsafe_b64encode(hashlib.sha1(png).digest()).decode().rstrip('=') + '"')
+                    with self.lock:
+                        self.renders += 1
+            finally:
+                if entry["qr"] is None:
+                    with self.lock:
+                        self.entries.pop(tracking_id, None)
+                entry["ready"].set()
+        entry["ready"].wait()
+        return entry["qr"]
+
+
+# ===== TRACKING PUSH (mirrors route.js) =====
+TRACKING_HEARTBEAT_MS = 15000
+TRACKING_STREAM_MAX_MS = 5 * 60 * 1000
+TRACKING_LONG_POLL_MAX_S = 30
+FINAL_TRACKING_STATUS = TRACKING_STATUSES[-1]
+
+
+def tracking_view(order):
+    fields = ['trackingId', 'status', 'statusHistory', 'planName', 'suburb', 'pickupDate', 'pickupTimeSlot',
+              'items', 'itemsConfirmed', 'confirmedItems']
+    return {**{f: order.get(f) for f in fields}, "qrUrl": qr_path(order['trackingId']), "createdAt": order.get('createdAt')}
+
+
+def _base36(n):
+    digits = ''
+    while True:
+        n, r = divmod(n, 36)
+        digits = '0123456789abcdefghijklmnopqrstuvwxyz'[r] + digits
+        if not n:
+            return digits
+
+
+def tracking_etag(order):
+    """Every tracked change rewrites updatedAt, so (status, updatedAt) identifies a version"""
+    stamp = datetime.fromisoformat((order.get('updatedAt') or order['createdAt']).replace('Z', '+00:00'))
+    status = order.get('status')
+    index = TRACKING_STATUSES.index(status) + 1 if status in TRACKING_STATUSES else 0
+    return f'"{index}-{_base36(int(stamp.timestamp() * 1000))}"'
+
+
+def sse_event(event, data, event_id=None):
+    prefix = f"id: {event_id}\n" if event_id is not None else ''
+    return f"{prefix}event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+class TrackingHub:
+    """Fans status deltas out to the SSE and long-poll watchers of each order"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.watchers = {}
+
+    def watch(self, tracking_id):
+        listener = queue.SimpleQueue()
+        with self.lock:
+            self.watchers.setdefault(tracking_id, set()).add(listener)
+        return listener
+
+    def unwatch(self, tracking_id, listener):
+        with self.lock:
+            listeners = self.watchers.get(tracking_id)
+            if listeners:
+                listeners.discard(listener)
+                if not listeners:
+                    del self.watchers[tracking_id]
+
+    def count(self):
+        with self.lock:
+            return sum(len(listeners) for listeners in self.watchers.values())
+
+    def publish(self, order, entry=None):
+        with self.lock:
+            listeners = list(self.watchers.get(order['trackingId'], ()))
+        if not listeners:
+            return
+        delta = {"trackingId": order['trackingId'], "version": len(order.get('statusHistory') or []), "status": order.get('status'),
+                 "entry": entry, "itemsConfirmed": order.get('itemsConfirmed'), "confirmedItems": order.get('confirmedItems'),
+                 "updatedAt": order.get('updatedAt'), "etag": tracking_etag(order)}
+        for listener in listeners:
+            listener.put(delta)
+
+
+# ===== NOTIFICATION OUTBOX (mirrors route.js) =====
+NOTIFY_BATCH_SIZE = 50
+NOTIFY_MAX_ATTEMPTS = 5
+NOTIFY_BACKOFF_MS = 2000
+NOTIFY_LOCK_MS = 5 * 60 * 1000
+NOTIFY_RETENTION_MS = 30 * 24 * 60 * 60 * 1000
+NOTIFY_FINAL_STATUSES = ['sent', 'logged', 'failed']
+
+
+def iso_in(ms):
+    return (datetime.now(timezone.utc) + timedelta(milliseconds=ms)).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+class RateLimiter:
+    """Spaces calls at least 1/per_second apart across threads, like rateLimiter() in route.js"""
+
+    def __init__(self, per_second):
+        self.per_second = per_second
+        self.lock = threading.Lock()
+        self.next_at = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.time()
+            at = max(now, self.next_at)
+            self.next_at = at + 1.0 / self.per_second
+        if at > now:
+            time.sleep(at - now)
+
+
+class NotificationOutbox:
+    """
+    Queued notifications drained in batches by a background thread. Delivery
+    goes to stub providers whose latency and failure rate are configurable,
+    standing in for SendGrid/Twilio.
+    """
+
+    def __init__(self, db, worker=True, delay_ms=0.0, failure_rate=0.0, backoff_ms=NOTIFY_BACKOFF_MS,
+                 email_rate=50.0, sms_rate=10.0, batch_size=NOTIFY_BATCH_SIZE, retention_ms=NOTIFY_RETENTION_MS):
+        self.db = db
+        self.retention_ms = retention_ms
+        self.worker = worker
+        self.delay_ms = delay_ms
+        self.failure_rate = failure_rate
+        self.backoff_ms = backoff_ms
+        self.batch_size = batch_size
+        self.channels = [('email', RateLimiter(email_rate)), ('phone', RateLimiter(sms_rate))]
+        self.drain_lock = threading.Lock()
+        self.cond = threading.Condition()
+        self.wake_at = float('inf')
+        self.thread = None
+        self.pool = ThreadPoolExecutor(max_workers=batch_size, thread_name_prefix='freshfold-notify')
+
+    def configure(self, delay_ms=None, failure_rate=None, backoff_ms=None, email_rate=None, sms_rate=None, retention_ms=None):
+        if retention_ms is not None:
+            self.retention_ms = retention_ms
+        if delay_ms is not None:
+            self.delay_ms = delay_ms
+        if failure_rate is not None:
+            self.failure_rate = failure_rate
+        if backoff_ms is not None:
+            self.backoff_ms = backoff_ms
+        if email_rate is not None:
+            self.channels[0][1].per_second = email_rate
+        if sms_rate is not None:
+            self.channels[1][1].per_second = sms_rate
+
+    def _provider(self, field):
+        if not self.delay_ms and not self.failure_rate:
+            return None
+        return 'email-stub' if field == 'email' else 'sms-stub'
+
+    def _send(self, provider):
+        if self.delay_ms:
+            time.sleep(self.delay_ms / 1000.0)
+        if random.random() < self.failure_rate:
+            raise RuntimeError(f"{provider} unavailable")
+
+    def deliver(self, notification):
+        delivered = list(notification.get('delivered') or [])
+        for field, limiter in self.channels:
+            provider = notification.get(field) and self._provider(field)
+            if not provider or provider in delivered:
+                continue
+            try:
+                limiter.wait()
+                self._send(provider)
+                delivered.append(provider)
+            except RuntimeError as e:
+                return {"delivered": delivered, "error": str(e)}
+        return {"delivered": delivered}
+
+    def delivery_update(self, notification, result):
+        unlock = {"claimId": "", "lockedUntil": ""}
+        if not result.get('error'):
+            return {"$set": {"status": 'sent' if result['delivered'] else 'logged', "sentVia": '+'.join(result['delivered']) or None,
+                             "delivered": result['delivered'], "sentAt": now_iso(), "expireAt": iso_in(self.retention_ms)}, "$unset": unlock}
+        attempts = (notification.get('attempts') or 0) + 1
+        if attempts >= NOTIFY_MAX_ATTEMPTS:
+            return {"$set": {"status": 'failed', "attempts": attempts, "delivered": result['delivered'], "error": result['error'],
+                             "expireAt": iso_in(self.retention_ms)}, "$unset": unlock}
+        backoff = self.backoff_ms * 2 ** (attempts - 1) * (0.5 + random.random())
+        return {"$set": {"status": 'queued', "attempts": attempts, "delivered": result['delivered'], "error": result['error'],
+                         "nextAttemptAt": iso_in(backoff)}, "$unset": unlock}
+
+    def claim(self, limit):
+        now = now_iso()
+        due = {"$or": [{"status": 'queued', "nextAttemptAt": {"$lte": now}}, {"status": 'sending', "lockedUntil": {"$lte": now}}]}
+        candidates = self.db['notifications'].find(due, sort=[("nextAttemptAt", 1)], limit=limit)
+        if not candidates:
+            return []
+        claim_id = str(uuid.uuid4())
+        self.db['notifications'].update_many({"$and": [{"id": {"$in": [n['id'] for n in candidates]}}, due]},
+                                             {"$set": {"status": 'sending', "claimId": claim_id, "lockedUntil": iso_in(NOTIFY_LOCK_MS)}})
+        return self.db['notifications'].find({"claimId": claim_id})
+
+    def drain(self, max_batches=None):
+        with self.drain_lock:
+            totals = {"batches": 0, "sent": 0, "retried": 0, "failed": 0}
+            while max_batches is None or totals['batches'] < max_batches:
+                batch = self.claim(self.batch_size)
+                if not batch:
+                    break
+                totals['batches'] += 1
+                ops = []
+                for notification, result in zip(batch, self.pool.map(self.deliver, batch)):
+                    update = self.delivery_update(notification, result)
+                    status = update['$set']['status']
+                    totals['retried' if status == 'queued' else 'failed' if status == 'failed' else 'sent'] += 1
+                    ops.append(({"id": notification['id'], "claimId": notification['claimId']}, update))
+                self.db['notifications'].bulk_write(ops)
+            pending = self.db['notifications'].find({"status": 'queued', "nextAttemptAt": {"$exists": True}}, sort=[("nextAttemptAt", 1)], limit=1)
+            if pending:
+                due_at = datetime.fromisoformat(pending[0]['nextAttemptAt'].replace('Z', '+00:00')).timestamp()
+                self.schedule(max(0.0, due_at - time.time()))
+            return totals
+
+    def stats(self):
+        counts = {}
+        oldest = None
+        for n in self.db['notifications'].scan():
+            counts[n['status']] = counts.get(n['status'], 0) + 1
+            if n['status'] in ('queued', 'sending') and (oldest is None or n['createdAt'] < oldest):
+                oldest = n['createdAt']
+        age = (time.time() - datetime.fromisoformat(oldest.replace('Z', '+00:00')).timestamp()) * 1000 if oldest else 0
+        return {"counts": counts, "oldestPendingAgeMs": int(age)}
+
+    def schedule(self, delay):
+        if not self.worker:
+            return
+        with self.cond:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='freshfold-notify-worker', daemon=True)
+                self.thread.start()
+            self.wake_at = min(self.wake_at, time.time() + delay)
+            self.cond.notify()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while self.wake_at > time.time():
+                    self.cond.wait(None if self.wake_at == float('inf') else self.wake_at - time.time())
+                self.wake_at = float('inf')
+            try:
+                self.drain()
+            except Exception as e:
+                print(f"Notification drain failed: {e}")
+
+
+# ===== DRIVER ASSIGNMENT (mirrors route.js) =====
+DRIVER_INDEX_TTL_MS = 30_000
+# 0 leaves drivers uncapped: suburb capacity is the only per-slot limit
+DRIVER_SLOT_MAX = 0
+
+
+class DriverAssigner:
+    """
+    Per-process zone -> drivers index ranking candidates by pickups held in
+    the booking's date/slot, then currentOrders, like assignDriver in
+    route.js. With a slot_max, the driver_slots conditional upsert is what
+    enforces it; the index only orders the candidates. When every zone
+    driver is full, the least-loaded one is booked over the cap.
+    """
+
+    def __init__(self, db, ttl_ms=DRIVER_INDEX_TTL_MS, slot_max=DRIVER_SLOT_MAX):
+        self.db = db
+        self.ttl = ttl_ms / 1000.0
+        self.slot_max = slot_max
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()
+        self.index = None
+        self.version = 0
+
+    def _load(self):
+        by_zone, by_id = {}, {}
+        for d in self.db['drivers'].find({"status": "active"}):
+            entry = {"id": d['id'], "name": d['name'], "currentOrders": d.get('currentOrders') or 0, "active": True}
+            by_id[d['id']] = entry
+            for zone in d.get('zoneKeys') or []:
+                by_zone.setdefault(zone, []).append(entry)
+        # slot_load: (driverId, date, slot) -> pickups held, learned from reservations
+        return {"by_zone": by_zone, "by_id": by_id, "slot_load": {}, "expires": time.time() + self.ttl}
+
+    def get_index(self):
+        index = self.index
+        if index and index['expires'] > time.time():
+            return index
+        with self.load_lock:
+            if self.index and self.index['expires'] > time.time():
+                return self.index
+            version = self.version
+            index = self._load()
+            with self.lock:
+                if version == self.version:
+                    self.index = index
+            return index
+
+    def invalidate(self):
+        with self.lock:
+            self.version += 1
+            self.index = None
+
+    def _pick(self, index, zone, pickup_date, slot, skip, cap):
+        best, best_held = None, 0
+        for d in index['by_zone'].get(zone, []):
+            if not d['active'] or d['id'] in skip:
+                continue
+            held = index['slot_load'].get((d['id'], pickup_date, slot), 0)
+            if held >= cap:
+                continue
+            if not best or held < best_held or (held == best_held and d['currentOrders'] < best['currentOrders']):
+                best, best_held = d, held
+        if best:
+            # Count the pick locally before the writes so concurrent bookings spread out
+            cell = (best['id'], pickup_date, slot)
+            index['slot_load'][cell] = index['slot_load'].get(cell, 0) + 1
+            best['currentOrders'] += 1
+        return best
+
+    def assign(self, zone, pickup_date, slot):
+        """(driverId, driverName, overCap) or None when the zone has no active driver"""
+        index = self.get_index()
+        # Within the cap first; then, with every zone driver full, over it
+        for cap in (self.slot_max, float('inf')) if self.slot_max else (float('inf'),):
+            skip = set()
+            while True:
+                with self.lock:
+                    d = self._pick(index, zone, pickup_date, slot, skip, cap)
+                if not d:
+                    break
+                skip.add(d['id'])
+                cell = (d['id'], pickup_date, slot)
+                query = {"driverId": d['id'], "pickupDate": pickup_date, "pickupTimeSlot": slot}
+                try:
+                    held = self.db['driver_slots'].find_one_and_update({**query, "count": {"$lt": cap}} if cap < float('inf') else query,
+                                                                       {"$inc": {"count": 1}}, upsert=True)
+                except DuplicateKeyError:
+                    # The upsert collided with a counter already at the cap
+                    with self.lock:
+                        index['slot_load'][cell] = cap
+                        d['currentOrders'] -= 1
+                    continue
+                with self.lock:
+                    index['slot_load'][cell] = held['count']
+                driver = self.db['drivers'].find_one_and_update({"id": d['id'], "status": "active"}, {"$inc": {"currentOrders": 1}})
+                if not driver:
+                    with self.lock:
+                        d['active'] = False
+                    self.db['driver_slots'].update_one(query, {"$inc": {"count": -1}})
+                    continue
+                with self.lock:
+                    d['currentOrders'] = driver['currentOrders']
+                over_cap = bool(self.slot_max) and held['count'] > self.slot_max
+                if over_cap:
+                    print(f"[DRIVER] every {zone} driver is full for {pickup_date} {slot}; {d['name']} now holds {held['count']} pickups")
+                return d['id'], d['name'], over_cap
+        return None
+
+    def move_load(self, order, from_id, to_id):
+        """Manual (re)assignment: move the slot counter and keep the local index in step"""
+        pickup_date, slot = order.get('pickupDate'), order.get('pickupTimeSlot')
+        if from_id:
+            self.db['driver_slots'].update_one({"driverId": from_id, "pickupDate": pickup_date, "pickupTimeSlot": slot}, {"$inc": {"count": -1}})
+        if to_id:
+            self.db['driver_slots'].update_one({"driverId": to_id, "pickupDate": pickup_date, "pickupTimeSlot": slot}, {"$inc": {"count": 1}}, upsert=True)
+        with self.lock:
+            if not self.index:
+                return
+            for driver_id, delta in ((from_id, -1), (to_id, 1)):
+                entry = driver_id and self.index['by_id'].get(driver_id)
+                if not entry:
+                    continue
+                entry['currentOrders'] += delta
+                cell = (driver_id, pickup_date, slot)
+                if cell in self.index['slot_load']:
+                    self.index['slot_load'][cell] += delta
+
+
+# ===== STRIPE WEBHOOK (mirrors route.js) =====
+WEBHOOK_STALE_MS = 60_000
+WEBHOOK_LOG_RETENTION_MS = 30 * 24 * 60 * 60 * 1000
+WEBHOOK_MAX_ATTEMPTS = 5
+WEBHOOK_SWEEP_BATCH = 100
+STRIPE_SIGNATURE_TOLERANCE = 300
+
+
+def verify_stripe_signature(payload, header, secret, tolerance=STRIPE_SIGNATURE_TOLERANCE):
+    """Stripe's `t=<unix>,v1=<hex hmac-sha256 of "t.payload">` scheme, as checked by stripe.webhooks.constructEvent"""
+    fields = [part.split('=', 1) for part in (header or '').split(',') if '=' in part]
+    timestamp = next((v for k, v in fields if k == 't'), None)
+    signatures = [v for k, v in fields if k == 'v1']
+    if not timestamp or not timestamp.isdigit() or not signatures:
+        raise ValueError('Unable to extract timestamp and signatures from header')
+    expected = hmac.new(secret.encode(), f"{timestamp}.".encode() + payload, hashlib.sha256).hexdigest()
+    if not any(hmac.compare_digest(expected, signature) for signature in signatures):
+        raise ValueError('No signatures found matching the expected signature for payload')
+    if tolerance and abs(time.time() - int(timestamp)) > tolerance:
+        raise ValueError('Timestamp outside the tolerance zone')
+
+
+# ===== SESSIONS (mirror route.js) =====
+SESSION_TTL = timedelta(days=30)
+TTL_MONITOR_INTERVAL = 60.0
+MONITORED_COLLECTIONS = ['sessions', 'notifications', 'webhook_logs', 'orders', 'users', 'complaints', 'payment_transactions', 'driver_slots']
+SESSION_CACHE_TTL_MS = 60_000
+SESSION_CACHE_MAX = 10_000
+PRUNE_INTERVAL = 3600.0
+
+
+class SessionCache:
+    """Bounded LRU of token -> user with a per-entry TTL, like sessionCache in route.js"""
+
+    def __init__(self, ttl_ms=SESSION_CACHE_TTL_MS, max_entries=SESSION_CACHE_MAX):
+        self.ttl = ttl_ms / 1000.0
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, token):
+        with self.lock:
+            entry = self.entries.get(token)
+            if not entry:
+                return None
+            if entry[1] <= time.time():
+                del self.entries[token]
+                return None
+            self.entries.move_to_end(token)
+            return dict(entry[0])
+
+    def put(self, token, user, session_expires_at=None):
+        if self.ttl <= 0:
+            return
+        expires = time.time() + self.ttl
+        if session_expires_at:
+            expires = min(expires, datetime.fromisoformat(session_expires_at.replace('Z', '+00:00')).timestamp())
+        with self.lock:
+            self.entries[token] = (user, expires)
+            self.entries.move_to_end(token)
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def discard(self, token):
+        with self.lock:
+            self.entries.pop(token, None)
+
+    def invalidate(self, **match):
+        with self.lock:
+            for token in [t for t, (user, _) in self.entries.items() if all(user.get(k) == v for k, v in match.items())]:
+                del self.entries[token]
+
+    def configure(self, ttl_ms):
+        with self.lock:
+            self.ttl = ttl_ms / 1000.0
+            self.entries.clear()
+
+
+# ===== TRAFFIC CAPTURE (mirrors route.js) =====
+# One NDJSON line per request: timing, route, auth role and a scrubbed body.
+# Ids and tokens become salted pseudonyms (stable within a capture, so a
+# replay can follow an order from creation to tracking), PII becomes typed
+# placeholders (emails keep a pseudonym, so a login still finds the account
+# registered earlier) and any other free text only keeps its length. Only values
+# under CAPTURE_KEEP_KEYS, which drive behaviour rather than identify
+# anyone, are written verbatim. Sessions are sampled whole.
+CAPTURE_VERSION = 1
+CAPTURE_KEEP_KEYS = {
+    'type', 'planId', 'suburb', 'suburbs', 'zones', 'pickupDate', 'pickupTimeSlot', 'deliveryPreference', 'items', 'weightKg',
+    'addons', 'promoCode', 'code', 'value', 'maxUses', 'expiryDate', 'maxPerSlot', 'status', 'action', 'category',
+    'itemsConfirmed', 'refundAmount', 'subtotal', 'date', 'from', 'to', 'days', 'limit', 'include', 'live', 'wait',
+    'reset', 'force', 'maxBatches',
+}
+CAPTURE_PII = {
+    'email': 'email', 'guestEmail': 'email', 'userEmail': 'email', 'name': 'name', 'guestName': 'name', 'userName': 'name',
+    'driverName': 'name', 'phone': 'phone', 'guestPhone': 'phone', 'password': 'secret', 'secret': 'secret',
+    'originUrl': 'url', 'photoUrl': 'url', 'photos': 'url',
+}
+CAPTURE_ID_KEY = re.compile(r'^(id|token|cursor|nextCursor)$|Ids?$')
+
+
+class TrafficCapture:
+    """Appends scrubbed request records to an NDJSON file; mirrors route.js captureRequest()"""
+
+    def __init__(self, path, sample=1.0, salt=None):
+        self.path = path
+        self.sample = sample
+        self.salt = (salt or uuid.uuid4().hex).encode()
+        self.lock = threading.Lock()
+        self.file = open(path, 'a')
+        self._write({"type": "capture", "version": CAPTURE_VERSION, "startedAt": now_iso(), "source": "local_backend.py"})
+
+    def _write(self, record):
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with self.lock:
+            if not self.file.closed:
+                self.file.write(line)
+                self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+    def pseudonym(self, value):
+        return 'ref_' + hmac.new(self.salt, str(value).encode(), hashlib.sha256).hexdigest()[:12]
+
+    def scrub(self, key, value):
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        if key in CAPTURE_KEEP_KEYS:
+            return value
+        if isinstance(value, list):
+            return [self.scrub(key, v) for v in value]
+        if isinstance(value, dict):
+            return {k: self.scrub(k, v) for k, v in value.items()}
+        if key and CAPTURE_ID_KEY.search(key):
+            return self.pseudonym(value)
+        if CAPTURE_PII.get(key) == 'email':
+            return f"<email:{self.pseudonym(str(value).strip().lower())}>"
+        if key in CAPTURE_PII:
+            return f"<{CAPTURE_PII[key]}>"
+        return f"<text:{len(str(value))}>"
+
+    def returns(self, data, prefix=''):
+        """{dotted path: pseudonym} of the ids a JSON response mentions, outside lists"""
+        found = {}
+        for key, value in (data.items() if isinstance(data, dict) else ()):
+            if isinstance(value, dict) and not prefix:
+                found.update(self.returns(value, f"{key}."))
+            elif isinstance(value, str) and CAPTURE_ID_KEY.search(key):
+                found[prefix + key] = self.pseudonym(value)
+        return found
+
+    def record(self, request, parts, user, response, total_ms):
+        auth = request.header('Authorization')
+        data = None
+        if not isinstance(response, StreamResponse) and response.body and 'json' in response.headers.get('Content-Type', ''):
+            data = json.loads(response.body)
+        returned = self.returns(data) if response.status < 400 else {}
+        token = auth.replace('Bearer ', '') if auth else None
+        session = self.pseudonym(token) if token else returned.get('token')
+        if session:
+            if int(session[4:12], 16) / 0xFFFFFFFF >= self.sample:
+                return
+        elif random.random() >= self.sample:
+            return
+        if not user and isinstance(data, dict) and isinstance(data.get('user'), dict):
+            user = data['user']
+        try:
+            body = request.json() if request.body else None
+        except ValueError:
+            body = f"<text:{len(request.body)}>"
+        record = {
+            "at": int(time.time() * 1000 - total_ms), "session": session, "role": user.get('role') if user else (None if token else 'anonymous'),
+            "method": request.method, "route": endpoint_key(request.method, parts),
+            "path": [self.pseudonym(s) if re.search(r'\d', s) else s for s in parts],
+            "query": {k: self.scrub(k, v) for k, v in request.query.items()}, "body": self.scrub('', body),
+            "bytes": len(request.body or b''), "status": response.status, "durationMs": round(total_ms, 2),
+        }
+        if token:
+            record['auth'] = True
+        if request.header('If-None-Match'):
+            record['conditional'] = True
+        if isinstance(response, StreamResponse):
+            record['stream'] = True
+        # Ids the request already named are echoes, not hand-outs a replay could wait for
+        named = json.dumps([record['path'], record['query'], record['body']])
+        returned = {path: ref for path, ref in returned.items() if ref not in named}
+        if returned:
+            record['returns'] = returned
+        self._write(record)
+
+
+class FreshFoldStandIn:
+    """Python port of the route.js handlers operating on a MemoryDB"""
+
+    def __init__(self, db=None, seed=True, base_url='http://localhost:3000', db_latency_ms=0.0,
+                 session_cache_ttl_ms=SESSION_CACHE_TTL_MS, qr_render_ms=0.0, notify_worker=True,
+                 notify_delay_ms=0.0, notify_failure_rate=0.0, server_timing=True, stripe_webhook_secret=None,
+                 capture_traffic=None, capture_sample=1.0, db_connect_ms=0.0, db_handshake_ms=0.0,
+                 max_pool_size=MONGO_MAX_POOL_SIZE, min_pool_size=MONGO_MIN_POOL_SIZE, db_warmup=True,
+                 ttl_monitor_interval=TTL_MONITOR_INTERVAL):
+        self.db = db or MemoryDB(db_latency_ms)
+        self.session_ttl = SESSION_TTL
+        self.webhook_retention_ms = WEBHOOK_LOG_RETENTION_MS
+        self.server_timing = server_timing
+        self.metrics = MetricsRegistry()
+        self.base_url = base_url
+        self.qr_cache = QrCache()
+        self.tracking = TrackingHub()
+        self.qr_render_ms = qr_render_ms
+        self.session_cache = SessionCache(session_cache_ttl_ms)
+        self.last_prune_at = 0.0
+        self.drivers = DriverAssigner(self.db)
+        self.stripe_webhook_secret = stripe_webhook_secret
+        self.injected_delays = {}
+        self.capture = TrafficCapture(capture_traffic, capture_sample) if capture_traffic else None
+        self.webhook_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='freshfold-webhook')
+        self.last_webhook_sweep_at = 0.0
+        self.outbox = NotificationOutbox(self.db, worker=notify_worker, delay_ms=notify_delay_ms, failure_rate=notify_failure_rate)
+        if seed:
+            latency, self.db.latency = self.db.latency, 0.0
+            seed_database(self.db)
+            self.db.latency = latency
+        run_migrations(self.db)
+        ensure_indexes(self.db)
+        self.connector = self.db.connector = DbConnector(db_connect_ms, db_handshake_ms, max_pool_size, min_pool_size)
+        self.db_warmup = db_warmup
+        if db_warmup:
+            self.warm_up()
+        self.ttl_monitor_interval = ttl_monitor_interval
+        self.ttl_wakeup = threading.Event()
+        self.expired = {}
+        threading.Thread(target=self._ttl_monitor, daemon=True, name='freshfold-ttl-monitor').start()
+
+    def _ttl_monitor(self):
+        """Stand-in for mongod's TTL monitor: every interval, drop documents past their TTL index date"""
+        while True:
+            self.ttl_wakeup.wait(self.ttl_monitor_interval)
+            self.ttl_wakeup.clear()
+            self.expire_documents()
+
+    def expire_documents(self):
+        removed = {}
+        for name, collection in list(self.db.collections.items()):
+            count = collection.expire()
+            if count:
+                removed[name] = count
+                self.expired[name] = self.expired.get(name, 0) + count
+        return removed
+
+    def warm_up(self):
+        """Module-load warm-up: connect and fill the pool in the background"""
+        threading.Thread(target=self.connector.warm_up, daemon=True, name='freshfold-db-warmup').start()
+
+    def restart(self):
+        """Simulated cold start: the database client and every per-process cache are gone"""
+        self.connector.restart()
+        self.session_cache = SessionCache(int(self.session_cache.ttl * 1000), self.session_cache.max_entries)
+        self.qr_cache = QrCache()
+        self.drivers = DriverAssigner(self.db, slot_max=self.drivers.slot_max)
+        if self.db_warmup:
+            self.warm_up()
+
+    # ----- auth -----
+    def get_user(self, request):
+        with phase('auth'):
+            user = self._lookup_user(request)
+        timing = getattr(_timing, 'current', None)
+        if timing:
+            timing.user = user
+        return user
+
+    def _lookup_user(self, request):
+        auth = request.header('Authorization')
+        if not auth:
+            return None
+        token = auth.replace('Bearer ', '')
+        cached = self.session_cache.get(token)
+        if cached:
+            return cached
+        session = self.db['sessions'].find_one({"token": token, "active": True})
+        if not session:
+            return None
+        if session.get('expiresAt') and session['expiresAt'] <= now_iso():
+            return None
+        user = self.db['users'].find_one({"id": session["userId"]})
+        if user:
+            self.session_cache.put(token, user, session.get('expiresAt'))
+        return user
+
+    def _new_session(self, user_id):
+        token = str(uuid.uuid4())
+        created = datetime.now(timezone.utc)
+        self.db['sessions'].insert_one({"token": token, "userId": user_id, "active": True, "createdAt": now_iso(),
+                                        "expiresAt": (created + self.session_ttl).isoformat(timespec='milliseconds').replace('+00:00', 'Z')})
+        self.prune_sessions()
+        return token
+
+    def prune_sessions(self):
+        """pruneSessions() backstop; expired sessions are left to the TTL index on expiresAt"""
+        if time.time() - self.last_prune_at < PRUNE_INTERVAL:
+            return 0
+        self.last_prune_at = time.time()
+        cutoff = (datetime.now(timezone.utc) - self.session_ttl).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+        return self.db['sessions'].delete_many({"$or": [{"active": False}, {"expiresAt": {"$exists": False}, "createdAt": {"$lt": cutoff}}]})
+
+    def logout(self, request):
+        auth = request.header('Authorization')
+        if not auth:
+            return json_response({"error": "Unauthorized"}, 401)
+        token = auth.replace('Bearer ', '')
+        self.session_cache.discard(token)
+        self.db['sessions'].delete_many({"token": token})
+        return json_response({"message": "Logged out"})
+
+    def register(self, request):
+        body = request.json() or {}
+        name, email, password = body.get('name'), body.get('email'), body.get('password')
+        if not name or not email or not password:
+            return json_response({"error": "Name, email and password required"}, 400)
+        if self.db['users'].find_one({"email": email.lower()}):
+            return json_response({"error": "Email already registered"}, 409)
+        user_id = str(uuid.uuid4())
+        user = {
+            "id": user_id, "name": name, "email": email.lower(), "password": hash_pw(password),
+            "phone": body.get('phone') or '', "suburb": body.get('suburb') or '', "role": "customer",
+            "subscription": None, "referralCode": 'REF-' + user_id[:8].upper(), "createdAt": now_iso(),
+        }
+        self.db['users'].insert_one(user)
+        token = self._new_session(user_id)
+        return json_response({"user": without_password(user), "token": token})
+
+    def login(self, request):
+        body = request.json() or {}
+        email, password = body.get('email'), body.get('password')
+        if not email or not password:
+            return json_response({"error": "Email and password required"}, 400)
+        user = self.db['users'].find_one({"email": email.lower()})
+        if not user or user['password'] != hash_pw(password):
+            return json_response({"error": "Invalid credentials"}, 401)
+        token = self._new_session(user['id'])
+        return json_response({"user": without_password(user), "token": token})
+
+    def me(self, request):
+        user = self.get_user(request)
+        if not user:
+            return json_response({"error": "Unauthorized"}, 401)
+        return json_response({"user": without_password(user)})
+
+    def make_admin(self, request):
+        body = request.json() or {}
+        if body.get('secret') != ADMIN_SECRET:
+            return json_response({"error": "Invalid secret"}, 403)
+        matched = self.db['users'].update_one({"email": (body.get('email') or '').lower()}, {"$set": {"role": "admin"}})
+        if not matched:
+            return json_response({"error": "User not found"}, 404)
+        self.session_cache.invalidate(email=(body.get('email') or '').lower())
+        return json_response({"message": "User promoted to admin"})
+
+    # ----- bookings -----
+    def create_booking(self, request):
+        user = self.get_user(request)
+        body = request.json() or {}
+        suburb = body.get('suburb')
+        pickup_date, slot = body.get('pickupDate'), body.get('pickupTimeSlot')
+        if not suburb or suburb.lower() not in [s.lower() for s in SERVICE_SUBURBS]:
+            return json_response({"error": "Service not available in this suburb. We serve Greater Geelong, Bellarine Peninsula, and Surf Coast areas."}, 400)
+        if not pickup_date or not slot:
+            return json_response({"error": "Pickup date and time slot required"}, 400)
+        lap('validate')
+
+        key = suburb_key(suburb)
+        settings = self.db['capacity_settings'].find_one({"suburbKey": key, "active": True})
+        max_per_slot = (settings or {}).get('maxPerSlot') or 5
+        slot_bookings = self.db['orders'].count_documents({"pickupDate": pickup_date, "suburbKey": key, "pickupTimeSlot": slot})
+        if slot_bookings >= max_per_slot:
+            return json_response({"error": f"This time slot is fully booked for {suburb} on {pickup_date}. Please choose another slot."}, 400)
+        lap('capacity')
+
+        booking_type, plan_id = body.get('type'), body.get('planId')
+        plan = None
+        if booking_type == 'subscription' and plan_id:
+            plan = next((p for p in PLANS if p['id'] == plan_id), None)
+            if not plan:
+                return json_response({"error": "Invalid plan"}, 400)
+            base_cost = plan['price']
+        else:
+            base_cost = money((body.get('weightKg') or 5) * ONE_OFF_RATE_PER_KG)
+
+        addons_total = 0
+        selected = []
+        for a in body.get('addons') or []:
+            addon = next((ad for ad in ADDONS if ad['id'] == a.get('id')), None)
+            if addon:
+                qty = a.get('quantity') or 1
+                addons_total += addon['price'] * qty
+                selected.append({**addon, "quantity": qty, "subtotal": money(addon['price'] * qty)})
+
+        subtotal = money(base_cost + addons_total)
+        discount, applied_promo = 0, None
+        if body.get('promoCode'):
+            promo = self.db['promo_codes'].find_one({"code": body['promoCode'].upper(), "active": True})
+            if promo:
+                not_expired = not promo.get('expiryDate') or promo['expiryDate'] >= now_iso()
+                under_limit = not promo.get('maxUses') or promo['currentUses'] < promo['maxUses']
+                if not_expired and under_limit:
+                    discount = money(subtotal * promo['value'] / 100) if promo['type'] == 'percentage' else min(promo['value'], subtotal)
+                    applied_promo = promo['code']
+                    self.db['promo_codes'].update_one({"id": promo['id']}, {"$inc": {"currentUses": 1}})
+
+        subtotal = money(subtotal - discount)
+        gst = money(subtotal * GST_RATE)
+        total = money(subtotal + gst)
+        lap('pricing')
+
+        tracking_id = 'FF-' + str(uuid.uuid4())[:8].upper()
+        tracking_url = f"{self.base_url}?track={tracking_id}"
+
+        driver_id, driver_name, over_cap = self.drivers.assign(key, pickup_date, slot) or (None, None, False)
+        lap('driver')
+
+        created = now_iso()
+        order = {
+            "id": str(uuid.uuid4()), "trackingId": tracking_id,
+            "userId": user['id'] if user else None,
+            "guestEmail": body.get('guestEmail') or (user or {}).get('email'),
+            "guestName": body.get('guestName') or (user or {}).get('name'),
+            "guestPhone": body.get('guestPhone') or (user or {}).get('phone'),
+            "type": booking_type or 'one-off', "planId": plan_id, "planName": plan['name'] if plan else 'One-Off Service',
+            "suburb": suburb, "suburbKey": key, "pickupDate": pickup_date, "pickupTimeSlot": slot,
+            "deliveryPreference": body.get('deliveryPreference') or 'standard',
+            "items": body.get('items') or 0, "weightKg": body.get('weightKg') or 5,
+            "instructions": body.get('instructions') or '',
+            "addons": selected, "baseCost": base_cost, "addonsTotal": money(addons_total),
+            "discount": discount, "promoCode": applied_promo,
+            "subtotal": subtotal, "gst": gst, "total": total,
+            "status": 'Order Placed',
+            "statusHistory": [{"status": 'Order Placed', "timestamp": created, "note": 'Order created'}],
+            "paymentStatus": 'pending', "qrUrl": qr_path(tracking_id), "trackingUrl": tracking_url,
+            "driverId": driver_id, "driverName": driver_name, "driverOverCap": over_cap,
+            "itemsConfirmed": False, "createdAt": created, "updatedAt": created,
+        }
+        self.db['orders'].insert_one(order)
+        lap('insert')
+        self._record_order_stats(order)
+        lap('stats')
+        self.send_notification('order_created', {"trackingId": tracking_id, "trackingUrl": tracking_url, "name": order['guestName'],
+                                                 "email": order['guestEmail'], "phone": order['guestPhone'], "total": total, "planName": order['planName']})
+        lap('notify')
+        return json_response({"order": order, "message": "Booking created successfully"}, 201)
+
+    def get_bookings(self, request):
+        user = self.get_user(request)
+        if not user:
+            return json_response({"error": "Unauthorized"}, 401)
+        params = page_params(request)
+        page = find_page(self.db, 'orders', {"userId": user['id']}, **params)
+        if page is None:
+            return json_response({"error": "Invalid cursor"}, 400)
+        body = {"orders": page['items'], "nextCursor": page['nextCursor']}
+        if not params['cursor']:
+            # The first page also carries the customer's order count for the dashboard
+            body['total'] = self.db['orders'].count_documents({"userId": user['id']})
+        return json_response(body)
+
+    def get_booking(self, request, booking_id):
+        order = self.db['orders'].find_one({"id": booking_id})
+        if not order:
+            return json_response({"error": "Order not found"}, 404)
+        return json_response({"order": public(order)})
+
+    def update_booking_status(self, request, booking_id):
+        user = self.get_user(request)
+        if not user or user.get('role') != 'admin':
+            return json_response({"error": "Admin access required"}, 403)
+        body = request.json() or {}
+        order = self.db['orders'].find_one({"id": booking_id})
+        if not order:
+            return json_response({"error": "Order not found"}, 404)
+        status = body.get('status')
+        update = {"updatedAt": now_iso()}
+        if status and status in TRACKING_STATUSES:
+            update['status'] = status
+            update['statusHistory'] = (order.get('statusHistory') or []) + [{"status": status, "timestamp": now_iso(), "note": body.get('note') or ''}]
+        if isinstance(body.get('itemsConfirmed'), bool):
+            update['itemsConfirmed'] = body['itemsConfirmed']
+            if 'confirmedItems' in body:
+                update['confirmedItems'] = body['confirmedItems']
+        self.db['orders'].update_one({"id": booking_id}, {"$set": update})
+        if update.get('status') and update['status'] != order.get('status'):
+            self._record_status_change(order.get('status'), update['status'])
+        updated = self.db['orders'].find_one({"id": booking_id})
+        if 'status' in update or 'itemsConfirmed' in update:
+            self.tracking.publish(updated, update['statusHistory'][-1] if 'status' in update else None)
+        if status:
+            self.send_notification('status_updated', {"trackingId": updated['trackingId'], "status": status, "email": updated.get('guestEmail'),
+                                                      "name": updated.get('guestName'), "phone": updated.get('guestPhone')})
+        return json_response({"order": public(updated)})
+
+    def bulk_update_status(self, request):
+        user = self.get_user(request)
+        if not user or user.get('role') != 'admin':
+            return json_response({"error": "Admin access required"}, 403)
+        updates = (request.json() or {}).get('updates')
+        if not isinstance(updates, list) or not updates:
+            return json_response({"error": "updates must be a non-empty array of { orderId, status, note }"}, 400)
+        if len(updates) > BULK_STATUS_MAX:
+            return json_response({"error": f"At most {BULK_STATUS_MAX} updates per request"}, 400)
+
+        results = [{"orderId": u.get('orderId') if isinstance(u, dict) else None, "ok": False} for u in updates]
+        seen, valid = set(), []
+        for i, u in enumerate(updates):
+            if not isinstance(u, dict) or not isinstance(u.get('orderId'), str):
+                results[i]['error'] = 'orderId required'
+            elif u.get('status') not in TRACKING_STATUSES:
+                results[i]['error'] = 'Invalid status'
+            elif u['orderId'] in seen:
+                results[i]['error'] = 'Duplicate orderId in batch'
+            else:
+                seen.add(u['orderId'])
+                valid.append(i)
+        lap('validate')
+
+        by_id = {o['id']: o for o in self.db['orders'].find({"id": {"$in": [updates[i]['orderId'] for i in valid]}})}
+        pending = []
+        for i in valid:
+            if updates[i]['orderId'] in by_id:
+                pending.append(i)
+            else:
+                results[i]['error'] = 'Order not found'
+        lap('read')
+
+        now = now_iso()
+        ops = [({"id": updates[i]['orderId']},
+                {"$set": {"status": updates[i]['status'], "updatedAt": now},
+                 "$push": {"statusHistory": {"status": updates[i]['status'], "timestamp": now, "note": updates[i].get('note') or ''}}})
+               for i in pending]
+        failed_ops = self.db['orders'].bulk_write(ops) if ops else {}
+        applied = []
+        for op, i in enumerate(pending):
+            if op in failed_ops:
+                results[i]['error'] = failed_ops[op]
+            else:
+                results[i] = {"orderId": updates[i]['orderId'], "ok": True, "status": updates[i]['status']}
+                applied.append(i)
+        lap('write')
+
+        inc = {}
+        for i in applied:
+            before, after = by_id[updates[i]['orderId']].get('status'), updates[i]['status']
+            if before != after:
+                inc[f"status.{stats_key(before)}"] = inc.get(f"status.{stats_key(before)}", 0) - 1
+                inc[f"status.{stats_key(after)}"] = inc.get(f"status.{stats_key(after)}", 0) + 1
+        if inc:
+            self._apply_stats_delta(inc)
+        lap('stats')
+
+        watched = [updates[i]['orderId'] for i in applied if by_id[updates[i]['orderId']]['trackingId'] in self.tracking.watchers]
+        if watched:
+            for order in self.db['orders'].find({"id": {"$in": watched}}):
+                self.tracking.publish(order, order['statusHistory'][-1])
+        notifications = []
+        for i in applied:
+            order = by_id[updates[i]['orderId']]
+            notifications.append(('status_updated', {"trackingId": order['trackingId'], "status": updates[i]['status'], "email": order.get('guestEmail'),
+                                                     "name": order.get('guestName'), "phone": order.get('guestPhone')}))
+        self.send_notifications(notifications)
+        lap('notify')
+        return json_response({"updated": len(applied), "failed": len(updates) - len(applied), "results": results})
+
+    def get_tracking(self, request, tracking_id):
+        if_none_match = request.header('If-None-Match')
+        if if_none_match:
+            wait = min(int(request.query.get('wait') or 0), TRACKING_LONG_POLL_MAX_S)
+            listener = self.tracking.watch(tracking_id) if wait else None
+            try:
+                current = self.db['orders'].find_one({"trackingId": tracking_id})
+                if not current:
+                    return json_response({"error": "Tracking ID not found"}, 404)
+                headers = {**cors(), 'ETag': tracking_etag(current), 'Cache-Control': 'no-cache'}
+                if if_none_match == headers['ETag']:
+                    if not listener or current.get('status') == FINAL_TRACKING_STATUS:
+                        return Response(304, b'', headers)
+                    try:
+                        listener.get(timeout=wait)
+                    except queue.Empty:
+                        return Response(304, b'', headers)
+            finally:
+                if listener:
+                    self.tracking.unwatch(tracking_id, listener)
+        order = self.db['orders'].find_one({"trackingId": tracking_id})
+        if not order:
+            return json_response({"error": "Tracking ID not found"}, 404)
+        response = json_response(tracking_view(order))
+        response.headers.update({'ETag': tracking_etag(order), 'Cache-Control': 'no-cache'})
+        return response
+
+    def tracking_events(self, request, tracking_id):
+        # Subscribe before the snapshot read; deltas queued meanwhile are filtered against it
+        listener = self.tracking.watch(tracking_id)
+        order = self.db['orders'].find_one({"trackingId": tracking_id})
+        if not order:
+            self.tracking.unwatch(tracking_id, listener)
+            return json_response({"error": "Tracking ID not found"}, 404)
+        history = order.get('statusHistory') or []
+        last_event_id = request.header('Last-Event-ID')
+        resuming = bool(last_event_id and last_event_id.isdigit() and int(last_event_id) <= len(history))
+        # delivered orders never change again: 204 stops EventSource reconnecting unless there is still history to catch up on
+        if order.get('status') == FINAL_TRACKING_STATUS and (not resuming or int(last_event_id) == len(history)):
+            self.tracking.unwatch(tracking_id, listener)
+            return Response(204, b'', cors())
+        if resuming:
+            start = int(last_event_id)
+            first = [sse_event('status', {"trackingId": tracking_id, "version": start + i + 1, "status": entry['status'], "entry": entry}, start + i + 1)
+                     for i, entry in enumerate(history[start:])]
+        else:
+            first = [sse_event('snapshot', tracking_view(order), len(history))]
+
+        def stream():
+            try:
+                yield from first
+                if order.get('status') == FINAL_TRACKING_STATUS:
+                    return
+                deadline = time.monotonic() + TRACKING_STREAM_MAX_MS / 1000
+                while (remaining := deadline - time.monotonic()) > 0:
+                    try:
+                        delta = listener.get(timeout=min(TRACKING_HEARTBEAT_MS / 1000, remaining))
+                    except queue.Empty:
+                        yield b': ping\n\n'
+                        continue
+                    if delta['entry'] and delta['version'] <= len(history):
+                        continue
+                    yield sse_event('status', delta, delta['version']) if delta['entry'] else sse_event('items', delta)
+                    if delta['status'] == FINAL_TRACKING_STATUS:
+                        return
+            finally:
+                self.tracking.unwatch(tracking_id, listener)
+
+        headers = {**cors(), 'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache, no-transform', 'X-Accel-Buffering': 'no'}
+        return StreamResponse(200, stream(), headers)
+
+    def tracking_qr(self, request, tracking_id):
+        def render():
+            order = self.db['orders'].find_one({"trackingId": tracking_id})
+            return render_qr(order['trackingUrl'], self.qr_render_ms) if order else None
+
+        with phase('render'):
+            qr = self.qr_cache.get(tracking_id, render)
+        if qr is None:
+            return json_response({"error": "Tracking ID not found"}, 404)
+        png, etag = qr
+        headers = {**cors(), 'ETag': etag, 'Cache-Control': 'public, max-age=31536000, immutable'}
+        if request.header('If-None-Match') == etag:
+            return Response(304, b'', headers)
+        return Response(200, png, {**headers, 'Content-Type': 'image/png'})
+
+    # ----- checkout (no payment gateway: mirrors the route.js Stripe error path) -----
+    def create_checkout(self, request):
+        body = request.json() or {}
+        order_id, origin_url = body.get('orderId'), body.get('originUrl')
+        if not order_id or not origin_url:
+            return json_response({"error": "orderId and originUrl required"}, 400)
+        order = self.db['orders'].find_one({"id": order_id})
+        if not order:
+            return json_response({"error": "Order not found"}, 404)
+        self.db['payment_transactions'].insert_one({
+            "id": str(uuid.uuid4()), "orderId": order_id, "userId": order.get('userId'), "amount": money(order['total']),
+            "currency": 'aud', "paymentStatus": 'stripe_error', "sessionId": None, "error": 'Stripe unavailable in local stand-in',
+            "metadata": {"orderId": order_id, "type": order['type'], "planId": order.get('planId')},
+            "createdAt": now_iso(), "updatedAt": now_iso(),
+        })
+        self.db['orders'].update_one({"id": order_id}, {"$set": {"paymentStatus": 'pending_manual'}})
+        return json_response({"error": "Payment gateway unavailable. Your order has been created and payment can be completed later.",
+                              "orderId": order_id, "trackingId": order['trackingId']})
+
+    def checkout_status(self, request, session_id):
+        txn = self.db['payment_transactions'].find_one({"sessionId": session_id})
+        if not txn:
+            return json_response({"error": "Transaction not found"}, 404)
+        return json_response({"payment_status": txn['paymentStatus']})
+
+    # ----- complaints -----
+    def create_complaint(self, request):
+        user = self.get_user(request)
+        body = request.json() or {}
+        category, description = body.get('category'), body.get('description')
+        if not category or not description:
+            return json_response({"error": "Category and description required"}, 400)
+        complaint = {
+            "id": str(uuid.uuid4()), "ticketNumber": 'TKT-' + str(uuid.uuid4())[:8].upper(),
+            "orderId": body.get('orderId'), "userId": user['id'] if user else None,
+            "userName": (user or {}).get('name') or body.get('guestName') or 'Guest',
+            "userEmail": (user or {}).get('email') or body.get('guestEmail') or '',
+            "category": category, "description": description,
+            "photoUrl": body.get('photoUrl'), "photos": body.get('photos') or [],
+            "status": 'open', "resolution": None, "refundAmount": None, "adminNotes": [],
+            "createdAt": now_iso(), "updatedAt": now_iso(),
+        }
+        self.db['complaints'].insert_one(complaint)
+        self.send_notification('complaint_submitted', {"ticketNumber": complaint['ticketNumber'], "category": category,
+                                                       "email": complaint['userEmail'], "name": complaint['userName'], "phone": (user or {}).get('phone')})
+        return json_response({"complaint": complaint, "message": 'Complaint submitted. Ticket: ' + complaint['ticketNumber']}, 201)
+
+    def get_complaints(self, request):
+        user = self.get_user(request)
+        if not user:
+            return json_response({"error": "Unauthorized"}, 401)
+        query = {} if user.get('role') == 'admin' else {"userId": user['id']}
+        if request.query.get('status'):
+            query['status'] = request.query['status']
+        page = find_page(self.db, 'complaints', query, **page_params(request))
+        if page is None:
+            return json_response({"error": "Invalid cursor"}, 400)
+        return json_response({"complaints": page['items'], "nextCursor": page['nextCursor']})
+
+    def update_complaint(self, request, complaint_id):
+        user = self.get_user(request)
+        if not user or user.get('role') != 'admin':
+            return json_response({"error": "Admin access required"}, 403)
+        body = request.json() or {}
+        complaint = self.db['complaints'].find_one({"id": complaint_id})
+        if not complaint:
+            return json_response({"error": "Complaint not found"}, 404)
+        update = {"updatedAt": now_iso()}
+        for field in ('status', 'resolution'):
+            if body.get(field):
+                update[field] = body[field]
+        if 'refundAmount' in body:
+            update['refundAmount'] = body['refundAmount']
+        if body.get('adminNote'):
+            update['adminNotes'] = (complaint.get('adminNotes') or []) + [{"note": body['adminNote'], "timestamp": now_iso(), "admin": user['name']}]
+        self.db['complaints'].update_one({"id": complaint_id}, {"$set": update})
+        return json_response({"complaint": public(self.db['complaints'].find_one({"id": complaint_id}))})
+
+    # ----- admin stats projection (mirrors route.js) -----
+    def _apply_stats_delta(self, inc):
+        # no upsert: while the projection is missing the delta is dropped and the next read rebuilds it
+        self.db['admin_stats'].update_one({"id": ADMIN_STATS_ID}, {"$inc": inc, "$set": {"updatedAt": now_iso()}})
+
+    def _record_order_stats(self, order):
+        self._apply_stats_delta(order_stats_delta(order))
+
+    def _record_status_change(self, from_status, to_status):
+        self._apply_stats_delta({f"status.{stats_key(from_status)}": -1, f"status.{stats_key(to_status)}": 1})
+
+    def _mark_order_paid(self, order_id):
+        """The order on the call that flipped it to paid, None otherwise"""
+        order = self.db['orders'].find_one_and_update({"id": order_id, "paymentStatus": {"$ne": 'paid'}},
+                                                      {"$set": {"paymentStatus": 'paid', "updatedAt": now_iso()}})
+        if not order:
+            return None
+        self._apply_stats_delta(payment_stats_delta(order))
+        return order
+
+    def compute_admin_stats(self):
+        return compute_admin_stats(self.db)
+
+    def rebuild_admin_stats(self):
+        return rebuild_admin_stats(self.db)
+
+    def admin_stats(self, request):
+        if request.query.get('live') == '1':
+            user = self.get_user(request)
+            if not user or user.get('role') != 'admin':
+                return json_response({"error": "Admin access required"}, 403)
+            stats = self.compute_admin_stats()
+        else:
+            stats = self.db['admin_stats'].find_one({"id": ADMIN_STATS_ID}) or self.rebuild_admin_stats()
+        recent = self.db['orders'].find({}, sort=[("createdAt", -1)], limit=10, exclude={'_id', *HEAVY_FIELDS['orders']})
+        return json_response({
+            **format_admin_stats(stats),
+            "openComplaints": self.db['complaints'].count_documents({"status": "open"}),
+            "totalUsers": self.db['users'].count_documents(),
+            "recentOrders": [public(o) for o in recent],
+            "activePromos": self.db['promo_codes'].count_documents({"active": True}),
+            "totalDrivers": self.db['drivers'].count_documents({"status": "active"}),
+        })
+
+    def rebuild_stats(self, request):
+        user = self.get_user(request)
+        if not user or user.get('role') != 'admin':
+            return json_response({"error": "Admin access required"}, 403)
+        started = time.perf_counter()
+        stats = self.rebuild_admin_stats()
+        return json_response({"message": "Admin stats rebuilt", "totalOrders": stats['totalOrders'],
+                              "durationMs": int((time.perf_counter() - started) * 1000)})
+
+    # ----- stand-in only: bulk loading for benchmarks -----
+    def bulk_insert(self, request, collection):
+        docs = request.json() or []
+        self.db[collection].insert_many(docs)
+        return json_response({"inserted": len(docs)})
+
+    def configure(self, request):
+        """Runtime knobs standing in for env vars, so benchmarks can compare settings on one server"""
+        body = request.json() or {}
+        if 'sessionCacheTtlMs' in body:
+            self.session_cache.configure(body['sessionCacheTtlMs'])
+        if 'qrRenderMs' in body:
+            self.qr_render_ms = body['qrRenderMs']
+        if 'stripeWebhookSecret' in body:
+            self.stripe_webhook_secret = body['stripeWebhookSecret'] or None
+        if 'captureTraffic' in body:
+            if self.capture:
+                self.capture.close()
+            self.capture = TrafficCapture(body['captureTraffic'], float(body.get('captureSample') or 1.0)) if body['captureTraffic'] else None
+        if 'injectDelayMs' in body:
+            # {"POST /api/bookings": 15}: simulated slowdowns for checking that the regression suite notices them
+            self.injected_delays = {key: float(ms) for key, ms in (body['injectDelayMs'] or {}).items()}
+        connector = self.connector
+        if 'singleFlightDb' in body:
+            connector.single_flight = bool(body['singleFlightDb'])
+        if 'dbWarmup' in body:
+            self.db_warmup = bool(body['dbWarmup'])
+        if 'dbConnectMs' in body:
+            connector.connect_ms = float(body['dbConnectMs'])
+        if 'dbHandshakeMs' in body:
+            connector.handshake_ms = float(body['dbHandshakeMs'])
+        if 'maxPoolSize' in body:
+            connector.max_pool_size = int(body['maxPoolSize'])
+        if 'minPoolSize' in body:
+            connector.min_pool_size = int(body['minPoolSize'])
+        if body.get('restart'):
+            self.restart()
+        # retention: SESSION_TTL_DAYS / NOTIFICATION_RETENTION_DAYS / WEBHOOK_LOG_RETENTION_DAYS in ms, so a soak run
+        # can watch expiry happen in minutes; ttlMonitorMs is mongod's ttlMonitorSleepSecs
+        if 'sessionTtlMs' in body:
+            self.session_ttl = timedelta(milliseconds=float(body['sessionTtlMs']))
+        if 'webhookRetentionMs' in body:
+            self.webhook_retention_ms = float(body['webhookRetentionMs'])
+        if 'ttlMonitorMs' in body:
+            self.ttl_monitor_interval = float(body['ttlMonitorMs']) / 1000
+            self.ttl_wakeup.set()
+        if 'driverSlotMax' in body:
+            # DRIVER_SLOT_MAX; 0 leaves drivers uncapped
+            self.drivers.slot_max = int(body['driverSlotMax'] or 0)
+        if 'indexes' in body:
+            for collection in list(self.db.collections.values()):
+                collection.drop_indexes()
+            if body['indexes']:
+                ensure_indexes(self.db)
+        self.outbox.configure(delay_ms=body.get('notifyDelayMs'), failure_rate=body.get('notifyFailureRate'),
+                              backoff_ms=body.get('notifyBackoffMs'), email_rate=body.get('notifyEmailRate'),
+                              sms_rate=body.get('notifySmsRate'), retention_ms=body.get('notificationRetentionMs'))
+        return json_response({"sessionCacheTtlMs": int(self.session_cache.ttl * 1000), "qrRenderMs": self.qr_render_ms,
+                              "qrRenders": self.qr_cache.renders, "trackingWatchers": self.tracking.count(), "notifyDelayMs": self.outbox.delay_ms,
+                              "notifyFailureRate": self.outbox.failure_rate, "notifyBackoffMs": self.outbox.backoff_ms,
+                              "stripeWebhookSecret": bool(self.stripe_webhook_secret), "injectDelayMs": self.injected_delays,
+                              "captureTraffic": self.capture.path if self.capture else None, "dbConnectMs": connector.connect_ms,
+                              "dbHandshakeMs": connector.handshake_ms, "dbWarmup": self.db_warmup, "db": connector.snapshot(),
+                              "sessionTtlMs": self.session_ttl.total_seconds() * 1000, "notificationRetentionMs": self.outbox.retention_ms,
+                              "webhookRetentionMs": self.webhook_retention_ms, "ttlMonitorMs": self.ttl_monitor_interval * 1000,
+                              "driverSlotMax": self.drivers.slot_max})
+
+    def admin_orders(self, request):
+        user = self.get_user(request)
+        if not user or user.get('role') != 'admin':
+            return json_response({"error": "Admin access required"}, 403)
+        status = request.query.get('status')
+        page = find_page(self.db, 'orders', {"status": status} if status else {}, **page_params(request))
+        if page is None:
+            return json_response({"error": "Invalid cursor"}, 400)
+        return json_response({"orders": page['items'], "nextCursor": page['nextCursor']})
+
+    # ----- subscriptions -----
+    def subscribe(self, request):
+        user = self.get_user(request)
+        if not user:
+            return json_response({"error": "Unauthorized"}, 401)
+        plan = next((p for p in PLANS if p['id'] == (request.json() or {}).get('planId')), None)
+        if not plan:
+            return json_response({"error": "Invalid plan"}, 400)
+        subscription = {
+            "id": str(uuid.uuid4()), "userId": user['id'], "planId": plan['id'], "planName": plan['name'],
+            "price": plan['price'], "status": 'active', "pickupsUsed": 0,
+            "pickupsPerMonth": plan['pickupsPerMonth'], "maxWeightKg": plan['maxWeightKg'],
+            "pausedAt": None, "cancelledAt": None, "createdAt": now_iso(), "updatedAt": now_iso(),
+        }
+        self.db['subscriptions'].insert_one(subscription)
+        self.db['users'].update_one({"id": user['id']}, {"$set": {"subscription": {"planId": plan['id'], "planName": plan['name'], "status": 'active'}}})
+        self.session_cache.invalidate(id=user['id'])
+        return json_response({"subscription": subscription, "message": 'Subscribed to ' + plan['name']})
+
+    def get_subscription(self, request):
+        user = self.get_user(request)
+        if not user:
+            return json_response({"error": "Unauthorized"}, 401)
+        sub = self.db['subscriptions'].find_one({"userId": user['id'], "status": {"$in": ['active', 'paused']}})
+        return json_response({"subscription": public(sub)})
+
+    def update_subscription(self, request):
+        user = self.get_user(request)
+        if not user:
+            return json_response({"error": "Unauthorized"}, 401)
+        body = request.json() or {}
+        action = body.get('action')
+        sub = self.db['subscriptions'].find_one({"userId": user['id'], "status": {"$in": ['active', 'paused']}})
+        if not sub:
+            return json_response({"error": "No active subscription found"}, 404)
+        update = {"updatedAt": now_iso()}
+        if action == 'pause':
+            update.update(status='paused', pausedAt=now_iso())
+        elif action == 'resume':
+            update.update(status='active', pausedAt=None)
+        elif action == 'cancel':
+            update.update(status='cancelled', cancelledAt=now_iso())
+        elif action == 'upgrade' and body.get('planId'):
+            plan = next((p for p in PLANS if p['id'] == body['planId']), None)
+            if not plan:
+                return json_response({"error": "Invalid plan"}, 400)
+            update.update(planId=plan['id'], planName=plan['name'], price=plan['price'],
+                          pickupsPerMonth=plan['pickupsPerMonth'], maxWeightKg=plan['maxWeightKg'])
+        self.db['subscriptions'].update_one({"id": sub['id']}, {"$set": update})
+        updated = self.db['subscriptions'].find_one({"id": sub['id']})
+        summary = None if action == 'cancel' else {"planId": updated['planId'], "planName": updated['planName'], "status": updated['status']}
+        self.db['users'].update_one({"id": user['id']}, {"$set": {"subscription": summary}})
+        self.session_cache.invalidate(id=user['id'])
+        return json_response({"subscription": public(updated)})
+
+    # ----- notifications -----
+    @staticmethod
+    def build_notification(notification_type, data):
+        notification = {
+            "id": str(uuid.uuid4()), "type": notification_type, "data": {**data, "_sanitized": True},
+            "email": data.get('email'), "phone": data.get('phone'),
+            "subject": 'Fresh Fold Notification', "message": f"{notification_type} for {data.get('trackingId') or 'your account'}",
+            "status": 'queued', "sentVia": None, "sentAt": None, "attempts": 0, "delivered": [],
+        }
+        notification['nextAttemptAt'] = notification['createdAt'] = now_iso()
+        return notification
+
+    def send_notification(self, notification_type, data):
+        notification = self.build_notification(notification_type, data)
+        self.db['notifications'].insert_one(notification)
+        self.outbox.schedule(0.0)
+        return notification
+
+    def send_notifications(self, items):
+        """Queue many notifications with one insert and one drain wake-up"""
+        if not items:
+            return []
+        notifications = [self.build_notification(notification_type, data) for notification_type, data in items]
+        self.db['notifications'].insert_many(notifications)
+        self.outbox.schedule(0.0)
+        return notifications
+
+    def get_notifications(self, request):
+        user = self.get_user(request)
+        if not user or user.get('role') != 'admin':
+            return json_response({"error": "Admin access required"}, 403)
+        page = find_page(self.db, 'notifications', {}, **page_params(request))
+        if page is None:
+            return json_response({"error": "Invalid cursor"}, 400)
+        return json_response({"notifications": page['items'], "nextCursor": page['nextCursor']})
+
+    def drain_notifications(self, request):
+        user = self.get_user(request)
+        if not user or user.get('role') != 'admin':
+            return json_response({"error": "Admin access required"}, 403)
+        max_batches = int(request.query['maxBatches']) if request.query.get('maxBatches') else None
+        return json_response({**self.outbox.drain(max_batches), **self.outbox.stats()})
+
+    def notification_stats(self, request):
+        user = self.get_user(request)
+        if not user or user.get('role') != 'admin':
+            return json_response({"error": "Admin access required"}, 403)
+        return json_response(self.outbox.stats())
+
+    # ----- invoices -----
+    def get_invoice(self, request, order_id):
+        order = self.db['orders'].find_one({"id": order_id})
+        if not order:
+            return json_response({"error": "Order not found"}, 404)
+        user = self.db['users'].find_one({"id": order['userId']}) if order.get('userId') else None
+        return json_response({"invoice": invoice_for(order, user)})
+
+    def admin_export(self, request):
+        """Orders or invoices for a date range as NDJSON / CSV, read EXPORT_BATCH_SIZE at a time as the client reads"""
+        user = self.get_user(request)
+        if not user or user.get('role') != 'admin':
+            return json_response({"error": "Admin access required"}, 403)
+        kind = request.query.get('type') or 'orders'
+        fmt = request.query.get('format') or 'ndjson'
+        if kind not in EXPORT_COLUMNS:
+            return json_response({"error": "type must be orders or invoices"}, 400)
+        if fmt not in EXPORT_FORMATS:
+            return json_response({"error": "format must be ndjson or csv"}, 400)
+        start = request.query.get('from')
+        end = request.query.get('to') or start
+        created = export_range(start, end)
+        if not created:
+            return json_response({"error": f"from and to (YYYY-MM-DD) must cover 1-{EXPORT_MAX_DAYS} days"}, 400)
+        columns = EXPORT_COLUMNS[kind]
+        orders_collection, users_collection = self.db['orders'], self.db['users']
+
+        def stream():
+            after = (_sort_value(created['$gte']), _sort_value(''))
+            pending = ','.join(columns) + '\n' if fmt == 'csv' else ''
+            while True:
+                orders = orders_collection.find({"createdAt": created}, sort=EXPORT_SORT, limit=EXPORT_BATCH_SIZE, after=after,
+                                                exclude={'_id', 'qrCode', 'statusHistory'})
+                rows = orders
+                if kind == 'invoices':
+                    ids = list(dict.fromkeys(o['userId'] for o in orders if o.get('userId')))
+                    users = users_collection.find({"id": {"$in": ids}}) if ids else []
+                    by_id = {u['id']: u for u in users}
+                    rows = [invoice_for(o, by_id.get(o.get('userId'))) for o in orders]
+                lines = [pending] if pending else []
+                pending = ''
+                for row in rows:
+                    if fmt == 'csv':
+                        flat = invoice_row(row) if kind == 'invoices' else row
+                        lines.append(','.join(csv_cell(flat.get(c)) for c in columns) + '\n')
+                    else:
+                        lines.append(json.dumps(row, separators=(',', ':'), ensure_ascii=False) + '\n')
+                if lines:
+                    yield ''.join(lines).encode()
+                if len(orders) < EXPORT_BATCH_SIZE:
+                    return
+                after = (_sort_value(orders[-1]['createdAt']), _sort_value(orders[-1]['id']))
+
+        headers = {**cors(), 'Content-Type': EXPORT_FORMATS[fmt], 'Cache-Control': 'no-store', 'X-Accel-Buffering': 'no',
+                   'Content-Disposition': f'attachment; filename="freshfold-{kind}-{start}-to-{end}.{fmt}"'}
+        return StreamResponse(200, stream(), headers)
+
+    # ----- promo codes -----
+    def create_promo(self, request):
+        user = self.get_user(request)
+        if not user or user.get('role') != 'admin':
+            return json_response({"error": "Admin access required"}, 403)
+        body = request.json() or {}
+        if not body.get('code') or not body.get('type') or body.get('value') is None:
+            return json_response({"error": "Code, type, and value required"}, 400)
+        code = body['code'].upper()
+        if self.db['promo_codes'].find_one({"code": code}):
+            return json_response({"error": "Code already exists"}, 409)
+        promo = {"id": str(uuid.uuid4()), "code": code, "type": body['type'], "value": float(body['value']),
+                 "description": body.get('description') or '', "expiryDate": body.get('expiryDate'),
+                 "maxUses": int(body['maxUses']) if body.get('maxUses') else None, "currentUses": 0, "active": True, "createdAt": now_iso()}
+        self.db['promo_codes'].insert_one(promo)
+        return json_response({"promo": promo}, 201)
+
+    def validate_promo(self, request):
+        body = request.json() or {}
+        if not body.get('code'):
+            return json_response({"error": "Code required"}, 400)
+        promo = self.db['promo_codes'].find_one({"code": body['code'].upper(), "active": True})
+        if not promo:
+            return json_response({"error": "Invalid or expired promo code"}, 404)
+        if promo.get('expiryDate') and promo['expiryDate'] < now_iso():
+            return json_response({"error": "Promo code has expired"}, 400)
+        if promo.get('maxUses') and promo['currentUses'] >= promo['maxUses']:
+            return json_response({"error": "Usage limit reached"}, 400)
+        discount = money((body.get('subtotal') or 0) * promo['value'] / 100) if promo['type'] == 'percentage' else promo['value']
+        return json_response({"valid": True, "code": promo['code'], "type": promo['type'], "value": promo['value'],
+                              "discount": discount, "description": promo['description']})
+
+    def get_promos(self, request):
+        user = self.get_user(request)
+        if not user or user.get('role') != 'admin':
+            return json_response({"error": "Admin access required"}, 403)
+        return json_response({"promos": [public(p) for p in self.db['promo_codes'].find({}, sort=[("createdAt", -1)])]})
+
+    def toggle_promo(self, request, promo_id):
+        user = self.get_user(request)
+        if not user or user.get('role') != 'admin':
+            return json_response({"error": "Admin access required"}, 403)
+        promo = self.db['promo_codes'].find_one({"id": promo_id})
+        if not promo:
+            return json_response({"error": "Not found"}, 404)
+        self.db['promo_codes'].update_one({"id": promo_id}, {"$set": {"active": not promo['active']}})
+        return json_response({"message": 'Deactivated' if promo['active'] else 'Activated'})
+
+    # ----- drivers -----
+    def create_driver(self, request):
+        user = self.get_user(request)
+        if not user or user.get('role') != 'admin':
+            return json_response({"error": "Admin access required"}, 403)
+        body = request.json() or {}
+        if not body.get('name'):
+            return json_response({"error": "Driver name required"}, 400)
+        driver = {"id": str(uuid.uuid4()), "name": body['name'], "phone": body.get('phone') or '', "vehicle": body.get('vehicle') or '',
+                  "assignedZones": body.get('zones') or [], "zoneKeys": [suburb_key(z) for z in body.get('zones') or []],
+                  "status": 'active', "currentOrders": 0, "totalDeliveries": 0, "createdAt": now_iso()}
+        self.db['drivers'].insert_one(driver)
+        self.drivers.invalidate()
+        return json_response({"driver": driver}, 201)
+
+    def get_drivers(self, request):
+        user = self.get_user(request)
+        if not user or user.get('role') != 'admin':
+            return json_response({"error": "Admin access required"}, 403)
+        return json_response({"drivers": [public(d) for d in self.db['drivers'].find({}, sort=[("name", 1)])]})
+
+    def update_driver(self, request, driver_id):
+        user = self.get_user(request)
+        if not user or user.get('role') != 'admin':
+            return json_response({"error": "Admin access required"}, 403)
+        body = request.json() or {}
+        if not self.db['drivers'].find_one({"id": driver_id}):
+            return json_response({"error": "Driver not found"}, 404)
+        update = {}
+        if body.get('name'):
+            update['name'] = body['name']
+        for field in ('phone', 'vehicle'):
+            if field in body:
+                update[field] = body[field]
+        if body.get('zones'):
+            update['assignedZones'] = body['zones']
+            update['zoneKeys'] = [suburb_key(z) for z in body['zones']]
+        if body.get('status'):
+            update['status'] = body['status']
+        update['updatedAt'] = now_iso()
+        self.db['drivers'].update_one({"id": driver_id}, {"$set": update})
+        self.drivers.invalidate()
+        return json_response({"driver": public(self.db['drivers'].find_one({"id": driver_id}))})
+
+    def assign_driver(self, request, order_id):
+        user = self.get_user(request)
+        if not user or user.get('role') != 'admin':
+            return json_response({"error": "Admin access required"}, 403)
+        driver_id = (request.json() or {}).get('driverId')
+        order = self.db['orders'].find_one({"id": order_id})
+        if not order:
+            return json_response({"error": "Order not found"}, 404)
+        driver = None
+        if driver_id:
+            driver = self.db['drivers'].find_one({"id": driver_id})
+            if not driver:
+                return json_response({"error": "Driver not found"}, 404)
+        if order.get('driverId'):
+            self.db['drivers'].update_one({"id": order['driverId']}, {"$inc": {"currentOrders": -1}})
+        self.db['orders'].update_one({"id": order_id}, {"$set": {"driverId": driver_id, "driverName": (driver or {}).get('name'), "driverOverCap": False, "updatedAt": now_iso()}})
+        if driver:
+            self.db['drivers'].update_one({"id": driver_id}, {"$inc": {"currentOrders": 1}})
+        if order.get('driverId') != (driver_id or None):
+            self.drivers.move_load(order, order.get('driverId'), driver_id or None)
+        return json_response({"message": f"Assigned to {driver['name']}" if driver else 'Driver unassigned', "driverName": (driver or {}).get('name')})
+
+    # ----- capacity -----
+    def get_capacity(self, request):
+        date, suburb = request.query.get('date'), request.query.get('suburb')
+        if not date or not suburb:
+            return json_response({"error": "Date and suburb query params required"}, 400)
+        key = suburb_key(suburb)
+        settings = self.db['capacity_settings'].find_one({"suburbKey": key, "active": True})
+        max_per_slot = (settings or {}).get('maxPerSlot') or 5
+        counts = {}
+        for o in self.db['orders'].scan({"pickupDate": date, "suburbKey": key}):
+            counts[o['pickupTimeSlot']] = counts.get(o['pickupTimeSlot'], 0) + 1
+        capacity = [{"slot": slot, "maxCapacity": max_per_slot, "booked": counts.get(slot, 0),
+                     "available": max(0, max_per_slot - counts.get(slot, 0))} for slot in PICKUP_SLOTS]
+        return json_response({"date": date, "suburb": suburb, "capacity": capacity, "maxPerSlot": max_per_slot})
+
+    def get_capacity_calendar(self, request):
+        """Slot availability for a date range across suburbs from one settings read and one grouped scan"""
+        start = request.query.get('from') or ''
+        suburbs = [s.strip() for s in (request.query.get('suburbs') or '').split(',') if s.strip()]
+        if not ISO_DATE.match(start) or not suburbs:
+            return json_response({"error": "from (YYYY-MM-DD) and suburbs query params required"}, 400)
+        try:
+            first = datetime.strptime(start, '%Y-%m-%d')
+            end = request.query.get('to')
+            days = (datetime.strptime(end, '%Y-%m-%d') - first).days + 1 if end else int(request.query.get('days') or 14)
+        except ValueError:
+            days = 0
+        if not 1 <= days <= CALENDAR_MAX_DAYS:
+            return json_response({"error": f"Date range must cover 1-{CALENDAR_MAX_DAYS} days"}, 400)
+        by_key = {}
+        for suburb in suburbs:
+            by_key.setdefault(suburb_key(suburb), suburb)
+        if len(by_key) > CALENDAR_MAX_SUBURBS:
+            return json_response({"error": f"At most {CALENDAR_MAX_SUBURBS} suburbs per request"}, 400)
+        dates = [(first + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days)]
+        keys = list(by_key)
+
+        settings = self.db['capacity_settings'].find({"suburbKey": {"$in": keys}, "active": True})
+        counts = {}
+        for o in self.db['orders'].scan({"suburbKey": {"$in": keys}, "pickupDate": {"$gte": dates[0], "$lte": dates[-1]}}):
+            cell = (o['suburbKey'], o['pickupDate'], o.get('pickupTimeSlot'))
+            counts[cell] = counts.get(cell, 0) + 1
+        lap('read')
+        max_by_key = {s['suburbKey']: s.get('maxPerSlot') for s in settings}
+        calendar = []
+        for key in keys:
+            max_per_slot = max_by_key.get(key) or 5
+            day_rows = []
+            for date in dates:
+                capacity = [{"slot": slot, "maxCapacity": max_per_slot, "booked": counts.get((key, date, slot), 0),
+                             "available": max(0, max_per_slot - counts.get((key, date, slot), 0))} for slot in PICKUP_SLOTS]
+                day_rows.append({"date": date, "available": sum(c['available'] for c in capacity), "capacity": capacity})
+            calendar.append({"suburb": by_key[key], "maxPerSlot": max_per_slot, "days": day_rows})
+        return json_response({"from": dates[0], "to": dates[-1], "slots": PICKUP_SLOTS, "suburbs": calendar})
+
+    def migrate(self, request):
+        user = self.get_user(request)
+        if not user or user.get('role') != 'admin':
+            return json_response({"error": "Admin access required"}, 403)
+        migrations = run_migrations(self.db, force=request.query.get('force') == '1')
+        return json_response({"migrations": migrations, "indexes": ensure_indexes(self.db)})
+
+    def set_capacity(self, request):
+        user = self.get_user(request)
+        if not user or user.get('role') != 'admin':
+            return json_response({"error": "Admin access required"}, 403)
+        body = request.json() or {}
+        if not body.get('suburb') or not body.get('maxPerSlot'):
+            return json_response({"error": "Suburb and maxPerSlot required"}, 400)
+        key = suburb_key(body['suburb'])
+        self.db['capacity_settings'].update_one({"suburbKey": key}, {"$set": {
+            "suburb": body['suburb'], "suburbKey": key, "maxPerSlot": int(body['maxPerSlot']), "active": True, "updatedAt": now_iso()}}, upsert=True)
+        return json_response({"message": f"Capacity: {body['maxPerSlot']} per slot for {body['suburb']}"})
+
+    # ----- stripe webhook -----
+    def stripe_webhook(self, request):
+        try:
+            if self.stripe_webhook_secret:
+                verify_stripe_signature(request.body, request.header('stripe-signature'), self.stripe_webhook_secret)
+            event = json.loads(request.text())
+        except ValueError as e:
+            return json_response({"error": f"Webhook rejected: {e}"}, 400)
+        event_id = event.get('id') or hashlib.sha256(json.dumps(event, sort_keys=True).encode()).hexdigest()
+        lap('verify')
+        try:
+            self.db['webhook_logs'].insert_one({
+                "id": str(uuid.uuid4()), "eventId": event_id, "type": event.get('type'), "data": event.get('data'),
+                "eventCreated": event.get('created'), "status": 'pending', "attempts": 0, "deliveries": 1, "receivedAt": now_iso(),
+            })
+        except DuplicateKeyError:
+            self.db['webhook_logs'].update_one({"eventId": event_id}, {"$inc": {"deliveries": 1}})
+            return json_response({"received": True, "duplicate": True})
+        lap('record')
+        self.webhook_pool.submit(self._guard_webhook, self.process_webhook_event, event_id)
+        if time.time() - self.last_webhook_sweep_at >= WEBHOOK_STALE_MS / 1000.0:
+            self.last_webhook_sweep_at = time.time()
+            self.webhook_pool.submit(self._guard_webhook, self.sweep_webhooks)
+        return json_response({"received": True})
+
+    @staticmethod
+    def _guard_webhook(work, *args):
+        try:
+            work(*args)
+        except Exception as e:
+            print(f"Webhook processing failed: {e}")
+
+    def process_webhook_event(self, event_id):
+        row = self.db['webhook_logs'].find_one_and_update({"eventId": event_id, "status": 'pending'},
+                                                          {"$set": {"status": 'processing', "claimedAt": now_iso()}, "$inc": {"attempts": 1}})
+        if not row:
+            return
+        try:
+            result = self.apply_webhook_event(row)
+            self.db['webhook_logs'].update_one({"eventId": event_id}, {"$set": {"status": 'processed', "result": result, "processedAt": now_iso(),
+                                                                                "expireAt": iso_in(self.webhook_retention_ms)}})
+        except Exception as e:
+            print(f"Webhook {event_id} failed: {e}")
+            update = ({"status": 'failed', "error": str(e), "expireAt": iso_in(self.webhook_retention_ms)} if row['attempts'] >= WEBHOOK_MAX_ATTEMPTS
+                      else {"status": 'pending', "error": str(e)})
+            self.db['webhook_logs'].update_one({"eventId": event_id}, {"$set": update})
+
+    def sweep_webhooks(self):
+        cutoff = (datetime.now(timezone.utc) - timedelta(milliseconds=WEBHOOK_STALE_MS)).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+        stale = self.db['webhook_logs'].find({"$or": [{"status": 'pending', "receivedAt": {"$lt": cutoff}},
+                                                      {"status": 'processing', "claimedAt": {"$lt": cutoff}}]}, limit=WEBHOOK_SWEEP_BATCH)
+        for row in stale:
+            if row['status'] == 'processing':
+                self.db['webhook_logs'].update_one({"eventId": row['eventId'], "status": 'processing', "claimedAt": row['claimedAt']},
+                                                   {"$set": {"status": 'pending'}})
+            self.process_webhook_event(row['eventId'])
+        return len(stale)
+
+    def apply_webhook_event(self, row):
+        event_type, obj = row.get('type'), (row.get('data') or {}).get('object') or {}
+        if event_type in ('checkout.session.completed', 'checkout.session.async_payment_succeeded'):
+            order_id = (obj.get('metadata') or {}).get('orderId')
+            # Delayed payment methods complete unpaid and settle with async_payment_succeeded
+            if not order_id or obj.get('payment_status') == 'unpaid':
+                return {"skipped": True}
+            order = self._mark_order_paid(order_id)
+            self.db['payment_transactions'].update_one({"sessionId": obj.get('id'), "paymentStatus": {"$ne": 'paid'}},
+                                                       {"$set": {"paymentStatus": 'paid', "updatedAt": now_iso()}})
+            # Only the event that flipped the order to paid notifies
+            if order:
+                self.send_notification('payment_received', {"trackingId": order['trackingId'], "amount": order['total'],
+                                                            "email": order.get('guestEmail'), "name": order.get('guestName')})
+            return {"orderId": order_id, "paid": bool(order)}
+        if event_type == 'customer.subscription.deleted':
+            user_id = (obj.get('metadata') or {}).get('userId')
+            if not user_id:
+                return {"skipped": True}
+            cancelled = self.db['subscriptions'].update_one({"userId": user_id, "status": {"$ne": 'cancelled'}},
+                                                            {"$set": {"status": 'cancelled', "updatedAt": now_iso()}})
+            return {"userId": user_id, "cancelled": bool(cancelled)}
+        return {"ignored": True}
+
+    def webhook_stats(self, request):
+        user = self.get_user(request)
+        if not user or user.get('role') != 'admin':
+            return json_response({"error": "Admin access required"}, 403)
+        by_status, deliveries, events = {}, 0, 0
+        for row in self.db['webhook_logs'].scan():
+            status = row.get('status') or 'legacy'
+            by_status[status] = by_status.get(status, 0) + 1
+            deliveries += row.get('deliveries') or 1
+            events += 1
+        return json_response({"events": events, "deliveries": deliveries, "duplicates": deliveries - events, "byStatus": by_status})
+
+    def get_referral_code(self, request):
+        user = self.get_user(request)
+        if not user:
+            return json_response({"error": "Unauthorized"}, 401)
+        return json_response({"referralCode": 'REF-' + user['id'][:8].upper(), "userId": user['id']})
+
+    # ----- router (same precedence as route.js) -----
+    # ----- metrics -----
+    def get_metrics(self, request):
+        user = self.get_user(request)
+        if not user or user.get('role') != 'admin':
+            return json_response({"error": "Admin access required"}, 403)
+        data = self.metrics.snapshot(reset=request.query.get('reset') == '1')
+        if request.query.get('collections') == '1':
+            data["collections"] = {name: self.db[name].count_documents() for name in MONITORED_COLLECTIONS}
+        return json_response({"enabled": self.server_timing, **data, "db": self.connector.snapshot(), "memory": process_memory()})
+
+    def handle(self, request):
+        parts = [unquote(p) for p in request.path.split('/') if p]
+        if parts and parts[0] == 'api':
+            parts = parts[1:]
+        capture = self.capture
+        if (not self.server_timing and not capture) or request.method == 'OPTIONS':
+            return self._route(request, parts)
+        timing = _timing.current = RequestTiming()
+        try:
+            response = self._route(request, parts)
+        finally:
+            _timing.current = None
+        total_ms = (time.perf_counter() - timing.start) * 1000
+        if self.server_timing:
+            response.headers['Server-Timing'] = timing.header(total_ms)
+            self.metrics.record(endpoint_key(request.method, parts), timing, total_ms)
+        if capture and parts[:1] != ['_local']:
+            capture.record(request, parts, timing.user, response, total_ms)
+        return response
+
+    def _route(self, request, parts):
+        if request.method == 'OPTIONS':
+            return json_response({})
+        if self.injected_delays:
+            delay_ms = self.injected_delays.get(endpoint_key(request.method, parts))
+            if delay_ms:
+                time.sleep(delay_ms / 1000.0)
+                lap('injected')
+        p = '/'.join(parts)
+        m = request.method
+        n = len(parts)
+        head = parts[0] if parts else None
+        second = parts[1] if n > 1 else None
+        routes = [
+            (p == 'health' and m == 'GET', lambda: json_response({"status": "ok", "service": "Fresh Fold API"})),
+            (p == 'auth/register' and m == 'POST', lambda: self.register(request)),
+            (p == 'auth/login' and m == 'POST', lambda: self.login(request)),
+            (p == 'auth/me' and m == 'GET', lambda: self.me(request)),
+            (p == 'auth/logout' and m == 'POST', lambda: self.logout(request)),
+            (p == 'auth/make-admin' and m == 'POST', lambda: self.make_admin(request)),
+            (p == 'plans' and m == 'GET', lambda: json_response({"plans": PLANS})),
+            (p == 'addons' and m == 'GET', lambda: json_response({"addons": ADDONS})),
+            (p == 'suburbs' and m == 'GET', lambda: json_response({"suburbs": SERVICE_SUBURBS})),
+            (p == 'bookings' and m == 'POST', lambda: self.create_booking(request)),
+            (p == 'bookings' and m == 'GET', lambda: self.get_bookings(request)),
+            (p == 'bookings/status' and m == 'POST', lambda: self.bulk_update_status(request)),
+            (head == 'bookings' and second == 'status' and n == 3 and m == 'PUT', lambda: self.update_booking_status(request, parts[2])),
+            (head == 'bookings' and n == 2 and m == 'GET', lambda: self.get_booking(request, parts[1])),
+            (head == 'bookings' and n == 2 and m == 'PUT', lambda: self.update_booking_status(request, parts[1])),
+            (head == 'tracking' and n == 2 and m == 'GET', lambda: self.get_tracking(request, parts[1])),
+            (head == 'tracking' and n == 3 and parts[2] == 'events' and m == 'GET', lambda: self.tracking_events(request, parts[1])),
+            (head == 'tracking' and n == 3 and parts[2] == 'qr' and m == 'GET', lambda: self.tracking_qr(request, parts[1])),
+            (p == 'checkout/session' and m == 'POST', lambda: self.create_checkout(request)),
+            (head == 'checkout' and second == 'status' and n == 3 and m == 'GET', lambda: self.checkout_status(request, parts[2])),
+            (p == 'complaints' and m == 'POST', lambda: self.create_complaint(request)),
+            (p == 'complaints' and m == 'GET', lambda: self.get_complaints(request)),
+            (head == 'complaints' and n == 2 and m == 'PUT', lambda: self.update_complaint(request, parts[1])),
+            (p == 'subscriptions' and m == 'POST', lambda: self.subscribe(request)),
+            (p == 'subscriptions' and m == 'GET', lambda: self.get_subscription(request)),
+            (p == 'subscriptions' and m == 'PUT', lambda: self.update_subscription(request)),
+            (p == 'admin/stats' and m == 'GET', lambda: self.admin_stats(request)),
+            (p == 'admin/stats/rebuild' and m == 'POST', lambda: self.rebuild_stats(request)),
+            (p == 'admin/orders' and m == 'GET', lambda: self.admin_orders(request)),
+            (p == 'admin/export' and m == 'GET', lambda: self.admin_export(request)),
+            (head == 'admin' and second == 'orders' and n == 3 and m == 'PUT', lambda: self.update_booking_status(request, parts[2])),
+            (p == 'admin/complaints' and m == 'GET', lambda: self.get_complaints(request)),
+            (head == 'admin' and second == 'complaints' and n == 3 and m == 'PUT', lambda: self.update_complaint(request, parts[2])),
+            (head == 'invoices' and n == 2 and m == 'GET', lambda: self.get_invoice(request, parts[1])),
+            (p == 'promo' and m == 'POST', lambda: self.create_promo(request)),
+            (p == 'promo/validate' and m == 'POST', lambda: self.validate_promo(request)),
+            (p == 'promo' and m == 'GET', lambda: self.get_promos(request)),
+            (head == 'promo' and n == 2 and m == 'PUT', lambda: self.toggle_promo(request, parts[1])),
+            (p == 'drivers' and m == 'POST', lambda: self.create_driver(request)),
+            (p == 'drivers' and m == 'GET', lambda: self.get_drivers(request)),
+            (head == 'drivers' and n == 2 and m == 'PUT', lambda: self.update_driver(request, parts[1])),
+            (head == 'drivers' and second == 'assign' and n == 3 and m == 'POST', lambda: self.assign_driver(request, parts[2])),
+            (p == 'capacity' and m == 'GET', lambda: self.get_capacity(request)),
+            (p == 'capacity/calendar' and m == 'GET', lambda: self.get_capacity_calendar(request)),
+            (p == 'capacity' and m == 'PUT', lambda: self.set_capacity(request)),
+            (p == 'webhook/stripe' and m == 'POST', lambda: self.stripe_webhook(request)),
+            (p == 'admin/webhooks/stats' and m == 'GET', lambda: self.webhook_stats(request)),
+            (p == 'notifications' and m == 'GET', lambda: self.get_notifications(request)),
+            (p == 'admin/migrate' and m == 'POST', lambda: self.migrate(request)),
+            (p == 'admin/notifications/drain' and m == 'POST', lambda: self.drain_notifications(request)),
+            (p == 'admin/notifications/stats' and m == 'GET', lambda: self.notification_stats(request)),
+            (p == 'referral' and m == 'GET', lambda: self.get_referral_code(request)),
+            (p == 'metrics' and m == 'GET', lambda: self.get_metrics(request)),
+            (head == '_local' and second == 'bulk' and n == 3 and m == 'POST', lambda: self.bulk_insert(request, parts[2])),
+            (p == '_local/config' and m == 'PUT', lambda: self.configure(request)),
+        ]
+        try:
+            for matched, handler in routes:
+                if matched:
+                    return handler()
+            return json_response({"error": "Not found", "path": p}, 404)
+        except Exception as e:
+            return json_response({"error": str(e) or 'Internal server error'}, 500)
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def _dispatch(self):
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        request = Request(self.command, url.path, query, self.headers, body)
+        response = self.server.app.handle(request)
+        self.send_response(response.status)
+        for name, value in response.headers.items():
+            self.send_header(name, value)
+        if isinstance(response, StreamResponse):
+            self._stream(response.body)
+            return
+        self.send_header('Content-Length', str(len(response.body)))
+        self.end_headers()
+        self.wfile.write(response.body)
+
+    def _stream(self, chunks):
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for chunk in chunks:
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            self.wfile.write(b'0\r\n\r\n')
+        except OSError:
+            # Watcher went away; the next write noticed
+            self.close_connection = True
+        finally:
+            chunks.close()
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_OPTIONS = _dispatch
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class LocalBackend:
+    """Runs a FreshFoldStandIn on a background HTTP server thread"""
+
+    def __init__(self, host='127.0.0.1', port=0, app=None, **app_kwargs):
+        self.app = app or FreshFoldStandIn(**app_kwargs)
+        self.server = _Server((host, port), _RequestHandler)
+        self.server.app = self.app
+        self.thread = None
+
+    @property
+    def db(self):
+        return self.app.db
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name='freshfold-local-backend', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fresh Fold local stand-in backend")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3001)
+    parser.add_argument("--no-seed", action="store_true", help="start with empty collections")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="simulated round trip per collection call")
+    parser.add_argument("--session-cache-ttl-ms", type=float, default=SESSION_CACHE_TTL_MS, help="token -> user cache TTL (0 disables)")
+    parser.add_argument("--qr-render-ms", type=float, default=0.0, help="simulated cost of rendering one QR image")
+    parser.add_argument("--notify-delay-ms", type=float, default=0.0, help="stub email/SMS provider latency")
+    parser.add_argument("--notify-failure-rate", type=float, default=0.0, help="share of stub provider sends that fail (0-1)")
+    parser.add_argument("--no-server-timing", action="store_true", help="omit Server-Timing headers (SERVER_TIMING=off)")
+    parser.add_argument("--stripe-webhook-secret", help="require Stripe-signed webhooks (STRIPE_WEBHOOK_SECRET)")
+    parser.add_argument("--capture-traffic", help="append scrubbed request records to this NDJSON file (TRAFFIC_CAPTURE_FILE)")
+    parser.add_argument("--capture-sample", type=float, default=1.0, help="share of sessions captured (TRAFFIC_CAPTURE_SAMPLE)")
+    parser.add_argument("--db-connect-ms", type=float, default=0.0, help="simulated client connect, migration and index check")
+    parser.add_argument("--db-handshake-ms", type=float, default=0.0, help="simulated cost of opening one pooled connection")
+    parser.add_argument("--max-pool-size", type=int, default=MONGO_MAX_POOL_SIZE, help="MONGO_MAX_POOL_SIZE")
+    parser.add_argument("--min-pool-size", type=int, default=MONGO_MIN_POOL_SIZE, help="MONGO_MIN_POOL_SIZE")
+    parser.add_argument("--no-db-warmup", action="store_true", help="connect on the first request instead of at boot (DB_WARMUP=off)")
+    args = parser.parse_args(argv)
+    backend = LocalBackend(args.host, args.port, seed=not args.no_seed, db_latency_ms=args.db_latency_ms,
+                           session_cache_ttl_ms=args.session_cache_ttl_ms, qr_render_ms=args.qr_render_ms,
+                           notify_delay_ms=args.notify_delay_ms, notify_failure_rate=args.notify_failure_rate,
+                           server_timing=not args.no_server_timing, stripe_webhook_secret=args.stripe_webhook_secret,
+                           capture_traffic=args.capture_traffic, capture_sample=args.capture_sample,
+                           db_connect_ms=args.db_connect_ms, db_handshake_ms=args.db_handshake_ms,
+                           max_pool_size=args.max_pool_size, min_pool_size=args.min_pool_size, db_warmup=not args.no_db_warmup)
+    print(f"Fresh Fold stand-in listening on {backend.base_url}")
+    try:
+        backend.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        backend.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
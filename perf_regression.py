@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Fresh Fold Performance Regression Suite
+Times a fixed set of API benchmarks built on FreshFoldAPITester, writes the
+results to versioned JSON under test_reports/perf/ and compares them with a
+stored baseline. Each benchmark is repeated over several runs; the median
+run is compared and the runs' median absolute deviation (MAD) sets the noise
+band, so a change only counts as a regression when it is both past the
+configured threshold and clearly outside run-to-run noise.
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+from load_test import percentile
+from perf_scenarios import _spread_bookings, admin_tester
+
+SCHEMA_VERSION = 1
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_reports", "perf")
+DEFAULT_BASELINE = os.path.join(RESULTS_DIR, "baseline.json")
+METRICS = ("p50_ms", "p95_ms", "throughput")
+# MAD * 1.4826 estimates the standard deviation of normally distributed runs
+MAD_TO_SIGMA = 1.4826
+
+
+def _benchmarks(tester, total):
+    """name -> callable issuing one request on the given session with the prepared tester's state"""
+    base = tester.base_url
+    headers = {"Authorization": f"Bearer {tester.auth_token}"}
+    credentials = {"email": tester.test_user["email"], "password": tester.test_user["password"]}
+    suburb, pickup_date, _ = tester.created_pickup
+    bookings = iter(_spread_bookings(total))
+    lock = threading.Lock()
+
+    def next_booking():
+        with lock:
+            return next(bookings)
+
+    return {
+        "auth-login": lambda s: s.post(f"{base}/auth/login", json=credentials),
+        "auth-me": lambda s: s.get(f"{base}/auth/me", headers=headers),
+        "booking-create": lambda s: s.post(f"{base}/bookings", json=next_booking()),
+        "tracking": lambda s: s.get(f"{base}/tracking/{tester.tracking_id}"),
+        "capacity": lambda s: s.get(f"{base}/capacity", params={"date": pickup_date, "suburb": suburb}),
+        "admin-stats": lambda s: s.get(f"{base}/admin/stats", headers=headers),
+        "listing": lambda s: s.get(f"{base}/admin/orders", params={"limit": 50}, headers=headers),
+    }
+
+
+def _summary(values):
+    median = statistics.median(values)
+    return {"median": median, "mad": statistics.median(abs(v - median) for v in values)}
+
+
+def _git_commit():
+    root = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True, text=True, timeout=10).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root, capture_output=True,
+                                    text=True, timeout=30).stdout.strip())
+    except (OSError, subprocess.SubprocessError):
+        return {"commit": "unknown", "dirty": None}
+    return {"commit": commit or "unknown", "dirty": dirty}
+
+
+class RegressionSuite:
+    """Runs the benchmarks `runs` times each and turns the runs into a versioned result document"""
+
+    def __init__(self, base_url, runs=5, requests_per_run=200, concurrency=4, warmup=20, only=None, target=None, log=print):
+        self.base_url = base_url
+        self.config = {"runs": runs, "requests": requests_per_run, "concurrency": concurrency, "warmup": warmup}
+        self.only = only
+        self.target = {"baseUrl": base_url, **(target or {})}
+        self.log = log
+
+    def _prepare(self):
+        tester = admin_tester(self.base_url)
+        # A slot nobody else books, so repeated runs never hit its capacity
+        pickup_date = (datetime.now() + timedelta(days=6000 + uuid.uuid4().int % 3000)).strftime('%Y-%m-%d')
+        if not tester.test_create_booking(pickup_date=pickup_date):
+            raise RuntimeError("Could not create the booking the benchmarks read")
+        return tester
+
+    def _run_once(self, call, count):
+        local = threading.local()
+
+        def timed(_):
+            if not hasattr(local, "session"):
+                local.session = requests.Session()
+            start = time.perf_counter()
+            try:
+                ok = call(local.session).status_code < 400
+            except requests.RequestException:
+                ok = False
+            return (time.perf_counter() - start) * 1000, ok
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.config["concurrency"]) as pool:
+            samples = list(pool.map(timed, range(count)))
+        wall = time.perf_counter() - start
+        latencies = sorted(ms for ms, _ in samples)
+        return {"p50_ms": percentile(latencies, 50), "p95_ms": percentile(latencies, 95),
+                "throughput": count / wall, "errors": sum(1 for _, ok in samples if not ok)}
+
+    def run(self):
+        runs, count, warmup = self.config["runs"], self.config["requests"], self.config["warmup"]
+        benchmarks = _benchmarks(self._prepare(), runs * count + warmup)
+        selected = {name: call for name, call in benchmarks.items() if not self.only or name in self.only}
+        per_run = {name: [] for name in selected}
+        for name, call in selected.items():
+            self._run_once(call, warmup)
+        # Rounds interleave the benchmarks, so a slow patch on the host spreads
+        # over all of them as run-to-run noise instead of sinking one benchmark
+        for _ in range(runs):
+            for name, call in selected.items():
+                per_run[name].append(self._run_once(call, count))
+        results = {}
+        for name, samples in per_run.items():
+            results[name] = {"runs": samples, **{metric: _summary([r[metric] for r in samples]) for metric in METRICS},
+                             "errors": sum(r["errors"] for r in samples)}
+            self.log(f"{name:<16} p50={results[name]['p50_ms']['median']:.2f}ms p95={results[name]['p95_ms']['median']:.2f}ms "
+                     f"(±{results[name]['p95_ms']['mad']:.2f}) {results[name]['throughput']['median']:.0f} req/s")
+        return {
+            "schema": SCHEMA_VERSION,
+            "createdAt": datetime.now(timezone.utc).isoformat(timespec='seconds').replace('+00:00', 'Z'),
+            "git": _git_commit(),
+            "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+            "target": self.target,
+            "config": self.config,
+            "benchmarks": results,
+        }
+
+
+def save_results(document, path=None):
+    """Write to `path`, or to a new test_reports/perf/<time>-<commit>.json; returns the path"""
+    if path is None:
+        stamp = document["createdAt"].replace(":", "").replace("-", "")
+        path = os.path.join(RESULTS_DIR, f"{stamp}-{document['git']['commit']}.json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+        f.write("\n")
+    return path
+
+
+def load_results(path):
+    with open(path) as f:
+        document = json.load(f)
+    if document.get("schema") != SCHEMA_VERSION:
+        raise ValueError(f"{path} has schema {document.get('schema')}, expected {SCHEMA_VERSION}")
+    return document
+
+
+def incompatibility(baseline, current):
+    """Why two result documents cannot be compared, or None"""
+    if baseline["config"] != current["config"]:
+        return f"benchmark config differs: baseline {baseline['config']} vs current {current['config']}"
+    for key in ("local", "dbLatencyMs"):
+        if baseline["target"].get(key) != current["target"].get(key):
+            return f"target {key} differs: baseline {baseline['target'].get(key)} vs current {current['target'].get(key)}"
+    return None
+
+
+def compare(baseline, current, max_p95_regression=20.0, max_throughput_regression=15.0, noise_k=3.0, min_p95_delta_ms=0.5):
+    """
+    Per benchmark and metric: ok, improved or regressed. A change regresses
+    when it is worse by more than the percentage threshold and by more than
+    noise_k standard deviations of the two runs' spread (plus, for p95, at
+    least min_p95_delta_ms, so sub-millisecond jitter on fast endpoints
+    never fails a build)
+    """
+    rows = []
+    for name, cur in current["benchmarks"].items():
+        base = baseline["benchmarks"].get(name)
+        if not base:
+            rows.append({"benchmark": name, "metric": "-", "verdict": "new"})
+            continue
+        for metric, higher_is_worse, limit in (("p95_ms", True, max_p95_regression), ("throughput", False, max_throughput_regression)):
+            before, after = base[metric]["median"], cur[metric]["median"]
+            noise = noise_k * MAD_TO_SIGMA * (base[metric]["mad"] + cur[metric]["mad"])
+            worse_by = after - before if higher_is_worse else before - after
+            pct = worse_by / before * 100 if before else 0.0
+            floor = min_p95_delta_ms if metric == "p95_ms" else 0.0
+            if worse_by > max(noise, floor) and pct > limit:
+                verdict = "REGRESSED"
+            elif -worse_by > max(noise, floor) and -pct > limit:
+                verdict = "improved"
+            else:
+                verdict = "ok"
+            rows.append({"benchmark": name, "metric": metric, "baseline": before, "current": after,
+                         "change_pct": (after - before) / before * 100 if before else 0.0, "noise": noise, "verdict": verdict})
+    return rows
+
+
+def report(rows, log=print):
+    log(f"{'benchmark':<16}{'metric':<12}{'baseline':>10}{'current':>10}{'change':>9}{'noise':>9}  verdict")
+    for row in rows:
+        if row["verdict"] == "new":
+            log(f"{row['benchmark']:<16}{'-':<12}{'':>10}{'':>10}{'':>9}{'':>9}  new (not in baseline)")
+            continue
+        log(f"{row['benchmark']:<16}{row['metric']:<12}{row['baseline']:>10.2f}{row['current']:>10.2f}"
+            f"{row['change_pct']:>+8.1f}%{row['noise']:>9.2f}  {row['verdict']}")
+    return sum(1 for row in rows if row["verdict"] == "REGRESSED")
+
+
+def run_regression(base_url, baseline_path=DEFAULT_BASELINE, save_baseline=False, max_p95_regression=20.0,
+                   max_throughput_regression=15.0, target=None, log=print, **options):
+    """Run, record and compare; returns the process exit code (0 ok, 1 regression, 2 not comparable)"""
+    log(f"=== Performance regression suite against {base_url} ===")
+    current = RegressionSuite(base_url, target=target, log=log, **options).run()
+    log(f"Results written to {save_results(current)}")
+    if save_baseline:
+        log(f"Baseline saved to {save_results(current, baseline_path)}")
+        return 0
+    if not os.path.exists(baseline_path):
+        log(f"No baseline at {baseline_path}; record one with --save-baseline")
+        return 0
+    baseline = load_results(baseline_path)
+    problem = incompatibility(baseline, current)
+    if problem:
+        log(f"Cannot compare with {baseline_path}: {problem}")
+        return 2
+    log(f"\n=== Against baseline {baseline['git']['commit']} from {baseline['createdAt']} "
+        f"(p95 +{max_p95_regression:.0f}% / throughput -{max_throughput_regression:.0f}% allowed) ===")
+    regressions = report(compare(baseline, current, max_p95_regression, max_throughput_regression), log)
+    log(f"{regressions} regression(s)" if regressions else "No regressions")
+    return 1 if regressions else 0
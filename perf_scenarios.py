@@ -0,0 +1,881 @@
+#!/usr/bin/env python3
+"""
+Fresh Fold Laundry Platform Performance Scenarios
+Targeted stress tests and benchmarks built on FreshFoldAPITester,
+run through `python backend_test.py --scenario <name>`
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import random
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+from backend_test import FreshFoldAPITester
+from export_client import MemorySampler, export
+from load_test import LoadGenerator, parse_server_timing, percentile
+from local_backend import PICKUP_SLOTS, SERVICE_SUBURBS, TRACKING_STATUSES
+from seed_data import BulkSeeder, StandInSink, SyntheticData
+from traffic_replay import TrafficReplayer, load_capture, report as report_replay
+from watch_client import WatcherPool
+from webhook_replay import WebhookReplayer
+
+
+def admin_tester(base_url):
+    """Registered tester promoted to admin, for scenarios that need admin endpoints"""
+    tester = FreshFoldAPITester(base_url)
+    tester.test_user["email"] = f"perf.admin.{uuid.uuid4().hex[:12]}@example.com"
+    tester.log = lambda message: None
+    if not (tester.test_user_registration() and tester.test_make_admin()):
+        raise RuntimeError("Could not create an admin user for the scenario")
+    return tester
+
+
+def latency_line(label, latencies_ms):
+    ordered = sorted(latencies_ms)
+    return (f"{label}: n={len(ordered)} p50={percentile(ordered, 50):.1f}ms "
+            f"p95={percentile(ordered, 95):.1f}ms p99={percentile(ordered, 99):.1f}ms max={(ordered or [0])[-1]:.1f}ms")
+
+
+def fire_concurrently(base_url, payloads, path="/bookings", headers=None):
+    """POST every payload at once (released together by a barrier); returns [(status, json, ms)]"""
+    barrier = threading.Barrier(len(payloads))
+    local = threading.local()
+
+    def send(payload):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        barrier.wait()
+        start = time.perf_counter()
+        try:
+            response = local.session.post(f"{base_url}{path}", json=payload, headers=headers, timeout=60)
+            body = response.json() if response.content else {}
+            return response.status_code, body, (time.perf_counter() - start) * 1000
+        except (requests.RequestException, ValueError) as e:
+            return 0, {"error": str(e)}, (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=len(payloads)) as pool:
+        return list(pool.map(send, payloads))
+
+
+def _booking(suburb, pickup_date, slot, **extra):
+    return {"type": "one-off", "suburb": suburb, "pickupDate": pickup_date, "pickupTimeSlot": slot,
+            "weightKg": 5, "guestEmail": f"race.{uuid.uuid4().hex[:10]}@example.com", "guestName": "Race Guest", **extra}
+
+
+def _spread_bookings(count, **extra):
+    """Bookings spread over suburbs, slots and far-future days so capacity never interferes"""
+    base_day = 4000 + uuid.uuid4().int % 3000
+    per_day = len(SERVICE_SUBURBS) * len(PICKUP_SLOTS)
+    payloads = []
+    for i in range(count):
+        pickup_date = (datetime.now() + timedelta(days=base_day + i // per_day)).strftime('%Y-%m-%d')
+        payloads.append(_booking(SERVICE_SUBURBS[i % len(SERVICE_SUBURBS)], pickup_date,
+                                 PICKUP_SLOTS[(i // len(SERVICE_SUBURBS)) % len(PICKUP_SLOTS)], **extra))
+    return payloads
+
+
+def run_capacity_race(base_url, concurrency=200, max_per_slot=5, max_uses=10, suburb="Torquay", log=print, **_):
+    """
+    Fire simultaneous POST /api/bookings at one suburb/date/slot and at one
+    limited-use promo code, then count overbooking and over-redemption
+    """
+    admin = admin_tester(base_url)
+    headers = {"Authorization": f"Bearer {admin.auth_token}"}
+    session = admin.session
+
+    # A date nobody else books, so the slot starts empty
+    pickup_date = (datetime.now() + timedelta(days=400 + uuid.uuid4().int % 3000)).strftime('%Y-%m-%d')
+    slot = PICKUP_SLOTS[0]
+    session.put(f"{base_url}/capacity", json={"suburb": suburb, "maxPerSlot": max_per_slot}, headers=headers)
+
+    log(f"=== Capacity race: {concurrency} concurrent bookings for {suburb} {pickup_date} {slot} (maxPerSlot={max_per_slot}) ===")
+    results = fire_concurrently(base_url, [_booking(suburb, pickup_date, slot) for _ in range(concurrency)])
+    created = sum(1 for status, _, _ in results if status == 201)
+    rejected = sum(1 for status, body, _ in results if status == 400 and 'fully booked' in body.get('error', ''))
+    capacity = session.get(f"{base_url}/capacity", params={"date": pickup_date, "suburb": suburb}).json()
+    booked = next((c["booked"] for c in capacity.get("capacity", []) if c["slot"] == slot), None)
+    overbooked = max(0, created - max_per_slot)
+    log(f"created={created} rejected_full={rejected} other={concurrency - created - rejected} booked_in_db={booked}")
+    log(f"{'❌' if overbooked else '✅'} overbooking: {overbooked} bookings past maxPerSlot")
+    log(latency_line("POST /bookings (slot race)", [ms for _, _, ms in results]))
+
+    # Promo race: spread bookings over free slots so capacity never interferes
+    code = f"RACE{uuid.uuid4().hex[:8].upper()}"
+    session.post(f"{base_url}/promo", json={"code": code, "type": "percentage", "value": 10, "maxUses": max_uses}, headers=headers)
+    payloads = _spread_bookings(concurrency, promoCode=code)
+
+    log(f"=== Promo race: {concurrency} concurrent bookings using {code} (maxUses={max_uses}) ===")
+    results = fire_concurrently(base_url, payloads)
+    redeemed = sum(1 for status, body, _ in results if status == 201 and body.get("order", {}).get("promoCode") == code)
+    promo = next((p for p in session.get(f"{base_url}/promo", headers=headers).json().get("promos", []) if p["code"] == code), {})
+    over_redeemed = max(0, redeemed - max_uses)
+    log(f"redeemed={redeemed} currentUses={promo.get('currentUses')} created={sum(1 for s, _, _ in results if s == 201)}")
+    log(f"{'❌' if over_redeemed else '✅'} over-redemption: {over_redeemed} discounts past maxUses")
+    log(latency_line("POST /bookings (promo race)", [ms for _, _, ms in results]))
+
+    return {"created": created, "overbooked": overbooked, "redeemed": redeemed, "over_redeemed": over_redeemed}
+
+
+def timed_get(session, url, samples, **kwargs):
+    latencies = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        response = session.get(url, timeout=600, **kwargs)
+        latencies.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+    return latencies
+
+
+def run_admin_stats_benchmark(base_url, sizes=(10_000, 100_000, 1_000_000), samples=20, live_samples=3, log=print, **_):
+    """Dashboard latency from the admin_stats projection vs live aggregation as order history grows"""
+    admin = admin_tester(base_url)
+    headers = {"Authorization": f"Bearer {admin.auth_token}"}
+    session = admin.session
+    seeder = BulkSeeder(StandInSink(base_url), log=log)
+    loaded = 0
+    rows = []
+    log("=== Admin stats benchmark: projection vs live aggregation ===")
+    for size in sizes:
+        if size > loaded:
+            seeder.run(orders=size - loaded, order_offset=loaded)
+            loaded = size
+        start = time.perf_counter()
+        rebuild = session.post(f"{base_url}/admin/stats/rebuild", headers=headers, timeout=600).json()
+        rebuild_ms = (time.perf_counter() - start) * 1000
+        projection = sorted(timed_get(session, f"{base_url}/admin/stats", samples, headers=headers))
+        live = sorted(timed_get(session, f"{base_url}/admin/stats", live_samples, headers=headers, params={"live": "1"}))
+        rows.append((size, rebuild.get("totalOrders"), percentile(projection, 50), percentile(projection, 95),
+                     percentile(live, 50), rebuild_ms))
+    log(f"{'orders':>10}{'counted':>10}{'proj p50':>11}{'proj p95':>11}{'live p50':>11}{'rebuild':>11}{'speedup':>9}")
+    for size, counted, p50, p95, live_p50, rebuild_ms in rows:
+        log(f"{size:>10}{counted or 0:>10}{p50:>9.1f}ms{p95:>9.1f}ms{live_p50:>9.1f}ms{rebuild_ms:>9.0f}ms{live_p50 / max(p50, 1e-9):>8.1f}x")
+    return rows
+
+
+def iter_pages(session, url, headers=None, params=None, key="orders"):
+    """Follow nextCursor through a paginated listing, yielding (items, response_bytes, ms) per page"""
+    params = dict(params or {})
+    while True:
+        start = time.perf_counter()
+        response = session.get(url, headers=headers, params=params, timeout=600)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        response.raise_for_status()
+        data = response.json()
+        yield data.get(key, []), len(response.content), elapsed_ms
+        if not data.get("nextCursor"):
+            return
+        params["cursor"] = data["nextCursor"]
+
+
+def run_paging_benchmark(base_url, sizes=(10_000, 100_000), page_size=50, depth=40, samples=10, log=print, **_):
+    """Latency and payload of the first and a deep page of GET /admin/orders as order history grows"""
+    admin = admin_tester(base_url)
+    headers = {"Authorization": f"Bearer {admin.auth_token}"}
+    session = admin.session
+    url = f"{base_url}/admin/orders"
+    seeder = BulkSeeder(StandInSink(base_url), log=log)
+    loaded = 0
+    rows = []
+    log(f"=== Paging benchmark: GET /admin/orders, {page_size} per page ===")
+    for size in sizes:
+        if size > loaded:
+            seeder.run(orders=size - loaded, order_offset=loaded)
+            loaded = size
+        first = sorted(timed_get(session, url, samples, headers=headers, params={"limit": page_size}))
+        walk = list(itertools.islice(iter_pages(session, url, headers, {"limit": page_size}), depth))
+        seen = sum(len(items) for items, _, _ in walk)
+        slim_bytes = sum(size_bytes for _, size_bytes, _ in walk) / max(len(walk), 1)
+        full = next(iter_pages(session, url, headers, {"limit": page_size, "include": "qrCode,statusHistory"}))
+        rows.append((size, percentile(first, 50), percentile(sorted(ms for _, _, ms in walk), 95), walk[-1][2], seen, slim_bytes, full[1]))
+    log(f"{'orders':>10}{'first p50':>11}{'walk p95':>11}{'page ' + str(depth):>11}{'rows':>8}{'slim KB':>9}{'full KB':>9}")
+    for size, first_p50, walk_p95, deep_ms, seen, slim_bytes, full_bytes in rows:
+        log(f"{size:>10}{first_p50:>9.1f}ms{walk_p95:>9.1f}ms{deep_ms:>9.1f}ms{seen:>8}{slim_bytes / 1024:>9.1f}{full_bytes / 1024:>9.1f}")
+    return rows
+
+
+def run_auth_cache_benchmark(base_url, samples=2000, log=print, **_):
+    """
+    Per-request auth overhead: GET /auth/me (test_auth_me in a hot loop) minus
+    unauthenticated GET /health, with the session cache on and off
+    """
+    tester = admin_tester(base_url)
+    session = tester.session
+    health = sorted(timed_get(session, f"{base_url}/health", samples))
+    # The stand-in can switch its cache at runtime; a real server runs once as configured
+    modes = [("cache on", 60_000), ("cache off", 0)]
+    if session.put(f"{base_url}/_local/config", json={}).status_code != 200:
+        modes = [("server default", None)]
+    log(f"=== Auth cache benchmark: {samples} x GET /auth/me ===")
+    log(latency_line("GET /health (no auth)", health))
+    rows = []
+    for label, ttl_ms in modes:
+        if ttl_ms is not None:
+            session.put(f"{base_url}/_local/config", json={"sessionCacheTtlMs": ttl_ms})
+        latencies = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            if not tester.test_auth_me():
+                raise RuntimeError("GET /auth/me failed during the benchmark")
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        overhead = percentile(latencies, 50) - percentile(health, 50)
+        rows.append((label, percentile(latencies, 50), overhead))
+        log(latency_line(f"GET /auth/me ({label})", latencies) + f" auth overhead p50={overhead:.2f}ms")
+    if len(modes) > 1:
+        session.put(f"{base_url}/_local/config", json={"sessionCacheTtlMs": modes[0][1]})
+
+    # Cached identities must still see role changes and logout straight away
+    tester.test_auth_me()
+    role = session.get(f"{base_url}/auth/me", headers={"Authorization": f"Bearer {tester.auth_token}"}).json()["user"]["role"]
+    log(f"{'✅' if role == 'admin' else '❌'} role change visible through the cache (role={role})")
+    revoked = tester.test_logout()
+    log(f"{'✅' if revoked else '❌'} logout revokes a cached token")
+    return rows
+
+
+def run_qr_benchmark(base_url, bookings=200, log=print, **_):
+    """
+    Booking latency with QR rendering off the critical path, and the cost of
+    that rendering isolated as a cold GET /tracking/{id}/qr minus a cached one
+    """
+    session = requests.Session()
+    created, tracking_ids = [], []
+    for i in range(bookings):
+        pickup_date = (datetime.now() + timedelta(days=1 + i % 60)).strftime('%Y-%m-%d')
+        payload = _booking(SERVICE_SUBURBS[i % len(SERVICE_SUBURBS)], pickup_date, PICKUP_SLOTS[i % len(PICKUP_SLOTS)])
+        start = time.perf_counter()
+        response = session.post(f"{base_url}/bookings", json=payload, timeout=60)
+        created.append((time.perf_counter() - start) * 1000)
+        if response.status_code == 201:
+            tracking_ids.append(response.json()["order"]["trackingId"])
+    if not tracking_ids:
+        raise RuntimeError("No bookings were created for the QR benchmark")
+
+    cold, warm, revalidated, sizes = [], [], [], []
+    for tracking_id in tracking_ids:
+        url = f"{base_url}/tracking/{tracking_id}/qr"
+        cold += timed_get(session, url, 1)
+        warm += timed_get(session, url, 1)
+        response = session.get(url)
+        sizes.append(len(response.content))
+        start = time.perf_counter()
+        status = session.get(url, headers={"If-None-Match": response.headers.get("ETag")}).status_code
+        revalidated.append((time.perf_counter() - start) * 1000)
+        if status != 304:
+            log(f"❌ {tracking_id}: revalidation returned {status}, expected 304")
+
+    log(f"=== QR benchmark: {len(tracking_ids)} bookings ===")
+    log(latency_line("POST /bookings (no inline QR)", created))
+    log(latency_line("GET /tracking/{id}/qr cold render", cold))
+    log(latency_line("GET /tracking/{id}/qr cached", warm))
+    log(latency_line("GET /tracking/{id}/qr 304", revalidated))
+    render_cost = percentile(sorted(cold), 50) - percentile(sorted(warm), 50)
+    log(f"QR render cost removed from POST /bookings: ~{render_cost:.1f}ms p50; "
+        f"image {sum(sizes) / len(sizes):.0f} bytes now fetched once per browser instead of with every listing row")
+    return {"booking_p50": percentile(sorted(created), 50), "render_cost_ms": render_cost}
+
+
+def _parse_iso(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def run_notification_benchmark(base_url, concurrency=200, provider_delay_ms=300, failure_rate=0.2, backoff_ms=200,
+                               legacy_rows=50, timeout=120, log=print, **_):
+    """
+    Booking latency with fast vs slow, flaky notification providers, then
+    outbox queue lag (enqueue -> delivery) until the queue drains. On the
+    stand-in, rows queued before the outbox (no nextAttemptAt) are seeded
+    first and must be closed out by the migration, not left pending
+    """
+    admin = admin_tester(base_url)
+    headers = {"Authorization": f"Bearer {admin.auth_token}"}
+    session = admin.session
+    configurable = session.put(f"{base_url}/_local/config", json={}).status_code == 200
+    if configurable and legacy_rows:
+        created = (datetime.now(timezone.utc) - timedelta(days=30)).isoformat().replace("+00:00", "Z")
+        session.post(f"{base_url}/_local/bulk/notifications", json=[
+            {"id": str(uuid.uuid4()), "type": "booking_confirmation", "data": {}, "email": "legacy@example.com", "phone": None,
+             "subject": "Booking confirmed", "message": "Legacy row", "status": "queued", "sentVia": None, "sentAt": None,
+             "createdAt": created} for _ in range(legacy_rows)]).raise_for_status()
+        session.post(f"{base_url}/admin/migrate", params={"force": "1"}, headers=headers).raise_for_status()
+    phases = [("fast providers", 0, 0.0), ("slow, flaky providers", provider_delay_ms, failure_rate)] if configurable else [("server providers", None, None)]
+    started_at = datetime.now().astimezone()
+    log(f"=== Notification outbox benchmark: {concurrency} concurrent bookings per phase ===")
+    for label, delay_ms, rate in phases:
+        if delay_ms is not None:
+            session.put(f"{base_url}/_local/config", json={"notifyDelayMs": delay_ms, "notifyFailureRate": rate, "notifyBackoffMs": backoff_ms})
+        results = fire_concurrently(base_url, _spread_bookings(concurrency, guestPhone="+61400999000"))
+        created = sum(1 for status, _, _ in results if status == 201)
+        log(latency_line(f"POST /bookings ({label}, {created} created)", [ms for _, _, ms in results]))
+
+    # Watch the queue drain, recording how stale the oldest pending row gets
+    deadline = time.time() + timeout
+    max_age = 0
+    while time.time() < deadline:
+        stats = session.get(f"{base_url}/admin/notifications/stats", headers=headers).json()
+        max_age = max(max_age, stats.get("oldestPendingAgeMs", 0))
+        pending = stats["counts"].get("queued", 0) + stats["counts"].get("sending", 0)
+        if not pending:
+            break
+        time.sleep(0.2)
+    else:
+        log(f"⚠️ queue not drained after {timeout}s: {stats['counts']}")
+    if configurable:
+        session.put(f"{base_url}/_local/config", json={"notifyDelayMs": 0, "notifyFailureRate": 0.0, "notifyBackoffMs": 2000})
+
+    lags, attempts, statuses = [], [], {}
+    for page, _, _ in iter_pages(session, f"{base_url}/notifications", headers, {"limit": 200}, key="notifications"):
+        recent = [n for n in page if _parse_iso(n["createdAt"]) >= started_at]
+        for n in recent:
+            statuses[n["status"]] = statuses.get(n["status"], 0) + 1
+            attempts.append(n.get("attempts") or 0)
+            if n.get("sentAt"):
+                lags.append((_parse_iso(n["sentAt"]) - _parse_iso(n["createdAt"])).total_seconds() * 1000)
+        if len(recent) < len(page):
+            break
+    log(latency_line("queue lag enqueue -> delivered", lags))
+    log(f"statuses={statuses} retries={sum(attempts)} max_attempts={max(attempts or [0])} oldest_pending_peak={max_age}ms")
+    return {"lag_p95": percentile(sorted(lags), 95), "statuses": statuses}
+
+
+def run_index_benchmark(base_url, sizes=(10_000, 100_000), samples=200, seed=42, log=print, **_):
+    """
+    Capacity-check and tracking-lookup latency as order history grows. On the
+    stand-in each size is also measured with indexes dropped (the regex-scan
+    era) and the capacity answers are compared between the two plans.
+    """
+    admin = admin_tester(base_url)
+    session = admin.session
+    configurable = session.put(f"{base_url}/_local/config", json={}).status_code == 200
+    data = SyntheticData(seed=seed)
+    seeder = BulkSeeder(StandInSink(base_url), seed=seed, log=log)
+    rng = random.Random(seed)
+    loaded = 0
+    rows = []
+    log("=== Index benchmark: capacity checks and tracking lookups ===")
+    for size in sizes:
+        if size > loaded:
+            seeder.run(orders=size - loaded, order_offset=loaded)
+            loaded = size
+        days = [(data.now - timedelta(days=rng.randint(0, data.days))).strftime('%Y-%m-%d') for _ in range(samples)]
+        suburbs = [rng.choice(SERVICE_SUBURBS[:10]) for _ in range(samples)]
+        tracking_ids = [data.tracking_id(rng.randrange(loaded)) for _ in range(samples)]
+        plans = [("indexed", True), ("no indexes", False)] if configurable else [("server", None)]
+        answers = {}
+        for label, indexed in plans:
+            if indexed is not None:
+                session.put(f"{base_url}/_local/config", json={"indexes": indexed})
+            capacity, tracking, answers[label] = [], [], []
+            # Unindexed scans get a handful of samples; they are orders of magnitude slower
+            count = samples if indexed is not False else max(3, samples // 40)
+            for day, suburb, tracking_id in list(zip(days, suburbs, tracking_ids))[:count]:
+                start = time.perf_counter()
+                response = session.get(f"{base_url}/capacity", params={"date": day, "suburb": suburb.upper()})
+                capacity.append((time.perf_counter() - start) * 1000)
+                answers[label].append([c["booked"] for c in response.json()["capacity"]])
+                start = time.perf_counter()
+                found = session.get(f"{base_url}/tracking/{tracking_id}").status_code == 200
+                tracking.append((time.perf_counter() - start) * 1000)
+                if not found:
+                    log(f"❌ seeded tracking ID {tracking_id} not found")
+            rows.append((size, label, percentile(sorted(capacity), 50), percentile(sorted(capacity), 95),
+                         percentile(sorted(tracking), 50), percentile(sorted(tracking), 95)))
+        if configurable:
+            session.put(f"{base_url}/_local/config", json={"indexes": True})
+            compared = len(answers["no indexes"])
+            same = answers["indexed"][:compared] == answers["no indexes"]
+            log(f"{'✅' if same else '❌'} {size} orders: capacity answers identical across plans ({compared} compared)")
+    log(f"{'orders':>10}  {'plan':<12}{'capacity p50':>14}{'p95':>10}{'tracking p50':>14}{'p95':>10}")
+    for size, label, cap50, cap95, trk50, trk95 in rows:
+        log(f"{size:>10}  {label:<12}{cap50:>12.1f}ms{cap95:>8.1f}ms{trk50:>12.1f}ms{trk95:>8.1f}ms")
+    return rows
+
+
+def _tracking_read_load(session, base_url, headers):
+    """(requests, summed db.orders ms) across the tracking endpoints since the last metrics reset"""
+    endpoints = session.get(f"{base_url}/metrics", headers=headers, params={"reset": "1"}, timeout=30).json().get("endpoints", {})
+    tracking = [phases for key, phases in endpoints.items() if key.startswith("GET /api/tracking/") and not key.endswith("/qr")]
+    return (sum(phases["total"]["count"] for phases in tracking),
+            sum(phases.get("db.orders", {}).get("sumMs", 0.0) for phases in tracking))
+
+
+def run_tracking_watch_benchmark(base_url, sizes=(2000,), orders=200, rounds=3, poll_interval=2.0,
+                                 modes=("sse", "long-poll", "poll"), log=print, **_):
+    """
+    Fan-out latency and order reads for N concurrent tracking watchers held as
+    SSE streams, long-polls or plain ETag polls while an admin advances order statuses
+    """
+    admin = admin_tester(base_url)
+    headers = {"Authorization": f"Bearer {admin.auth_token}"}
+    local = threading.local()
+
+    def advance(order, status, published):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        published[(order["trackingId"], status)] = time.perf_counter()
+        local.session.put(f"{base_url}/bookings/{order['id']}", json={"status": status}, headers=headers, timeout=60)
+
+    rows = []
+    for watchers in sizes:
+        for mode in modes:
+            # Fresh orders per run, so every run walks the same statuses
+            created = [body["order"] for status, body, _ in fire_concurrently(base_url, _spread_bookings(orders)) if status == 201]
+            if not created:
+                raise RuntimeError("No bookings were created for the tracking benchmark")
+            published, latencies, delivered = {}, [], {}
+
+            def on_status(tracking_id, status, at):
+                sent = published.get((tracking_id, status))
+                if sent is not None:
+                    latencies.append((at - sent) * 1000)
+                    delivered[status] = delivered.get(status, 0) + 1
+
+            async def run():
+                pool = WatcherPool(base_url, [order["trackingId"] for order in created], on_status)
+                pool.start(watchers, mode, interval=poll_interval)
+                ready = await pool.wait_ready()
+                await asyncio.to_thread(_tracking_read_load, admin.session, base_url, headers)
+                started, requests_before = time.perf_counter(), pool.requests
+                with ThreadPoolExecutor(max_workers=16) as updaters:
+                    for status in TRACKING_STATUSES[1:1 + rounds]:
+                        await asyncio.to_thread(lambda: list(updaters.map(lambda order: advance(order, status, published), created)))
+                        deadline = time.perf_counter() + poll_interval * 2 + 5
+                        while delivered.get(status, 0) < ready and time.perf_counter() < deadline:
+                            await asyncio.sleep(0.05)
+                window = time.perf_counter() - started
+                server = await asyncio.to_thread(_tracking_read_load, admin.session, base_url, headers)
+                await pool.stop()
+                return pool, ready, window, pool.requests - requests_before, server
+
+            pool, ready, window, client_requests, (server_requests, db_ms) = asyncio.run(run())
+            ordered = sorted(latencies)
+            rows.append({"watchers": watchers, "mode": mode, "ready": ready, "errors": pool.errors,
+                         "delivered": len(ordered), "expected": ready * rounds, "p50": percentile(ordered, 50),
+                         "p95": percentile(ordered, 95), "max": (ordered or [0])[-1], "window": window,
+                         "requests": server_requests or client_requests, "not_modified": pool.not_modified, "db_ms": db_ms})
+            log(f"{mode}: {ready}/{watchers} watchers ready, {len(ordered)}/{ready * rounds} deliveries in {window:.1f}s")
+
+    log(f"=== Tracking fan-out: {orders} orders per run, {rounds} status changes each, polls every {poll_interval}s ===")
+    log(f"{'watchers':>8}  {'mode':<10}{'delivered':>12}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'requests':>10}{'req/s':>8}{'db.orders ms':>14}")
+    for row in rows:
+        log(f"{row['watchers']:>8}  {row['mode']:<10}{row['delivered']:>6}/{row['expected']:<5}{row['p50']:>9.1f}{row['p95']:>9.1f}"
+            f"{row['max']:>9.1f}{row['requests']:>10}{row['requests'] / row['window']:>8.0f}{row['db_ms']:>14.1f}")
+    return rows
+
+
+def run_bulk_status_benchmark(base_url, orders=100, rounds=5, log=print, **_):
+    """
+    A driver round of `orders` status changes as that many PUT /bookings/{id}
+    calls versus one POST /bookings/status batch, on fresh orders each round
+    """
+    admin = admin_tester(base_url)
+    headers = {"Authorization": f"Bearer {admin.auth_token}"}
+    session = admin.session
+
+    def fresh_orders():
+        created = [body["order"]["id"] for status, body, _ in fire_concurrently(base_url, _spread_bookings(orders)) if status == 201]
+        if len(created) != orders:
+            raise RuntimeError(f"Only {len(created)}/{orders} bookings were created for the bulk status benchmark")
+        return created
+
+    def db_ms(response):
+        return sum(ms for name, ms in parse_server_timing(response.headers.get("Server-Timing", "")).items() if name.startswith("db."))
+
+    single, batch = [], []
+    for _ in range(rounds):
+        order_ids = fresh_orders()
+        start, server_db = time.perf_counter(), 0.0
+        for order_id in order_ids:
+            response = session.put(f"{base_url}/bookings/{order_id}", json={"status": "Picked Up", "note": "round"}, headers=headers, timeout=60)
+            if response.status_code != 200:
+                raise RuntimeError(f"Single status update failed: {response.status_code} {response.text}")
+            server_db += db_ms(response)
+        single.append(((time.perf_counter() - start) * 1000, server_db))
+
+        order_ids = fresh_orders()
+        updates = [{"orderId": order_id, "status": "Picked Up", "note": "round"} for order_id in order_ids]
+        start = time.perf_counter()
+        response = session.post(f"{base_url}/bookings/status", json={"updates": updates}, headers=headers, timeout=60)
+        elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code != 200 or response.json().get("updated") != orders:
+            raise RuntimeError(f"Bulk status update failed: {response.status_code} {response.text[:200]}")
+        batch.append((elapsed, db_ms(response)))
+
+    log(f"=== Bulk status benchmark: {orders} orders per round, {rounds} rounds ===")
+    log(f"{'':<28}{'p50 ms':>10}{'max ms':>10}{'per order':>11}{'server db ms':>14}")
+    rows = {}
+    for label, samples in ((f"{orders} x PUT /bookings/{{id}}", single), ("1 x POST /bookings/status", batch)):
+        wall = sorted(ms for ms, _ in samples)
+        db = sorted(ms for _, ms in samples)
+        rows[label] = {"p50": percentile(wall, 50), "db_p50": percentile(db, 50)}
+        log(f"{label:<28}{percentile(wall, 50):>10.1f}{wall[-1]:>10.1f}{percentile(wall, 50) / orders:>11.2f}{percentile(db, 50):>14.1f}")
+    single_p50, batch_p50 = (row["p50"] for row in rows.values())
+    log(f"Batch is {single_p50 / max(batch_p50, 1e-9):.1f}x faster end to end for a {orders}-order round")
+    return rows
+
+
+def run_capacity_calendar_benchmark(base_url, suburbs=("Geelong", "Newtown", "Highton", "Belmont", "Torquay", "Lara"),
+                                    days=14, bookings=240, rounds=10, log=print, **_):
+    """
+    A two-week availability grid across neighbouring suburbs built from one
+    GET /capacity per suburb-day versus a single GET /capacity/calendar,
+    checking that both give the same numbers
+    """
+    session = requests.Session()
+    first = datetime.now() + timedelta(days=4000 + uuid.uuid4().int % 3000)
+    dates = [(first + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days)]
+    payloads = [_booking(suburbs[i % len(suburbs)], dates[(i // (len(suburbs) * len(PICKUP_SLOTS))) % days],
+                         PICKUP_SLOTS[(i // len(suburbs)) % len(PICKUP_SLOTS)]) for i in range(bookings)]
+    created = sum(1 for status, _, _ in fire_concurrently(base_url, payloads) if status == 201)
+
+    def per_day_grid():
+        return {(suburb, date): session.get(f"{base_url}/capacity", params={"date": date, "suburb": suburb}, timeout=60).json()["capacity"]
+                for suburb in suburbs for date in dates}
+
+    def calendar_grid():
+        response = session.get(f"{base_url}/capacity/calendar", params={"from": dates[0], "days": days, "suburbs": ",".join(suburbs)}, timeout=60)
+        response.raise_for_status()
+        return {(row["suburb"], day["date"]): day["capacity"] for row in response.json()["suburbs"] for day in row["days"]}
+
+    per_day, calendar = per_day_grid(), calendar_grid()
+    mismatches = sum(1 for cell in per_day if per_day[cell] != calendar.get(cell))
+    booked = sum(slot["booked"] for cells in calendar.values() for slot in cells)
+
+    timings = {}
+    for label, build in ((f"{len(per_day)} x GET /capacity", per_day_grid), ("1 x GET /capacity/calendar", calendar_grid)):
+        samples = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            build()
+            samples.append((time.perf_counter() - start) * 1000)
+        timings[label] = samples
+
+    log(f"=== Capacity calendar: {len(suburbs)} suburbs x {days} days, {created} bookings seeded ===")
+    for label, samples in timings.items():
+        log(latency_line(label, samples))
+    per_day_p50, calendar_p50 = (percentile(sorted(samples), 50) for samples in timings.values())
+    log(f"Calendar is {per_day_p50 / max(calendar_p50, 1e-9):.1f}x faster for the grid; "
+        f"{booked} booked slots counted, {mismatches} of {len(per_day)} suburb-days differ from /capacity")
+    return {"mismatches": mismatches, "per_day_p50": per_day_p50, "calendar_p50": calendar_p50}
+
+
+def run_driver_assign_simulation(base_url, bookings=3000, concurrency=32, suburbs=("Lorne", "Point Lonsdale", "Queenscliff"),
+                                 drivers=12, per_cell=10, slot_max=4, log=print, **_):
+    """
+    Replay `bookings` bookings against a temporary fleet with overlapping
+    zones and report booking-time assignment latency (the `driver`
+    Server-Timing phase), orders per driver, slot-cap violations and
+    whether drivers' currentOrders agree with the orders they were given.
+    The stand-in is given a cap of `slot_max`; a real server uses its DRIVER_SLOT_MAX
+    """
+    admin = admin_tester(base_url)
+    headers = {"Authorization": f"Bearer {admin.auth_token}"}
+    session = admin.session
+    run = uuid.uuid4().hex[:6]
+    configurable = session.put(f"{base_url}/_local/config", json={"driverSlotMax": slot_max}).status_code == 200
+
+    # Driver i covers its home suburb and, for every other driver, the next one too
+    fleet = {}
+    for i in range(drivers):
+        zones = [suburbs[i % len(suburbs)]] + ([suburbs[(i + 1) % len(suburbs)]] if i % 2 else [])
+        response = session.post(f"{base_url}/drivers", json={"name": f"Sim {run} #{i + 1:02d}", "zones": zones}, headers=headers)
+        response.raise_for_status()
+        fleet[response.json()["driver"]["id"]] = response.json()["driver"]
+    for suburb in suburbs:
+        session.put(f"{base_url}/capacity", json={"suburb": suburb, "maxPerSlot": per_cell}, headers=headers)
+
+    first = datetime.now() + timedelta(days=5000 + uuid.uuid4().int % 3000)
+    cells_per_day = len(suburbs) * len(PICKUP_SLOTS)
+    payloads = []
+    for i in range(bookings):
+        cell = i % (cells_per_day * max(1, bookings // (cells_per_day * per_cell)))
+        payloads.append(_booking(suburbs[cell % len(suburbs)], (first + timedelta(days=cell // cells_per_day)).strftime('%Y-%m-%d'),
+                                 PICKUP_SLOTS[(cell // len(suburbs)) % len(PICKUP_SLOTS)]))
+    random.Random(7).shuffle(payloads)
+
+    local = threading.local()
+
+    def book(payload):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        start = time.perf_counter()
+        response = local.session.post(f"{base_url}/bookings", json=payload, timeout=60)
+        elapsed = (time.perf_counter() - start) * 1000
+        order = response.json().get("order") if response.status_code == 201 else None
+        phases = parse_server_timing(response.headers.get("Server-Timing", ""))
+        return order, elapsed, phases.get("driver")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(book, payloads))
+    wall = time.perf_counter() - start
+
+    orders = [order for order, _, _ in results if order]
+    per_driver, per_cell_load = {driver_id: 0 for driver_id in fleet}, {}
+    for order in orders:
+        if order["driverId"] in per_driver:
+            per_driver[order["driverId"]] += 1
+            cell = (order["driverId"], order["pickupDate"], order["pickupTimeSlot"])
+            per_cell_load[cell] = per_cell_load.get(cell, 0) + 1
+    unassigned = sum(1 for order in orders if not order["driverId"])
+    over_cap = sum(1 for count in per_cell_load.values() if count > slot_max)
+    flagged = sum(1 for order in orders if order.get("driverOverCap"))
+    current = {d["id"]: d.get("currentOrders", 0) for d in session.get(f"{base_url}/drivers", headers=headers).json()["drivers"] if d["id"] in fleet}
+    drifted = sum(1 for driver_id, count in per_driver.items() if current.get(driver_id) != count)
+    for driver_id in fleet:
+        session.put(f"{base_url}/drivers/{driver_id}", json={"status": "inactive"}, headers=headers)
+    if configurable:
+        session.put(f"{base_url}/_local/config", json={"driverSlotMax": 0})
+
+    log(f"=== Driver assignment: {len(orders)}/{bookings} bookings at concurrency {concurrency} in {wall:.1f}s, "
+        f"{drivers} drivers over {len(suburbs)} suburbs ===")
+    log(latency_line("driver phase", [ms for _, _, ms in results if ms is not None]))
+    log(latency_line("booking total", [ms for _, ms, _ in results]))
+    counts = sorted(per_driver.values())
+    mean = sum(counts) / len(counts)
+    spread = (sum((c - mean) ** 2 for c in counts) / len(counts)) ** 0.5
+    log(f"{'driver':<18}{'zones':<32}{'orders':>8}{'busiest slot':>14}")
+    for driver_id, driver in sorted(fleet.items(), key=lambda item: item[1]["name"]):
+        busiest = max((c for (d, _, _), c in per_cell_load.items() if d == driver_id), default=0)
+        log(f"{driver['name']:<18}{', '.join(driver['assignedZones']):<32}{per_driver[driver_id]:>8}{busiest:>14}")
+    log(f"Orders per driver: min={counts[0]} max={counts[-1]} mean={mean:.1f} stdev={spread:.1f} (cv {spread / max(mean, 1e-9):.2f}); "
+        f"{unassigned} unassigned, {over_cap} driver-slots over the cap of {slot_max} ({flagged} orders flagged driverOverCap), "
+        f"{drifted} drivers with drifted currentOrders")
+    return {"assigned": len(orders) - unassigned, "unassigned": unassigned, "over_cap": over_cap, "flagged": flagged,
+            "drifted": drifted, "per_driver": counts}
+
+
+def run_webhook_replay(base_url, orders=300, duplicates=3, forged=0.05, concurrency=32, secret=None, log=print, **_):
+    """
+    Pay `orders` fresh orders through a shuffled burst of signed, duplicated
+    and forged checkout.session.completed deliveries, then check throughput,
+    ack latency and that each order was paid, counted and notified once
+    """
+    admin = admin_tester(base_url)
+    headers = {"Authorization": f"Bearer {admin.auth_token}"}
+    generated = secret is None
+    if generated:
+        secret = f"whsec_{uuid.uuid4().hex}"
+        if requests.put(f"{base_url}/_local/config", json={"stripeWebhookSecret": secret}, timeout=10).status_code != 200:
+            log("Target has no /_local/config: sending unsigned events, pass --secret to sign them")
+            secret = generated = None
+    created = [body["order"] for status, body, _ in fire_concurrently(base_url, _spread_bookings(orders)) if status == 201]
+    batch = [(order["id"], order["trackingId"], order["total"]) for order in created]
+
+    replayer = WebhookReplayer(base_url, secret=secret, admin_headers=headers, concurrency=concurrency)
+    revenue_before = replayer.revenue()
+    since = datetime.utcnow().isoformat(timespec='milliseconds') + 'Z'
+    deliveries = replayer.build([order_id for order_id, _, _ in batch], duplicates=duplicates, forged_share=forged)
+    try:
+        burst = replayer.fire(deliveries)
+        applied_after = replayer.wait_applied()
+        check = replayer.check_exactly_once(batch, revenue_before, since)
+    finally:
+        if generated:
+            requests.put(f"{base_url}/_local/config", json={"stripeWebhookSecret": None}, timeout=10)
+
+    outcomes = burst["outcomes"]
+    exactly_once = (outcomes["acked"] == len(batch) and not outcomes["unexpected"] and not outcomes["error"]
+                    and not check["unpaid"] and not check["wrong_notifications"]
+                    and abs(check["revenue_delta"] - check["expected_revenue"]) < 0.01)
+    log(f"=== Webhook replay: {len(deliveries)} deliveries for {len(batch)} events at concurrency {concurrency} "
+        f"({'signed' if secret else 'unsigned'}) ===")
+    log(f"{len(deliveries) / burst['wall']:.0f} deliveries/s over {burst['wall']:.2f}s; "
+        f"acked {outcomes['acked']}, duplicate {outcomes['duplicate']}, forged rejected {outcomes['rejected']}, "
+        f"unexpected {outcomes['unexpected']}, errors {outcomes['error']}")
+    log(latency_line("ack latency", burst["latencies"]))
+    log(f"All events applied {applied_after:.2f}s after the burst ended")
+    log(f"Exactly once: {'yes' if exactly_once else 'NO'} - {check['unpaid']} unpaid orders, "
+        f"{check['wrong_notifications']} orders without exactly one payment notification, "
+        f"revenue +{check['revenue_delta']:.2f} (expected +{check['expected_revenue']:.2f})")
+    return {"exactly_once": exactly_once, "outcomes": dict(outcomes), "wall": burst["wall"], **check}
+
+
+TRAFFIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_reports", "traffic")
+
+
+def run_traffic_replay(base_url, capture=None, speeds=(1, 10, 100), users=40, rate=25.0, duration=8.0, concurrency=64, log=print, **_):
+    """
+    Replay a traffic capture at each speed and report per-route latency next
+    to the captured timings. Without a capture file, first records `duration`
+    seconds of paced load_test virtual users on the stand-in (/_local/config
+    captureTraffic) and checks the capture holds no email addresses
+    """
+    if capture is None:
+        os.makedirs(TRAFFIC_DIR, exist_ok=True)
+        capture = os.path.join(TRAFFIC_DIR, f"{datetime.now():%Y%m%dT%H%M%S}.ndjson")
+        if requests.put(f"{base_url}/_local/config", json={"captureTraffic": capture}, timeout=10).status_code != 200:
+            raise RuntimeError("Target has no /_local/config to capture through; pass --capture with an existing capture")
+        try:
+            LoadGenerator(users=users, rate=rate, ramp_up=1.0, duration=duration, base_url=base_url, log=lambda message: None).run()
+        finally:
+            requests.put(f"{base_url}/_local/config", json={"captureTraffic": None}, timeout=10)
+    with open(capture) as f:
+        leaks = sum(1 for line in f if "@" in line)
+    records = load_capture(capture)
+    sessions = len({r.get("session") for r in records if r.get("session")})
+    log(f"=== Capture {capture}: {len(records)} requests, {sessions} sessions, {leaks} lines containing an email address ===")
+    summaries = []
+    for i, speed in enumerate(speeds):
+        # Each pass books past the previous one's dates, so replays never meet each other's full slots
+        replayer = TrafficReplayer(base_url, records, speed=speed, concurrency=concurrency, shift_days=61 * (i + 1), log=log)
+        summary = replayer.run()
+        report_replay(summary, log)
+        summaries.append(summary)
+    return {"capture": capture, "leaks": leaks, "summaries": summaries}
+
+
+COLD_START_VARIANTS = [
+    ("warm (reference)", None),
+    ("connect per caller (before)", {"singleFlightDb": False, "dbWarmup": False}),
+    ("single-flight", {"singleFlightDb": True, "dbWarmup": False}),
+    ("single-flight + warm-up", {"singleFlightDb": True, "dbWarmup": True}),
+]
+
+
+def _burst_get(url, count, **kwargs):
+    """GET `count` times at once (released together by a barrier); returns [(status, start, end, server timings)]"""
+    barrier = threading.Barrier(count)
+
+    def send(_):
+        session = requests.Session()
+        barrier.wait()
+        start = time.perf_counter()
+        try:
+            response = session.get(url, timeout=60, **kwargs)
+            status, timings = response.status_code, parse_server_timing(response.headers.get("Server-Timing", ""))
+        except requests.RequestException:
+            status, timings = 0, {}
+        return status, start, time.perf_counter(), timings
+
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        return list(pool.map(send, range(count)))
+
+
+def run_cold_start_benchmark(base_url, concurrency=200, rounds=3, connect_ms=300.0, handshake_ms=20.0, max_pool_size=100,
+                             min_pool_size=5, boot_ms=500.0, log=print, **_):
+    """
+    Restart the stand-in (/_local/config restart) with a cold database client
+    and release `concurrency` first requests (GET /capacity) boot_ms later:
+    connecting per caller as route.js used to, single flight, and single
+    flight with warm-up on boot, next to a burst on a warm server. Reports
+    time to first response, client and server (Server-Timing) latency, the
+    wait on db.connect and the clients and pooled connections opened
+    """
+    admin = admin_tester(base_url)
+    headers = {"Authorization": f"Bearer {admin.auth_token}"}
+    config = f"{base_url}/_local/config"
+    response = requests.put(config, json={}, timeout=10)
+    if response.status_code != 200:
+        raise RuntimeError("Target has no /_local/config to restart through")
+    before = response.json()
+    requests.put(config, json={"dbConnectMs": connect_ms, "dbHandshakeMs": handshake_ms, "maxPoolSize": max_pool_size,
+                               "minPoolSize": min_pool_size, "singleFlightDb": True, "dbWarmup": True, "restart": True}, timeout=10)
+    time.sleep(boot_ms / 1000.0)
+    params = {"date": (datetime.now() + timedelta(days=9000)).strftime('%Y-%m-%d'), "suburb": "Geelong"}
+    log(f"=== Cold start: {concurrency} first requests {boot_ms:.0f}ms after boot, connect {connect_ms:.0f}ms, "
+        f"{handshake_ms:.0f}ms per connection, pool {min_pool_size}-{max_pool_size}, {rounds} rounds ===")
+    rows = []
+    try:
+        for label, variant in COLD_START_VARIANTS:
+            firsts, latencies, server, waits, clients, connections, errors = [], [], [], [], [], [], 0
+            for _ in range(rounds):
+                if variant is not None:
+                    requests.put(config, json={**variant, "restart": True}, timeout=10)
+                    time.sleep(boot_ms / 1000.0)
+                opened = requests.get(f"{base_url}/metrics", headers=headers, timeout=10).json()["db"] if variant is None else None
+                results = _burst_get(f"{base_url}/capacity", concurrency, params=params)
+                errors += sum(1 for status, _, _, _ in results if status != 200)
+                released = min(start for _, start, _, _ in results)
+                firsts.append((min(end for _, _, end, _ in results) - released) * 1000)
+                latencies.extend((end - start) * 1000 for _, start, end, _ in results)
+                server.extend(timings.get("total", 0.0) for _, _, _, timings in results)
+                waits.append(max(timings.get("db.connect", 0.0) for _, _, _, timings in results))
+                db = requests.get(f"{base_url}/metrics", headers=headers, timeout=10).json()["db"]
+                clients.append(db["connects"] - (opened["connects"] if opened else 0))
+                connections.append(db["connectionsCreated"] - (opened["connectionsCreated"] if opened else 0))
+            latencies.sort()
+            server.sort()
+            row = {"variant": label, "first_ms": statistics.median(firsts), "p50_ms": percentile(latencies, 50),
+                   "p95_ms": percentile(latencies, 95), "server_p95_ms": percentile(server, 95), "connect_wait_ms": max(waits),
+                   "clients": max(clients), "connections": max(connections), "errors": errors}
+            rows.append(row)
+            log(f"{label:<28} first response {row['first_ms']:.0f}ms, p50 {row['p50_ms']:.0f}ms, p95 {row['p95_ms']:.0f}ms "
+                f"(server p95 {row['server_p95_ms']:.1f}ms, db.connect wait {row['connect_wait_ms']:.0f}ms); "
+                f"{row['clients']} client(s), {row['connections']} connections opened, {errors} errors")
+    finally:
+        db = before["db"]
+        requests.put(config, json={"dbConnectMs": before["dbConnectMs"], "dbHandshakeMs": before["dbHandshakeMs"],
+                                   "maxPoolSize": db["maxPoolSize"], "minPoolSize": db["minPoolSize"],
+                                   "singleFlightDb": db["singleFlight"], "dbWarmup": before["dbWarmup"], "restart": True}, timeout=10)
+    return rows
+
+def run_export_benchmark(base_url, sizes=(10_000, 100_000), users=2000, legacy_rows=300, log=print, **_):
+    """
+    Month-end export as order history grows: one streamed year of invoices
+    (NDJSON and CSV) and orders (CSV) against the per-order GET /invoices/{id}
+    calls an accounting script made before, with rows/s, time to first row
+    and the server's peak RSS growth (sampled from /api/metrics) per export
+    """
+    admin = admin_tester(base_url)
+    headers = {"Authorization": f"Bearer {admin.auth_token}"}
+    session = requests.Session()
+    seeder = BulkSeeder(StandInSink(base_url), seed=random.randrange(1 << 30), log=lambda message: None)
+    year = ("2025-01-01", "2025-12-31")
+    exports = [("invoices", "ndjson", year), ("invoices", "csv", year), ("orders", "csv", year)]
+    loaded = 0
+    rows = []
+    log(f"=== Bulk export: a year of invoices / orders streamed vs GET /invoices/{{id}} per order ({users} customers) ===")
+    for size in sizes:
+        if size > loaded:
+            seeder.run(users=0 if loaded else users, orders=size - loaded, order_offset=loaded, order_users=users)
+            loaded = size
+        for kind, fmt, (start, end) in exports:
+            with MemorySampler(base_url, headers) as memory:
+                result = export(base_url, headers, kind, start, end, fmt, session=session)
+            rows.append({"orders": size, "method": f"stream {kind} {fmt}", **result, "rss_growth": memory.growth})
+        december = [json.loads(line)["id"] for line in session.get(
+            f"{base_url}/admin/export", params={"type": "orders", "from": "2025-12-01", "to": "2025-12-31"}, headers=headers,
+            timeout=600).text.splitlines()[:legacy_rows]]
+        with MemorySampler(base_url, headers) as memory:
+            started = time.perf_counter()
+            for order_id in december:
+                session.get(f"{base_url}/invoices/{order_id}", timeout=30).raise_for_status()
+            seconds = time.perf_counter() - started
+        rows.append({"orders": size, "method": "GET /invoices/{id}", "rows": len(december), "bytes": None, "seconds": seconds,
+                     "first_row_ms": None, "rows_per_s": len(december) / seconds if seconds else 0.0, "rss_growth": memory.growth})
+    log(f"{'orders':>9}  {'method':<22}{'rows':>8}{'rows/s':>10}{'first row':>11}{'MiB':>8}{'RSS peak +':>12}")
+    for row in rows:
+        first = f"{row['first_row_ms']:.0f}ms" if row["first_row_ms"] is not None else "-"
+        size = f"{row['bytes'] / 2 ** 20:.1f}" if row["bytes"] is not None else "-"
+        growth = f"{row['rss_growth'] / 2 ** 20:.1f}MiB" if row["rss_growth"] is not None else "-"
+        log(f"{row['orders']:>9}  {row['method']:<22}{row['rows']:>8}{row['rows_per_s']:>10,.0f}{first:>11}{size:>8}{growth:>12}")
+    return rows
+
+
+SCENARIOS = {
+    "capacity-race": run_capacity_race,
+    "admin-stats": run_admin_stats_benchmark,
+    "paging": run_paging_benchmark,
+    "auth-cache": run_auth_cache_benchmark,
+    "qr": run_qr_benchmark,
+    "notifications": run_notification_benchmark,
+    "indexes": run_index_benchmark,
+    "tracking-watch": run_tracking_watch_benchmark,
+    "bulk-status": run_bulk_status_benchmark,
+    "capacity-calendar": run_capacity_calendar_benchmark,
+    "driver-assign": run_driver_assign_simulation,
+    "webhook-replay": run_webhook_replay,
+    "traffic-replay": run_traffic_replay,
+    "cold-start": run_cold_start_benchmark,
+    "export": run_export_benchmark,
+}
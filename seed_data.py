@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Fresh Fold Bulk Synthetic Data Seeder
+Streams millions of realistic users, orders, subscriptions, complaints and
+drivers into MongoDB or the local stand-in in fixed-size batches, so memory
+stays bounded and the same --seed always produces the same dataset.
+
+    python seed_data.py --base-url http://127.0.0.1:3001/api --users 100000 --orders 1000000
+    python seed_data.py --mongo-url mongodb://localhost:27017 --db freshfold --orders 1000000
+"""
+
+import argparse
+import hashlib
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import requests
+
+from local_backend import ADDONS, PICKUP_SLOTS, PLANS, SERVICE_SUBURBS, TRACKING_STATUSES, GST_RATE, ONE_OFF_RATE_PER_KG, qr_path, suburb_key
+
+SEED_NAMESPACE = uuid.UUID("5f0c1e2a-6b1d-4c58-9a57-0f4d9b8f1f00")
+SEED_PASSWORD_HASH = hashlib.sha256(b"password123").hexdigest()
+FIRST_NAMES = ["Olivia", "Jack", "Charlotte", "Noah", "Amelia", "William", "Isla", "Oliver", "Mia", "Thomas", "Ava", "James"]
+LAST_NAMES = ["Smith", "Jones", "Williams", "Brown", "Wilson", "Taylor", "Nguyen", "Johnson", "Martin", "White", "Anderson", "Walker"]
+COMPLAINT_CATEGORIES = ["Service Quality", "Late Delivery", "Missing Items", "Damaged Items", "Billing", "Other"]
+# Suburb popularity falls off roughly with distance from central Geelong
+SUBURB_WEIGHTS = [1.0 / (1 + i * 0.15) for i in range(len(SERVICE_SUBURBS))]
+
+
+def iso(moment):
+    return moment.isoformat(timespec="milliseconds") + "Z"
+
+
+def money(value):
+    return round(value + 1e-9, 2)
+
+
+class SyntheticData:
+    """Deterministic document factories; ids are derived from (seed, kind, index) so nothing is kept in memory"""
+
+    def __init__(self, seed=42, days=730, now=None):
+        self.seed = seed
+        self.days = days
+        self.now = now or datetime(2026, 1, 1)
+
+    def _id(self, kind, index):
+        return str(uuid.uuid5(SEED_NAMESPACE, f"{self.seed}:{kind}:{index}"))
+
+    def _rng(self, kind):
+        return random.Random(f"{self.seed}:{kind}")
+
+    def user_id(self, index):
+        return self._id("user", index)
+
+    def order_id(self, index):
+        return self._id("order", index)
+
+    def driver_id(self, index):
+        return self._id("driver", index)
+
+    def tracking_id(self, index):
+        # Multiplying by an odd constant is a bijection mod 2**32, so ids never collide
+        return "FF-%08X" % ((index * 2654435761 + self.seed) % 2 ** 32)
+
+    def users(self, count):
+        rng = self._rng("users")
+        for i in range(count):
+            uid = self.user_id(i)
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            created = self.now - timedelta(seconds=rng.randint(0, self.days * 86400))
+            subscription = None
+            if rng.random() < 0.15:
+                plan = rng.choice(PLANS)
+                status = rng.choices(["active", "paused", "cancelled"], [7, 1, 2])[0]
+                subscription = {
+                    "id": self._id("subscription", i), "userId": uid, "planId": plan["id"], "planName": plan["name"],
+                    "price": plan["price"], "status": status, "pickupsUsed": rng.randint(0, plan["pickupsPerMonth"]),
+                    "pickupsPerMonth": plan["pickupsPerMonth"], "maxWeightKg": plan["maxWeightKg"],
+                    "pausedAt": iso(created) if status == "paused" else None,
+                    "cancelledAt": iso(created) if status == "cancelled" else None,
+                    "createdAt": iso(created), "updatedAt": iso(created),
+                }
+            user = {
+                "id": uid, "name": name, "email": f"seed.user.{self.seed}.{i}@example.com", "password": SEED_PASSWORD_HASH,
+                "phone": "+614%08d" % rng.randint(0, 99999999), "suburb": rng.choices(SERVICE_SUBURBS, SUBURB_WEIGHTS)[0],
+                "role": "customer", "referralCode": "REF-" + uid[:8].upper(), "createdAt": iso(created),
+                "subscription": ({"planId": subscription["planId"], "planName": subscription["planName"], "status": subscription["status"]}
+                                 if subscription and subscription["status"] != "cancelled" else None),
+            }
+            yield user, subscription
+
+    @staticmethod
+    def suburbs_per_driver(drivers):
+        return max(1, len(SERVICE_SUBURBS) // max(drivers, 1))
+
+    def drivers(self, count):
+        rng = self._rng("drivers")
+        per_driver = self.suburbs_per_driver(count)
+        for i in range(count):
+            zones = [SERVICE_SUBURBS[(i * per_driver + z) % len(SERVICE_SUBURBS)] for z in range(max(per_driver, 3))]
+            yield {
+                "id": self.driver_id(i), "name": f"Seed Driver {i + 1}", "phone": "+614%08d" % rng.randint(0, 99999999),
+                "vehicle": rng.choice(["Van", "Hatchback", "Ute"]), "assignedZones": zones,
+                "zoneKeys": [suburb_key(z) for z in zones], "status": "active",
+                "currentOrders": 0, "totalDeliveries": rng.randint(0, 2000), "createdAt": iso(self.now),
+            }
+
+    def orders(self, count, users=0, drivers=0, start=0):
+        """Orders start..start+count; each chunk has its own stream so top-ups are reproducible too"""
+        rng = self._rng(f"orders:{start}")
+        for i in range(start, start + count):
+            created = self.now - timedelta(seconds=rng.randint(0, self.days * 86400))
+            age_days = (self.now - created).days
+            suburb_index = rng.choices(range(len(SERVICE_SUBURBS)), SUBURB_WEIGHTS)[0]
+            plan = rng.choice(PLANS) if rng.random() < 0.3 else None
+            weight = round(rng.uniform(2, 20), 1)
+            base = plan["price"] if plan else money(weight * ONE_OFF_RATE_PER_KG)
+            addons = [{**a, "quantity": 1, "subtotal": a["price"]} for a in rng.sample(ADDONS, rng.choices([0, 1, 2, 3], [5, 3, 2, 1])[0])]
+            addons_total = money(sum(a["subtotal"] for a in addons))
+            subtotal = money(base + addons_total)
+            gst = money(subtotal * GST_RATE)
+            # Older orders have progressed further through the tracking flow
+            stage = len(TRACKING_STATUSES) - 1 if age_days > 7 else min(len(TRACKING_STATUSES) - 1, rng.randint(0, age_days + 1))
+            history = [{"status": s, "timestamp": iso(created + timedelta(hours=4 * n)), "note": ""}
+                       for n, s in enumerate(TRACKING_STATUSES[:stage + 1])]
+            user_index = rng.randrange(users) if users and rng.random() < 0.8 else None
+            driver_index = (suburb_index // self.suburbs_per_driver(drivers)) % drivers if drivers else None
+            tracking_id = self.tracking_id(i)
+            yield {
+                "id": self.order_id(i), "trackingId": tracking_id,
+                "userId": self.user_id(user_index) if user_index is not None else None,
+                "guestEmail": f"seed.user.{self.seed}.{user_index}@example.com" if user_index is not None else f"guest.{i}@example.com",
+                "guestName": "Seed Customer", "guestPhone": None,
+                "type": "subscription" if plan else "one-off", "planId": plan["id"] if plan else None,
+                "planName": plan["name"] if plan else "One-Off Service",
+                "suburb": SERVICE_SUBURBS[suburb_index], "suburbKey": suburb_key(SERVICE_SUBURBS[suburb_index]),
+                "pickupDate": (created + timedelta(days=rng.randint(1, 7))).strftime("%Y-%m-%d"),
+                "pickupTimeSlot": rng.choice(PICKUP_SLOTS), "deliveryPreference": rng.choice(["standard", "standard", "express"]),
+                "items": rng.randint(1, 40), "weightKg": weight, "instructions": "",
+                "addons": addons, "baseCost": base, "addonsTotal": addons_total, "discount": 0, "promoCode": None,
+                "subtotal": subtotal, "gst": gst, "total": money(subtotal + gst),
+                "status": history[-1]["status"], "statusHistory": history,
+                "paymentStatus": "paid" if age_days > 1 or rng.random() < 0.6 else "pending",
+                "qrUrl": qr_path(tracking_id), "trackingUrl": f"http://localhost:3000?track={tracking_id}",
+                "driverId": self.driver_id(driver_index) if driver_index is not None else None,
+                "driverName": f"Seed Driver {driver_index + 1}" if driver_index is not None else None,
+                "itemsConfirmed": stage > 1, "createdAt": iso(created), "updatedAt": history[-1]["timestamp"],
+            }
+
+    def complaints(self, count, orders=0, users=0):
+        rng = self._rng("complaints")
+        for i in range(count):
+            created = self.now - timedelta(seconds=rng.randint(0, self.days * 86400))
+            user_index = rng.randrange(users) if users else None
+            yield {
+                "id": self._id("complaint", i), "ticketNumber": "TKT-%08X" % ((i * 2246822519 + self.seed) % 2 ** 32),
+                "orderId": self.order_id(rng.randrange(orders)) if orders else None,
+                "userId": self.user_id(user_index) if user_index is not None else None,
+                "userName": "Seed Customer", "userEmail": f"seed.user.{self.seed}.{user_index}@example.com" if user_index is not None else "",
+                "category": rng.choice(COMPLAINT_CATEGORIES), "description": "Seeded complaint",
+                "photoUrl": None, "photos": [], "status": rng.choices(["open", "in_progress", "resolved"], [2, 1, 6])[0],
+                "resolution": None, "refundAmount": None, "adminNotes": [], "createdAt": iso(created), "updatedAt": iso(created),
+            }
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class StandInSink:
+    """Writes batches through the local stand-in's /_local/bulk/{collection} endpoint"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+
+    def insert(self, collection, docs):
+        response = self.session.post(f"{self.base_url}/_local/bulk/{collection}", json=docs, timeout=600)
+        if response.status_code == 404:
+            raise RuntimeError(f"{self.base_url} is not the local stand-in; use --mongo-url to seed a real database")
+        response.raise_for_status()
+
+    def finish(self):
+        # Recompute the admin_stats projection through the real admin endpoint
+        from backend_test import FreshFoldAPITester
+        admin = FreshFoldAPITester(self.base_url)
+        admin.log = lambda message: None
+        admin.test_user["email"] = f"seed.admin.{uuid.uuid4().hex[:12]}@example.com"
+        if admin.test_user_registration() and admin.test_make_admin():
+            admin.session.post(f"{self.base_url}/admin/stats/rebuild",
+                               headers={"Authorization": f"Bearer {admin.auth_token}"}, timeout=3600)
+
+
+class MemorySink:
+    """Inserts straight into an in-process stand-in's MemoryDB"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def insert(self, collection, docs):
+        self.db[collection].insert_many(docs)
+
+    def finish(self):
+        self.db['admin_stats'].delete_many({})  # rebuilt lazily on the next dashboard load
+
+
+class MongoSink:
+    """Unordered insert_many into a real MongoDB (needs pymongo)"""
+
+    def __init__(self, mongo_url, db_name="freshfold"):
+        try:
+            from pymongo import MongoClient
+        except ImportError:
+            raise RuntimeError("Seeding MongoDB directly needs pymongo (pip install pymongo)")
+        self.db = MongoClient(mongo_url)[db_name]
+
+    def insert(self, collection, docs):
+        self.db[collection].insert_many(docs, ordered=False)
+
+    def finish(self):
+        self.db['admin_stats'].delete_many({})  # rebuilt lazily on the next dashboard load
+
+
+class BulkSeeder:
+    """Streams SyntheticData into a sink batch by batch with progress reporting"""
+
+    def __init__(self, sink, seed=42, batch_size=5000, log=print):
+        self.sink = sink
+        self.data = SyntheticData(seed)
+        self.batch_size = batch_size
+        self.log = log
+
+    def _stream(self, collection, docs, total):
+        started = time.time()
+        written = 0
+        for batch in batched(docs, self.batch_size):
+            self.sink.insert(collection, batch)
+            written += len(batch)
+            if written % (self.batch_size * 20) == 0 or written == total:
+                rate = written / max(time.time() - started, 1e-9)
+                self.log(f"  {collection}: {written}/{total} ({rate:,.0f} docs/s)")
+        return written
+
+    def _seed_users(self, users):
+        """Users and their subscriptions come from the same stream so user.subscription stays consistent"""
+        written = 0
+        for batch in batched(self.data.users(users), self.batch_size):
+            self.sink.insert("users", [user for user, _ in batch])
+            subscriptions = [sub for _, sub in batch if sub]
+            if subscriptions:
+                self.sink.insert("subscriptions", subscriptions)
+            written += len(batch)
+        if users:
+            self.log(f"  users: {written}/{users} (+ subscriptions)")
+
+    def run(self, users=0, orders=0, drivers=0, complaints=0, order_offset=0, order_users=None):
+        """order_users: users the orders belong to when topping up orders for users seeded by an earlier run"""
+        self.log(f"=== Seeding users={users} orders={orders} drivers={drivers} complaints={complaints} (seed={self.data.seed}) ===")
+        started = time.time()
+        self._seed_users(users)
+        self._stream("drivers", self.data.drivers(drivers), drivers)
+        self._stream("orders", self.data.orders(orders, users if order_users is None else order_users, drivers, start=order_offset), orders)
+        self._stream("complaints", self.data.complaints(complaints, orders, users), complaints)
+        self.sink.finish()
+        self.log(f"Seeding finished in {time.time() - started:.1f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fresh Fold bulk synthetic data seeder")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--base-url", help="local stand-in API URL, e.g. http://127.0.0.1:3001/api")
+    target.add_argument("--mongo-url", help="MongoDB connection string")
+    parser.add_argument("--db", default="freshfold", help="database name for --mongo-url")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--drivers", type=int, default=25)
+    parser.add_argument("--complaints", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42, help="same seed and counts produce the same dataset")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args(argv)
+    sink = StandInSink(args.base_url) if args.base_url else MongoSink(args.mongo_url, args.db)
+    BulkSeeder(sink, seed=args.seed, batch_size=args.batch_size).run(
+        users=args.users, orders=args.orders, drivers=args.drivers, complaints=args.complaints)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Fresh Fold Soak Test
+Sustains a realistic traffic mix (bookings, tracking, logins, payments) for
+hours while sampling, every interval, the server's resident memory and
+collection sizes from /api/metrics and the client-side per-endpoint latency
+of the window since the previous sample. Samples are appended to NDJSON
+under test_reports/soak/ as they are taken. At the end, growth rates are
+fitted over the steady half of the run and the run fails when memory keeps
+climbing, an append-only collection never levels off, or an endpoint's p95
+drifts upwards.
+"""
+
+import json
+import math
+import os
+import statistics
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+from load_test import DEFAULT_MIX, LoadGenerator
+from perf_scenarios import admin_tester, iter_pages
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_reports", "soak")
+# Every login adds a session row and every payment a webhook_logs row, on top of the default mix
+SOAK_MIX = {**DEFAULT_MIX, "login": 2, "payment": 1}
+# Collections only ever appended to by traffic; they must level off once their TTL / retention kicks in.
+# The rest hold business data that is expected to grow with bookings, so their rates are reported, not judged.
+BOUNDED_COLLECTIONS = ("sessions", "notifications", "webhook_logs")
+HOUR = 3600.0
+# A collection only counts as growing when its late-half trend is this many standard errors above zero;
+# sizes going up and down as TTL deletes catch up with bursts of inserts are noise, not growth
+GROWTH_T = 4.0
+# Sample windows with fewer requests to an endpoint give too noisy a p95 to judge drift on
+MIN_WINDOW_REQUESTS = 20
+
+
+def trend(points):
+    """
+    Least-squares slope of (seconds, value) points, per hour, and its t statistic
+    (slope over standard error; inf for an exact line, 0 when there is nothing to fit)
+    """
+    if len(points) < 3:
+        return 0.0, 0.0
+    mean_t = statistics.fmean(t for t, _ in points)
+    mean_v = statistics.fmean(v for _, v in points)
+    spread = sum((t - mean_t) ** 2 for t, _ in points)
+    if not spread:
+        return 0.0, 0.0
+    rate = sum((t - mean_t) * (v - mean_v) for t, v in points) / spread
+    residual = sum((v - mean_v - rate * (t - mean_t)) ** 2 for t, v in points)
+    error = (residual / (len(points) - 2) / spread) ** 0.5
+    return rate * HOUR, rate / error if error else (math.inf if rate else 0.0)
+
+
+def slope(points):
+    """Least-squares slope of (seconds, value) points, per hour"""
+    return trend(points)[0]
+
+
+class MetricsSampler:
+    """Reads memory and collection sizes from /api/metrics as an admin, logging in again if the session expired"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.tester = admin_tester(base_url)
+        self.session = requests.Session()
+
+    def sample(self):
+        for attempt in range(2):
+            response = self.session.get(f"{self.base_url}/metrics", params={"collections": "1"},
+                                        headers={"Authorization": f"Bearer {self.tester.auth_token}"}, timeout=30)
+            if response.status_code in (401, 403) and not attempt:
+                self.tester.test_user_login()
+                continue
+            response.raise_for_status()
+            data = response.json()
+            return {"rss": (data.get("memory") or {}).get("rss"), "collections": data.get("collections") or {}}
+
+
+class SoakTest:
+    """Runs the soak mix for `duration` seconds and samples the server every `interval` seconds"""
+
+    def __init__(self, base_url, duration=4 * HOUR, interval=60.0, users=10, rate=5.0, ramp_up=30.0, mix=None,
+                 max_rss_growth_mb=32.0, max_latency_drift=50.0, min_drift_ms=10.0, plateau_ratio=0.15,
+                 out=None, log=print):
+        self.base_url = base_url
+        self.duration = duration
+        self.interval = interval
+        self.max_rss_growth_mb = max_rss_growth_mb
+        self.max_latency_drift = max_latency_drift
+        self.min_drift_ms = min_drift_ms
+        self.plateau_ratio = plateau_ratio
+        self.log = log
+        self.out = out or os.path.join(RESULTS_DIR, f"soak-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.ndjson")
+        self.generator = LoadGenerator(users=users, rate=rate, ramp_up=ramp_up, duration=duration, mix=mix or SOAK_MIX,
+                                       base_url=base_url, log=lambda message: None, server_timing=False)
+        self.samples = []
+
+    def _take_sample(self, sampler, started, sink):
+        server = sampler.sample()
+        row = {"t": round(time.time() - started, 1), "rss": server["rss"], "collections": server["collections"],
+               "iterations": self.generator.iterations, "failedIterations": self.generator.failed_iterations,
+               "endpoints": {endpoint: {key: round(stats[key], 2) for key in ("count", "errors", "p50", "p95", "max")}
+                             for endpoint, stats in self.generator.recorder.drain().items()}}
+        self.samples.append(row)
+        sink.write(json.dumps(row, separators=(",", ":")) + "\n")
+        sink.flush()
+        rss = f"{row['rss'] / 2 ** 20:.0f} MiB" if row["rss"] is not None else "n/a"
+        sizes = " ".join(f"{name}={row['collections'][name]}" for name in BOUNDED_COLLECTIONS if name in row["collections"])
+        requests_in_window = sum(stats["count"] for stats in row["endpoints"].values())
+        self.log(f"[{row['t'] / 60:6.1f} min] rss {rss}, {requests_in_window} requests, {sizes}")
+
+    def run(self):
+        """Sample until the load finishes; returns the analysis and logs the verdict"""
+        sampler = MetricsSampler(self.base_url)
+        os.makedirs(os.path.dirname(os.path.abspath(self.out)), exist_ok=True)
+        self.log(f"=== Soak run: {self.generator.users} users at {self.generator.rate or 'unbounded'} it/s for "
+                 f"{self.duration / 60:.0f} min, sampling every {self.interval:.0f}s -> {self.out} ===")
+        load = threading.Thread(target=self.generator.run, daemon=True, name="freshfold-soak-load")
+        started = time.time()
+        with open(self.out, "w", encoding="utf-8") as sink:
+            self._take_sample(sampler, started, sink)
+            load.start()
+            while load.is_alive():
+                load.join(max(0.0, started + self.interval * len(self.samples) - time.time()))
+                if not load.is_alive() or time.time() >= started + self.interval * len(self.samples):
+                    self._take_sample(sampler, started, sink)
+        self.log(f"Iterations: {self.generator.iterations} completed, {self.generator.failed_iterations} failed")
+        return self.report(self.analyze())
+
+    def analyze(self):
+        """Growth rates over the steady second half of the run, compared with the first half where it matters"""
+        samples = [row for row in self.samples if row["t"] >= self.generator.ramp_up] or self.samples
+        half = len(samples) // 2
+        early, late = samples[:half + 1], samples[half:]
+        findings = {"samples": len(self.samples), "memory": None, "collections": {}, "endpoints": {}, "flags": []}
+
+        for name in sorted({name for row in samples for name in row["collections"]}):
+            early_rate = slope([(row["t"], row["collections"][name]) for row in early if name in row["collections"]])
+            late_rate, significance = trend([(row["t"], row["collections"][name]) for row in late if name in row["collections"]])
+            # levelled off: no clear upward trend in the steady half, or what it added is small next to the largest
+            # size seen. A collection that keeps growing linearly adds about a third of its peak there.
+            peak = max((row["collections"].get(name) or 0) for row in samples)
+            added = late_rate * (late[-1]["t"] - late[0]["t"]) / HOUR
+            flat = significance < GROWTH_T or added <= self.plateau_ratio * peak
+            findings["collections"][name] = {"size": samples[-1]["collections"].get(name), "earlyPerHour": early_rate,
+                                             "latePerHour": late_rate, "flat": flat, "bounded": name in BOUNDED_COLLECTIONS}
+            if name in BOUNDED_COLLECTIONS and not flat:
+                findings["flags"].append(f"{name} still growing at {late_rate:,.0f} rows/h")
+
+        rss = [(row["t"], row["rss"] / 2 ** 20) for row in late if row["rss"] is not None]
+        if rss:
+            growth = slope(rss)
+            # a server holding its data in process (the --local stand-in) grows with every stored row;
+            # per new document, that costs a few KiB, while a leak shows up with little or no data growth
+            documents = sum(max(row["latePerHour"], 0.0) for row in findings["collections"].values())
+            findings["memory"] = {"startMb": rss[0][1], "endMb": rss[-1][1], "mbPerHour": growth,
+                                  "kibPerDocument": growth * 1024 / documents if documents else None}
+            if growth > self.max_rss_growth_mb:
+                findings["flags"].insert(0, f"server RSS still growing at {growth:.1f} MiB/h")
+
+        quarter = max(1, len(samples) // 4)
+        for endpoint in sorted({endpoint for row in samples for endpoint in row["endpoints"]}):
+            windows = [(row["t"], row["endpoints"][endpoint]["p95"]) for row in samples
+                       if row["endpoints"].get(endpoint, {}).get("count", 0) >= MIN_WINDOW_REQUESTS]
+            if len(windows) < 4:
+                continue
+            first = statistics.median(p95 for _, p95 in windows[:quarter])
+            last = statistics.median(p95 for _, p95 in windows[-quarter:])
+            drift = (last / first - 1) * 100 if first else 0.0
+            drifting = drift > self.max_latency_drift and last - first > self.min_drift_ms
+            findings["endpoints"][endpoint] = {"firstP95": first, "lastP95": last, "driftPct": drift,
+                                               "msPerHour": slope(windows), "drifting": drifting}
+            if drifting:
+                findings["flags"].append(f"{endpoint} p95 drifted {first:.0f} -> {last:.0f} ms")
+        return findings
+
+    def report(self, findings):
+        log = self.log
+        memory = findings["memory"]
+        if memory:
+            status = "⚠️ growing" if memory["mbPerHour"] > self.max_rss_growth_mb else "✅ flat"
+            per_document = f" ({memory['kibPerDocument']:.1f} KiB per new document)" if memory["kibPerDocument"] is not None else ""
+            log(f"\nServer RSS {memory['startMb']:.0f} -> {memory['endMb']:.0f} MiB over the steady half, "
+                f"{memory['mbPerHour']:+.1f} MiB/h{per_document}  {status}")
+        log(f"\n{'collection':<24}{'size':>10}{'early /h':>12}{'late /h':>12}")
+        for name, row in findings["collections"].items():
+            status = ("✅ flat" if row["flat"] else "⚠️ unbounded") if row["bounded"] else "(business data)"
+            log(f"{name:<24}{row['size'] or 0:>10}{row['earlyPerHour']:>12,.0f}{row['latePerHour']:>12,.0f}  {status}")
+        log(f"\n{'endpoint':<34}{'p95 first':>10}{'p95 last':>10}{'drift':>8}{'ms/h':>8}")
+        for endpoint, row in findings["endpoints"].items():
+            status = "⚠️ drifting" if row["drifting"] else "✅ stable"
+            log(f"{endpoint:<34}{row['firstP95']:>10.1f}{row['lastP95']:>10.1f}{row['driftPct']:>7.0f}%"
+                f"{row['msPerHour']:>8.1f}  {status}")
+        if findings["flags"]:
+            log("\n⚠️ Soak found unbounded growth or drift:\n  " + "\n  ".join(findings["flags"]))
+        else:
+            log("\n✅ Soak stable: memory, append-only collections and latency all levelled off")
+        return findings
+
+
+def check_legacy_retention(base_url, rows=20):
+    """
+    Seed notifications the way sendNotification stored them before the outbox (queued,
+    no nextAttemptAt) on the local stand-in and re-run the migrations: every row must come
+    out final with an expireAt, or the TTL index never removes it. Returns a flag or None
+    """
+    tester = admin_tester(base_url)
+    headers = {"Authorization": f"Bearer {tester.auth_token}"}
+    created = (datetime.now(timezone.utc) - timedelta(days=90)).isoformat().replace("+00:00", "Z")
+    ids = {str(uuid.uuid4()) for _ in range(rows)}
+    tester.session.post(f"{base_url}/_local/bulk/notifications", json=[
+        {"id": row_id, "type": "booking_confirmation", "data": {}, "email": "legacy@example.com", "phone": None,
+         "subject": "Booking confirmed", "message": "Legacy row", "status": "queued", "sentVia": None, "sentAt": None,
+         "createdAt": created} for row_id in ids]).raise_for_status()
+    tester.session.post(f"{base_url}/admin/migrate", params={"force": "1"}, headers=headers).raise_for_status()
+    stuck = set(ids)
+    for page, _, _ in iter_pages(tester.session, f"{base_url}/notifications", headers, {"limit": 200}, key="notifications"):
+        stuck -= {n["id"] for n in page if n["status"] != "queued" and n.get("expireAt")}
+    return f"{len(stuck)} of {rows} legacy notifications left without an expiry" if stuck else None
+
+
+def run_soak(base_url, retention_ms=None, **kwargs):
+    """
+    Soak entry point for backend_test.py --soak. retention_ms shortens session TTL and
+    notification / webhook log retention on the local stand-in so expiry shows up within the run,
+    and first checks that pre-outbox notification rows get an expiry too.
+    Returns the process exit code
+    """
+    legacy = None
+    if retention_ms:
+        requests.put(f"{base_url}/_local/config", json={
+            "sessionTtlMs": retention_ms, "notificationRetentionMs": retention_ms, "webhookRetentionMs": retention_ms,
+            "ttlMonitorMs": min(retention_ms / 4, 60_000)}).raise_for_status()
+        legacy = check_legacy_retention(base_url)
+    soak = SoakTest(base_url, **kwargs)
+    if legacy:
+        soak.log(f"⚠️ {legacy}")
+    findings = soak.run()
+    return 1 if findings["flags"] or legacy else 0
@@ -0,0 +1,27 @@
+from load_test import percentile
+
+
+def test_percentile_nearest_rank_1_to_100():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile(values, 100) == 100
+    assert percentile(values, 7) == 7
+
+
+def test_percentile_nearest_rank_1_to_10():
+    values = list(range(1, 11))
+    assert percentile(values, 50) == 5
+    assert percentile(values, 95) == 10
+    assert percentile(values, 0) == 1
+
+
+def test_percentile_consistent_across_sizes():
+    # p50 is the lower middle for every even n, not skewed by round-half-to-even
+    for n in (2, 10, 20, 50, 100):
+        assert percentile(list(range(1, n + 1)), 50) == n // 2
+
+
+def test_percentile_empty():
+    assert percentile([], 95) == 0.0
@@ -0,0 +1,55 @@
+from local_backend import DriverAssigner, MemoryDB, NotificationOutbox, now_iso, run_migrations
+
+
+def legacy_notification(n):
+    # What sendNotification stored before the outbox: queued, but no attempts or nextAttemptAt
+    return {"id": f"legacy-{n}", "type": "booking_confirmation", "data": {}, "email": "old@example.com", "phone": None,
+            "subject": "Booking confirmed", "message": "Thanks", "status": "queued", "sentVia": None, "sentAt": None,
+            "createdAt": "2024-06-01T00:00:00.000Z"}
+
+
+def test_drain_ignores_legacy_queued_rows():
+    db = MemoryDB()
+    db['notifications'].insert_many([legacy_notification(n) for n in range(3)])
+    outbox = NotificationOutbox(db, worker=False)
+    assert outbox.drain() == {"batches": 0, "sent": 0, "retried": 0, "failed": 0}
+
+
+def test_migration_closes_out_legacy_queued_rows():
+    db = MemoryDB()
+    db['notifications'].insert_many([legacy_notification(n) for n in range(3)])
+    db['notifications'].insert_one({**legacy_notification(3), "attempts": 1, "nextAttemptAt": now_iso()})
+    run_migrations(db)
+    stats = NotificationOutbox(db, worker=False).stats()
+    assert stats["counts"] == {"logged": 3, "queued": 1}
+    assert stats["oldestPendingAgeMs"] > 0
+    assert NotificationOutbox(db, worker=False).drain()["sent"] == 1
+
+
+def test_legacy_rows_expire_after_retention_backfill_already_ran():
+    db = MemoryDB()
+    db['migrations'].insert_one({"id": "2026-retention-expiry", "appliedAt": now_iso()})
+    db['notifications'].insert_many([legacy_notification(n) for n in range(3)])
+    run_migrations(db)
+    assert all(n.get("expireAt") for n in db['notifications'].find({}))
+
+
+def one_driver_zone():
+    db = MemoryDB()
+    db['drivers'].insert_one({"id": "d1", "name": "Solo", "zoneKeys": ["lorne"], "status": "active", "currentOrders": 0})
+    return db
+
+
+def test_full_driver_is_booked_over_the_cap_not_left_unassigned():
+    db = one_driver_zone()
+    drivers = DriverAssigner(db, slot_max=1)
+    assert drivers.assign("lorne", "2030-01-01", "8am-10am") == ("d1", "Solo", False)
+    assert drivers.assign("lorne", "2030-01-01", "8am-10am") == ("d1", "Solo", True)
+    assert db['driver_slots'].find_one({"driverId": "d1"})["count"] == 2
+    assert db['drivers'].find_one({"id": "d1"})["currentOrders"] == 2
+
+
+def test_drivers_are_uncapped_by_default():
+    drivers = DriverAssigner(one_driver_zone())
+    assert [drivers.assign("lorne", "2030-01-01", "8am-10am") for _ in range(6)] == [("d1", "Solo", False)] * 6
+    assert drivers.assign("torquay", "2030-01-01", "8am-10am") is None
@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""
+Fresh Fold Traffic Replayer
+Reissues a traffic capture (the NDJSON route.js writes with
+TRAFFIC_CAPTURE_FILE set, or the stand-in with --capture-traffic) against a
+target at 1x, 10x or 100x speed. Requests keep their captured spacing divided
+by the speed, each captured session replays in order over its own connection
+and login, ids the capture saw being handed out are mapped to the ones the
+target hands out, and latency is reported per route next to the captured
+timings. A request that uses an id another session creates waits for that
+creation, however far behind schedule the creating session has fallen.
+"""
+
+import argparse
+import heapq
+import json
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+from load_test import parse_server_timing, percentile
+from local_backend import ADMIN_SECRET, CAPTURE_VERSION, PICKUP_SLOTS, SERVICE_SUBURBS
+
+Result = namedtuple("Result", "route status ms lag_ms captured_status captured_ms server_ms")
+
+PSEUDONYM = re.compile(r'^ref_[0-9a-f]{12}$')
+PLACEHOLDER = re.compile(r'^<(email|name|phone|secret|url|text)(?::(\w+))?>$')
+# Every replayed account shares one password, so captured logins match captured registrations
+REPLAY_PASSWORD = "replay-password"
+DATE_KEYS = {'pickupDate', 'date', 'from', 'to'}
+# Stripe signs webhook deliveries with a secret the capture never sees; webhook_replay.py covers that route
+SKIPPED_ROUTES = {'POST /api/webhook/stripe'}
+# Kind of record an id names, by the path segment before it (checkout session ids are Stripe's and get none)
+PATH_ID_KINDS = {'tracking': 'tracking', 'bookings': 'order', 'invoices': 'order', 'orders': 'order', 'assign': 'order',
+                 'complaints': 'complaint', 'drivers': 'driver', 'promo': 'promo'}
+BODY_ID_KINDS = {'orderId': 'order', 'orderIds': 'order', 'trackingId': 'tracking', 'driverId': 'driver'}
+
+
+def load_capture(path):
+    """Request records of a capture in time order; header lines are checked and dropped"""
+    records = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("type") == "capture":
+                if record.get("version") != CAPTURE_VERSION:
+                    raise ValueError(f"{path} is capture version {record.get('version')}, expected {CAPTURE_VERSION}")
+                continue
+            records.append(record)
+    records.sort(key=lambda r: r["at"])
+    return records
+
+
+def _id_kind(path, index):
+    if path[0] == 'checkout' or index == 0:
+        return None
+    previous = path[index - 1]
+    if previous == 'status':
+        return 'order' if path[0] == 'bookings' else None
+    return PATH_ID_KINDS.get(previous)
+
+
+def _status_class(status):
+    # A conditional poll answered 200 instead of 304 (or back) still did its job
+    return 2 if status == 304 else status // 100
+
+
+def _refs(value):
+    """Id and email pseudonyms anywhere in a captured path, query or body"""
+    if isinstance(value, dict):
+        return [ref for v in value.values() for ref in _refs(v)]
+    if isinstance(value, list):
+        return [ref for v in value for ref in _refs(v)]
+    if not isinstance(value, str):
+        return []
+    if PSEUDONYM.match(value):
+        return [value]
+    placeholder = PLACEHOLDER.match(value)
+    return [placeholder.group(2)] if placeholder and placeholder.group(1) == 'email' and placeholder.group(2) else []
+
+
+def _email_ref(record):
+    body = record.get("body") if isinstance(record.get("body"), dict) else {}
+    placeholder = PLACEHOLDER.match(str(body.get("email", "")))
+    return placeholder.group(2) if placeholder and placeholder.group(1) == 'email' else None
+
+
+def _issues(record):
+    """Pseudonyms a record hands out: returned ids, and the email of an account it registers"""
+    issued = list((record.get("returns") or {}).values())
+    if record["route"] == "POST /api/auth/register" and _email_ref(record):
+        issued.append(_email_ref(record))
+    return issued
+
+
+def _dig(data, dotted):
+    for key in dotted.split('.'):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+class ReplaySession:
+    """One captured session: its records in order, the live login standing in for it and its ETags"""
+
+    def __init__(self, key, records, email, http=None):
+        self.key = key
+        self.records = records
+        self.position = 0
+        self.role = next((r["role"] for r in records if r.get("role")), "customer" if key else "anonymous")
+        self.http = http or requests.Session()
+        self.token = None
+        self.email = email
+        self.etags = {}
+
+    @property
+    def needs_token(self):
+        """Keyed sessions the capture joined after they had logged in"""
+        return bool(self.key) and self.records[0]["route"] not in ("POST /api/auth/register", "POST /api/auth/login")
+
+
+class _ThreadLocalHttp:
+    """requests.Session-alike handing each worker thread its own keep-alive connection"""
+
+    def __init__(self, local):
+        self.local = local
+
+    def request(self, *args, **kwargs):
+        if not hasattr(self.local, "http"):
+            self.local.http = requests.Session()
+        return self.local.http.request(*args, **kwargs)
+
+
+class TrafficReplayer:
+    """Schedules captured records against base_url at `speed` and collects per-route results"""
+
+    def __init__(self, base_url, records, speed=1.0, concurrency=64, shift_days=None, admin_secret=ADMIN_SECRET, log=print):
+        self.base_url = base_url
+        self.records = records
+        self.speed = speed
+        self.concurrency = concurrency
+        self.admin_secret = admin_secret
+        self.log = log
+        if shift_days is None:
+            # Keep booked dates as far ahead of today as they were ahead of the capture
+            captured = datetime.fromtimestamp(records[0]["at"] / 1000, timezone.utc).date() if records else None
+            shift_days = (datetime.now(timezone.utc).date() - captured).days if captured else 0
+        self.shift_days = shift_days
+        self.nonce = uuid.uuid4().hex[:8]
+        self.ids = {}
+        self.results = []
+        self.skipped = 0
+        self.cond = threading.Condition()
+        self.heap = []
+        self.active = 0
+        # Ids the capture saw handed out that the replay has not handed out yet, and who waits for them
+        self.unissued = set()
+        self.parked = defaultdict(list)
+        self.local = threading.local()
+
+    def _email(self, ref=None):
+        return f"replay.{self.nonce}.{ref[4:] if ref else uuid.uuid4().hex[:12]}@example.com"
+
+    # ----- setup -----
+    def _sessions(self):
+        grouped = defaultdict(list)
+        for i, record in enumerate(self.records):
+            if record["route"] in SKIPPED_ROUTES or record.get("stream"):
+                self.skipped += 1
+                continue
+            self.unissued.update(_issues(record))
+            # Requests without a token have nothing tying them together and replay on their own
+            grouped[record.get("session") or f"anonymous-{i}"].append(record)
+        sessions = []
+        for key, records in grouped.items():
+            if key.startswith("anonymous-"):
+                # One request each, so they share the worker threads' connections instead of opening their own
+                sessions.append(ReplaySession(None, records, self._email(), http=_ThreadLocalHttp(self.local)))
+                continue
+            login = next((r for r in records if r["route"] in ("POST /api/auth/login", "POST /api/auth/register")), None)
+            sessions.append(ReplaySession(key, records, self._email(login and _email_ref(login))))
+        return sessions
+
+    def _register(self, email, admin=False, http=requests):
+        response = http.post(f"{self.base_url}/auth/register", timeout=60,
+                             json={"name": "Replay User", "email": email, "password": REPLAY_PASSWORD})
+        response.raise_for_status()
+        if admin:
+            http.post(f"{self.base_url}/auth/make-admin", json={"email": email, "secret": self.admin_secret},
+                      timeout=60).raise_for_status()
+        return response.json()["token"]
+
+    def _accounts(self, sessions):
+        """{email pseudonym: admin} for accounts the capture logs into but never saw registered"""
+        registered, accounts = set(), {}
+        for record in self.records:
+            ref = _email_ref(record)
+            if ref and record["route"] == "POST /api/auth/register":
+                registered.add(ref)
+            elif ref and ref not in registered:
+                accounts.setdefault(ref, False)
+        for session in sessions:
+            ref = _email_ref(session.records[0])
+            if ref in accounts and session.role == "admin":
+                accounts[ref] = True
+        return accounts
+
+    def _fixture(self, admin, kind, index):
+        """A live record standing in for one the capture referenced but never saw created"""
+        headers = {"Authorization": f"Bearer {admin.token}"}
+        url = self.base_url
+        if kind in ('order', 'tracking'):
+            day = (datetime.now() + timedelta(days=3000 + self.shift_days + index // (len(SERVICE_SUBURBS) * len(PICKUP_SLOTS)))).strftime('%Y-%m-%d')
+            order = admin.http.post(f"{url}/bookings", headers=headers, timeout=60, json={
+                "type": "one-off", "suburb": SERVICE_SUBURBS[index % len(SERVICE_SUBURBS)], "pickupDate": day,
+                "pickupTimeSlot": PICKUP_SLOTS[(index // len(SERVICE_SUBURBS)) % len(PICKUP_SLOTS)], "weightKg": 5,
+            }).json()["order"]
+            return order["trackingId"] if kind == 'tracking' else order["id"]
+        if kind == 'complaint':
+            return admin.http.post(f"{url}/complaints", headers=headers, timeout=60,
+                                   json={"category": "other", "description": "Replay fixture"}).json()["complaint"]["id"]
+        if kind == 'driver':
+            return admin.http.post(f"{url}/drivers", headers=headers, timeout=60,
+                                   json={"name": f"Replay Driver {index}", "zones": []}).json()["driver"]["id"]
+        if kind == 'promo':
+            return admin.http.post(f"{url}/promo", headers=headers, timeout=60,
+                                   json={"code": f"RPL{self.nonce}{index}".upper(), "type": "percentage", "value": 10}).json()["promo"]["id"]
+        return None
+
+    def _missing_ids(self):
+        """{pseudonym: kind} for ids used before (or without) the capture seeing them handed out"""
+        issued, missing = set(), {}
+        for record in self.records:
+            for index, segment in enumerate(record["path"]):
+                kind = _id_kind(record["path"], index)
+                if PSEUDONYM.match(segment) and segment not in issued and kind:
+                    missing.setdefault(segment, kind)
+            for key, kind in BODY_ID_KINDS.items():
+                value = (record.get("body") or {}).get(key) if isinstance(record.get("body"), dict) else None
+                for ref in (value if isinstance(value, list) else [value]):
+                    if isinstance(ref, str) and PSEUDONYM.match(ref) and ref not in issued:
+                        missing.setdefault(ref, kind)
+            issued.update((record.get("returns") or {}).values())
+        return missing
+
+    def prepare(self, sessions):
+        """
+        Create what the capture assumed already existed: accounts it logs into,
+        logins for sessions it joined mid-way and records behind ids it never
+        saw created. Not timed; returns (accounts, logins, fixtures)
+        """
+        admin = ReplaySession("fixtures", [{"route": "", "role": "admin"}], self._email())
+        admin.token = self._register(admin.email, admin=True, http=admin.http)
+        joined = [s for s in sessions if s.needs_token]
+        accounts = list(self._accounts(sessions).items())
+        missing = list(self._missing_ids().items())
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, 32)) as pool:
+            list(pool.map(lambda account: self._register(self._email(account[0]), admin=account[1]), accounts))
+            tokens = pool.map(lambda s: self._register(s.email, admin=s.role == "admin"), joined)
+            for session, token in zip(joined, tokens):
+                session.token = token
+            live = pool.map(lambda item: self._fixture(admin, item[1][1], item[0]), enumerate(missing))
+            self.ids.update((ref, value) for (ref, _), value in zip(missing, live) if value)
+        return len(accounts), len(joined), len(missing)
+
+    # ----- rehydration -----
+    def _fill(self, key, value, session):
+        if isinstance(value, list):
+            return [self._fill(key, v, session) for v in value]
+        if isinstance(value, dict):
+            return {k: self._fill(k, v, session) for k, v in value.items()}
+        if not isinstance(value, str):
+            return value
+        if PSEUDONYM.match(value):
+            return self.ids.get(value, value)
+        if key in DATE_KEYS and self.shift_days:
+            try:
+                return (datetime.strptime(value, '%Y-%m-%d') + timedelta(days=self.shift_days)).strftime('%Y-%m-%d')
+            except ValueError:
+                return value
+        placeholder = PLACEHOLDER.match(value)
+        if not placeholder:
+            return value
+        kind, detail = placeholder.groups()
+        if kind == 'text':
+            length = int(detail or 0)
+            return ("replayed text " * (length // 14 + 1))[:length]
+        if kind == 'email':
+            return self._email(detail) if detail else session.email
+        if kind == 'secret':
+            return self.admin_secret if key == 'secret' else REPLAY_PASSWORD
+        return {"name": "Replay User", "phone": "0400000000", "url": "http://localhost:3000"}[kind]
+
+    # ----- scheduling -----
+    def _due(self, record, start):
+        return start + (record["at"] - self.records[0]["at"]) / 1000.0 / self.speed
+
+    def _send(self, session, record, due):
+        path = '/'.join(self.ids.get(s, s) for s in record["path"])
+        url = f"{self.base_url}/{path}"
+        params = {k: v for k, v in self._fill('', record.get("query") or {}, session).items()
+                  if not (isinstance(v, str) and PSEUDONYM.match(v))}
+        headers = {}
+        if record.get("auth") and session.token:
+            headers["Authorization"] = f"Bearer {session.token}"
+        if record.get("conditional") and url in session.etags:
+            headers["If-None-Match"] = session.etags[url]
+        body = self._fill('', record.get("body"), session)
+        start = time.perf_counter()
+        try:
+            response = session.http.request(record["method"], url, params=params, headers=headers, timeout=60,
+                                            json=body if body is not None else None)
+            status = response.status_code
+        except requests.RequestException:
+            response, status = None, 0
+        elapsed = (time.perf_counter() - start) * 1000
+        server_ms = parse_server_timing(response.headers.get("Server-Timing", "")).get("total") if response is not None else None
+        self.results.append(Result(record["route"], status, elapsed, (start - due) * 1000, record["status"], record["durationMs"], server_ms))
+        if response is None:
+            return
+        if response.headers.get("ETag"):
+            session.etags[url] = response.headers["ETag"]
+        if record.get("returns") and response.ok and 'json' in response.headers.get("Content-Type", ''):
+            data = response.json()
+            for dotted, ref in record["returns"].items():
+                value = _dig(data, dotted)
+                if isinstance(value, str):
+                    self.ids[ref] = value
+                    if dotted == "token":
+                        session.token = value
+
+    def _waiting_on(self, record):
+        """An id this record uses that the replay has yet to hand out, or None"""
+        own = _issues(record)
+        for ref in _refs(record["path"]) + _refs(record.get("query")) + _refs(record.get("body")):
+            if ref in self.unissued and ref not in own:
+                return ref
+        return None
+
+    def _step(self, session, due, start):
+        record = session.records[session.position]
+        try:
+            self._send(session, record, due)
+        finally:
+            session.position += 1
+            with self.cond:
+                # Handed out or failed: either way nobody should keep waiting for these ids
+                for ref in _issues(record):
+                    self.unissued.discard(ref)
+                    for entry in self.parked.pop(ref, ()):
+                        heapq.heappush(self.heap, entry)
+                if session.position < len(session.records):
+                    heapq.heappush(self.heap, (self._due(session.records[session.position], start), id(session), session))
+                else:
+                    self.active -= 1
+                self.cond.notify()
+
+    def run(self):
+        sessions = self._sessions()
+        accounts, logins, fixtures = self.prepare(sessions)
+        self.log(f"Prepared {accounts} accounts, {logins} logins and {fixtures} records the capture assumed already existed")
+        start = time.perf_counter()
+        self.active = len(sessions)
+        self.heap = [(self._due(s.records[0], start), id(s), s) for s in sessions]
+        heapq.heapify(self.heap)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            with self.cond:
+                while self.active:
+                    if not self.heap:
+                        self.cond.wait()
+                        continue
+                    due, _, session = self.heap[0]
+                    delay = due - time.perf_counter()
+                    if delay > 0:
+                        self.cond.wait(delay)
+                        continue
+                    entry = heapq.heappop(self.heap)
+                    ref = self._waiting_on(session.records[session.position])
+                    if ref:
+                        self.parked[ref].append(entry)
+                        continue
+                    pool.submit(self._step, session, due, start)
+        return self.summary(len(sessions), time.perf_counter() - start)
+
+    # ----- reporting -----
+    def summary(self, sessions, wall):
+        routes = defaultdict(list)
+        for result in self.results:
+            routes[result.route].append(result)
+        rows = {}
+        for route, results in routes.items():
+            live = sorted(r.ms for r in results)
+            server = sorted(r.server_ms for r in results if r.server_ms is not None)
+            captured = sorted(r.captured_ms for r in results)
+            rows[route] = {
+                "count": len(results), "errors": sum(1 for r in results if r.status == 0 or r.status >= 500),
+                "drift": sum(1 for r in results if _status_class(r.status) != _status_class(r.captured_status)),
+                "p50": percentile(live, 50), "p95": percentile(live, 95), "p99": percentile(live, 99),
+                "server_p50": percentile(server, 50), "server_p95": percentile(server, 95),
+                "captured_p50": percentile(captured, 50), "captured_p95": percentile(captured, 95),
+            }
+        lags = sorted(max(r.lag_ms, 0.0) for r in self.results)
+        span = (self.records[-1]["at"] - self.records[0]["at"]) / 1000.0 if self.records else 0.0
+        return {"speed": self.speed, "requests": len(self.results), "sessions": sessions, "skipped": self.skipped,
+                "wall": wall, "span": span, "routes": rows,
+                "lag": {"p50": percentile(lags, 50), "p95": percentile(lags, 95), "max": (lags or [0.0])[-1]},
+                "errors": sum(row["errors"] for row in rows.values()), "drift": sum(row["drift"] for row in rows.values())}
+
+
+def report(summary, log=print):
+    log(f"=== Traffic replay at {summary['speed']:g}x: {summary['requests']} requests from {summary['sessions']} sessions "
+        f"in {summary['wall']:.2f}s, {summary['requests'] / max(summary['wall'], 1e-9):.0f} req/s (captured "
+        f"{summary['span']:.2f}s, {summary['requests'] / max(summary['span'], 1e-9):.0f} req/s; {summary['skipped']} not replayable) ===")
+    # p50/p95/p99: client round trip; srv: the target's Server-Timing total; cap: the captured server time
+    log(f"{'route':<40}{'count':>7}{'err':>5}{'drift':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        f"{'srv p50':>9}{'srv p95':>9}{'cap p50':>9}{'cap p95':>9}")
+    for route in sorted(summary["routes"], key=lambda r: -summary["routes"][r]["count"]):
+        row = summary["routes"][route]
+        log(f"{route:<40}{row['count']:>7}{row['errors']:>5}{row['drift']:>6}{row['p50']:>9.1f}{row['p95']:>9.1f}"
+            f"{row['p99']:>9.1f}{row['server_p50']:>9.1f}{row['server_p95']:>9.1f}{row['captured_p50']:>9.1f}{row['captured_p95']:>9.1f}")
+    lag = summary["lag"]
+    log(f"Schedule lag: p50={lag['p50']:.1f}ms p95={lag['p95']:.1f}ms max={lag['max']:.1f}ms; "
+        f"{summary['errors']} errors, {summary['drift']} responses whose status class differs from the capture")
+
+
+def replay(base_url, records, speeds=(1, 10, 100), concurrency=64, shift_days=None, admin_secret=ADMIN_SECRET, log=print):
+    """Replay the same records once per speed against base_url; returns one summary per speed"""
+    summaries = []
+    for speed in speeds:
+        replayer = TrafficReplayer(base_url, records, speed=speed, concurrency=concurrency, shift_days=shift_days,
+                                   admin_secret=admin_secret, log=log)
+        summary = replayer.run()
+        report(summary, log)
+        summaries.append(summary)
+    return summaries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fresh Fold captured traffic replayer")
+    parser.add_argument("capture", help="NDJSON traffic capture (TRAFFIC_CAPTURE_FILE / --capture-traffic)")
+    parser.add_argument("--base-url", help="API base URL, e.g. http://127.0.0.1:3001/api")
+    parser.add_argument("--local", action="store_true", help="replay each speed against a fresh in-process stand-in")
+    parser.add_argument("--speed", default="1,10,100", help="comma-separated speed-ups, e.g. 1,10,100")
+    parser.add_argument("--concurrency", type=int, default=64, help="requests in flight at most")
+    parser.add_argument("--shift-days", type=int, default=None, help="days added to captured dates (default: capture age)")
+    parser.add_argument("--admin-secret", default=ADMIN_SECRET, help="make-admin secret of the target")
+    args = parser.parse_args(argv)
+    if not args.base_url and not args.local:
+        parser.error("--base-url or --local is required")
+    records = load_capture(args.capture)
+    speeds = [float(s) for s in args.speed.split(",")]
+    if not args.local:
+        replay(args.base_url, records, speeds, args.concurrency, args.shift_days, args.admin_secret)
+        return
+    from local_backend import LocalBackend
+    for speed in speeds:
+        with LocalBackend() as backend:
+            replay(backend.base_url, records, [speed], args.concurrency, args.shift_days, args.admin_secret)
+
+
+if __name__ == "__main__":
+    main()
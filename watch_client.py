@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Fresh Fold Tracking Watchers
+Asyncio clients that hold thousands of concurrent order-tracking watchers
+over raw HTTP/1.1 streams, one socket each: SSE subscribers, long-pollers
+and plain ETag pollers. Every status change a watcher sees is reported to
+`on_status(tracking_id, status, perf_counter_seconds)`.
+"""
+
+import asyncio
+import json
+import random
+import time
+from urllib.parse import urlsplit
+
+
+class ApiEndpoint:
+    """host/port/path prefix of an API base URL such as http://127.0.0.1:3001/api"""
+
+    def __init__(self, base_url):
+        url = urlsplit(base_url)
+        if url.scheme != "http":
+            raise ValueError(f"Watchers speak plain HTTP only, got {base_url}")
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.prefix = url.path.rstrip("/")
+
+    async def connect(self):
+        return await asyncio.open_connection(self.host, self.port, limit=1 << 20)
+
+    def request(self, method, path, headers=None):
+        lines = [f"{method} {self.prefix}{path} HTTP/1.1", f"Host: {self.host}:{self.port}"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+
+async def read_head(reader):
+    """(status, lower-cased headers) of the next response on the connection"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    status = int(status_line.split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return status, headers
+
+
+async def iter_chunks(reader):
+    """Chunked transfer-encoding body, one chunk at a time"""
+    while True:
+        size = int((await reader.readline()).split(b";")[0], 16)
+        if size == 0:
+            await reader.readline()
+            return
+        data = await reader.readexactly(size)
+        await reader.readline()
+        yield data
+
+
+async def read_body(reader, status, headers):
+    if status in (204, 304):
+        return b""
+    if headers.get("transfer-encoding") == "chunked":
+        return b"".join([chunk async for chunk in iter_chunks(reader)])
+    return await reader.readexactly(int(headers.get("content-length") or 0))
+
+
+class WatcherPool:
+    """Runs N watchers of one kind against a set of tracking ids and waits until all are connected"""
+
+    def __init__(self, base_url, tracking_ids, on_status, connect_concurrency=200):
+        self.endpoint = ApiEndpoint(base_url)
+        self.tracking_ids = tracking_ids
+        self.on_status = on_status
+        self.connecting = asyncio.Semaphore(connect_concurrency)
+        self.ready = 0
+        self.errors = 0
+        self.requests = 0
+        self.not_modified = 0
+        self.tasks = []
+
+    async def _sse(self, tracking_id):
+        async with self.connecting:
+            reader, writer = await self.endpoint.connect()
+            writer.write(self.endpoint.request("GET", f"/tracking/{tracking_id}/events", {"Accept": "text/event-stream"}))
+            self.requests += 1
+            status, headers = await read_head(reader)
+        try:
+            if status != 200:
+                raise ConnectionError(f"events returned {status}")
+            buffer = b""
+            async for chunk in iter_chunks(reader):
+                buffer += chunk
+                while b"\n\n" in buffer:
+                    raw, buffer = buffer.split(b"\n\n", 1)
+                    fields = dict(line.split(": ", 1) for line in raw.decode().split("\n") if ": " in line)
+                    if fields.get("event") == "snapshot":
+                        self.ready += 1
+                    elif fields.get("event") == "status":
+                        self.on_status(tracking_id, json.loads(fields["data"])["status"], time.perf_counter())
+        finally:
+            writer.close()
+
+    async def _poll(self, tracking_id, interval, wait):
+        """ETag poller; with `wait` every request is a long-poll held until the next change"""
+        async with self.connecting:
+            reader, writer = await self.endpoint.connect()
+        etag, status_seen = None, None
+        path = f"/tracking/{tracking_id}" + (f"?wait={wait}" if wait else "")
+        try:
+            # Spread plain pollers over the interval like independent clients
+            if interval:
+                await asyncio.sleep(random.random() * interval)
+            while True:
+                writer.write(self.endpoint.request("GET", path, {"If-None-Match": etag} if etag else None))
+                self.requests += 1
+                status, headers = await read_head(reader)
+                body = await read_body(reader, status, headers)
+                if status == 200:
+                    etag = headers.get("etag")
+                    current = json.loads(body)["status"]
+                    if status_seen is None:
+                        self.ready += 1
+                    elif current != status_seen:
+                        self.on_status(tracking_id, current, time.perf_counter())
+                    status_seen = current
+                elif status == 304:
+                    self.not_modified += 1
+                else:
+                    raise ConnectionError(f"tracking returned {status}")
+                if interval:
+                    await asyncio.sleep(interval)
+        finally:
+            writer.close()
+
+    def start(self, count, mode, interval=2.0, wait=25):
+        for i in range(count):
+            tracking_id = self.tracking_ids[i % len(self.tracking_ids)]
+            if mode == "sse":
+                coroutine = self._sse(tracking_id)
+            elif mode == "long-poll":
+                coroutine = self._poll(tracking_id, 0, wait)
+            else:
+                coroutine = self._poll(tracking_id, interval, 0)
+            self.tasks.append(asyncio.create_task(self._guard(coroutine)))
+
+    async def _guard(self, coroutine):
+        try:
+            await coroutine
+        except asyncio.CancelledError:
+            raise
+        except (OSError, ValueError, asyncio.IncompleteReadError):
+            self.errors += 1
+
+    async def wait_ready(self, timeout=60.0):
+        deadline = time.monotonic() + timeout
+        while self.ready + self.errors < len(self.tasks) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        return self.ready
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
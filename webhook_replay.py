@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Fresh Fold Stripe Webhook Replayer
+Fires bursts of signed checkout.session.completed events at
+POST /api/webhook/stripe the way Stripe retries look from the receiving end:
+every event is redelivered several times, deliveries are shuffled so
+duplicates and other orders' events arrive out of order, and a share carry
+forged signatures. Then it waits for the acknowledged events to be applied
+and checks every order was paid, counted in revenue and notified exactly once.
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+Delivery = namedtuple("Delivery", "event_id payload signature genuine")
+
+
+def stripe_signature(payload, secret, timestamp=None):
+    """Stripe-Signature header value: t=<unix>,v1=<hex hmac-sha256 of "t.payload">"""
+    timestamp = int(timestamp or time.time())
+    digest = hmac.new(secret.encode(), f"{timestamp}.".encode() + payload, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+def checkout_completed_event(order_id, created=None):
+    session_id = f"cs_test_{uuid.uuid4().hex}"
+    return {
+        "id": f"evt_{uuid.uuid4().hex[:24]}", "object": "event", "type": "checkout.session.completed",
+        "created": int(created or time.time()), "livemode": False,
+        "data": {"object": {"id": session_id, "object": "checkout.session", "payment_status": "paid", "status": "complete",
+                            "metadata": {"orderId": order_id}}},
+    }
+
+
+class WebhookReplayer:
+    """Builds and fires delivery bursts and checks their effects through the admin API"""
+
+    def __init__(self, base_url, secret=None, admin_headers=None, concurrency=32, seed=7):
+        self.base_url = base_url
+        self.secret = secret
+        self.admin_headers = admin_headers or {}
+        self.concurrency = concurrency
+        self.random = random.Random(seed)
+        self.session = requests.Session()
+
+    def build(self, order_ids, duplicates=3, forged_share=0.05):
+        """One event per order delivered `duplicates` times, shuffled, plus forged copies when signing"""
+        deliveries = []
+        now = time.time()
+        for order_id in order_ids:
+            # Created timestamps spread over the last minute, so arrival order differs from event order
+            event = checkout_completed_event(order_id, created=now - self.random.random() * 60)
+            payload = json.dumps(event).encode()
+            for _ in range(duplicates):
+                deliveries.append(Delivery(event["id"], payload, self.secret and stripe_signature(payload, self.secret), True))
+            if self.secret and self.random.random() < forged_share:
+                deliveries.append(Delivery(event["id"], payload, stripe_signature(payload, "whsec_forged"), False))
+        self.random.shuffle(deliveries)
+        return deliveries
+
+    def fire(self, deliveries):
+        """POST every delivery from `concurrency` threads; returns outcome counts, ack latencies and wall time"""
+        local = threading.local()
+
+        def send(delivery):
+            if not hasattr(local, "session"):
+                local.session = requests.Session()
+            headers = {"Content-Type": "application/json"}
+            if delivery.signature:
+                headers["Stripe-Signature"] = delivery.signature
+            start = time.perf_counter()
+            try:
+                response = local.session.post(f"{self.base_url}/webhook/stripe", data=delivery.payload, headers=headers, timeout=60)
+                elapsed = (time.perf_counter() - start) * 1000
+                body = response.json() if response.content else {}
+            except (requests.RequestException, ValueError):
+                return "error", (time.perf_counter() - start) * 1000
+            if response.status_code == 400 and not delivery.genuine:
+                return "rejected", elapsed
+            if response.status_code != 200 or not delivery.genuine:
+                return "unexpected", elapsed
+            return ("duplicate" if body.get("duplicate") else "acked"), elapsed
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            results = list(pool.map(send, deliveries))
+        return {"outcomes": Counter(outcome for outcome, _ in results), "latencies": [ms for _, ms in results],
+                "wall": time.perf_counter() - start}
+
+    def stats(self):
+        response = self.session.get(f"{self.base_url}/admin/webhooks/stats", headers=self.admin_headers, timeout=60)
+        response.raise_for_status()
+        return response.json()
+
+    def wait_applied(self, timeout=120.0):
+        """Seconds until no webhook event is pending or processing"""
+        start = time.perf_counter()
+        while time.perf_counter() - start < timeout:
+            by_status = self.stats()["byStatus"]
+            if not by_status.get("pending") and not by_status.get("processing"):
+                return time.perf_counter() - start
+            time.sleep(0.05)
+        raise TimeoutError(f"webhook events still in flight after {timeout:.0f}s")
+
+    def revenue(self):
+        response = self.session.get(f"{self.base_url}/admin/stats", headers=self.admin_headers, timeout=60)
+        response.raise_for_status()
+        return response.json()["totalRevenue"]
+
+    def payment_notifications(self, since):
+        """payment_received notifications per tracking id, newest first until `since` (ISO timestamp)"""
+        counts = Counter()
+        params = {"limit": 200}
+        while True:
+            response = self.session.get(f"{self.base_url}/notifications", headers=self.admin_headers, params=params, timeout=60)
+            response.raise_for_status()
+            data = response.json()
+            for notification in data["notifications"]:
+                if notification["createdAt"] < since:
+                    return counts
+                if notification["type"] == "payment_received":
+                    counts[notification["data"].get("trackingId")] += 1
+            if not data.get("nextCursor"):
+                return counts
+            params["cursor"] = data["nextCursor"]
+
+    def check_exactly_once(self, orders, revenue_before, since):
+        """orders: [(orderId, trackingId, total)] that each got one event, however many deliveries"""
+        unpaid = [order_id for order_id, _, _ in orders
+                  if self.session.get(f"{self.base_url}/invoices/{order_id}", timeout=60).json()["invoice"]["paymentStatus"] != "paid"]
+        notified = self.payment_notifications(since)
+        wrong_notifications = sum(1 for _, tracking_id, _ in orders if notified[tracking_id] != 1)
+        expected = round(sum(total for _, _, total in orders), 2)
+        return {"unpaid": len(unpaid), "wrong_notifications": wrong_notifications,
+                "revenue_delta": round(self.revenue() - revenue_before, 2), "expected_revenue": expected}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fresh Fold Stripe webhook burst replayer")
+    parser.add_argument("--base-url", required=True, help="API base URL, e.g. http://127.0.0.1:3001/api")
+    parser.add_argument("--secret", help="STRIPE_WEBHOOK_SECRET of the target (default: a fresh one, set on a stand-in via /_local/config)")
+    parser.add_argument("--orders", type=int, default=300, help="orders created and paid through the burst")
+    parser.add_argument("--duplicates", type=int, default=3, help="deliveries of every event")
+    parser.add_argument("--forged", type=float, default=0.05, help="share of events also sent with a forged signature")
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args(argv)
+    from perf_scenarios import run_webhook_replay
+    result = run_webhook_replay(args.base_url, orders=args.orders, duplicates=args.duplicates, forged=args.forged,
+                                concurrency=args.concurrency, secret=args.secret)
+    raise SystemExit(0 if result["exactly_once"] else 1)
+
+
+if __name__ == "__main__":
+    main()